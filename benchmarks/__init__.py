@@ -0,0 +1 @@
+"""Benchmarks for NailGun, run as modules, like ``python -m benchmarks.suite``."""
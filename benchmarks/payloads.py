@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Time the ``create_payload`` and ``update_payload`` overrides in entities.
+
+Each entity class in :mod:`nailgun.entities` which overrides either method is
+populated with a value for every field, and each override is timed both with
+the compiled payload builders and with the field-by-field implementation they
+replaced. No server is needed. For example::
+
+    python -m benchmarks.payloads --number 2000
+
+"""
+
+import argparse
+import inspect
+import re
+import time
+from unittest import mock
+
+from nailgun import entities, entity_mixins
+from nailgun.config import ServerConfig
+from nailgun.entity_fields import (
+    BooleanField,
+    IntegerField,
+    ListField,
+    OneToManyField,
+    OneToOneField,
+)
+
+METHODS = ('create_payload', 'update_payload')
+
+SIMPLE_VALUES = {BooleanField: True, IntegerField: 1, ListField: []}
+
+
+def legacy_payload(fields, values):
+    """Build a payload as :func:`nailgun.entity_mixins._payload` used to."""
+    for field_name, field in fields.items():
+        if field_name in values:
+            if isinstance(field, OneToOneField):
+                values[f'{field_name}_id'] = getattr(values.pop(field_name), 'id', None)
+            elif isinstance(field, OneToManyField):
+                values[f'{field_name}_ids'] = [entity.id for entity in values.pop(field_name)]
+            elif isinstance(field, ListField):
+                if values[field_name] is None:
+                    continue
+                values[field_name] = [
+                    (
+                        legacy_payload(obj.get_fields(), obj.get_values())
+                        if isinstance(obj, entities.Entity)
+                        else obj
+                    )
+                    for obj in values[field_name]
+                ]
+    return values
+
+
+def fake_value(server_config, field):
+    """Return a plausible value for ``field``, without asking a server."""
+    if isinstance(field, OneToOneField):
+        return make_entity(server_config, field.entity, id=1)
+    if isinstance(field, OneToManyField):
+        return [make_entity(server_config, field.entity, id=i) for i in range(1, 4)]
+    if hasattr(field, 'choices'):
+        return field.choices[0]
+    return SIMPLE_VALUES.get(type(field), 'value')
+
+
+def make_entity(server_config, entity_type, **kwargs):
+    """Make an ``entity_type``, passing any values its constructor insists on."""
+    while True:
+        try:
+            return entity_type(server_config, **kwargs)
+        except TypeError as err:
+            match = re.search(r'value must be provided for the "(\w+)" field', str(err))
+            if match is None or match[1] in kwargs:
+                raise
+            kwargs[match[1]] = 1
+
+
+def overrides(server_config):
+    """Yield ``(name, method)`` for each populated entity's payload override.
+
+    ``method`` is ``None`` if the entity could not be populated.
+    """
+    for name, entity_type in inspect.getmembers(entities, inspect.isclass):
+        methods = [method for method in METHODS if method in vars(entity_type)]
+        if not issubclass(entity_type, entities.Entity) or not methods:
+            continue
+        try:
+            entity = make_entity(server_config, entity_type)
+            for field_name, field in entity.get_fields().items():
+                setattr(entity, field_name, fake_value(server_config, field))
+            entity.id = 1
+        except TypeError:
+            entity = None
+        for method in methods:
+            yield f'{name}.{method}', getattr(entity, method, None)
+
+
+def time_calls(function, number, repeat=5):
+    """Return the least average time taken by ``function()`` over ``repeat`` runs.
+
+    :returns: A number of seconds, or ``None`` if ``function`` fails.
+    """
+    try:
+        function()
+    except Exception:  # noqa: BLE001 - an override may need a server
+        return None
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = (time.perf_counter() - start) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    """Time each override with both payload implementations, and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=1000)
+    args = parser.parse_args()
+
+    server_config = ServerConfig('https://satellite.example.com')
+    totals = {'compiled': 0.0, 'legacy': 0.0}
+    skipped = []
+    print(f'{"override":<44} {"compiled":>10} {"legacy":>10}  (µs per call)')
+    for label, method in overrides(server_config):
+        if method is None:
+            skipped.append(label)
+            continue
+        compiled = time_calls(method, args.number)
+        with mock.patch.object(entity_mixins, '_payload', legacy_payload):
+            legacy = time_calls(method, args.number)
+        if compiled is None or legacy is None:
+            skipped.append(label)
+            continue
+        totals['compiled'] += compiled
+        totals['legacy'] += legacy
+        print(f'{label:<44} {compiled * 1e6:10.1f} {legacy * 1e6:10.1f}')
+    print(f'{"total":<44} {totals["compiled"] * 1e6:10.1f} {totals["legacy"] * 1e6:10.1f}')
+    if skipped:
+        print(f'Skipped, as they need a server or more values: {", ".join(skipped)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Compare searching for packages as entities and as rows.
+
+No server is needed: the server's response is faked, so only the time spent
+turning search results in to entities or rows is measured. For example::
+
+    python -m benchmarks.search_rows --results 100000 --repeat 3
+
+"""
+
+import argparse
+import time
+from unittest import mock
+
+from nailgun.config import ServerConfig
+from nailgun.entities import Package
+
+
+def fake_results(count):
+    """Return ``count`` package search results, as the server returns them."""
+    return [
+        {
+            'id': i,
+            'name': f'package-{i}',
+            'version': '1.0',
+            'release': '1.el9',
+            'arch': 'x86_64',
+            'epoch': '0',
+            'filename': f'package-{i}-1.0-1.el9.x86_64.rpm',
+            'nvra': f'package-{i}-1.0-1.el9.x86_64',
+            'nvrea': f'package-{i}-1.0-1.el9.x86_64',
+            'checksum': f'{i:064x}',
+            'summary': 'A package',
+            'description': 'A package, faked for benchmarking.',
+            'sourcerpm': f'package-{i}-1.0-1.el9.src.rpm',
+            'repository_id': i % 50 + 1,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def best_time(function, repeat):
+    """Call ``function`` ``repeat`` times, and return the shortest time taken."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    """Time both kinds of search, and print how long each takes."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--results', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    package = Package(ServerConfig('https://satellite.example.com'))
+    results = fake_results(args.results)
+    columns = ('id', 'name', 'version', 'release', 'arch', 'repository')
+
+    def search_json(*_args, **_kwargs):
+        # Results are normalized in place, so each search gets fresh copies.
+        return {'results': [dict(result) for result in results]}
+
+    with mock.patch.object(Package, 'search_json', side_effect=search_json):
+        timings = (
+            ('copying results only', best_time(search_json, args.repeat)),
+            ('search()', best_time(package.search, args.repeat)),
+            ('search_rows()', best_time(package.search_rows, args.repeat)),
+            (
+                f'search_rows(columns={len(columns)})',
+                best_time(lambda: package.search_rows(columns=columns), args.repeat),
+            ),
+        )
+    print(f'{args.results} results, best of {args.repeat}:')
+    for label, seconds in timings:
+        print(f'  {label:<28} {seconds:8.3f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""Time common NailGun operations against a stand-in Satellite server.
+
+Each benchmark talks over HTTP to a :class:`nailgun.fake_server.FakeServer`,
+which runs in this process. The results are written as JSON and compared
+against a baseline, so that a release which makes these operations slower can
+be spotted. Run the suite from the root of the repository::
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --save-baseline
+
+Each benchmark's time is recorded as a ratio to the time taken by a fixed
+calibration workload, timed in the same run, so that baselines recorded on one
+machine can be compared against on another. The script exits with a non-zero
+status if any ratio is greater than its baseline by more than ``--threshold``.
+
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from nailgun import entity_mixins
+from nailgun.config import ServerConfig
+from nailgun.entities import ContentUpload, Host, Package, Product, Repository
+from nailgun.fake_server import FakeServer
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+VERSION = os.path.join(os.path.dirname(__file__), os.pardir, 'VERSION')
+
+HOST_VALUES = {
+    'name': 'host.example.com',
+    'organization': 1,
+    'location': 2,
+    'hostgroup': 3,
+    'domain': 4,
+    'subnet': 5,
+    'architecture': 6,
+    'operatingsystem': 7,
+    'medium': 8,
+    'ptable': 9,
+    'mac': '00:11:22:33:44:55',
+    'ip': '192.168.0.10',
+    'build': True,
+    'enabled': True,
+    'managed': True,
+    'comment': 'A host, faked for benchmarking.',
+    'host_parameters_attributes': [{'name': 'key', 'value': 'value'}],
+}
+
+
+#: The number of times a task is polled before it finishes.
+TASK_POLLS = 3
+
+
+def fake_package(i):
+    """Return a package, as the server returns it."""
+    return {
+        'id': i,
+        'name': f'package-{i}',
+        'version': '1.0',
+        'release': '1.el9',
+        'arch': 'x86_64',
+        'epoch': '0',
+        'filename': f'package-{i}-1.0-1.el9.x86_64.rpm',
+        'nvra': f'package-{i}-1.0-1.el9.x86_64',
+        'checksum': f'{i:064x}',
+        'summary': 'A package',
+        'sourcerpm': f'package-{i}-1.0-1.el9.src.rpm',
+        'repository_id': i % 50 + 1,
+    }
+
+
+def make_server_with_content(packages):
+    """Return a :class:`nailgun.fake_server.FakeServer` holding the content benchmarked.
+
+    It holds a product, a repository of that product and ``packages``
+    packages.
+
+    :returns: A ``(server, product_id, repository_id)`` tuple.
+    """
+    server = FakeServer(
+        'http://127.0.0.1',
+        entity_types=(ContentUpload, Package, Product, Repository),
+        task_polls=TASK_POLLS,
+    )
+    _, product = server.handle(
+        'POST', 'katello/api/v2/products', payload={'name': 'Benchmark', 'organization_id': 1}
+    )
+    _, repository = server.handle(
+        'POST',
+        'katello/api/v2/repositories',
+        payload={'name': 'Benchmark', 'product_id': product['id'], 'content_type': 'file'},
+    )
+    server.records('katello/api/v2/packages').update(
+        (i, fake_package(i)) for i in range(1, packages + 1)
+    )
+    return server, product['id'], repository['id']
+
+
+class _QuietHandler(WSGIRequestHandler):
+    """Handle requests without logging each of them to stderr."""
+
+    def log_message(self, *args):
+        """Do not log anything."""
+
+
+@contextlib.contextmanager
+def serve(app):
+    """Serve the WSGI application ``app`` in a background thread, on a free port.
+
+    :returns: A context manager which yields a
+        :class:`nailgun.config.ServerConfig` for the server.
+    """
+    server = make_server('127.0.0.1', 0, app, WSGIServer, handler_class=_QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield ServerConfig(f'http://127.0.0.1:{server.server_port}', auth=('admin', 'changeme'))
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+def calibrate():
+    """Do a fixed amount of work, which other timings are relative to."""
+    for _ in range(100):
+        json.loads(json.dumps([fake_package(i) for i in range(100)]))
+
+
+def best_time(function, number, repeat):
+    """Return the least average time taken by ``function()`` over ``repeat`` runs."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = (time.perf_counter() - start) / number
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def benchmarks(server_config, args, upload_path, product_id, repository_id):
+    """Yield ``(name, function, number, size)`` for each benchmark.
+
+    ``size`` is the number of bytes each call handles, or ``None``.
+    """
+    host = Host(server_config, **HOST_VALUES)
+    yield 'construct', lambda: Host(server_config, **HOST_VALUES), args.number * 10, None
+    yield 'read', Product(server_config, id=product_id).read, args.number, None
+    package = Package(server_config)
+    yield 'search', lambda: package.search(query={'per_page': 20}), args.number, None
+    yield (
+        f'search_{args.results}',
+        lambda: package.search(query={'per_page': args.results}),
+        1,
+        None,
+    )
+    yield 'create_payload', host.create_payload, args.number * 10, None
+    yield 'update_payload', lambda: host.update_payload(HOST_VALUES), args.number * 10, None
+    yield 'task_poll', Product(server_config, id=product_id).sync, args.number, None
+    content_upload = ContentUpload(
+        server_config, repository=Repository(server_config, id=repository_id)
+    )
+    yield (
+        'upload',
+        lambda: content_upload.upload(upload_path, 'file'),
+        1,
+        os.path.getsize(upload_path),
+    )
+
+
+def run(args):
+    """Run each benchmark, and return the results as a JSON-serializable dict."""
+    results = {}
+    # Tasks are polled as quickly as possible, to time NailGun rather than sleep.
+    entity_mixins.TASK_POLL_RATE = 0
+    calibration = best_time(calibrate, 10, args.repeat)
+    server, product_id, repository_id = make_server_with_content(args.results)
+    with tempfile.NamedTemporaryFile() as upload_file, serve(server) as server_config:
+        upload_file.write(os.urandom(args.upload_size * 1024 * 1024))
+        upload_file.flush()
+        for name, function, number, size in benchmarks(
+            server_config, args, upload_file.name, product_id, repository_id
+        ):
+            seconds = best_time(function, number, args.repeat)
+            results[name] = {'ratio': seconds / calibration, 'seconds': seconds, 'number': number}
+            if size is not None:
+                results[name]['bytes_per_second'] = size / seconds
+            print(f'{name:<20} {seconds * 1e3:12.3f}ms', file=sys.stderr)
+    with open(VERSION) as handle:
+        version = handle.read().strip()
+    return {
+        'nailgun': version,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'calibration_seconds': calibration,
+        'benchmarks': results,
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print how the ratios in ``results`` compare to those in ``baseline``.
+
+    :returns: The names of the benchmarks which are slower than their baseline
+        by more than ``threshold``, a fraction.
+    """
+    slower = []
+    print(f'{"benchmark":<20} {"baseline":>12} {"current":>12} {"change":>8}')
+    for name, result in results['benchmarks'].items():
+        if name not in baseline['benchmarks']:
+            print(f'{name:<20} {"-":>12} {result["ratio"]:12.3f}')
+            continue
+        before = baseline['benchmarks'][name]['ratio']
+        change = result['ratio'] / before - 1
+        flag = ''
+        if change > threshold:
+            slower.append(name)
+            flag = '  slower'
+        print(f'{name:<20} {before:12.3f} {result["ratio"]:12.3f} {change:+8.1%}{flag}')
+    return slower
+
+
+def main():
+    """Run the benchmarks, save their results, and compare them to the baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=100, help='calls per timed run')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per benchmark')
+    parser.add_argument('--results', type=int, default=100_000, help='rows in a large search')
+    parser.add_argument('--upload-size', type=int, default=32, help='MiB to upload')
+    parser.add_argument('--output', help='where to write results, as JSON')
+    parser.add_argument('--baseline', default=BASELINE, help='results to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='overwrite the baseline')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown')
+    args = parser.parse_args()
+
+    results = run(args)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            json.dump(results, handle, indent=2)
+    if args.save_baseline:
+        # Only ratios are kept, as times depend on the machine they were taken on.
+        baseline = {key: value for key, value in results.items() if key != 'calibration_seconds'}
+        baseline['benchmarks'] = {
+            name: {'ratio': result['ratio'], 'number': result['number']}
+            for name, result in results['benchmarks'].items()
+        }
+        with open(args.baseline, 'w') as handle:
+            json.dump(baseline, handle, indent=2)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}, so nothing to compare to.')
+        return 0
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)
+    slower = compare(results, baseline, args.threshold)
+    if slower:
+        print(f'Slower than the baseline: {", ".join(slower)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
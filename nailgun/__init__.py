@@ -4,11 +4,30 @@ NailGun's modules are organized in to a tree of dependencies, where each module
 only knows about the modules below it in the tree and no module knows about
 others at the same level in the tree. The modules can be visualized like this::
 
-    nailgun.entities
-    └── nailgun.entity_mixins
-        ├── nailgun.entity_fields
-        ├── nailgun.config
-        └── nailgun.client
+    nailgun.orchestration, nailgun.fake_server
+    └── nailgun.entities
+        └── nailgun.entity_mixins
+            ├── nailgun.query
+            │   └── nailgun.entity_fields
+            ├── nailgun.json_stream
+            ├── nailgun.config
+            └── nailgun.client
+
+    nailgun.cassette
+    └── nailgun.client
+
+    nailgun.tracing, nailgun.budget, nailgun.profiling
+    └── nailgun.metrics
+        └── nailgun.entity_mixins
+            └── nailgun.client
+
+Entities provided by server plugins are defined in submodules of
+:mod:`nailgun.entities`, such as ``nailgun.entities.ansible``. These submodules
+build on the entities defined by :mod:`nailgun.entities` itself, which imports
+them only when needed.
+
+Setting the ``NAILGUN_PROFILE`` environment variable switches on
+:mod:`nailgun.profiling` when NailGun is imported.
 
 If this is your first time working with NailGun, please read several of the
 :doc:`/examples` before the documentation here.
@@ -16,5 +35,11 @@ If this is your first time working with NailGun, please read several of the
 """
 
 from logging import basicConfig
+import os
 
 basicConfig()
+
+if os.environ.get('NAILGUN_PROFILE'):
+    from nailgun import profiling
+
+    profiling.enable_from_environment()
@@ -0,0 +1,190 @@
+"""Count the requests a block of code makes, and fail if it makes too many.
+
+A :class:`RequestBudget` counts the requests sent through :mod:`nailgun.client`
+by each thread while it is active, grouped by HTTP method and templated path (see
+:func:`nailgun.metrics.template_path`). It can be used as a context manager or
+as a decorator::
+
+    with RequestBudget(max_requests=20) as budget:
+        hosts = [Host(server_config, id=id_).read() for id_ in host_ids]
+    print(budget.report())
+
+    @RequestBudget(max_requests=20, max_reads=5)
+    def test_hosts():
+        ...
+
+Reading many entities of one kind, one request each, is usually slower than
+searching for them with one request. Such "N+1" patterns are logged as a
+warning, or fail the budget if ``max_reads`` is given.
+
+"""
+
+import collections
+import contextlib
+import logging
+import re
+import threading
+
+from nailgun import client
+from nailgun.metrics import template_path
+
+logger = logging.getLogger(__name__)
+
+#: Single entity reads from a collection which are reported as a likely N+1
+#: pattern, if there are at least this many.
+N_PLUS_ONE_THRESHOLD = 10
+
+# The templated path of a single entity. Task polls are repeated reads of one
+# entity by design, so they are not counted as reads.
+_ENTITY_PATH = re.compile(r'^(?P<collection>.+)/\{id\}$')
+_TASK_PATH = '/foreman_tasks/api/tasks/{id}'
+
+
+class BudgetExceededError(Exception):
+    """Indicates that a block of code made more requests than its budget allows."""
+
+
+class RequestBudget(contextlib.ContextDecorator):
+    """Count the requests made within a block, and fail if there are too many.
+
+    The counts are checked when the block exits without an error. They are
+    reset each time the block is entered. A budget may be entered again while
+    in use, as by a recursive function it decorates: requests are then
+    counted, and checked, for the outermost block only.
+
+    Requests are counted per thread. A thread counts the requests it sends
+    itself between entering the block and exiting it, so a function which the
+    budget decorates may run in several threads at once, each call being
+    counted apart. Requests sent by other threads, such as the worker threads
+    of :func:`nailgun.entity_mixins.save`, are not counted.
+
+    :param max_requests: The most requests allowed in all, or ``None``.
+    :param max_per_endpoint: The most requests allowed with one HTTP method to
+        one templated path, or ``None``.
+    :param max_reads: The most single entity reads allowed from one
+        collection, or ``None``. If ``None``, collections read from at least
+        :data:`N_PLUS_ONE_THRESHOLD` times are logged as a warning instead.
+    :raises BudgetExceededError: When the block exits, if a limit is exceeded.
+    """
+
+    def __init__(self, max_requests=None, max_per_endpoint=None, max_reads=None):
+        self.max_requests = max_requests
+        self.max_per_endpoint = max_per_endpoint
+        self.max_reads = max_reads
+        self._lock = threading.Lock()
+        # The number of threads within the block, and the depth and counts of
+        # each of them.
+        self._threads = 0
+        self._local = threading.local()
+
+    @property
+    def counts(self):
+        """The requests made by the current thread in its last block.
+
+        A ``collections.Counter`` of ``(method, templated path)`` tuples.
+        """
+        try:
+            return self._local.counts
+        except AttributeError:
+            counts = self._local.counts = collections.Counter()
+            return counts
+
+    def __enter__(self):
+        """Start counting requests afresh, unless already counting in this thread."""
+        local = self._local
+        local.depth = getattr(local, 'depth', 0) + 1
+        if local.depth > 1:
+            return self
+        local.counts = collections.Counter()
+        with self._lock:
+            self._threads += 1
+            if self._threads == 1:
+                client.add_interceptor(self.intercept)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Stop counting requests, and check the counts if no error was raised.
+
+        Nothing is done when an inner block exits.
+        """
+        local = self._local
+        local.depth -= 1
+        if local.depth > 0:
+            return False
+        with self._lock:
+            self._threads -= 1
+            if self._threads == 0:
+                client.remove_interceptor(self.intercept)
+        if exc_type is None:
+            self.check()
+        return False
+
+    def intercept(self, method, url, kwargs, send):
+        """Count a request, and send it. See :func:`nailgun.client.add_interceptor`.
+
+        Only requests sent by threads within the block are counted.
+        """
+        local = self._local
+        if getattr(local, 'depth', 0):
+            local.counts[method, template_path(url)] += 1
+        return send()
+
+    @property
+    def total(self):
+        """The number of requests made."""
+        return sum(self.counts.values())
+
+    def reads(self):
+        """Return the number of single entity reads from each collection.
+
+        :returns: A dict mapping the templated path of each collection to the
+            number of ``GET`` requests for single entities in it.
+        """
+        reads = collections.Counter()
+        for (method, path), count in self.counts.items():
+            match = _ENTITY_PATH.match(path)
+            if method == 'GET' and match and path != _TASK_PATH:
+                reads[match.group('collection')] += count
+        return dict(reads)
+
+    def n_plus_one(self, threshold=N_PLUS_ONE_THRESHOLD):
+        """Return the collections read from at least ``threshold`` times.
+
+        :returns: A dict like :meth:`reads` returns.
+        """
+        return {path: count for path, count in self.reads().items() if count >= threshold}
+
+    def report(self):
+        """Return a summary of the requests made, busiest endpoints first."""
+        lines = [f'{self.total} requests']
+        for (method, path), count in self.counts.most_common():
+            lines.append(f'{count:>6} {method} {path}')
+        for path, count in self.n_plus_one().items():
+            lines.append(f'Likely N+1: {count} reads from {path}. Could one search do?')
+        return '\n'.join(lines)
+
+    def check(self):
+        """Check the counts against the limits.
+
+        :raises BudgetExceededError: If a limit is exceeded.
+        """
+        problems = []
+        if self.max_requests is not None and self.total > self.max_requests:
+            problems.append(f'{self.total} requests, more than {self.max_requests}')
+        if self.max_per_endpoint is not None:
+            problems.extend(
+                f'{count} {method} {path} requests, more than {self.max_per_endpoint}'
+                for (method, path), count in self.counts.items()
+                if count > self.max_per_endpoint
+            )
+        if self.max_reads is not None:
+            problems.extend(
+                f'{count} reads from {path}, more than {self.max_reads}'
+                for path, count in self.n_plus_one(self.max_reads + 1).items()
+            )
+        if problems:
+            raise BudgetExceededError(
+                'Request budget exceeded: {}.\n{}'.format('; '.join(problems), self.report())
+            )
+        for path, count in self.n_plus_one().items():
+            logger.warning('Likely N+1: %s reads from %s. Could one search do?', count, path)
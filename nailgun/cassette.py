@@ -0,0 +1,336 @@
+"""Record the requests NailGun makes, and replay them without a server.
+
+:func:`record` saves every request sent through :mod:`nailgun.client`, and the
+response to it, in a cassette. :func:`replay` answers requests from a cassette
+instead of sending them, so that a job can be re-run offline::
+
+    with cassette.record('job.jsonl.gz'):
+        run_job(server_config)
+    with cassette.replay('job.jsonl.gz', latency='recorded'):
+        run_job(server_config)
+
+Task polls are requests like any other, so they are recorded and replayed too.
+
+A cassette is a text file holding one JSON object per line: a header, then one
+line per request. It is compressed with gzip if its name ends in ``.gz``. As
+each line stands alone, cassettes are written and read a line at a time, and a
+cassette need never be held in memory whole.
+
+The bodies of responses to streamed requests, like file downloads, are not
+kept in the cassette. They are written a chunk at a time to blob files, named
+after the digest of their contents, in a directory beside the cassette: the
+cassette's name followed by ``.blobs``.
+
+"""
+
+import base64
+import contextlib
+import datetime
+import gzip
+import hashlib
+from http.client import responses
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+
+import requests
+
+from nailgun import client
+
+#: The version of the cassette format written by :class:`Recorder`. Version 2
+#: added blob files.
+FORMAT_VERSION = 2
+
+#: The versions of the cassette format read by :class:`Player`.
+_READABLE_VERSIONS = (1, 2)
+
+#: How many bytes of a streamed body are written to its blob file at a time.
+_BLOB_CHUNK_SIZE = 1024 * 1024
+
+
+class CassetteError(Exception):
+    """Indicates that a cassette cannot be read, or holds no matching request."""
+
+
+def _open(path, mode):
+    """Open ``path`` in text ``mode``, decompressing it if its name ends in ``.gz``."""
+    if str(path).endswith('.gz'):
+        return gzip.open(path, f'{mode}t', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def _blob_directory(path):
+    """Return the directory holding the blob files of the cassette at ``path``."""
+    return f'{path}.blobs'
+
+
+class _BlobFile(io.FileIO):
+    """A blob file opened for reading, which closes itself once read to its end."""
+
+    def read(self, size=-1):
+        """Read up to ``size`` bytes, closing the file if there are none left."""
+        chunk = super().read(size)
+        if not chunk:
+            self.close()
+        return chunk
+
+
+def _blob_response(response, path):
+    """Make ``response`` hand out its body from the blob file at ``path``."""
+    response.raw = _BlobFile(path)
+    response._content = False
+    response._content_consumed = False
+
+
+def _request_body(kwargs):
+    """Return a short, JSON serializable stand-in for the body of a request.
+
+    Text bodies, such as JSON payloads, are kept as they are. Binary bodies,
+    such as content uploads, are replaced by their digest, and uploaded files
+    are left out.
+    """
+    body = kwargs.get('data')
+    if body is None:
+        body = kwargs.get('json')
+    if body is None or isinstance(body, str):
+        return body
+    if isinstance(body, bytes | bytearray | memoryview):
+        return f'sha256:{hashlib.sha256(body).hexdigest()}'
+    return json.dumps(body, sort_keys=True, default=str)
+
+
+class Recorder:
+    """An interceptor which writes each request and response to a cassette.
+
+    See :func:`nailgun.client.add_interceptor`. Use :func:`record` rather than
+    making a recorder directly.
+
+    :param path: Where to write the cassette.
+    """
+
+    def __init__(self, path):
+        self._file = _open(path, 'w')
+        self._blobs = _blob_directory(path)
+        self._lock = threading.Lock()
+        self._write({'nailgun_cassette': FORMAT_VERSION})
+
+    def __call__(self, method, url, kwargs, send):
+        """Send the request, record it and its response, and return the response."""
+        interaction = {
+            'method': method,
+            'url': url,
+            'params': kwargs.get('params'),
+            'body': _request_body(kwargs),
+        }
+        start = time.perf_counter()
+        try:
+            response = send()
+        except requests.exceptions.RequestException as err:
+            interaction['error'] = {'type': type(err).__name__, 'message': str(err)}
+            interaction['elapsed'] = time.perf_counter() - start
+            self._write(interaction)
+            raise
+        if kwargs.get('stream'):
+            # The body is written to a blob file, then handed out from there,
+            # so that it is never held in memory whole.
+            blob = self._write_blob(response)
+            interaction['blob'] = blob
+            _blob_response(response, os.path.join(self._blobs, blob))
+        else:
+            content = response.content
+            try:
+                interaction['content'] = content.decode('utf-8')
+            except UnicodeDecodeError:
+                interaction['content'] = base64.b64encode(content).decode('ascii')
+                interaction['base64'] = True
+        interaction['elapsed'] = time.perf_counter() - start
+        interaction['status'] = response.status_code
+        interaction['headers'] = dict(response.headers)
+        self._write(interaction)
+        return response
+
+    def _write_blob(self, response):
+        """Write the body of ``response`` to a blob file, a chunk at a time.
+
+        :returns: The name of the blob file, the SHA-256 digest of the body.
+        """
+        os.makedirs(self._blobs, exist_ok=True)
+        checksum = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=self._blobs, delete=False) as handle:
+            try:
+                for chunk in response.iter_content(_BLOB_CHUNK_SIZE):
+                    checksum.update(chunk)
+                    handle.write(chunk)
+            except BaseException:
+                handle.close()
+                os.remove(handle.name)
+                raise
+        blob = checksum.hexdigest()
+        os.replace(handle.name, os.path.join(self._blobs, blob))
+        return blob
+
+    def _write(self, value):
+        """Write ``value`` to the cassette as one line of JSON."""
+        line = json.dumps(value, separators=(',', ':'), default=str)
+        with self._lock:
+            self._file.write(f'{line}\n')
+
+    def close(self):
+        """Finish writing the cassette."""
+        self._file.close()
+
+
+class Player:
+    """An interceptor which answers requests from a cassette.
+
+    See :func:`nailgun.client.add_interceptor`. Use :func:`replay` rather than
+    making a player directly.
+
+    Each recorded response is handed out once, to the first request with the
+    same method, URL and parameters, and body if ``match_body`` is true.
+    Responses are usually handed out in the order they were recorded. If
+    requests are made in a different order, as when several threads make
+    them, the responses passed over are held until they are asked for.
+
+    :param path: The cassette to read.
+    :param latency: How long to wait before each response is handed out:
+        ``None`` not to wait, ``'recorded'`` to wait as long as the request
+        took when it was recorded, or a number of seconds.
+    :param match_body: Whether requests must also have the same body as those
+        recorded. Bodies often hold random values, like generated names.
+    :param window: The most responses to hold while looking for a match.
+    :raises CassetteError: If ``path`` is not a cassette.
+    """
+
+    def __init__(self, path, latency=None, match_body=False, window=1000):
+        self.latency = latency
+        self.match_body = match_body
+        self.window = window
+        self._file = _open(path, 'r')
+        self._blobs = _blob_directory(path)
+        self._pending = []
+        self._lock = threading.Lock()
+        header = self._read()
+        if not isinstance(header, dict) or header.get('nailgun_cassette') not in _READABLE_VERSIONS:
+            self._file.close()
+            versions = ', '.join(map(str, _READABLE_VERSIONS))
+            raise CassetteError(f'{path} is not a NailGun cassette (versions {versions} readable).')
+
+    def __call__(self, method, url, kwargs, _send):
+        """Return the recorded response to the request, rather than send it."""
+        key = self._key(method, url, kwargs.get('params'), _request_body(kwargs))
+        interaction = self._take(key)
+        if self.latency == 'recorded':
+            time.sleep(interaction['elapsed'])
+        elif self.latency:
+            time.sleep(self.latency)
+        if 'error' in interaction:
+            error = interaction['error']
+            error_type = getattr(requests.exceptions, error['type'], None)
+            if not isinstance(error_type, type) or not issubclass(
+                error_type, requests.exceptions.RequestException
+            ):
+                error_type = requests.exceptions.RequestException
+            raise error_type(error['message'])
+        response = _response(interaction)
+        if 'blob' in interaction:
+            _blob_response(response, os.path.join(self._blobs, interaction['blob']))
+        return response
+
+    def _key(self, method, url, params, body):
+        """Return what a request must have in common with a recorded one."""
+        params = json.dumps(params, sort_keys=True, default=str)
+        return (method, url, params, body if self.match_body else None)
+
+    def _take(self, key):
+        """Remove and return the first recorded interaction matching ``key``."""
+        with self._lock:
+            for i, interaction in enumerate(self._pending):
+                if self._matches(interaction, key):
+                    return self._pending.pop(i)
+            while len(self._pending) <= self.window:
+                interaction = self._read()
+                if interaction is None:
+                    break
+                if self._matches(interaction, key):
+                    return interaction
+                self._pending.append(interaction)
+        raise CassetteError(f'No recorded response for {key[0]} {key[1]}')
+
+    def _matches(self, interaction, key):
+        """Tell whether ``interaction`` is a recording of a request with ``key``."""
+        return key == self._key(
+            interaction['method'], interaction['url'], interaction['params'], interaction['body']
+        )
+
+    def _read(self):
+        """Read the next line of the cassette, or return ``None`` at its end."""
+        line = self._file.readline()
+        if not line:
+            return None
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError as err:
+            raise CassetteError(f'Cannot read cassette line: {err}') from err
+
+    def close(self):
+        """Stop reading the cassette."""
+        self._file.close()
+
+
+def _response(interaction):
+    """Make a ``requests.Response`` from a recorded interaction.
+
+    The body of a response recorded in a blob file is left out.
+    """
+    content = interaction.get('content', '')
+    response = requests.Response()
+    response.status_code = interaction['status']
+    response.reason = responses.get(response.status_code, '')
+    response.headers = requests.structures.CaseInsensitiveDict(interaction['headers'])
+    response._content = (
+        base64.b64decode(content) if interaction.get('base64') else content.encode('utf-8')
+    )
+    response._content_consumed = True
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.url = interaction['url']
+    response.elapsed = datetime.timedelta(seconds=interaction['elapsed'])
+    return response
+
+
+@contextlib.contextmanager
+def record(path):
+    """Record the requests made through :mod:`nailgun.client` in a cassette.
+
+    :param path: Where to write the cassette.
+    :returns: A context manager which yields a :class:`Recorder`.
+    """
+    recorder = Recorder(path)
+    client.add_interceptor(recorder)
+    try:
+        yield recorder
+    finally:
+        client.remove_interceptor(recorder)
+        recorder.close()
+
+
+@contextlib.contextmanager
+def replay(path, latency=None, match_body=False, window=1000):
+    """Answer the requests made through :mod:`nailgun.client` from a cassette.
+
+    No request is sent to a server. See :class:`Player` for the arguments.
+
+    :returns: A context manager which yields a :class:`Player`.
+    :raises CassetteError: From within the block, if a request was not
+        recorded.
+    """
+    player = Player(path, latency, match_body, window)
+    client.add_interceptor(player)
+    try:
+        yield player
+    finally:
+        client.remove_interceptor(player)
+        player.close()
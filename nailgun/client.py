@@ -9,6 +9,16 @@ Each function is modified with the following behaviours:
    'content-type' header is 'application/json'.
 3. It logs information about the request before it is sent.
 4. It logs information about the response when it is received.
+5. It accepts an optional ``response_mode`` argument, which is recorded on the
+   returned response. See :data:`RESPONSE_MODES`.
+6. It sends the request through any interceptors. See :func:`add_interceptor`.
+7. It accepts an optional ``retry_policy`` argument, a
+   :class:`nailgun.config.RequestRetryPolicy`, and retries the request as it
+   decides. :meth:`nailgun.config.ServerConfig.get_client_kwargs` passes the
+   server's policy on as a ``default_retry_policy`` argument, which is used
+   when no ``retry_policy`` is passed. A request which is safe to repeat despite its method,
+   such as a ``POST`` which only searches, may be marked with an
+   ``idempotent=True`` argument, and one which is not with ``idempotent=False``.
 
 .. _Requests: http://docs.python-requests.org/en/latest/
 .. _functions from:
@@ -16,8 +26,13 @@ Each function is modified with the following behaviours:
 
 """
 
+from collections import namedtuple
+import contextlib
+import functools
 from json import dumps
 import logging
+import threading
+import time
 from warnings import simplefilter
 
 import requests
@@ -52,6 +67,196 @@ simplefilter(
     urllib3.exceptions.InsecureRequestWarning,
 )
 
+#: Values accepted by the ``response_mode`` argument of the functions in this
+#: module. The mode only affects how a non-JSON response body is handed back
+#: by :func:`nailgun.entities._handle_response`:
+#:
+#: ``'decode'``
+#:     Decode the whole body as UTF-8 text. This is the default.
+#: ``'bytes'``
+#:     Return the body as ``bytes``, decoding it only if the content type is
+#:     textual.
+#: ``'memoryview'``
+#:     Like ``'bytes'``, but wrap binary bodies in a ``memoryview``, so that
+#:     slicing them does not copy them again.
+#: ``'stream'``
+#:     Do not download the body up front. Return an iterator over chunks of
+#:     the body instead, decoding chunks only if the content type is textual.
+RESPONSE_MODES = ('decode', 'bytes', 'memoryview', 'stream')
+
+#: What a server said in its response headers about how it handled a request,
+#: as returned by :func:`response_metadata`.
+#:
+#: ``request_id``
+#:     The ID the server logged the request under, from the ``X-Request-Id``
+#:     header, or ``None``.
+#: ``elapsed``
+#:     The seconds between sending the request and receiving the response
+#:     headers, as measured by the client.
+#: ``server_seconds``
+#:     The seconds the server spent handling the request, from the
+#:     ``X-Runtime`` header, or the ``total`` metric of the ``Server-Timing``
+#:     header, or ``None``. The rest of ``elapsed`` was spent on the network
+#:     and in queues.
+#: ``server_timing``
+#:     A dict mapping each metric in the ``Server-Timing`` header to its
+#:     duration in seconds.
+ResponseMetadata = namedtuple(
+    'ResponseMetadata', ('request_id', 'elapsed', 'server_seconds', 'server_timing')
+)
+
+
+def _parse_server_timing(header):
+    """Return the metrics with a duration in a ``Server-Timing`` header, in seconds.
+
+    >>> _parse_server_timing('db;dur=53, app;desc="App";dur=47, cache')
+    {'db': 0.053, 'app': 0.047}
+    """
+    timing = {}
+    for metric in header.split(','):
+        name, *params = (part.strip() for part in metric.split(';'))
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'dur':
+                with contextlib.suppress(ValueError):
+                    timing[name] = float(value.strip().strip('"')) / 1000
+    return timing
+
+
+def response_metadata(response):
+    """Return what ``response`` says about how the server handled the request.
+
+    :param response: A ``requests.Response``.
+    :returns: A :data:`ResponseMetadata`.
+    """
+    headers = response.headers
+    server_timing = _parse_server_timing(headers.get('server-timing', ''))
+    server_seconds = server_timing.get('total')
+    runtime = headers.get('x-runtime')
+    if runtime is not None:
+        with contextlib.suppress(ValueError):
+            server_seconds = float(runtime)
+    elapsed = response.elapsed.total_seconds() if response.elapsed else None
+    return ResponseMetadata(headers.get('x-request-id'), elapsed, server_seconds, server_timing)
+
+
+# A tuple, so that requests being sent need not hold a lock to read it.
+_interceptors = ()
+_interceptors_lock = threading.Lock()
+
+
+def add_interceptor(interceptor):
+    """Send every request made by this module through ``interceptor``.
+
+    An interceptor is called as ``interceptor(method, url, kwargs, send)``.
+    ``method`` is an upper case HTTP method, and ``kwargs`` is a ``dict`` of the
+    arguments for requests, including ``params``, ``data`` and ``json`` if the
+    wrapped function accepts them. ``send()`` sends the request on, and returns
+    the response. An interceptor must return a response. It may change
+    ``kwargs`` before calling ``send()``, call ``send()`` more than once, or not
+    call it at all.
+
+    Interceptors added later are called nearer to the network. For example, an
+    interceptor which times requests should be added after one which retries
+    them, so that each attempt is timed.
+
+    :param interceptor: A callable, as described above.
+    :returns: Nothing.
+    """
+    global _interceptors
+    with _interceptors_lock:
+        _interceptors = (*_interceptors, interceptor)
+
+
+def remove_interceptor(interceptor):
+    """Stop sending requests through ``interceptor``.
+
+    :param interceptor: A callable passed to :func:`add_interceptor`.
+    :returns: Nothing.
+    :raises: ``ValueError`` if ``interceptor`` was not added.
+    """
+    global _interceptors
+    with _interceptors_lock:
+        interceptors = list(_interceptors)
+        interceptors.remove(interceptor)
+        _interceptors = tuple(interceptors)
+
+
+def _send(method, url, kwargs, function):
+    """Send a request through each interceptor, and return the response.
+
+    If ``kwargs`` has a ``retry_policy``, or else a ``default_retry_policy``,
+    send the request again, through each interceptor, for as long as the policy
+    says to. A request whose body cannot be sent twice, such as a file being
+    uploaded, is not retried. See :func:`_replayable`.
+
+    :param method: The request's upper case HTTP method.
+    :param url: The request's URL.
+    :param kwargs: A ``dict`` of arguments for ``function``. The
+        ``retry_policy``, ``default_retry_policy`` and ``idempotent`` arguments
+        are popped from it.
+    :param function: A function which sends a request, given a copy of
+        ``kwargs`` that it may change.
+    """
+    retry_policy = kwargs.pop('retry_policy', None)
+    default_retry_policy = kwargs.pop('default_retry_policy', None)
+    if retry_policy is None:
+        retry_policy = default_retry_policy
+    idempotent = kwargs.pop('idempotent', None)
+
+    def send():
+        return function(dict(kwargs))
+
+    for interceptor in reversed(_interceptors):
+        send = functools.partial(interceptor, method, url, kwargs, send)
+    if retry_policy is None or not _replayable(kwargs):
+        return send()
+
+    attempt = 1
+    while True:
+        try:
+            response = send()
+        except (requests.ConnectionError, requests.Timeout) as err:
+            if not retry_policy.should_retry(method, attempt, idempotent=idempotent):
+                raise
+            delay = retry_policy.get_delay(attempt)
+            reason = repr(err)
+        else:
+            if not retry_policy.should_retry(
+                method, attempt, response.status_code, idempotent=idempotent
+            ):
+                return response
+            delay = retry_policy.get_delay(attempt, response.headers.get('retry-after'))
+            if delay is None:
+                return response
+            reason = f'HTTP {response.status_code}'
+            response.close()
+        logger.warning(
+            'Retrying HTTP %s request to %s in %.2f seconds after attempt %s failed with %s.',
+            method,
+            url,
+            delay,
+            attempt,
+            reason,
+        )
+        time.sleep(delay)
+        attempt += 1
+
+
+def _replayable(kwargs):
+    """Tell whether the body of a request can be sent again by a retry.
+
+    A body given as a string, bytes, a ``dict`` or ``json`` can be. Files and
+    other streams, such as the file-like objects or generators passed when
+    uploading content, are read as the request is sent, so they cannot be.
+
+    :param kwargs: A ``dict`` of arguments for a function from `Requests`_.
+    """
+    data = kwargs.get('data')
+    return kwargs.get('files') is None and (
+        data is None or isinstance(data, (str, bytes, bytearray, dict))
+    )
+
 
 def _content_type_is_json(kwargs):
     """Check whether the content-type in ``kwargs`` is 'application/json'.
@@ -83,6 +288,30 @@ def _set_content_type(kwargs):
     kwargs['headers'] = headers
 
 
+def _pop_response_mode(kwargs):
+    """Pop the ``response_mode`` argument from ``kwargs``.
+
+    If streaming is requested, ask requests not to download the response body
+    immediately.
+
+    :param kwargs: A ``dict``. The keyword args supplied to :func:`request` or
+        one of the convenience functions like it.
+    :return: The requested response mode, or ``None``. ``kwargs`` is modified
+        in-place.
+    :raises: ``ValueError`` if the requested response mode is unknown.
+    """
+    response_mode = kwargs.pop('response_mode', None)
+    if response_mode is None:
+        return None
+    if response_mode not in RESPONSE_MODES:
+        raise ValueError(
+            f'Unknown response mode "{response_mode}". Valid modes are {RESPONSE_MODES}.'
+        )
+    if response_mode == 'stream':
+        kwargs['stream'] = True
+    return response_mode
+
+
 def _truncate_data(data, max_len=500):
     """Truncate data to a max length."""
     if isinstance(data, str | bytes):
@@ -113,31 +342,64 @@ def _log_request(method, url, kwargs, data=None, params=None):
     )
 
 
-def _log_response(response):
+def _log_response(response, response_mode=None):
     """Log out information about a ``Request`` object.
 
     After calling ``requests.request`` or one of its convenience methods, the
     object returned can be passed to this method. If done, information about
     the object returned is logged.
 
+    The body of a streamed response is not logged, as reading it here would
+    consume the stream. Likewise, the body of a response requested in a raw
+    mode is not decoded just to be logged.
+
+    :param response_mode: One of :data:`RESPONSE_MODES`, or ``None``.
     :return: Nothing is returned.
     """
-    message = f'Received HTTP {response.status_code} response: {response.text}'
+    if response_mode == 'stream':
+        body = '<streamed body>'
+    elif response_mode in ('bytes', 'memoryview'):
+        body = f'<{len(response.content)} bytes>'
+    else:
+        body = response.text
+    message = f'Received HTTP {response.status_code} response: {body}'
     if not response.ok:
         logger.warning(message)
     else:
         logger.debug(message)
 
 
+def _call_client(method, url, kwargs, function, **request_args):
+    """Log, send and log the response to a request, as each wrapper does.
+
+    :param method: The request's upper case HTTP method.
+    :param url: The request's URL.
+    :param kwargs: A ``dict``. The keyword args supplied to :func:`request` or
+        one of the convenience functions like it. The ``response_mode``
+        argument is popped from it.
+    :param function: See :func:`_send`. It is given ``request_args`` and
+        ``kwargs``, merged.
+    :param request_args: The named arguments of the wrapper, such as ``data``
+        or ``params``.
+    :returns: The response, with the requested response mode recorded on it.
+    """
+    response_mode = _pop_response_mode(kwargs)
+    _log_request(method, url, kwargs, request_args.get('data'), params=request_args.get('params'))
+    response = _send(method, url, {**request_args, **kwargs}, function)
+    _log_response(response, response_mode)
+    if response_mode is not None:
+        response.response_mode = response_mode
+    return response
+
+
 def request(method, url, **kwargs):
     """Wrap ``requests.request``."""
     _set_content_type(kwargs)
     if _content_type_is_json(kwargs) and kwargs.get('data') is not None:
         kwargs['data'] = dumps(kwargs['data'])
-    _log_request(method, url, kwargs)
-    response = requests.request(method, url, **kwargs)
-    _log_response(response)
-    return response
+    return _call_client(
+        method.upper(), url, kwargs, lambda kwargs: requests.request(method, url, **kwargs)
+    )
 
 
 def head(url, **kwargs):
@@ -145,10 +407,7 @@ def head(url, **kwargs):
     _set_content_type(kwargs)
     if _content_type_is_json(kwargs) and kwargs.get('data') is not None:
         kwargs['data'] = dumps(kwargs['data'])
-    _log_request('HEAD', url, kwargs)
-    response = requests.head(url, **kwargs)
-    _log_response(response)
-    return response
+    return _call_client('HEAD', url, kwargs, lambda kwargs: requests.head(url, **kwargs))
 
 
 def get(url, params=None, **kwargs):
@@ -156,10 +415,13 @@ def get(url, params=None, **kwargs):
     _set_content_type(kwargs)
     if _content_type_is_json(kwargs) and kwargs.get('data') is not None:
         kwargs['data'] = dumps(kwargs['data'])
-    _log_request('GET', url, kwargs, params=params)
-    response = requests.get(url, params, **kwargs)
-    _log_response(response)
-    return response
+    return _call_client(
+        'GET',
+        url,
+        kwargs,
+        lambda kwargs: requests.get(url, kwargs.pop('params'), **kwargs),
+        params=params,
+    )
 
 
 def post(url, data=None, json=None, **kwargs):
@@ -167,10 +429,14 @@ def post(url, data=None, json=None, **kwargs):
     _set_content_type(kwargs)
     if _content_type_is_json(kwargs) and data is not None:
         data = dumps(data)
-    _log_request('POST', url, kwargs, data)
-    response = requests.post(url, data, json, **kwargs)
-    _log_response(response)
-    return response
+    return _call_client(
+        'POST',
+        url,
+        kwargs,
+        lambda kwargs: requests.post(url, kwargs.pop('data'), kwargs.pop('json'), **kwargs),
+        data=data,
+        json=json,
+    )
 
 
 def put(url, data=None, **kwargs):
@@ -178,10 +444,13 @@ def put(url, data=None, **kwargs):
     _set_content_type(kwargs)
     if _content_type_is_json(kwargs) and data is not None:
         data = dumps(data)
-    _log_request('PUT', url, kwargs, data)
-    response = requests.put(url, data, **kwargs)
-    _log_response(response)
-    return response
+    return _call_client(
+        'PUT',
+        url,
+        kwargs,
+        lambda kwargs: requests.put(url, kwargs.pop('data'), **kwargs),
+        data=data,
+    )
 
 
 def patch(url, data=None, **kwargs):
@@ -189,10 +458,13 @@ def patch(url, data=None, **kwargs):
     _set_content_type(kwargs)
     if _content_type_is_json(kwargs) and data is not None:
         data = dumps(data)
-    _log_request('PATCH', url, kwargs, data)
-    response = requests.patch(url, data, **kwargs)
-    _log_response(response)
-    return response
+    return _call_client(
+        'PATCH',
+        url,
+        kwargs,
+        lambda kwargs: requests.patch(url, kwargs.pop('data'), **kwargs),
+        data=data,
+    )
 
 
 def delete(url, **kwargs):
@@ -200,7 +472,4 @@ def delete(url, **kwargs):
     _set_content_type(kwargs)
     if _content_type_is_json(kwargs) and kwargs.get('data') is not None:
         kwargs['data'] = dumps(kwargs['data'])
-    _log_request('DELETE', url, kwargs)
-    response = requests.delete(url, **kwargs)
-    _log_response(response)
-    return response
+    return _call_client('DELETE', url, kwargs, lambda kwargs: requests.delete(url, **kwargs))
@@ -8,8 +8,11 @@ presenting that information.
 
 """
 
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
 import json
 from os.path import isfile, join
+import random
 from threading import Lock
 
 from packaging.version import parse
@@ -52,6 +55,133 @@ def _get_config_file_path(xdg_config_dir, xdg_config_file):
     )
 
 
+class RequestRetryPolicy:
+    """Decide whether and when to retry a request which failed.
+
+    A request is retried if the connection to the server failed or timed out,
+    or if the server responded with one of ``statuses``. Only requests which
+    are safe to repeat are retried: those with one of ``methods``, and those
+    explicitly marked as idempotent. For example, a ``POST`` which creates an
+    entity is never retried unless marked so, as the first attempt may have
+    created it.
+
+    Attempt ``n`` is retried after ``delay * backoff ** (n - 1)`` seconds, at
+    most ``max_delay``. If ``jitter`` is true, a random part of that is waited
+    instead, so that many clients do not retry at once. If the server sent a
+    ``Retry-After`` header, at least that long is waited, unless it is longer
+    than ``max_retry_after``, in which case the request is not retried.
+
+    :param max_attempts: The most times a request is sent, including the first.
+    :param delay: The seconds to wait before the first retry.
+    :param backoff: How much longer to wait before each following retry.
+    :param max_delay: The most seconds to wait before a retry, before jitter.
+    :param jitter: Whether to wait a random part of the delay.
+    :param statuses: The HTTP status codes which are retried.
+    :param methods: The upper case HTTP methods which are retried.
+    :param max_retry_after: The most seconds a ``Retry-After`` header may ask
+        for, for the request to be retried.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_attempts=3,
+        delay=0.5,
+        backoff=2,
+        max_delay=30,
+        jitter=True,
+        statuses=(429, 500, 502, 503, 504),
+        methods=('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS'),
+        max_retry_after=120,
+    ):
+        self.max_attempts = max_attempts
+        self.delay = delay
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.statuses = tuple(statuses)
+        self.methods = tuple(methods)
+        self.max_retry_after = max_retry_after
+
+    def __repr__(self):
+        """Return a string representation of the object."""
+        kv_pairs = ", ".join(f"{key}={value!r}" for key, value in self.to_dict().items())
+        return f"{self.__module__}.{type(self).__name__}({kv_pairs})"
+
+    def to_dict(self):
+        """Return the policy's settings, as can be passed to its constructor."""
+        return vars(self).copy()
+
+    def should_retry(self, method, attempt, status=None, idempotent=None):
+        """Tell whether a failed request should be sent again.
+
+        :param method: The request's upper case HTTP method.
+        :param attempt: How many times the request has been sent.
+        :param status: The status code of the response, or ``None`` if the
+            connection failed.
+        :param idempotent: ``True`` if the request is safe to repeat whatever
+            its method, ``False`` if it is not, or ``None`` to judge by its
+            method.
+        :returns: ``True`` or ``False``.
+        """
+        if attempt >= self.max_attempts:
+            return False
+        if status is not None and status not in self.statuses:
+            return False
+        if idempotent is None:
+            return method in self.methods
+        return idempotent
+
+    def get_delay(self, attempt, retry_after=None):
+        """Return how long to wait before sending a request again.
+
+        :param attempt: How many times the request has been sent.
+        :param retry_after: The value of the response's ``Retry-After``
+            header, or ``None``.
+        :returns: The seconds to wait, or ``None`` if the server asked for a
+            longer wait than ``max_retry_after``.
+        """
+        delay = min(self.delay * self.backoff ** (attempt - 1), self.max_delay)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        seconds = _parse_retry_after(retry_after)
+        if seconds is None:
+            return delay
+        if seconds > self.max_retry_after:
+            return None
+        return max(seconds, delay)
+
+
+def _parse_retry_after(value):
+    """Return the seconds a ``Retry-After`` header asks to wait, or ``None``.
+
+    >>> _parse_retry_after('120')
+    120.0
+    >>> _parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT') == 0
+    True
+    """
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=UTC)
+    return max((when - datetime.now(UTC)).total_seconds(), 0.0)
+
+
+def _encode_config(obj):
+    """Encode the values in a configuration which JSON cannot encode."""
+    if isinstance(obj, RequestRetryPolicy):
+        return obj.to_dict()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
 class BaseServerConfig:
     """A set of facts for communicating with a Satellite server.
 
@@ -212,7 +342,7 @@ class BaseServerConfig:
                 config = {}
             config[label] = cfg
             with open(path, 'w') as config_file:
-                json.dump(config, config_file)
+                json.dump(config, config_file, default=_encode_config)
         finally:
             self._file_lock.release()
 
@@ -227,6 +357,10 @@ class ServerConfig(BaseServerConfig):
 
     :param verify: A boolean. Should SSL be verified when communicating with
         the server? No instance attribute is created if no value is provided.
+    :param retry_policy: A :class:`nailgun.config.RequestRetryPolicy`, or a
+        dict of arguments for one, deciding how failed requests to the server
+        are retried. Requests are not retried, and no instance attribute is
+        created, if no value is provided.
     """
 
     # It's OK that this class has only one public method. This class is
@@ -234,10 +368,14 @@ class ServerConfig(BaseServerConfig):
     _xdg_config_dir = 'nailgun'
     _xdg_config_file = 'server_configs.json'
 
-    def __init__(self, url, auth=None, version=None, verify=None):
+    def __init__(self, url, auth=None, version=None, verify=None, retry_policy=None):
         super().__init__(url, auth, version)
         if verify is not None:
             self.verify = verify
+        if isinstance(retry_policy, dict):
+            retry_policy = RequestRetryPolicy(**retry_policy)
+        if retry_policy is not None:
+            self.retry_policy = retry_policy
 
     def get_client_kwargs(self):
         """Get kwargs for use with the methods in :mod:`nailgun.client`.
@@ -259,10 +397,15 @@ class ServerConfig(BaseServerConfig):
         But this latter approach is more fragile. It will break if ``cfg`` does
         not have an ``auth`` or ``verify`` attribute.
 
+        The ``retry_policy`` attribute is passed as ``default_retry_policy``,
+        so that a ``retry_policy`` passed along with these kwargs wins.
+
         """
         config = vars(self).copy()
         config.pop('url')
         config.pop('version', None)
+        if 'retry_policy' in config:
+            config['default_retry_policy'] = config.pop('retry_policy')
         return config
 
     @classmethod
@@ -19,12 +19,20 @@ makes use of a work-around notes so in its docstring.
 :class:`nailgun.entity_mixins.Entity` provides more insight into the inner
 workings of entity classes.
 
+Entities provided by server plugins, such as Ansible and OpenSCAP, are defined
+in submodules of this package. Each submodule is only imported the first time
+one of its entities is used, so that importing this module stays cheap. These
+entities are accessed in the same way as all others, for example::
+
+    from nailgun.entities import DiscoveredHost
+
 """
 
 from datetime import datetime
 from functools import lru_cache
 import hashlib
 from http.client import ACCEPTED, NO_CONTENT
+import importlib
 import os.path
 from urllib.parse import urljoin
 
@@ -40,7 +48,6 @@ from nailgun.entity_mixins import (
     EntitySearchMixin,
     EntityUpdateMixin,
     _get_entity_ids,
-    _payload,
     _poll_task,
     to_json_serializable,  # noqa: F401
 )
@@ -48,8 +55,8 @@ from nailgun.entity_mixins import (
 # The size of this file is a direct reflection of the size of Satellite's API.
 # This file's size has already been significantly cut down through the use of
 # mixins and fields, and cutting the file down in size further would simply
-# obfuscate the design of the entities. It might be possible to place entity
-# definitions in separate modules, though.
+# obfuscate the design of the entities. Entities provided by plugins live in
+# submodules, see `_PLUGIN_ENTITIES`.
 
 # NailGun aims to be like a traditional database ORM and allow uses of the dot
 # operator such as these:
@@ -91,11 +98,37 @@ _OPERATING_SYSTEMS = (
 )
 
 
+#: Size in bytes of the chunks yielded by responses handled in ``'stream'`` mode.
+#: See :func:`_handle_response`.
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
 class APIResponseError(Exception):
     """Indicates an error if response returns unexpected result."""
 
 
-def _handle_response(response, server_config, synchronous=False, timeout=None):
+def _get_text_encoding(content_type):
+    """Find the character set of a textual content type.
+
+    :param content_type: A string, such as ``'text/html; charset=utf-8'``.
+    :returns: The character set named in ``content_type``, ``'utf-8'`` if a
+        textual content type names no character set, or ``None`` if
+        ``content_type`` is not textual.
+    """
+    media_type, *params = (part.strip() for part in content_type.split(';'))
+    if not (
+        media_type.startswith('text/')
+        or media_type.endswith(('/xml', '+xml', '/yaml', '/x-yaml', '/javascript'))
+    ):
+        return None
+    for param in params:
+        name, _, value = param.partition('=')
+        if name.strip() == 'charset' and value:
+            return value.strip('"\' ')
+    return 'utf-8'
+
+
+def _handle_response(response, server_config, synchronous=False, timeout=None, response_mode=None):
     """Handle a server's response in a typical fashion.
 
     Do the following:
@@ -108,12 +141,22 @@ def _handle_response(response, server_config, synchronous=False, timeout=None):
        the type method should return server's response, with all JSON decoded
        or just response content itself.
 
+    How non-JSON content is returned depends on the response mode. See
+    :data:`nailgun.client.RESPONSE_MODES`. A mode requested for a single call,
+    as in ``org.download_debug_certificate(response_mode='bytes')``, takes
+    precedence over the ``response_mode`` argument, which lets an entity method
+    choose its own default. A method which defaults to ``'stream'`` should
+    request it from :mod:`nailgun.client` too, so that the body is not
+    downloaded up front.
+
     :param response: A response object as returned by one of the functions in
         :mod:`nailgun.client` or the requests library.
     :param server_config: A `nailgun.config.ServerConfig` object.
     :param synchronous: Should this function poll the server?
     :param timeout: Maximum number of seconds to wait until timing out.
             Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
+    :param response_mode: One of :data:`nailgun.client.RESPONSE_MODES`.
+        Defaults to ``'decode'``.
     """
     response.raise_for_status()
     if synchronous is True and response.status_code == ACCEPTED:
@@ -122,12 +165,40 @@ def _handle_response(response, server_config, synchronous=False, timeout=None):
         )
     if response.status_code == NO_CONTENT:
         return
-    if 'application/json' in response.headers.get('content-type', '').lower():
+    content_type = response.headers.get('content-type', '').lower()
+    if 'application/json' in content_type:
         return response.json()
-    elif isinstance(response.content, bytes):
-        return response.content.decode('utf-8')
-    else:
+    if getattr(response, 'response_mode', None) in client.RESPONSE_MODES:
+        response_mode = response.response_mode
+    return _get_content(response, content_type, response_mode)
+
+
+def _get_content(response, content_type, response_mode=None):
+    """Return the non-JSON content of a response in the requested mode.
+
+    :param response: See :func:`_handle_response`.
+    :param content_type: The response's lowercased content type.
+    :param response_mode: One of :data:`nailgun.client.RESPONSE_MODES`.
+        Defaults to ``'decode'``.
+    :returns: A ``str``, ``bytes``, ``memoryview`` or an iterator over chunks
+        of the content.
+    """
+    if response_mode in (None, 'decode'):
+        if isinstance(response.content, bytes):
+            return response.content.decode('utf-8')
         return response.content
+    encoding = _get_text_encoding(content_type)
+    if response_mode == 'stream':
+        if encoding is not None:
+            response.encoding = encoding
+        return response.iter_content(
+            chunk_size=STREAM_CHUNK_SIZE, decode_unicode=encoding is not None
+        )
+    if encoding is not None:
+        return response.content.decode(encoding)
+    if response_mode == 'memoryview':
+        return memoryview(response.content)
+    return response.content
 
 
 def _check_for_value(field_name, field_values):
@@ -231,6 +302,7 @@ class ActivationKey(
         }
         self._meta = {
             'api_path': 'katello/api/v2/activation_keys',
+            'search_fields': ('name',),
         }
         super().__init__(server_config=server_config, **kwargs)
 
@@ -602,6 +674,7 @@ class Architecture(
         }
         self._meta = {
             'api_path': 'api/v2/architectures',
+            'search_fields': ('name',),
         }
         super().__init__(server_config=server_config, **kwargs)
 
@@ -625,65 +698,6 @@ class Architecture(
         return self.read()
 
 
-class ArfReport(Entity, EntityDeleteMixin, EntityReadMixin, EntitySearchMixin):
-    """A representation of a Arf Report entity.
-
-    # Read Arf report
-    ArfReport(id=<id>).read()
-    # Delete Arf report
-    ArfReport(id=<id>).delete()
-    # Download Arf report in HTML
-    ArfReport(id=<id>).download_html()
-    """
-
-    def __init__(self, server_config=None, **kwargs):
-        self._fields = {
-            'location': entity_fields.OneToManyField(Location),
-            'organization': entity_fields.OneToManyField(Organization),
-            'host': entity_fields.OneToOneField(Host),
-            'openscap_proxy': entity_fields.OneToOneField(Capsule),
-            'policy': entity_fields.OneToOneField(CompliancePolicies),
-        }
-        self._meta = {
-            'api_path': 'api/compliance/arf_reports',
-        }
-        super().__init__(server_config=server_config, **kwargs)
-
-    def path(self, which=None):
-        """Extend ``nailgun.entity_mixins.Entity.path``.
-
-        The format of the returned path depends on the value of ``which``:
-
-        download_html
-            /api/compliance/arf_reports/:id/download_html
-
-        Otherwise, call ``super``.
-
-        """
-        if which in ("download_html",):
-            return f'{super().path(which="self")}/{which}'
-        return super().path(which)
-
-    def download_html(self, synchronous=True, timeout=None, **kwargs):
-        """Download ARF report in HTML.
-
-        :param synchronous: What should happen if the server returns an HTTP
-            202 (accepted) status code? Wait for the task to complete if
-            ``True``. Immediately return the server's response otherwise.
-        :param timeout: Maximum number of seconds to wait until timing out.
-            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
-        :param kwargs: Arguments to pass to requests.
-        :returns: The server's response, with all JSON decoded.
-        :raises: ``requests.exceptions.HTTPError`` If the server responds with
-            an HTTP 4XX or 5XX message.
-
-        """
-        kwargs = kwargs.copy()  # shadow the passed-in kwargs
-        kwargs.update(self._server_config.get_client_kwargs())
-        response = client.get(self.path('download_html'), **kwargs)
-        return _handle_response(response, self._server_config, synchronous, timeout)
-
-
 class Audit(Entity, EntityReadMixin, EntitySearchMixin):
     """A representation of Audit entity."""
 
@@ -1340,410 +1354,116 @@ class ConfigReport(Entity, EntityDeleteMixin, EntityReadMixin, EntitySearchMixin
         super().__init__(server_config=server_config, **kwargs)
 
 
-class DiscoveredHost(
-    Entity,
-    EntityCreateMixin,
-    EntityDeleteMixin,
-    EntityReadMixin,
-    EntitySearchMixin,
-    EntityUpdateMixin,
+class ExternalUserGroup(
+    Entity, EntityCreateMixin, EntityDeleteMixin, EntityUpdateMixin, EntityReadMixin
 ):
-    """A representation of a Foreman Discovered Host entity."""
+    """A representation of a External Usergroup entity.
+
+    ``usergroup`` must be passed in when this entity is instantiated.
+
+    :raises: ``TypeError`` if ``usergroup`` is not passed in.
+
+     # Create external usergroup
+     ExternalUserGroup(name='foobargroup',usergroup=usergroup,auth_source=auth).create()
+     # Read external usergroup
+     ExternalUserGroup(id=<id>, usergroup=usergroup).read()
+     # Delete external usergroup
+     ExternalUserGroup(id=<id>, usergroup=usergroup).delete()
+     # Refresh external usergroup
+     ExternalUserGroup(id=<id>, usergroup=usergroup).refresh()
+    """
 
     def __init__(self, server_config=None, **kwargs):
+        _check_for_value('usergroup', kwargs)
         self._fields = {
-            'name': entity_fields.StringField(
-                required=True, str_type='alpha', length=(6, 12), unique=True
+            'name': entity_fields.StringField(required=True),
+            'usergroup': entity_fields.OneToOneField(
+                UserGroup,
+                required=True,
+                parent=True,
             ),
-            'ip': entity_fields.IPAddressField(required=True),
-            'mac': entity_fields.MACAddressField(required=True),
-            'hostgroup': entity_fields.OneToOneField(HostGroup),
-            'root_pass': entity_fields.StringField(),
-            'build': entity_fields.BooleanField(default=False),
-            'organization': entity_fields.OneToOneField(Organization),
-            'location': entity_fields.OneToOneField(Location),
+            'auth_source': entity_fields.OneToOneField(AuthSourceLDAP, required=True),
         }
+        super().__init__(server_config=server_config, **kwargs)
         self._meta = {
-            'api_path': '/api/v2/discovered_hosts',
+            'api_path': f'{self.usergroup.path()}/external_usergroups',
         }
-        super().__init__(server_config=server_config, **kwargs)
+
+    def read(self, entity=None, attrs=None, ignore=None, params=None):
+        """Ignore usergroup from read and alter auth_source_ldap with auth_source."""
+        entity = entity or self.entity_with_parent()
+        if ignore is None:
+            ignore = set()
+        ignore.add('usergroup')
+        if attrs is None:
+            attrs = self.read_json()
+        attrs['auth_source'] = attrs.pop('auth_source_ldap')
+        return super().read(entity, attrs, ignore, params)
 
     def path(self, which=None):
         """Extend ``nailgun.entity_mixins.Entity.path``.
 
         The format of the returned path depends on the value of ``which``:
 
-        facts
-            /discovered_hosts/facts
-        refresh_facts
-            /discovered_hosts/<id>/refresh_facts
-        reboot
-            /discovered_hosts/<id>/reboot
-
-        ``super`` is called otherwise.
-
+        refresh
+            /api/usergroups/:usergroup_id/external_usergroups/:id/refresh
         """
-        if which in (
-            'auto_provision',
-            'auto_provision_all',
-            'facts',
-            'refresh_facts',
-            'reboot',
-            'reboot_all',
-        ):
-            prefix = 'base' if which in ['auto_provision_all', 'facts', 'reboot_all'] else 'self'
-            return f'{super().path(which=prefix)}/{which}'
+        if which == "refresh":
+            return f'{super().path(which="self")}/{which}'
         return super().path(which)
 
-    def create_payload(self):
-        """Wrap submitted data within an extra dict.
-
-        For more information, see `Bugzilla #1151220
-        <https://bugzilla.redhat.com/show_bug.cgi?id=1151220>`_.
-
-        """
-        return {'discovered_host': super().create_payload()}
-
-    def update_payload(self, fields=None):
-        """Wrap submitted data within an extra dict."""
-        return {'discovered_host': super().update_payload(fields)}
-
-    def facts(self, synchronous=True, timeout=None, **kwargs):
-        """Update facts for discovered host, and create the host.
-
-        :param synchronous: What should happen if the server returns an HTTP
-            202 (accepted) status code? Wait for the task to complete if
-            ``True``. Immediately return the server's response otherwise.
-        :param timeout: Maximum number of seconds to wait until timing out.
-            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
-        :param kwargs: Arguments to pass to requests.
-        :returns: The server's response, with all JSON decoded.
-        :raises: ``requests.exceptions.HTTPError`` If the server responds with
-            an HTTP 4XX or 5XX message.
-
-        """
-        kwargs = kwargs.copy()  # shadow the passed-in kwargs
-        kwargs.update(self._server_config.get_client_kwargs())
-        response = client.post(self.path('facts'), **kwargs)
-        return _handle_response(response, self._server_config, synchronous, timeout)
-
-    def refresh_facts(self, synchronous=True, timeout=None, **kwargs):
-        """Refresh facts for discovered host.
+    def refresh(self, synchronous=True, timeout=None, **kwargs):
+        """Refresh external usergroup.
 
         :param synchronous: What should happen if the server returns an HTTP
             202 (accepted) status code? Wait for the task to complete if
             ``True``. Immediately return the server's response otherwise.
         :param timeout: Maximum number of seconds to wait until timing out.
             Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
-        :param kwargs: Arguments to pass to requests.
-        :returns: The server's response, with all JSON decoded.
-        :raises: ``requests.exceptions.HTTPError`` If the server responds with
-            an HTTP 4XX or 5XX message.
-
-        """
-        kwargs = kwargs.copy()  # shadow the passed-in kwargs
-        kwargs.update(self._server_config.get_client_kwargs())
-        response = client.put(self.path('refresh_facts'), **kwargs)
-        return _handle_response(response, self._server_config, synchronous, timeout)
-
-    def read(self, entity=None, attrs=None, ignore=None, params=None):
-        """Make sure, everything except `id` and `name` are in the ignore list for read."""
-        if ignore is None:
-            ignore = set()
-        ignore.add('ip')
-        ignore.add('mac')
-        ignore.add('root_pass')
-        ignore.add('hostgroup')
-        ignore.add('build')
-        ignore.add('organization')
-        ignore.add('location')
-        return super().read(entity, attrs, ignore, params)
-
-    def reboot(self, synchronous=True, timeout=None, **kwargs):
-        """Reboot the discovered host.
 
-        :param synchronous: What should happen if the server returns an HTTP
-            202 (accepted) status code? Wait for the task to complete if
-            ``True``. Immediately return the server's response otherwise.
-        :param timeout: Maximum number of seconds to wait until timing out.
-            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
         :param kwargs: Arguments to pass to requests.
-        :returns: The server's response, with all JSON decoded.
-        :raises: ``requests.exceptions.HTTPError`` If the server responds with
-            an HTTP 4XX or 5XX message.
-
-        """
-        kwargs = kwargs.copy()  # shadow the passed-in kwargs
-        kwargs.update(self._server_config.get_client_kwargs())
-        response = client.put(self.path('reboot'), **kwargs)
-        return _handle_response(response, self._server_config, synchronous, timeout)
-
-    def reboot_all(self, synchronous=True, timeout=None, **kwargs):
-        """Reboot all discovered hosts.
 
-        :param synchronous: What should happen if the server returns an HTTP
-            202 (accepted) status code? Wait for the task to complete if
-            ``True``. Immediately return the server's response otherwise.
-        :param timeout: Maximum number of seconds to wait until timing out.
-            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
-        :param kwargs: Arguments to pass to requests.
         :returns: The server's response, with all JSON decoded.
-        :raises: ``requests.exceptions.HTTPError`` If the server responds with
-            an HTTP 4XX or 5XX message.
-        """
-        kwargs = kwargs.copy()  # shadow the passed-in kwargs
-        kwargs.update(self._server_config.get_client_kwargs())
-        response = client.put(self.path('reboot_all'), **kwargs)
-        return _handle_response(response, self._server_config, synchronous, timeout)
 
-    def auto_provision(self, synchronous=True, timeout=None, **kwargs):
-        """Auto-provision the discovered host.
-
-        :param synchronous: What should happen if the server returns an HTTP
-            202 (accepted) status code? Wait for the task to complete if
-            ``True``. Immediately return the server's response otherwise.
-        :param timeout: Maximum number of seconds to wait until timing out.
-            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
-        :param kwargs: Arguments to pass to requests.
-        :returns: The server's response, with all JSON decoded.
         :raises: ``requests.exceptions.HTTPError`` If the server responds with
             an HTTP 4XX or 5XX message.
         """
         kwargs = kwargs.copy()  # shadow the passed-in kwargs
         kwargs.update(self._server_config.get_client_kwargs())
-        response = client.post(self.path('auto_provision'), **kwargs)
+        response = client.put(self.path('refresh'), **kwargs)
         return _handle_response(response, self._server_config, synchronous, timeout)
 
-    def auto_provision_all(self, synchronous=True, timeout=None, **kwargs):
-        """Auto-provision of all discovered hosts.
 
-        :param synchronous: What should happen if the server returns an HTTP
-            202 (accepted) status code? Wait for the task to complete if
-            ``True``. Immediately return the server's response otherwise.
-        :param timeout: Maximum number of seconds to wait until timing out.
-            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
-        :param kwargs: Arguments to pass to requests.
-        :returns: The server's response, with all JSON decoded.
-        :raises: ``requests.exceptions.HTTPError`` If the server responds with
-            an HTTP 4XX or 5XX message.
-        """
-        kwargs = kwargs.copy()  # shadow the passed-in kwargs
-        kwargs.update(self._server_config.get_client_kwargs())
-        response = client.post(self.path('auto_provision_all'), **kwargs)
-        return _handle_response(response, self._server_config, synchronous, timeout)
+class KatelloStatus(Entity, EntityReadMixin):
+    """A representation of a Status entity."""
 
+    def __init__(self, server_config=None, **kwargs):
+        self._fields = {
+            'version': entity_fields.StringField(),
+            'timeUTC': entity_fields.DateTimeField(),
+        }
+        self._meta = {
+            'api_path': 'katello/api/v2/status',
+            'read_type': 'base',
+        }
+        super().__init__(server_config=server_config, **kwargs)
 
-class DiscoveryRule(
-    Entity,
-    EntityCreateMixin,
-    EntityDeleteMixin,
-    EntityReadMixin,
-    EntitySearchMixin,
-    EntityUpdateMixin,
-):
-    """A representation of a Foreman Discovery Rule entity.
 
-    .. NOTE:: The ``search_`` field is named as such due to a naming conflict
-        with :meth:`nailgun.entity_mixins.Entity.path`.
-    """
+class LibvirtComputeResource(AbstractComputeResource):
+    """A representation of a Libvirt Compute Resource entity."""
 
     def __init__(self, server_config=None, **kwargs):
         self._fields = {
-            'enabled': entity_fields.BooleanField(),
-            'hostgroup': entity_fields.OneToOneField(HostGroup, required=True),
-            'hostname': entity_fields.StringField(),
-            'location': entity_fields.OneToManyField(Location),
-            'max_count': entity_fields.IntegerField(),
-            'name': entity_fields.StringField(
-                required=True, str_type='alpha', length=(6, 12), unique=True
+            'display_type': entity_fields.StringField(
+                choices=('vnc', 'spice'),
+                required=True,
             ),
-            'organization': entity_fields.OneToManyField(Organization),
-            'priority': entity_fields.IntegerField(),
-            'search_': entity_fields.StringField(required=True),
-        }
-        self._meta = {
-            'api_path': '/api/v2/discovery_rules',
+            'set_console_password': entity_fields.BooleanField(),
         }
         super().__init__(server_config=server_config, **kwargs)
-
-    def create_payload(self):
-        """Wrap submitted data within an extra dict.
-
-        For more information, see `Bugzilla #1151220
-        <https://bugzilla.redhat.com/show_bug.cgi?id=1151220>`_.
-
-        In addition, rename the ``search_`` field to ``search``.
-
-        """
-        payload = super().create_payload()
-        if 'search_' in payload:
-            payload['search'] = payload.pop('search_')
-        return {'discovery_rule': payload}
-
-    def create(self, create_missing=None):
-        """Do extra work to fetch a complete set of attributes for this entity.
-
-        For more information, see `Bugzilla #1381129
-        <https://bugzilla.redhat.com/show_bug.cgi?id=1381129>`_.
-
-        """
-        return type(self)(
-            server_config=self._server_config,
-            id=self.create_json(create_missing)['id'],
-        ).read()
-
-    def read(self, entity=None, attrs=None, ignore=None, params=None):
-        """Work around a bug. Rename ``search`` to ``search_``.
-
-        For more information on the bug, see `Bugzilla #1257255
-        <https://bugzilla.redhat.com/show_bug.cgi?id=1257255>`_.
-
-        """
-        if attrs is None:
-            attrs = self.read_json()
-        attrs['search_'] = attrs.pop('search')
-
-        # Satellite doesn't return this attribute. See BZ 1257255.
-        attr = 'max_count'
-        if ignore is None:
-            ignore = set()
-        if attr not in ignore:
-            # We cannot call `self.update_json([])`, as an ID might not be
-            # present on self. However, `attrs` is guaranteed to have an ID.
-            attrs[attr] = DiscoveryRule(
-                server_config=self._server_config,
-                id=attrs['id'],
-            ).update_json([])[attr]
-        return super().read(entity, attrs, ignore, params)
-
-    def update(self, fields=None):
-        """Fetch a complete set of attributes for this entity.
-
-        For more information, see `Bugzilla #1381129
-        <https://bugzilla.redhat.com/show_bug.cgi?id=1381129>`_.
-
-        """
-        self.update_json(fields)
-        return self.read()
-
-    def update_payload(self, fields=None):
-        """Wrap submitted data within an extra dict."""
-        payload = super().update_payload(fields)
-        if 'search_' in payload:
-            payload['search'] = payload.pop('search_')
-        return {'discovery_rule': payload}
-
-
-class ExternalUserGroup(
-    Entity, EntityCreateMixin, EntityDeleteMixin, EntityUpdateMixin, EntityReadMixin
-):
-    """A representation of a External Usergroup entity.
-
-    ``usergroup`` must be passed in when this entity is instantiated.
-
-    :raises: ``TypeError`` if ``usergroup`` is not passed in.
-
-     # Create external usergroup
-     ExternalUserGroup(name='foobargroup',usergroup=usergroup,auth_source=auth).create()
-     # Read external usergroup
-     ExternalUserGroup(id=<id>, usergroup=usergroup).read()
-     # Delete external usergroup
-     ExternalUserGroup(id=<id>, usergroup=usergroup).delete()
-     # Refresh external usergroup
-     ExternalUserGroup(id=<id>, usergroup=usergroup).refresh()
-    """
-
-    def __init__(self, server_config=None, **kwargs):
-        _check_for_value('usergroup', kwargs)
-        self._fields = {
-            'name': entity_fields.StringField(required=True),
-            'usergroup': entity_fields.OneToOneField(
-                UserGroup,
-                required=True,
-                parent=True,
-            ),
-            'auth_source': entity_fields.OneToOneField(AuthSourceLDAP, required=True),
-        }
-        super().__init__(server_config=server_config, **kwargs)
-        self._meta = {
-            'api_path': f'{self.usergroup.path()}/external_usergroups',
-        }
-
-    def read(self, entity=None, attrs=None, ignore=None, params=None):
-        """Ignore usergroup from read and alter auth_source_ldap with auth_source."""
-        entity = entity or self.entity_with_parent()
-        if ignore is None:
-            ignore = set()
-        ignore.add('usergroup')
-        if attrs is None:
-            attrs = self.read_json()
-        attrs['auth_source'] = attrs.pop('auth_source_ldap')
-        return super().read(entity, attrs, ignore, params)
-
-    def path(self, which=None):
-        """Extend ``nailgun.entity_mixins.Entity.path``.
-
-        The format of the returned path depends on the value of ``which``:
-
-        refresh
-            /api/usergroups/:usergroup_id/external_usergroups/:id/refresh
-        """
-        if which == "refresh":
-            return f'{super().path(which="self")}/{which}'
-        return super().path(which)
-
-    def refresh(self, synchronous=True, timeout=None, **kwargs):
-        """Refresh external usergroup.
-
-        :param synchronous: What should happen if the server returns an HTTP
-            202 (accepted) status code? Wait for the task to complete if
-            ``True``. Immediately return the server's response otherwise.
-        :param timeout: Maximum number of seconds to wait until timing out.
-            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
-
-        :param kwargs: Arguments to pass to requests.
-
-        :returns: The server's response, with all JSON decoded.
-
-        :raises: ``requests.exceptions.HTTPError`` If the server responds with
-            an HTTP 4XX or 5XX message.
-        """
-        kwargs = kwargs.copy()  # shadow the passed-in kwargs
-        kwargs.update(self._server_config.get_client_kwargs())
-        response = client.put(self.path('refresh'), **kwargs)
-        return _handle_response(response, self._server_config, synchronous, timeout)
-
-
-class KatelloStatus(Entity, EntityReadMixin):
-    """A representation of a Status entity."""
-
-    def __init__(self, server_config=None, **kwargs):
-        self._fields = {
-            'version': entity_fields.StringField(),
-            'timeUTC': entity_fields.DateTimeField(),
-        }
-        self._meta = {
-            'api_path': 'katello/api/v2/status',
-            'read_type': 'base',
-        }
-        super().__init__(server_config=server_config, **kwargs)
-
-
-class LibvirtComputeResource(AbstractComputeResource):
-    """A representation of a Libvirt Compute Resource entity."""
-
-    def __init__(self, server_config=None, **kwargs):
-        self._fields = {
-            'display_type': entity_fields.StringField(
-                choices=('vnc', 'spice'),
-                required=True,
-            ),
-            'set_console_password': entity_fields.BooleanField(),
-        }
-        super().__init__(server_config=server_config, **kwargs)
-        self._fields['provider'].default = 'Libvirt'
-        self._fields['provider'].required = True
-        self._fields['provider_friendly_name'].default = 'Libvirt'
+        self._fields['provider'].default = 'Libvirt'
+        self._fields['provider'].required = True
+        self._fields['provider_friendly_name'].default = 'Libvirt'
 
 
 class OVirtComputeResource(AbstractComputeResource):
@@ -3030,6 +2750,7 @@ class ContentView(
         }
         self._meta = {
             'api_path': 'katello/api/v2/content_views',
+            'search_fields': ('name', 'label'),
         }
         super().__init__(server_config=server_config, **kwargs)
 
@@ -3079,7 +2800,7 @@ class ContentView(
         :param filters: A dict. Used to filter search results locally.
         :return: A list of entities, all of type ``type(self)``.
         """
-        results = self.search_json(fields, query)['results']
+        results = self._search_json(fields, query, filters)['results']
         results = self.search_normalize(results)
         entities = []
         for result in results:
@@ -3381,7 +3102,10 @@ class Domain(
             ),
             'organization': entity_fields.OneToManyField(Organization),
         }
-        self._meta = {'api_path': 'api/v2/domains'}
+        self._meta = {
+            'api_path': 'api/v2/domains',
+            'search_fields': ('name',),
+        }
         super().__init__(server_config=server_config, **kwargs)
 
     def create_missing(self):
@@ -3915,6 +3639,36 @@ class ForemanTask(Entity, EntityReadMixin, EntitySearchMixin):
         response = client.post(self.path('bulk_resume'), **kwargs)
         return _handle_response(response, self._server_config, synchronous, timeout)
 
+    def bulk_search(self, synchronous=True, timeout=None, **kwargs):
+        """Search for several tasks in one request.
+
+        Here is an example of how to use this method::
+
+            ForemanTask().bulk_search(
+                data={'searches': [{'type': 'task', 'task_id': task_id}]}
+            )
+
+        The request only reads, so it is retried as an idempotent request
+        unless ``idempotent=False`` is passed. See :mod:`nailgun.client`.
+
+        :param synchronous: What should happen if the server returns an HTTP
+            202 (accepted) status code? Wait for the task to complete if
+            ``True``. Immediately return the server's response otherwise.
+        :param timeout: Maximum number of seconds to wait until timing out.
+            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
+        :param kwargs: Arguments to pass to requests.
+        :returns: The server's response, with all JSON decoded. This is a list
+            with one item per search, where each item holds the search
+            parameters and the matching tasks.
+        :raises: ``requests.exceptions.HTTPError`` If the server responds with
+            an HTTP 4XX or 5XX message.
+
+        """
+        kwargs = {'idempotent': True, **kwargs}  # shadow the passed-in kwargs
+        kwargs.update(self._server_config.get_client_kwargs())
+        response = client.post(self.path('bulk_search'), **kwargs)
+        return _handle_response(response, self._server_config, synchronous, timeout)
+
 
 class GPGKey(ContentCredential):
     """A representation of a GPG Key entity."""
@@ -3989,6 +3743,7 @@ class HostCollection(
         }
         self._meta = {
             'api_path': 'katello/api/v2/host_collections',
+            'search_fields': ('name',),
         }
         super().__init__(server_config=server_config, **kwargs)
 
@@ -4078,7 +3833,10 @@ class HostGroup(
                 'lifecycle_environment': entity_fields.OneToOneField(LifecycleEnvironment),
             }
         )
-        self._meta = {'api_path': 'api/v2/hostgroups'}
+        self._meta = {
+            'api_path': 'api/v2/hostgroups',
+            'search_fields': ('name',),
+        }
         super().__init__(server_config=server_config, **kwargs)
 
     def create(self, create_missing=None):
@@ -4469,7 +4227,10 @@ class Host(
             ),
         }
         self._owner_type = None  # actual ``owner_type`` value
-        self._meta = {'api_path': 'api/v2/hosts'}
+        self._meta = {
+            'api_path': 'api/v2/hosts',
+            'search_fields': ('name',),
+        }
         super().__init__(server_config=server_config, **kwargs)
 
         # See https://github.com/SatelliteQE/nailgun/issues/258
@@ -5285,7 +5046,7 @@ class Host(
         :param filters: A dict. Used to filter search results locally.
         :return: A list of entities, all of type ``type(self)``.
         """
-        results = self.search_json(fields, query)['results']
+        results = self._search_json(fields, query, filters)['results']
         results = self.search_normalize(results)
         entities = []
         for result in results:
@@ -5673,6 +5434,7 @@ class LifecycleEnvironment(
         }
         self._meta = {
             'api_path': 'katello/api/v2/environments',
+            'search_fields': ('name', 'label'),
         }
         super().__init__(server_config=server_config, **kwargs)
 
@@ -5795,7 +5557,10 @@ class Location(
             'subnet': entity_fields.OneToManyField(Subnet),
             'user': entity_fields.OneToManyField(User),
         }
-        self._meta = {'api_path': 'api/v2/locations'}
+        self._meta = {
+            'api_path': 'api/v2/locations',
+            'search_fields': ('name',),
+        }
         super().__init__(server_config=server_config, **kwargs)
 
     def create_payload(self):
@@ -5989,6 +5754,7 @@ class OperatingSystem(
         }
         self._meta = {
             'api_path': 'api/v2/operatingsystems',
+            'search_fields': ('name', 'major', 'minor', 'family'),
         }
         super().__init__(server_config=server_config, **kwargs)
 
@@ -6102,6 +5868,7 @@ class Organization(
         )
         self._meta = {
             'api_path': 'katello/api/organizations',
+            'search_fields': ('name', 'label', 'title'),
         }
         super().__init__(server_config=server_config, **kwargs)
 
@@ -6317,19 +6084,25 @@ class Organization(
     def rh_cloud_download_report(self, destination, **kwargs):
         """Download RHCloud Inventory report.
 
+        The report is streamed to ``destination`` chunk by chunk, rather than
+        being held in memory, unless ``response_mode='bytes'`` or
+        ``response_mode='memoryview'`` is passed.
+
         :param destination: File path where report will be saved.
             e.g. robottelo_tmp_dir.joinpath(f'report_{gen_alphanumeric()}.tar.xz')
         :param kwargs: Arguments to pass to requests.
-        :returns: The server's response, with all JSON decoded.
         :raises: ``requests.exceptions.HTTPError`` If the server responds with
             an HTTP 4XX or 5XX message.
 
         """
         kwargs = kwargs.copy()  # shadow the passed-in kwargs
         kwargs.update(self._server_config.get_client_kwargs())
+        kwargs.setdefault('response_mode', 'stream')
         response = client.get(self.path('rh_cloud/report'), **kwargs)
+        content = _handle_response(response, self._server_config, response_mode='stream')
         with open(destination, 'wb') as tarfile:
-            tarfile.write(response.content)
+            for chunk in (content,) if isinstance(content, bytes | memoryview) else content:
+                tarfile.write(chunk)
 
     def rh_cloud_generate_report(self, synchronous=True, timeout=None, **kwargs):
         """Start RHCloud Inventory report generation process.
@@ -6601,6 +6374,7 @@ class Product(
         }
         self._meta = {
             'api_path': 'katello/api/v2/products',
+            'search_fields': ('name', 'label'),
         }
         super().__init__(server_config=server_config, **kwargs)
 
@@ -6665,7 +6439,7 @@ class Product(
         <https://bugzilla.redhat.com/show_bug.cgi?id=1237283>`_ and
         `nailgun#261 <https://github.com/SatelliteQE/nailgun/issues/261>`_.
         """
-        results = self.search_json(fields, query)['results']
+        results = self._search_json(fields, query, filters)['results']
         results = self.search_normalize(results)
         entities = []
         for result in results:
@@ -7025,50 +6799,6 @@ class ModuleStream(Entity, EntityReadMixin, EntitySearchMixin):
         super().__init__(server_config=server_config, **kwargs)
 
 
-class CompliancePolicies(
-    Entity,
-    EntityCreateMixin,
-    EntityDeleteMixin,
-    EntityReadMixin,
-    EntitySearchMixin,
-    EntityUpdateMixin,
-):
-    """A representation of a Policy entity."""
-
-    def __init__(self, server_config=None, **kwargs):
-        self._fields = {
-            'name': entity_fields.StringField(
-                required=True, str_type='alpha', length=(4, 30), unique=True
-            ),
-            'description': entity_fields.StringField(),
-            'scap_content_id': entity_fields.IntegerField(required=True),
-            'scap_content_profile_id': entity_fields.IntegerField(required=True),
-            'period': entity_fields.StringField(),  # (weekly, monthly, custom)
-            'weekday': entity_fields.StringField(),  # (only if period == “weekly”)
-            'day_of_month': entity_fields.IntegerField(),  # (only if period == “monthly”)
-            'cron_line': entity_fields.StringField(),  # (only if period == “custom”)
-            'hostgroup': entity_fields.OneToManyField(HostGroup),
-            'host': entity_fields.OneToManyField(Host),
-            'tailoring_file_id': entity_fields.IntegerField(),
-            'tailoring_file_profile_id': entity_fields.IntegerField(),
-            'deploy_by': entity_fields.StringField(choices=('puppet', 'ansible', 'manual')),
-            'location': entity_fields.OneToManyField(Location),
-            'organization': entity_fields.OneToManyField(Organization),
-        }
-        self._meta = {'api_path': 'api/v2/compliance/policies'}
-        super().__init__(server_config=server_config, **kwargs)
-
-    def update(self, fields=None):
-        """Fetch a complete set of attributes for this entity.
-
-        For more information, see `Bugzilla #1746934
-        <https://bugzilla.redhat.com/show_bug.cgi?id=1746934>`_.
-
-        """
-        self.update_json(fields)
-        return self.read()
-
-
 class Realm(
     Entity,
     EntityCreateMixin,
@@ -7329,6 +7059,7 @@ class Repository(
             self._fields['download_policy'].required = True
         self._meta = {
             'api_path': 'katello/api/v2/repositories',
+            'search_fields': ('name',),
         }
         if kwargs.get('content_type') == 'deb':
             self._fields['deb_releases'].default = 'stable'
@@ -7932,41 +7663,6 @@ class RHCIDeployment(
         return _handle_response(response, self._server_config, synchronous, timeout)
 
 
-class RHCloud(Entity):
-    """A representation of a RHCloud entity."""
-
-    def __init__(self, server_config=None, **kwargs):
-        self._fields = {
-            'organization': entity_fields.OneToOneField(Organization),
-            'location': entity_fields.OneToOneField(Location),
-        }
-        super().__init__(server_config=server_config, **kwargs)
-        self._meta = {'api_path': 'api/v2/rh_cloud'}
-
-    def path(self, which=None):
-        """Extend ``nailgun.entity_mixins.Entity.path``."""
-        if which in ("enable_connector", "advisor_engine_config"):
-            return f'{super().path(which="base")}/{which}'
-        return super().path(which)
-
-    def enable_connector(self, synchronous=True, timeout=None, **kwargs):
-        """Enable RH Cloud connector."""
-        kwargs = kwargs.copy()
-        kwargs.update(self._server_config.get_client_kwargs())
-        kwargs['data'] = {}
-        if data := _payload(self.get_fields(), self.get_values()):
-            kwargs['data'] = data
-        response = client.post(self.path('enable_connector'), **kwargs)
-        return _handle_response(response, self._server_config, synchronous, timeout)
-
-    def advisor_engine_config(self, synchronous=True, timeout=None, **kwargs):
-        """Get advisor engine configuration information."""
-        kwargs = kwargs.copy()
-        kwargs.update(self._server_config.get_client_kwargs())
-        response = client.get(self.path('advisor_engine_config'), **kwargs)
-        return _handle_response(response, self._server_config, synchronous, timeout)
-
-
 class RoleLDAPGroups(Entity):
     """A representation of a Role LDAP Groups entity."""
 
@@ -8006,6 +7702,7 @@ class Role(
         }
         self._meta = {
             'api_path': 'api/v2/roles',
+            'search_fields': ('name',),
         }
         super().__init__(server_config=server_config, **kwargs)
 
@@ -8482,7 +8179,10 @@ class Subnet(
             'tftp': entity_fields.OneToOneField(SmartProxy),
             'vlanid': entity_fields.StringField(),
         }
-        self._meta = {'api_path': 'api/v2/subnets'}
+        self._meta = {
+            'api_path': 'api/v2/subnets',
+            'search_fields': ('name',),
+        }
         super().__init__(server_config=server_config, **kwargs)
 
     def create_payload(self):
@@ -8836,78 +8536,17 @@ class SyncPlan(
         return data
 
 
-class TailoringFile(
-    Entity,
-    EntityCreateMixin,
-    EntityDeleteMixin,
-    EntityReadMixin,
-    EntitySearchMixin,
-    EntityUpdateMixin,
-):
-    """A representation of a Tailoring File entity."""
+class Template(Entity):
+    """A representation of a Template entity."""
 
     def __init__(self, server_config=None, **kwargs):
-        self._fields = {
-            'name': entity_fields.StringField(
-                required=True, str_type='alpha', length=(4, 30), unique=True
-            ),
-            'scap_file': entity_fields.StringField(),
-            'original_filename': entity_fields.StringField(),
-            'tailoring_file_profiles': entity_fields.StringField(),
-            'location': entity_fields.OneToManyField(Location),
-            'organization': entity_fields.OneToManyField(Organization),
+        self._meta = {
+            'api_path': 'api/v2/templates',
         }
-        if 'scap_file' in kwargs:
-            with open(kwargs['scap_file']) as input_file:
-                kwargs['scap_file'] = input_file.read()
-        self._meta = {'api_path': 'api/v2/compliance/tailoring_files'}
         super().__init__(server_config=server_config, **kwargs)
 
-    def create(self, create_missing=None):
-        """Do extra work to fetch a complete set of attributes for this entity.
-
-        For more information, see `Bugzilla #1381129
-        <https://bugzilla.redhat.com/show_bug.cgi?id=1381129>`_.
-
-        """
-        return type(self)(
-            server_config=self._server_config,
-            id=self.create_json(create_missing)['id'],
-        ).read()
-
-    def create_payload(self, **kwargs):
-        """Wrap submitted data within an extra dict."""
-        return {'tailoring_file': super().create_payload()}
-
-    def read(self, entity=None, attrs=None, ignore=None, params=None):
-        """Ignore ``scap_file`` field."""
-        if ignore is None:
-            ignore = set()
-        ignore.update(['scap_file'])
-        return super().read(entity, attrs, ignore, params)
-
-    def update(self, fields=None):
-        """Fetch a complete set of attributes for this entity.
-
-        For more information, see `Bugzilla #1234964
-        <https://bugzilla.redhat.com/show_bug.cgi?id=1234964>`_.
-
-        """
-        self.update_json(fields)
-        return self.read()
-
-
-class Template(Entity):
-    """A representation of a Template entity."""
-
-    def __init__(self, server_config=None, **kwargs):
-        self._meta = {
-            'api_path': 'api/v2/templates',
-        }
-        super().__init__(server_config=server_config, **kwargs)
-
-    def path(self, which=None):
-        """Extend ``nailgun.entity_mixins.Entity.path``.
+    def path(self, which=None):
+        """Extend ``nailgun.entity_mixins.Entity.path``.
 
         The format of the returned path depends on the value of ``which``:
 
@@ -9013,7 +8652,10 @@ class UserGroup(
             'user': entity_fields.OneToManyField(User),
             'usergroup': entity_fields.OneToManyField(UserGroup),
         }
-        self._meta = {'api_path': 'api/v2/usergroups'}
+        self._meta = {
+            'api_path': 'api/v2/usergroups',
+            'search_fields': ('name',),
+        }
         super().__init__(server_config=server_config, **kwargs)
 
     def create_payload(self):
@@ -9111,6 +8753,7 @@ class User(
         }
         self._meta = {
             'api_path': 'api/v2/users',
+            'search_fields': ('login', 'firstname', 'lastname', 'mail', 'admin'),
         }
         super().__init__(server_config=server_config, **kwargs)
 
@@ -9145,235 +8788,6 @@ class User(
         return self.read()
 
 
-class VirtWhoConfig(
-    Entity,
-    EntityCreateMixin,
-    EntityDeleteMixin,
-    EntityReadMixin,
-    EntitySearchMixin,
-    EntityUpdateMixin,
-):
-    """A representation of a VirtWho Config entity."""
-
-    def __init__(self, server_config=None, **kwargs):
-        self._fields = {
-            'blacklist': entity_fields.StringField(),
-            'debug': entity_fields.BooleanField(),
-            'exclude_host_parents': entity_fields.StringField(),
-            'filter_host_parents': entity_fields.StringField(),
-            'filtering_mode': entity_fields.IntegerField(
-                choices=[0, 1, 2], default=0, required=True
-            ),
-            'http_proxy': entity_fields.OneToOneField(HTTPProxy),
-            'http_proxy_id': entity_fields.IntegerField(),
-            'hypervisor_id': entity_fields.StringField(
-                choices=['hostname', 'uuid', 'hwuuid'], default='hostname', required=True
-            ),
-            'hypervisor_password': entity_fields.StringField(),
-            'hypervisor_server': entity_fields.StringField(),
-            'hypervisor_type': entity_fields.StringField(
-                choices=['esx', 'hyperv', 'libvirt', 'kubevirt', 'ahv'],
-                default='libvirt',
-                required=True,
-            ),
-            'hypervisor_username': entity_fields.StringField(),
-            'interval': entity_fields.IntegerField(
-                choices=[60, 120, 240, 480, 720, 1440, 2880, 4320], default=120, required=True
-            ),
-            'name': entity_fields.StringField(required=True),
-            'no_proxy': entity_fields.StringField(),
-            'organization_id': entity_fields.IntegerField(),
-            'satellite_url': entity_fields.StringField(required=True),
-            'status': entity_fields.StringField(),
-            'whitelist': entity_fields.StringField(),
-            'prism_flavor': entity_fields.StringField(
-                choices=['central', 'element'], default='element'
-            ),
-            'kubeconfig_path': entity_fields.StringField(),
-            'ahv_internal_debug': entity_fields.BooleanField(),
-        }
-        self._meta = {
-            'api_path': 'foreman_virt_who_configure/api/v2/configs',
-        }
-        super().__init__(server_config=server_config, **kwargs)
-
-    def path(self, which=None):
-        """Extend ``nailgun.entity_mixins.Entity.path``.
-
-        The format of the returned path depends on the value of ``which``:
-
-        deploy_script
-            /foreman_virt_who_configure/api/v2/configs/:id/deploy_script
-
-        configs
-            /foreman_virt_who_configure/api/v2/organizations/:organization_id/configs
-
-        ``super`` is called otherwise.
-
-        """
-        if which and which in ("deploy_script"):
-            return f'{super().path(which="self")}/{which}'
-        if which and which in ("configs"):
-            return (
-                f'{self._server_config.url}/'
-                f'foreman_virt_who_configure/api/v2/organizations/'
-                f"{self.read(ignore={'http_proxy'}).organization_id}/"
-                f'{which}'
-            )
-        return super().path(which)
-
-    def create_payload(self):
-        """Wrap config in extra dict."""
-        return {'foreman_virt_who_configure_config': super().create_payload()}
-
-    def update_payload(self, fields=None):
-        """Wrap config in extra dict."""
-        return {'foreman_virt_who_configure_config': super().update_payload(fields)}
-
-    def deploy_script(self, synchronous=True, timeout=None, **kwargs):
-        """Deploy script for a VirtWho Config.
-
-        :param synchronous: What should happen if the server returns an HTTP
-            202 (accepted) status code? Wait for the task to complete if
-            ``True``. Immediately return the server's response otherwise.
-        :param timeout: Maximum number of seconds to wait until timing out.
-            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
-        :param kwargs: Arguments to pass to requests.
-        :returns: The server's response, with all JSON decoded.
-        :raises: ``requests.exceptions.HTTPError`` If the server responds with
-            an HTTP 4XX or 5XX message.
-
-        """
-        kwargs = kwargs.copy()  # shadow the passed-in kwargs
-        kwargs.update(self._server_config.get_client_kwargs())
-        response = client.get(self.path('deploy_script'), **kwargs)
-        return _handle_response(response, self._server_config, synchronous, timeout)
-
-    def read(self, entity=None, attrs=None, ignore=None, params=None):
-        """Read subscription from server.
-
-        Override :meth:`nailgun.entity_mixins.EntityReadMixin.read` to ignore
-        the ``hypervisor_password``.
-        """
-        if not ignore:
-            ignore = set()
-        ignore.add('hypervisor_password')
-        ignore.add('http_proxy_id')
-        return super().read(entity, attrs, ignore, params)
-
-    def get_organization_configs(self, synchronous=True, timeout=None, **kwargs):
-        """Get all virt-who configurations per organization.
-
-        Unusually, the ``/foreman_virt_who_configure/api/v2/organizations/
-        :organization_id/configs`` path is totally unsupported.
-        Support to List of virt-who configurations per organization.
-
-        :param synchronous: What should happen if the server returns an HTTP
-            202 (accepted) status code? Wait for the task to complete if
-            ``True``. Immediately return the server's response otherwise.
-        :param timeout: Maximum number of seconds to wait until timing out.
-            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
-        :param kwargs: Arguments to pass to requests.
-        :returns: The server's response, with all JSON decoded.
-        :raises: ``requests.exceptions.HTTPError`` If the server responds with
-            an HTTP 4XX or 5XX message.
-        """
-        kwargs = kwargs.copy()
-        kwargs.update(self._server_config.get_client_kwargs())
-        response = client.get(self.path('configs'), **kwargs)
-        return _handle_response(response, self._server_config, synchronous, timeout)
-
-
-class ScapContents(
-    Entity,
-    EntityCreateMixin,
-    EntityDeleteMixin,
-    EntityReadMixin,
-    EntitySearchMixin,
-    EntityUpdateMixin,
-):
-    """A representation of a ScapContents entity."""
-
-    def __init__(self, server_config=None, **kwargs):
-        self._fields = {
-            'title': entity_fields.StringField(required=True),
-            'scap_file': entity_fields.StringField(required=True),
-            'original_filename': entity_fields.StringField(),
-            'location': entity_fields.OneToManyField(Location),
-            'organization': entity_fields.OneToManyField(Organization),
-            'scap_content_profiles': entity_fields.StringField(),
-        }
-        if 'scap_file' in kwargs:
-            with open(kwargs['scap_file']) as input_file:
-                kwargs['scap_file'] = input_file.read()
-        self._meta = {
-            'api_path': 'api/compliance/scap_contents',
-        }
-        super().__init__(server_config=server_config, **kwargs)
-
-    def create(self, create_missing=None):
-        """Do extra work to fetch a complete set of attributes for this entity.
-
-        For more information, see `Bugzilla #1381129
-        <https://bugzilla.redhat.com/show_bug.cgi?id=1381129>`_.
-
-        """
-        return type(self)(
-            server_config=self._server_config,
-            id=self.create_json(create_missing)['id'],
-        ).read()
-
-    def read(self, entity=None, attrs=None, ignore=None, params=None):
-        """Read subscription from server.
-
-        Override :meth:`nailgun.entity_mixins.EntityReadMixin.read` to ignore
-        the ``scap_file``.
-        """
-        if ignore is None:
-            ignore = set()
-        ignore.add('scap_file')
-        return super().read(entity, attrs, ignore, params)
-
-    def path(self, which=None):
-        """Extend ``nailgun.entity_mixins.Entity.path``.
-
-        The format of the returned path depends on the value of ``which``:
-
-        xml
-            api/compliance/scap_contents/:id/xml
-
-        Otherwise, call ``super``.
-
-        """
-        if which in ("xml",):
-            return f'{super().path(which="self")}/{which}'
-        return super().path(which)
-
-    def update(self, fields=None):
-        """Fetch a complete set of attributes for this entity."""
-        self.update_json(fields)
-        return self.read()
-
-    def xml(self, synchronous=True, timeout=None, **kwargs):
-        """Download an SCAP content as XML.
-
-        :param synchronous: What should happen if the server returns an HTTP
-            202 (accepted) status code? Wait for the task to complete if
-            ``True``. Immediately return the server's response otherwise.
-        :param timeout: Maximum number of seconds to wait until timing out.
-            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
-        :param kwargs: Arguments to pass to requests.
-        :returns: The server's response, with all JSON decoded.
-        :raises: ``requests.exceptions.HTTPError`` If the server responds with
-            an HTTP 4XX or 5XX message.
-
-        """
-        kwargs = kwargs.copy()  # shadow the passed-in kwargs
-        kwargs.update(self._server_config.get_client_kwargs())
-        response = client.get(self.path('xml'), **kwargs)
-        return _handle_response(response, self._server_config, synchronous, timeout)
-
-
 class Srpms(Entity, EntityReadMixin, EntitySearchMixin):
     """A representation of a Srpms entity."""
 
@@ -9493,165 +8907,6 @@ class Webhooks(
         return _handle_response(response, self._server_config, synchronous, timeout)
 
 
-class AnsiblePlaybooks(Entity):
-    """A representation of Ansible Playbooks entity."""
-
-    def __init__(self, server_config=None, **kwargs):
-        self._meta = {
-            'api_path': '/ansible/api/ansible_playbooks',
-        }
-        super().__init__(server_config=server_config, **kwargs)
-
-    def path(self, which=None):
-        """Extend ``nailgun.entity_mixins.Entity.path``.
-
-        The format of the returned path depends on the value of ``which``:
-
-        fetch
-            /ansible_playbooks/fetch
-        sync
-            /ansible_playbooks/sync
-
-        ``super`` is called otherwise.
-
-        """
-        if which in ("sync", "fetch"):
-            return f'{super().path(which="base")}/{which}'
-        return super().path(which)
-
-    def fetch(self, synchronous=True, timeout=None, **kwargs):
-        """Fetch all ansible playbooks.
-
-        :param synchronous: What should happen if the server returns an HTTP
-            202 (accepted) status code? Wait for the task to complete if
-            ``True``. Immediately return the server's response otherwise.
-        :param timeout: Maximum number of seconds to wait until timing out.
-            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
-        :param kwargs: Arguments to pass to requests.
-        :returns: The server's response, with all JSON decoded.
-        :raises: ``requests.exceptions.HTTPError`` If the server responds with
-            an HTTP 4XX or 5XX message.
-
-        """
-        kwargs = kwargs.copy()
-        kwargs.update(self._server_config.get_client_kwargs())
-        response = client.get(self.path('fetch'), **kwargs)
-        return _handle_response(response, self._server_config, synchronous, timeout)
-
-    def sync(self, synchronous=True, timeout=None, **kwargs):
-        """Sync ansible playbooks.
-
-        :param synchronous: What should happen if the server returns an HTTP
-            202 (accepted) status code? Wait for the task to complete if
-            ``True``. Immediately return the server's response otherwise.
-        :param timeout: Maximum number of seconds to wait until timing out.
-            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
-        :param kwargs: Arguments to pass to requests.
-        :returns: The server's response, with all JSON decoded.
-        :raises: ``requests.exceptions.HTTPError`` If the server responds with
-            an HTTP 4XX or 5XX message.
-
-        """
-        kwargs = kwargs.copy()
-        kwargs.update(self._server_config.get_client_kwargs())
-        response = client.put(self.path('sync'), **kwargs)
-        return _handle_response(response, self._server_config, synchronous, timeout)
-
-
-class AnsibleRoles(
-    Entity,
-    EntityCreateMixin,
-    EntityDeleteMixin,
-    EntityReadMixin,
-    EntitySearchMixin,
-    EntityUpdateMixin,
-):
-    """A representation of Ansible Roles entity."""
-
-    def __init__(self, server_config=None, **kwargs):
-        self._meta = {
-            'api_path': '/ansible/api/ansible_roles',
-        }
-        super().__init__(server_config=server_config, **kwargs)
-
-    def path(self, which=None):
-        """Extend ``nailgun.entity_mixins.Entity.path``.
-
-        The format of the returned path depends on the value of ``which``:
-
-        sync
-            /ansible_roles/sync
-
-        ``super`` is called otherwise.
-
-        """
-        if which in ("sync",):
-            return f'{super().path(which="base")}/{which}'
-        return super().path(which)
-
-    def sync(self, synchronous=True, timeout=None, **kwargs):
-        """Sync ansible roles from a proxy.
-
-        AnsibleRoles.sync(data={'proxy_id': "target_sat.ip", 'role_names': ["role_name"]})
-
-        :param synchronous: What should happen if the server returns an HTTP
-            202 (accepted) status code? Wait for the task to complete if
-            ``True``. Immediately return the server's response otherwise.
-        :param timeout: Maximum number of seconds to wait until timing out.
-            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
-        :param kwargs: Arguments to pass to requests.
-        :returns: The server's response, with all JSON decoded.
-        :raises: ``requests.exceptions.HTTPError`` If the server responds with
-            an HTTP 4XX or 5XX message.
-
-        """
-        kwargs = kwargs.copy()
-        kwargs.update(self._server_config.get_client_kwargs())
-        response = client.put(self.path('sync'), **kwargs)
-        return _handle_response(response, self._server_config, synchronous, timeout)
-
-
-class AnsibleVariable(
-    Entity,
-    EntityCreateMixin,
-    EntityReadMixin,
-    EntityDeleteMixin,
-    EntitySearchMixin,
-    EntityUpdateMixin,
-):
-    """A representation of a Ansible Variable entity."""
-
-    def __init__(self, server_config=None, **kwargs):
-        self._fields = {
-            'variable': entity_fields.StringField(required=True),
-            'ansible_role_id': entity_fields.IntegerField(required=True),
-            'default_value': entity_fields.StringField(),
-            'override_value_order': entity_fields.StringField(),
-            'description': entity_fields.StringField(),
-            'validator_type': entity_fields.ListField(),
-            'validator_rule': entity_fields.StringField(),
-            'variable_type': entity_fields.StringField(
-                default='string',
-                choices=(
-                    'string',
-                    'boolean',
-                    'integer',
-                    'real',
-                    'array',
-                    'hash',
-                    'yaml',
-                    'json',
-                ),
-            ),
-            'merge_overrides': entity_fields.BooleanField(),
-            'merge_default': entity_fields.BooleanField(),
-            'avoid_duplicates': entity_fields.BooleanField(),
-            'override': entity_fields.BooleanField(),
-        }
-        self._meta = {'api_path': 'ansible/api/ansible_variables'}
-        super().__init__(server_config=server_config, **kwargs)
-
-
 class TablePreferences(
     Entity,
     EntityCreateMixin,
@@ -9719,3 +8974,39 @@ class NotificationRecipients(Entity, EntityReadMixin):
             'read_type': 'base',
         }
         super().__init__(server_config=server_config, **kwargs)
+
+
+#: Maps the name of each entity defined by a plugin submodule to the name of
+#: that submodule.
+_PLUGIN_ENTITIES = {
+    name: module
+    for module, names in (
+        ('ansible', ('AnsiblePlaybooks', 'AnsibleRoles', 'AnsibleVariable')),
+        ('compliance', ('ArfReport', 'CompliancePolicies', 'ScapContents', 'TailoringFile')),
+        ('discovery', ('DiscoveredHost', 'DiscoveryRule')),
+        ('rh_cloud', ('RHCloud',)),
+        ('virt_who', ('VirtWhoConfig',)),
+    )
+    for name in names
+}
+
+
+def __getattr__(name):
+    """Return an entity defined by a plugin submodule, importing it if need be.
+
+    Python calls this function when ``name`` is not found in this module.
+
+    :param name: The name of an entity, such as ``'DiscoveredHost'``.
+    :raises AttributeError: If ``name`` is not the name of such an entity.
+    """
+    module = _PLUGIN_ENTITIES.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    entity = getattr(importlib.import_module(f'{__name__}.{module}'), name)
+    globals()[name] = entity
+    return entity
+
+
+def __dir__():
+    """List this module's names, including those of entities not yet imported."""
+    return sorted(globals().keys() | _PLUGIN_ENTITIES.keys())
@@ -0,0 +1,277 @@
+"""Entities provided by the Foreman OpenSCAP plugin.
+
+Import these entities from :mod:`nailgun.entities`, which loads this module
+the first time one of them is used.
+
+"""
+
+from nailgun import client, entities, entity_fields
+from nailgun.entities import (
+    Capsule,
+    Host,
+    HostGroup,
+    Location,
+    Organization,
+)
+from nailgun.entity_mixins import (
+    Entity,
+    EntityCreateMixin,
+    EntityDeleteMixin,
+    EntityReadMixin,
+    EntitySearchMixin,
+    EntityUpdateMixin,
+)
+
+
+class ArfReport(Entity, EntityDeleteMixin, EntityReadMixin, EntitySearchMixin):
+    """A representation of a Arf Report entity.
+
+    # Read Arf report
+    ArfReport(id=<id>).read()
+    # Delete Arf report
+    ArfReport(id=<id>).delete()
+    # Download Arf report in HTML
+    ArfReport(id=<id>).download_html()
+    """
+
+    def __init__(self, server_config=None, **kwargs):
+        self._fields = {
+            'location': entity_fields.OneToManyField(Location),
+            'organization': entity_fields.OneToManyField(Organization),
+            'host': entity_fields.OneToOneField(Host),
+            'openscap_proxy': entity_fields.OneToOneField(Capsule),
+            'policy': entity_fields.OneToOneField(CompliancePolicies),
+        }
+        self._meta = {
+            'api_path': 'api/compliance/arf_reports',
+        }
+        super().__init__(server_config=server_config, **kwargs)
+
+    def path(self, which=None):
+        """Extend ``nailgun.entity_mixins.Entity.path``.
+
+        The format of the returned path depends on the value of ``which``:
+
+        download_html
+            /api/compliance/arf_reports/:id/download_html
+
+        Otherwise, call ``super``.
+
+        """
+        if which in ("download_html",):
+            return f'{super().path(which="self")}/{which}'
+        return super().path(which)
+
+    def download_html(self, synchronous=True, timeout=None, **kwargs):
+        """Download ARF report in HTML.
+
+        :param synchronous: What should happen if the server returns an HTTP
+            202 (accepted) status code? Wait for the task to complete if
+            ``True``. Immediately return the server's response otherwise.
+        :param timeout: Maximum number of seconds to wait until timing out.
+            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
+        :param kwargs: Arguments to pass to requests.
+        :returns: The server's response, with all JSON decoded.
+        :raises: ``requests.exceptions.HTTPError`` If the server responds with
+            an HTTP 4XX or 5XX message.
+
+        """
+        kwargs = kwargs.copy()  # shadow the passed-in kwargs
+        kwargs.update(self._server_config.get_client_kwargs())
+        response = client.get(self.path('download_html'), **kwargs)
+        return entities._handle_response(response, self._server_config, synchronous, timeout)
+
+
+class CompliancePolicies(
+    Entity,
+    EntityCreateMixin,
+    EntityDeleteMixin,
+    EntityReadMixin,
+    EntitySearchMixin,
+    EntityUpdateMixin,
+):
+    """A representation of a Policy entity."""
+
+    def __init__(self, server_config=None, **kwargs):
+        self._fields = {
+            'name': entity_fields.StringField(
+                required=True, str_type='alpha', length=(4, 30), unique=True
+            ),
+            'description': entity_fields.StringField(),
+            'scap_content_id': entity_fields.IntegerField(required=True),
+            'scap_content_profile_id': entity_fields.IntegerField(required=True),
+            'period': entity_fields.StringField(),  # (weekly, monthly, custom)
+            'weekday': entity_fields.StringField(),  # (only if period == “weekly”)
+            'day_of_month': entity_fields.IntegerField(),  # (only if period == “monthly”)
+            'cron_line': entity_fields.StringField(),  # (only if period == “custom”)
+            'hostgroup': entity_fields.OneToManyField(HostGroup),
+            'host': entity_fields.OneToManyField(Host),
+            'tailoring_file_id': entity_fields.IntegerField(),
+            'tailoring_file_profile_id': entity_fields.IntegerField(),
+            'deploy_by': entity_fields.StringField(choices=('puppet', 'ansible', 'manual')),
+            'location': entity_fields.OneToManyField(Location),
+            'organization': entity_fields.OneToManyField(Organization),
+        }
+        self._meta = {'api_path': 'api/v2/compliance/policies'}
+        super().__init__(server_config=server_config, **kwargs)
+
+    def update(self, fields=None):
+        """Fetch a complete set of attributes for this entity.
+
+        For more information, see `Bugzilla #1746934
+        <https://bugzilla.redhat.com/show_bug.cgi?id=1746934>`_.
+
+        """
+        self.update_json(fields)
+        return self.read()
+
+
+class TailoringFile(
+    Entity,
+    EntityCreateMixin,
+    EntityDeleteMixin,
+    EntityReadMixin,
+    EntitySearchMixin,
+    EntityUpdateMixin,
+):
+    """A representation of a Tailoring File entity."""
+
+    def __init__(self, server_config=None, **kwargs):
+        self._fields = {
+            'name': entity_fields.StringField(
+                required=True, str_type='alpha', length=(4, 30), unique=True
+            ),
+            'scap_file': entity_fields.StringField(),
+            'original_filename': entity_fields.StringField(),
+            'tailoring_file_profiles': entity_fields.StringField(),
+            'location': entity_fields.OneToManyField(Location),
+            'organization': entity_fields.OneToManyField(Organization),
+        }
+        if 'scap_file' in kwargs:
+            with open(kwargs['scap_file']) as input_file:
+                kwargs['scap_file'] = input_file.read()
+        self._meta = {'api_path': 'api/v2/compliance/tailoring_files'}
+        super().__init__(server_config=server_config, **kwargs)
+
+    def create(self, create_missing=None):
+        """Do extra work to fetch a complete set of attributes for this entity.
+
+        For more information, see `Bugzilla #1381129
+        <https://bugzilla.redhat.com/show_bug.cgi?id=1381129>`_.
+
+        """
+        return type(self)(
+            server_config=self._server_config,
+            id=self.create_json(create_missing)['id'],
+        ).read()
+
+    def create_payload(self, **kwargs):
+        """Wrap submitted data within an extra dict."""
+        return {'tailoring_file': super().create_payload()}
+
+    def read(self, entity=None, attrs=None, ignore=None, params=None):
+        """Ignore ``scap_file`` field."""
+        if ignore is None:
+            ignore = set()
+        ignore.update(['scap_file'])
+        return super().read(entity, attrs, ignore, params)
+
+    def update(self, fields=None):
+        """Fetch a complete set of attributes for this entity.
+
+        For more information, see `Bugzilla #1234964
+        <https://bugzilla.redhat.com/show_bug.cgi?id=1234964>`_.
+
+        """
+        self.update_json(fields)
+        return self.read()
+
+
+class ScapContents(
+    Entity,
+    EntityCreateMixin,
+    EntityDeleteMixin,
+    EntityReadMixin,
+    EntitySearchMixin,
+    EntityUpdateMixin,
+):
+    """A representation of a ScapContents entity."""
+
+    def __init__(self, server_config=None, **kwargs):
+        self._fields = {
+            'title': entity_fields.StringField(required=True),
+            'scap_file': entity_fields.StringField(required=True),
+            'original_filename': entity_fields.StringField(),
+            'location': entity_fields.OneToManyField(Location),
+            'organization': entity_fields.OneToManyField(Organization),
+            'scap_content_profiles': entity_fields.StringField(),
+        }
+        if 'scap_file' in kwargs:
+            with open(kwargs['scap_file']) as input_file:
+                kwargs['scap_file'] = input_file.read()
+        self._meta = {
+            'api_path': 'api/compliance/scap_contents',
+        }
+        super().__init__(server_config=server_config, **kwargs)
+
+    def create(self, create_missing=None):
+        """Do extra work to fetch a complete set of attributes for this entity.
+
+        For more information, see `Bugzilla #1381129
+        <https://bugzilla.redhat.com/show_bug.cgi?id=1381129>`_.
+
+        """
+        return type(self)(
+            server_config=self._server_config,
+            id=self.create_json(create_missing)['id'],
+        ).read()
+
+    def read(self, entity=None, attrs=None, ignore=None, params=None):
+        """Read subscription from server.
+
+        Override :meth:`nailgun.entity_mixins.EntityReadMixin.read` to ignore
+        the ``scap_file``.
+        """
+        if ignore is None:
+            ignore = set()
+        ignore.add('scap_file')
+        return super().read(entity, attrs, ignore, params)
+
+    def path(self, which=None):
+        """Extend ``nailgun.entity_mixins.Entity.path``.
+
+        The format of the returned path depends on the value of ``which``:
+
+        xml
+            api/compliance/scap_contents/:id/xml
+
+        Otherwise, call ``super``.
+
+        """
+        if which in ("xml",):
+            return f'{super().path(which="self")}/{which}'
+        return super().path(which)
+
+    def update(self, fields=None):
+        """Fetch a complete set of attributes for this entity."""
+        self.update_json(fields)
+        return self.read()
+
+    def xml(self, synchronous=True, timeout=None, **kwargs):
+        """Download an SCAP content as XML.
+
+        :param synchronous: What should happen if the server returns an HTTP
+            202 (accepted) status code? Wait for the task to complete if
+            ``True``. Immediately return the server's response otherwise.
+        :param timeout: Maximum number of seconds to wait until timing out.
+            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
+        :param kwargs: Arguments to pass to requests.
+        :returns: The server's response, with all JSON decoded.
+        :raises: ``requests.exceptions.HTTPError`` If the server responds with
+            an HTTP 4XX or 5XX message.
+
+        """
+        kwargs = kwargs.copy()  # shadow the passed-in kwargs
+        kwargs.update(self._server_config.get_client_kwargs())
+        response = client.get(self.path('xml'), **kwargs)
+        return entities._handle_response(response, self._server_config, synchronous, timeout)
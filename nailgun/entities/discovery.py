@@ -0,0 +1,311 @@
+"""Entities provided by the Foreman Discovery plugin.
+
+Import these entities from :mod:`nailgun.entities`, which loads this module
+the first time one of them is used.
+
+"""
+
+from nailgun import client, entities, entity_fields
+from nailgun.entities import HostGroup, Location, Organization
+from nailgun.entity_mixins import (
+    Entity,
+    EntityCreateMixin,
+    EntityDeleteMixin,
+    EntityReadMixin,
+    EntitySearchMixin,
+    EntityUpdateMixin,
+)
+
+
+class DiscoveredHost(
+    Entity,
+    EntityCreateMixin,
+    EntityDeleteMixin,
+    EntityReadMixin,
+    EntitySearchMixin,
+    EntityUpdateMixin,
+):
+    """A representation of a Foreman Discovered Host entity."""
+
+    def __init__(self, server_config=None, **kwargs):
+        self._fields = {
+            'name': entity_fields.StringField(
+                required=True, str_type='alpha', length=(6, 12), unique=True
+            ),
+            'ip': entity_fields.IPAddressField(required=True),
+            'mac': entity_fields.MACAddressField(required=True),
+            'hostgroup': entity_fields.OneToOneField(HostGroup),
+            'root_pass': entity_fields.StringField(),
+            'build': entity_fields.BooleanField(default=False),
+            'organization': entity_fields.OneToOneField(Organization),
+            'location': entity_fields.OneToOneField(Location),
+        }
+        self._meta = {
+            'api_path': '/api/v2/discovered_hosts',
+        }
+        super().__init__(server_config=server_config, **kwargs)
+
+    def path(self, which=None):
+        """Extend ``nailgun.entity_mixins.Entity.path``.
+
+        The format of the returned path depends on the value of ``which``:
+
+        facts
+            /discovered_hosts/facts
+        refresh_facts
+            /discovered_hosts/<id>/refresh_facts
+        reboot
+            /discovered_hosts/<id>/reboot
+
+        ``super`` is called otherwise.
+
+        """
+        if which in (
+            'auto_provision',
+            'auto_provision_all',
+            'facts',
+            'refresh_facts',
+            'reboot',
+            'reboot_all',
+        ):
+            prefix = 'base' if which in ['auto_provision_all', 'facts', 'reboot_all'] else 'self'
+            return f'{super().path(which=prefix)}/{which}'
+        return super().path(which)
+
+    def create_payload(self):
+        """Wrap submitted data within an extra dict.
+
+        For more information, see `Bugzilla #1151220
+        <https://bugzilla.redhat.com/show_bug.cgi?id=1151220>`_.
+
+        """
+        return {'discovered_host': super().create_payload()}
+
+    def update_payload(self, fields=None):
+        """Wrap submitted data within an extra dict."""
+        return {'discovered_host': super().update_payload(fields)}
+
+    def facts(self, synchronous=True, timeout=None, **kwargs):
+        """Update facts for discovered host, and create the host.
+
+        :param synchronous: What should happen if the server returns an HTTP
+            202 (accepted) status code? Wait for the task to complete if
+            ``True``. Immediately return the server's response otherwise.
+        :param timeout: Maximum number of seconds to wait until timing out.
+            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
+        :param kwargs: Arguments to pass to requests.
+        :returns: The server's response, with all JSON decoded.
+        :raises: ``requests.exceptions.HTTPError`` If the server responds with
+            an HTTP 4XX or 5XX message.
+
+        """
+        kwargs = kwargs.copy()  # shadow the passed-in kwargs
+        kwargs.update(self._server_config.get_client_kwargs())
+        response = client.post(self.path('facts'), **kwargs)
+        return entities._handle_response(response, self._server_config, synchronous, timeout)
+
+    def refresh_facts(self, synchronous=True, timeout=None, **kwargs):
+        """Refresh facts for discovered host.
+
+        :param synchronous: What should happen if the server returns an HTTP
+            202 (accepted) status code? Wait for the task to complete if
+            ``True``. Immediately return the server's response otherwise.
+        :param timeout: Maximum number of seconds to wait until timing out.
+            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
+        :param kwargs: Arguments to pass to requests.
+        :returns: The server's response, with all JSON decoded.
+        :raises: ``requests.exceptions.HTTPError`` If the server responds with
+            an HTTP 4XX or 5XX message.
+
+        """
+        kwargs = kwargs.copy()  # shadow the passed-in kwargs
+        kwargs.update(self._server_config.get_client_kwargs())
+        response = client.put(self.path('refresh_facts'), **kwargs)
+        return entities._handle_response(response, self._server_config, synchronous, timeout)
+
+    def read(self, entity=None, attrs=None, ignore=None, params=None):
+        """Make sure, everything except `id` and `name` are in the ignore list for read."""
+        if ignore is None:
+            ignore = set()
+        ignore.add('ip')
+        ignore.add('mac')
+        ignore.add('root_pass')
+        ignore.add('hostgroup')
+        ignore.add('build')
+        ignore.add('organization')
+        ignore.add('location')
+        return super().read(entity, attrs, ignore, params)
+
+    def reboot(self, synchronous=True, timeout=None, **kwargs):
+        """Reboot the discovered host.
+
+        :param synchronous: What should happen if the server returns an HTTP
+            202 (accepted) status code? Wait for the task to complete if
+            ``True``. Immediately return the server's response otherwise.
+        :param timeout: Maximum number of seconds to wait until timing out.
+            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
+        :param kwargs: Arguments to pass to requests.
+        :returns: The server's response, with all JSON decoded.
+        :raises: ``requests.exceptions.HTTPError`` If the server responds with
+            an HTTP 4XX or 5XX message.
+
+        """
+        kwargs = kwargs.copy()  # shadow the passed-in kwargs
+        kwargs.update(self._server_config.get_client_kwargs())
+        response = client.put(self.path('reboot'), **kwargs)
+        return entities._handle_response(response, self._server_config, synchronous, timeout)
+
+    def reboot_all(self, synchronous=True, timeout=None, **kwargs):
+        """Reboot all discovered hosts.
+
+        :param synchronous: What should happen if the server returns an HTTP
+            202 (accepted) status code? Wait for the task to complete if
+            ``True``. Immediately return the server's response otherwise.
+        :param timeout: Maximum number of seconds to wait until timing out.
+            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
+        :param kwargs: Arguments to pass to requests.
+        :returns: The server's response, with all JSON decoded.
+        :raises: ``requests.exceptions.HTTPError`` If the server responds with
+            an HTTP 4XX or 5XX message.
+        """
+        kwargs = kwargs.copy()  # shadow the passed-in kwargs
+        kwargs.update(self._server_config.get_client_kwargs())
+        response = client.put(self.path('reboot_all'), **kwargs)
+        return entities._handle_response(response, self._server_config, synchronous, timeout)
+
+    def auto_provision(self, synchronous=True, timeout=None, **kwargs):
+        """Auto-provision the discovered host.
+
+        :param synchronous: What should happen if the server returns an HTTP
+            202 (accepted) status code? Wait for the task to complete if
+            ``True``. Immediately return the server's response otherwise.
+        :param timeout: Maximum number of seconds to wait until timing out.
+            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
+        :param kwargs: Arguments to pass to requests.
+        :returns: The server's response, with all JSON decoded.
+        :raises: ``requests.exceptions.HTTPError`` If the server responds with
+            an HTTP 4XX or 5XX message.
+        """
+        kwargs = kwargs.copy()  # shadow the passed-in kwargs
+        kwargs.update(self._server_config.get_client_kwargs())
+        response = client.post(self.path('auto_provision'), **kwargs)
+        return entities._handle_response(response, self._server_config, synchronous, timeout)
+
+    def auto_provision_all(self, synchronous=True, timeout=None, **kwargs):
+        """Auto-provision of all discovered hosts.
+
+        :param synchronous: What should happen if the server returns an HTTP
+            202 (accepted) status code? Wait for the task to complete if
+            ``True``. Immediately return the server's response otherwise.
+        :param timeout: Maximum number of seconds to wait until timing out.
+            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
+        :param kwargs: Arguments to pass to requests.
+        :returns: The server's response, with all JSON decoded.
+        :raises: ``requests.exceptions.HTTPError`` If the server responds with
+            an HTTP 4XX or 5XX message.
+        """
+        kwargs = kwargs.copy()  # shadow the passed-in kwargs
+        kwargs.update(self._server_config.get_client_kwargs())
+        response = client.post(self.path('auto_provision_all'), **kwargs)
+        return entities._handle_response(response, self._server_config, synchronous, timeout)
+
+
+class DiscoveryRule(
+    Entity,
+    EntityCreateMixin,
+    EntityDeleteMixin,
+    EntityReadMixin,
+    EntitySearchMixin,
+    EntityUpdateMixin,
+):
+    """A representation of a Foreman Discovery Rule entity.
+
+    .. NOTE:: The ``search_`` field is named as such due to a naming conflict
+        with :meth:`nailgun.entity_mixins.Entity.path`.
+    """
+
+    def __init__(self, server_config=None, **kwargs):
+        self._fields = {
+            'enabled': entity_fields.BooleanField(),
+            'hostgroup': entity_fields.OneToOneField(HostGroup, required=True),
+            'hostname': entity_fields.StringField(),
+            'location': entity_fields.OneToManyField(Location),
+            'max_count': entity_fields.IntegerField(),
+            'name': entity_fields.StringField(
+                required=True, str_type='alpha', length=(6, 12), unique=True
+            ),
+            'organization': entity_fields.OneToManyField(Organization),
+            'priority': entity_fields.IntegerField(),
+            'search_': entity_fields.StringField(required=True),
+        }
+        self._meta = {
+            'api_path': '/api/v2/discovery_rules',
+        }
+        super().__init__(server_config=server_config, **kwargs)
+
+    def create_payload(self):
+        """Wrap submitted data within an extra dict.
+
+        For more information, see `Bugzilla #1151220
+        <https://bugzilla.redhat.com/show_bug.cgi?id=1151220>`_.
+
+        In addition, rename the ``search_`` field to ``search``.
+
+        """
+        payload = super().create_payload()
+        if 'search_' in payload:
+            payload['search'] = payload.pop('search_')
+        return {'discovery_rule': payload}
+
+    def create(self, create_missing=None):
+        """Do extra work to fetch a complete set of attributes for this entity.
+
+        For more information, see `Bugzilla #1381129
+        <https://bugzilla.redhat.com/show_bug.cgi?id=1381129>`_.
+
+        """
+        return type(self)(
+            server_config=self._server_config,
+            id=self.create_json(create_missing)['id'],
+        ).read()
+
+    def read(self, entity=None, attrs=None, ignore=None, params=None):
+        """Work around a bug. Rename ``search`` to ``search_``.
+
+        For more information on the bug, see `Bugzilla #1257255
+        <https://bugzilla.redhat.com/show_bug.cgi?id=1257255>`_.
+
+        """
+        if attrs is None:
+            attrs = self.read_json()
+        attrs['search_'] = attrs.pop('search')
+
+        # Satellite doesn't return this attribute. See BZ 1257255.
+        attr = 'max_count'
+        if ignore is None:
+            ignore = set()
+        if attr not in ignore:
+            # We cannot call `self.update_json([])`, as an ID might not be
+            # present on self. However, `attrs` is guaranteed to have an ID.
+            attrs[attr] = DiscoveryRule(
+                server_config=self._server_config,
+                id=attrs['id'],
+            ).update_json([])[attr]
+        return super().read(entity, attrs, ignore, params)
+
+    def update(self, fields=None):
+        """Fetch a complete set of attributes for this entity.
+
+        For more information, see `Bugzilla #1381129
+        <https://bugzilla.redhat.com/show_bug.cgi?id=1381129>`_.
+
+        """
+        self.update_json(fields)
+        return self.read()
+
+    def update_payload(self, fields=None):
+        """Wrap submitted data within an extra dict."""
+        payload = super().update_payload(fields)
+        if 'search_' in payload:
+            payload['search'] = payload.pop('search_')
+        return {'discovery_rule': payload}
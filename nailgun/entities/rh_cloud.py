@@ -0,0 +1,45 @@
+"""Entities provided by the Foreman RH Cloud plugin.
+
+Import these entities from :mod:`nailgun.entities`, which loads this module
+the first time one of them is used.
+
+"""
+
+from nailgun import client, entities, entity_fields
+from nailgun.entities import Location, Organization
+from nailgun.entity_mixins import Entity, _payload
+
+
+class RHCloud(Entity):
+    """A representation of a RHCloud entity."""
+
+    def __init__(self, server_config=None, **kwargs):
+        self._fields = {
+            'organization': entity_fields.OneToOneField(Organization),
+            'location': entity_fields.OneToOneField(Location),
+        }
+        super().__init__(server_config=server_config, **kwargs)
+        self._meta = {'api_path': 'api/v2/rh_cloud'}
+
+    def path(self, which=None):
+        """Extend ``nailgun.entity_mixins.Entity.path``."""
+        if which in ("enable_connector", "advisor_engine_config"):
+            return f'{super().path(which="base")}/{which}'
+        return super().path(which)
+
+    def enable_connector(self, synchronous=True, timeout=None, **kwargs):
+        """Enable RH Cloud connector."""
+        kwargs = kwargs.copy()
+        kwargs.update(self._server_config.get_client_kwargs())
+        kwargs['data'] = {}
+        if data := _payload(self.get_fields(), self.get_values()):
+            kwargs['data'] = data
+        response = client.post(self.path('enable_connector'), **kwargs)
+        return entities._handle_response(response, self._server_config, synchronous, timeout)
+
+    def advisor_engine_config(self, synchronous=True, timeout=None, **kwargs):
+        """Get advisor engine configuration information."""
+        kwargs = kwargs.copy()
+        kwargs.update(self._server_config.get_client_kwargs())
+        response = client.get(self.path('advisor_engine_config'), **kwargs)
+        return entities._handle_response(response, self._server_config, synchronous, timeout)
@@ -0,0 +1,156 @@
+"""Entities provided by the Foreman virt-who configure plugin.
+
+Import these entities from :mod:`nailgun.entities`, which loads this module
+the first time one of them is used.
+
+"""
+
+from nailgun import client, entities, entity_fields
+from nailgun.entities import HTTPProxy
+from nailgun.entity_mixins import (
+    Entity,
+    EntityCreateMixin,
+    EntityDeleteMixin,
+    EntityReadMixin,
+    EntitySearchMixin,
+    EntityUpdateMixin,
+)
+
+
+class VirtWhoConfig(
+    Entity,
+    EntityCreateMixin,
+    EntityDeleteMixin,
+    EntityReadMixin,
+    EntitySearchMixin,
+    EntityUpdateMixin,
+):
+    """A representation of a VirtWho Config entity."""
+
+    def __init__(self, server_config=None, **kwargs):
+        self._fields = {
+            'blacklist': entity_fields.StringField(),
+            'debug': entity_fields.BooleanField(),
+            'exclude_host_parents': entity_fields.StringField(),
+            'filter_host_parents': entity_fields.StringField(),
+            'filtering_mode': entity_fields.IntegerField(
+                choices=[0, 1, 2], default=0, required=True
+            ),
+            'http_proxy': entity_fields.OneToOneField(HTTPProxy),
+            'http_proxy_id': entity_fields.IntegerField(),
+            'hypervisor_id': entity_fields.StringField(
+                choices=['hostname', 'uuid', 'hwuuid'], default='hostname', required=True
+            ),
+            'hypervisor_password': entity_fields.StringField(),
+            'hypervisor_server': entity_fields.StringField(),
+            'hypervisor_type': entity_fields.StringField(
+                choices=['esx', 'hyperv', 'libvirt', 'kubevirt', 'ahv'],
+                default='libvirt',
+                required=True,
+            ),
+            'hypervisor_username': entity_fields.StringField(),
+            'interval': entity_fields.IntegerField(
+                choices=[60, 120, 240, 480, 720, 1440, 2880, 4320], default=120, required=True
+            ),
+            'name': entity_fields.StringField(required=True),
+            'no_proxy': entity_fields.StringField(),
+            'organization_id': entity_fields.IntegerField(),
+            'satellite_url': entity_fields.StringField(required=True),
+            'status': entity_fields.StringField(),
+            'whitelist': entity_fields.StringField(),
+            'prism_flavor': entity_fields.StringField(
+                choices=['central', 'element'], default='element'
+            ),
+            'kubeconfig_path': entity_fields.StringField(),
+            'ahv_internal_debug': entity_fields.BooleanField(),
+        }
+        self._meta = {
+            'api_path': 'foreman_virt_who_configure/api/v2/configs',
+        }
+        super().__init__(server_config=server_config, **kwargs)
+
+    def path(self, which=None):
+        """Extend ``nailgun.entity_mixins.Entity.path``.
+
+        The format of the returned path depends on the value of ``which``:
+
+        deploy_script
+            /foreman_virt_who_configure/api/v2/configs/:id/deploy_script
+
+        configs
+            /foreman_virt_who_configure/api/v2/organizations/:organization_id/configs
+
+        ``super`` is called otherwise.
+
+        """
+        if which and which in ("deploy_script"):
+            return f'{super().path(which="self")}/{which}'
+        if which and which in ("configs"):
+            return (
+                f'{self._server_config.url}/'
+                f'foreman_virt_who_configure/api/v2/organizations/'
+                f"{self.read(ignore={'http_proxy'}).organization_id}/"
+                f'{which}'
+            )
+        return super().path(which)
+
+    def create_payload(self):
+        """Wrap config in extra dict."""
+        return {'foreman_virt_who_configure_config': super().create_payload()}
+
+    def update_payload(self, fields=None):
+        """Wrap config in extra dict."""
+        return {'foreman_virt_who_configure_config': super().update_payload(fields)}
+
+    def deploy_script(self, synchronous=True, timeout=None, **kwargs):
+        """Deploy script for a VirtWho Config.
+
+        :param synchronous: What should happen if the server returns an HTTP
+            202 (accepted) status code? Wait for the task to complete if
+            ``True``. Immediately return the server's response otherwise.
+        :param timeout: Maximum number of seconds to wait until timing out.
+            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
+        :param kwargs: Arguments to pass to requests.
+        :returns: The server's response, with all JSON decoded.
+        :raises: ``requests.exceptions.HTTPError`` If the server responds with
+            an HTTP 4XX or 5XX message.
+
+        """
+        kwargs = kwargs.copy()  # shadow the passed-in kwargs
+        kwargs.update(self._server_config.get_client_kwargs())
+        response = client.get(self.path('deploy_script'), **kwargs)
+        return entities._handle_response(response, self._server_config, synchronous, timeout)
+
+    def read(self, entity=None, attrs=None, ignore=None, params=None):
+        """Read subscription from server.
+
+        Override :meth:`nailgun.entity_mixins.EntityReadMixin.read` to ignore
+        the ``hypervisor_password``.
+        """
+        if not ignore:
+            ignore = set()
+        ignore.add('hypervisor_password')
+        ignore.add('http_proxy_id')
+        return super().read(entity, attrs, ignore, params)
+
+    def get_organization_configs(self, synchronous=True, timeout=None, **kwargs):
+        """Get all virt-who configurations per organization.
+
+        Unusually, the ``/foreman_virt_who_configure/api/v2/organizations/
+        :organization_id/configs`` path is totally unsupported.
+        Support to List of virt-who configurations per organization.
+
+        :param synchronous: What should happen if the server returns an HTTP
+            202 (accepted) status code? Wait for the task to complete if
+            ``True``. Immediately return the server's response otherwise.
+        :param timeout: Maximum number of seconds to wait until timing out.
+            Defaults to ``nailgun.entity_mixins.TASK_TIMEOUT``.
+        :param kwargs: Arguments to pass to requests.
+        :returns: The server's response, with all JSON decoded.
+        :raises: ``requests.exceptions.HTTPError`` If the server responds with
+            an HTTP 4XX or 5XX message.
+        """
+        kwargs = kwargs.copy()
+        kwargs.update(self._server_config.get_client_kwargs())
+        response = client.get(self.path('configs'), **kwargs)
+        return entities._handle_response(response, self._server_config, synchronous, timeout)
@@ -1,21 +1,36 @@
 """Defines a set of mixins that provide tools for interacting with entities."""
 
 import _thread as thread
+from collections import namedtuple
 from collections.abc import Iterable
 import contextlib
 from datetime import date, datetime
+import functools
 import http.client as http_client
 import json as std_json
 import threading
 import time
+import types
 from urllib.parse import urljoin
+import weakref
 
 from fauxfactory import gen_choice
 from inflection import pluralize
 from requests.exceptions import HTTPError, JSONDecodeError
 
 from nailgun import client, config
-from nailgun.entity_fields import IntegerField, ListField, OneToManyField, OneToOneField
+from nailgun.entity_fields import (
+    BooleanField,
+    EmailField,
+    FloatField,
+    IntegerField,
+    ListField,
+    OneToManyField,
+    OneToOneField,
+    StringField,
+)
+from nailgun.json_stream import CHUNK_SIZE, ArrayStream
+from nailgun.query import And, Query, Raw, SearchField
 
 # This module contains very extensive docstrings, so this module is easier to
 # understand than its size suggests. That said, it could be useful to split
@@ -43,6 +58,41 @@ DEFAULT_SERVER_CONFIG = None
 #: :meth:`nailgun.entity_mixins.EntityCreateMixin.create_json`.
 CREATE_MISSING = False
 
+#: Used by :meth:`nailgun.entity_mixins.EntityUpdateMixin.update_payload`.
+#:
+#: If true, ``update()`` sends only the fields changed since the entity was
+#: read when no ``fields`` are named. (See
+#: :meth:`nailgun.entity_mixins.Entity.get_changed_fields`.) By default, every
+#: field with a value is sent.
+UPDATE_CHANGED_FIELDS = False
+
+#: Whether to keep what the server says about how it handled requests. See
+#: :func:`nailgun.client.response_metadata`.
+#:
+#: If true, entities returned by ``create``, ``read`` and ``update`` hold what
+#: was said about the response they were made from, as
+#: :attr:`nailgun.entity_mixins.Entity.response_metadata`, and results of task
+#: waits are returned as :class:`nailgun.entity_mixins.TaskResult` objects.
+RESPONSE_METADATA = False
+
+#: Used by :meth:`nailgun.entity_mixins.EntitySearchMixin.search_filter`.
+#:
+#: The maximum number of entities read at once when filtering search results.
+SEARCH_FILTER_MAX_WORKERS = 8
+
+#: Used by :func:`nailgun.entity_mixins.save`.
+#:
+#: The maximum number of entities updated at once.
+SAVE_MAX_WORKERS = 8
+
+#: The kinds of field whose values
+#: :meth:`nailgun.entity_mixins.EntitySearchMixin.search_filter_query` can
+#: compare server-side.
+_SEARCHABLE_FIELDS = (BooleanField, EmailField, FloatField, IntegerField, StringField)
+
+# The kinds of field that payload builders and normalizers tell apart.
+_PLAIN, _ONE_TO_ONE, _ONE_TO_MANY, _LIST = range(4)
+
 
 def raise_for_status_add_to_exception(response):
     """Add error message from response to exception.
@@ -94,6 +144,189 @@ class TaskFailedError(Exception):
         self.task_id = task_id
 
 
+class TaskResult(dict):
+    """Information about a finished task, and about the response which held it.
+
+    Returned by :func:`_poll_task` if :data:`RESPONSE_METADATA` is true. This
+    is a dict of the task information, with a ``response_metadata`` attribute
+    holding a :data:`nailgun.client.ResponseMetadata` for the last poll.
+    """
+
+    response_metadata = None
+
+
+#: An entity operation, or a task wait, which observers are told about.
+#:
+#: ``name`` is the name of the entity method called, such as ``'create'`` or
+#: ``'sync'``, or ``'poll_task'`` for a task wait. ``entity`` is the entity the method was
+#: called on, or for a task wait the entity of the enclosing operation, if any.
+#: ``task_id`` is the ID of the task waited on, if any, and ``parent`` is the
+#: enclosing operation, if any. See :func:`add_observer`.
+Operation = namedtuple('Operation', ('name', 'entity', 'task_id', 'parent'))
+
+# The entity methods which observers are told about, besides action methods.
+# See `_sends_requests`.
+_OBSERVED_METHODS = ('create', 'read', 'search', 'update', 'delete')
+
+# The names which mark a method of an entity as an action method, such as
+# `Repository.sync`: it sends requests with `nailgun.client`, often through
+# `nailgun.entities._handle_response`.
+_REQUEST_NAMES = frozenset(('client', '_handle_response'))
+
+_observers = ()
+_observers_lock = threading.Lock()
+
+# The entity classes and mixins, whose methods are wrapped by `_observe_class`
+# once the first observer is added, so that importing NailGun does not pay for
+# it. Each maps to whether its action methods are wrapped too.
+_observable_classes = weakref.WeakKeyDictionary()
+_classes_observed = False
+_operations = threading.local()
+
+# The JSON body and metadata of the response last decoded by each thread.
+_responses = threading.local()
+
+
+def add_observer(observer):
+    """Tell ``observer`` about each entity operation and task wait.
+
+    An observer is called as ``observer(operation)`` when an operation starts,
+    where ``operation`` is an :data:`Operation`, and must return a context
+    manager. That context manager is entered before the operation runs, and
+    exited when it finishes, with any exception it raised. The operations
+    observed are calls to ``create``, ``read``, ``search``, ``update`` and
+    ``delete``, calls to action methods which send requests, such as
+    ``Repository.sync`` or ``ContentView.publish``, and task waits by
+    :func:`_poll_task`. Calls made by a method to an override of itself are
+    one operation, and so are calls made by an operation to action methods of
+    the same entity.
+
+    While no observer is added, operations are not tracked at all. The
+    methods of entity classes are wrapped when the first observer is added, so
+    calls through bound methods taken before then are not observed.
+
+    :param observer: A callable, as described above.
+    """
+    global _observers, _classes_observed
+    with _observers_lock:
+        if not _classes_observed:
+            for cls, actions in list(_observable_classes.items()):
+                _observe_class(cls, actions)
+            _classes_observed = True
+        _observers = (*_observers, observer)
+
+
+def remove_observer(observer):
+    """Stop telling ``observer`` about entity operations.
+
+    :param observer: A callable passed to :func:`add_observer`.
+    :raises ValueError: If ``observer`` was not added.
+    """
+    global _observers
+    with _observers_lock:
+        observers = list(_observers)
+        observers.remove(observer)
+        _observers = tuple(observers)
+
+
+def current_operation():
+    """Return the innermost :data:`Operation` running in this thread, or ``None``.
+
+    Operations are only tracked while an observer is added. See
+    :func:`add_observer`.
+    """
+    stack = getattr(_operations, 'stack', None)
+    return stack[-1] if stack else None
+
+
+@contextlib.contextmanager
+def _observing(name, entity, task_id=None):
+    """Track an operation, and tell each observer about it."""
+    parent = current_operation()
+    operation = Operation(name, entity, task_id, parent)
+    stack = _operations.__dict__.setdefault('stack', [])
+    stack.append(operation)
+    try:
+        with contextlib.ExitStack() as observers:
+            for observer in _observers:
+                observers.enter_context(observer(operation))
+            yield operation
+    finally:
+        stack.pop()
+
+
+def _observed(method, action=False):
+    """Wrap an entity method, so that observers are told when it is called.
+
+    :param method: The method to wrap.
+    :param action: Whether ``method`` is an action method. An action method
+        called while an operation on the same entity runs is part of that
+        operation.
+    """
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not _observers:
+            return method(self, *args, **kwargs)
+        current = current_operation()
+        if current is not None and current.entity is self and (action or current.name == name):
+            return method(self, *args, **kwargs)
+        with _observing(name, self):
+            return method(self, *args, **kwargs)
+
+    # Keep the signature of the method for `inspect.getfullargspec`, which does
+    # not follow `__wrapped__`. Classes are only wrapped once an observer is
+    # added, so importing `inspect` here costs nothing at import time.
+    import inspect  # noqa: PLC0415
+
+    wrapper.__signature__ = inspect.signature(method)
+    wrapper.__observed__ = True
+    return wrapper
+
+
+def _observable(cls, actions=False):
+    """Wrap the methods of ``cls`` once an observer is added. See :func:`_observe_class`.
+
+    This is used as a decorator by the entity mixins, whose action methods are
+    not observed.
+    """
+    with _observers_lock:
+        _observable_classes[cls] = actions
+        if _classes_observed:
+            _observe_class(cls, actions)
+    return cls
+
+
+def _observe_class(cls, actions):
+    """Wrap mixin methods and their overrides, so that observers are told of them.
+
+    :param cls: An entity class or mixin.
+    :param actions: Whether to wrap the action methods of ``cls`` too. Action
+        methods are the public methods which send requests, such as
+        ``Repository.sync``. See :func:`add_observer`.
+    """
+    for name, method in list(vars(cls).items()):
+        if not callable(method) or hasattr(method, '__observed__'):
+            continue
+        if name in _OBSERVED_METHODS:
+            setattr(cls, name, _observed(method))
+        elif (
+            actions
+            and name[:1] != '_'
+            and isinstance(method, types.FunctionType)
+            and _sends_requests(method.__code__)
+        ):
+            setattr(cls, name, _observed(method, action=True))
+
+
+def _sends_requests(code):
+    """Tell whether the code of an entity method, or of a function within it, sends requests."""
+    return not _REQUEST_NAMES.isdisjoint(code.co_names) or any(
+        _sends_requests(const) for const in code.co_consts if isinstance(const, types.CodeType)
+    )
+
+
 def _poll_task(task_id, server_config, poll_rate=None, timeout=None, must_succeed=True):
     """Implement :meth:`nailgun.entities.ForemanTask.poll`.
 
@@ -108,6 +341,15 @@ def _poll_task(task_id, server_config, poll_rate=None, timeout=None, must_succee
     :meth:`nailgun.entities.ForemanTask.poll` here allows both that method and
     the mixins in this module to use the same logic.
     """
+    if not _observers:
+        return _wait_for_task(task_id, server_config, poll_rate, timeout, must_succeed)
+    parent = current_operation()
+    with _observing('poll_task', parent and parent.entity, task_id):
+        return _wait_for_task(task_id, server_config, poll_rate, timeout, must_succeed)
+
+
+def _wait_for_task(task_id, server_config, poll_rate, timeout, must_succeed):
+    """Poll a task until it finishes. See :func:`_poll_task`."""
     if poll_rate is None:
         poll_rate = TASK_POLL_RATE
     if timeout is None:
@@ -129,6 +371,9 @@ def _poll_task(task_id, server_config, poll_rate=None, timeout=None, must_succee
             raise_for_status_add_to_exception(response)
             task_info = response.json()
             if task_info['state'] in ('paused', 'stopped'):
+                if RESPONSE_METADATA:
+                    task_info = TaskResult(task_info)
+                    task_info.response_metadata = client.response_metadata(response)
                 break
             time.sleep(poll_rate)
     except KeyboardInterrupt:
@@ -214,25 +459,73 @@ def _payload(fields, values):
         :meth:`nailgun.entity_mixins.Entity.get_values`.
     :returns: A dict mapping field names to field values.
     """
-    for field_name, field in fields.items():
-        if field_name in values:
+    return _get_payload_builder(fields).build(values)
+
+
+class _PayloadBuilder:
+    """Turn entity values in to a payload, for one set of fields.
+
+    A builder works out once which fields are sent as ``<field>_id`` or
+    ``<field>_ids``, and which hold lists that may contain entities, so that
+    building a payload only touches those fields. See :func:`_payload`.
+
+    :param fields: A dict mapping field names to
+        :class:`nailgun.entity_fields.Field` objects.
+    """
+
+    def __init__(self, fields):
+        #: A dict mapping each field name to its kind.
+        self.kinds = {}
+        # (kind, field_name, payload_key) for the fields which need converting,
+        # in the order of the fields.
+        self.conversions = []
+        for field_name, field in fields.items():
             if isinstance(field, OneToOneField):
-                values[f'{field_name}_id'] = getattr(values.pop(field_name), 'id', None)
+                kind, key = _ONE_TO_ONE, f'{field_name}_id'
             elif isinstance(field, OneToManyField):
-                values[f'{field_name}_ids'] = [entity.id for entity in values.pop(field_name)]
+                kind, key = _ONE_TO_MANY, f'{field_name}_ids'
             elif isinstance(field, ListField):
+                kind, key = _LIST, field_name
+            else:
+                kind, key = _PLAIN, field_name
+            self.kinds[field_name] = kind
+            if kind != _PLAIN:
+                self.conversions.append((kind, field_name, key))
+
+    def build(self, values):
+        """Convert ``values`` in place, and return them. See :func:`_payload`."""
+        for kind, field_name, key in self.conversions:
+            if field_name not in values:
+                continue
+            if kind == _ONE_TO_ONE:
+                values[key] = getattr(values.pop(field_name), 'id', None)
+            elif kind == _ONE_TO_MANY:
+                values[key] = [entity.id for entity in values.pop(field_name)]
+            elif values[field_name] is not None:
+                values[key] = [
+                    _payload(obj.get_fields(), obj.get_values()) if isinstance(obj, Entity) else obj
+                    for obj in values[field_name]
+                ]
+        return values
 
-                def parse(obj):
-                    """Parse obj payload if it is an Entity."""
-                    if isinstance(obj, Entity):
-                        return _payload(obj.get_fields(), obj.get_values())
-                    return obj
 
-                if values[field_name] is None:
-                    continue
+#: Compiled :class:`_PayloadBuilder` objects, keyed by fields. See
+#: :func:`_get_payload_builder`.
+_PAYLOAD_BUILDERS = {}
 
-                values[field_name] = [parse(obj) for obj in values[field_name]]
-    return values
+
+def _get_payload_builder(fields):
+    """Return a :class:`_PayloadBuilder` for ``fields``, compiling it once.
+
+    Builders are cached by the names and types of the fields, which are cheap
+    to compare, rather than by entity type, as :func:`_payload` is given only
+    fields.
+    """
+    key = (tuple(fields), tuple(map(type, fields.values())))
+    builder = _PAYLOAD_BUILDERS.get(key)
+    if builder is None:
+        builder = _PAYLOAD_BUILDERS[key] = _PayloadBuilder(fields)
+    return builder
 
 
 def _get_server_config():
@@ -319,6 +612,136 @@ def _get_entity_ids(field_name, attrs):
         )
 
 
+# Stands for a key missing from JSON data.
+_MISSING = object()
+
+#: Compiled :class:`_Normalizer` objects, keyed by entity type and fields. See
+#: :func:`_get_normalizer`.
+_NORMALIZERS = {}
+
+
+class _Normalizer:
+    """Turn JSON data from the server in to values for one kind of entity.
+
+    :meth:`EntityReadMixin.read` and :meth:`EntitySearchMixin.search_normalize`
+    look up every field of every record in the same way. A normalizer works out
+    the kind of each field, and the keys it may be found under, once, so that
+    each record is handled by a tight loop of dict lookups. Data which is not
+    in one of the usual forms is handed to :func:`_get_entity_id` or
+    :func:`_get_entity_ids`, so the results and errors are those of those
+    functions.
+
+    :param fields: A dict mapping field names to
+        :class:`nailgun.entity_fields.Field` objects.
+    """
+
+    def __init__(self, fields):
+        self.steps = []
+        for field_name, field in fields.items():
+            if isinstance(field, OneToOneField):
+                step = (_ONE_TO_ONE, field_name, f'{field_name}_id', None, field.entity)
+            elif isinstance(field, OneToManyField):
+                step = (
+                    _ONE_TO_MANY,
+                    field_name,
+                    f'{field_name}_ids',
+                    pluralize(field_name),
+                    field.entity,
+                )
+            else:
+                step = (_PLAIN, field_name, None, None, None)
+            self.steps.append(step)
+
+    @staticmethod
+    def entity_id(field_name, id_key, attrs):
+        """Return the ID of a one to one relationship, like :func:`_get_entity_id`."""
+        value = attrs.get(field_name, _MISSING)
+        if value is None:
+            return None
+        if type(value) is dict and 'id' in value:
+            return value['id']
+        if value is _MISSING and id_key in attrs:
+            return attrs[id_key]
+        return _get_entity_id(field_name, attrs)
+
+    @staticmethod
+    def entity_ids(field_name, ids_key, plural, attrs):
+        """Return the IDs of a one to many relationship, like :func:`_get_entity_ids`."""
+        if ids_key in attrs:
+            return attrs[ids_key]
+        if field_name in attrs:
+            return [entity['id'] for entity in attrs[field_name]]
+        if plural in attrs:
+            return [entity['id'] for entity in attrs[plural]]
+        return _get_entity_ids(field_name, attrs)
+
+    def search(self, result):
+        """Normalize one search result, as :meth:`EntitySearchMixin.search_normalize` does.
+
+        Fields missing from ``result`` are left out.
+        """
+        attrs = {}
+        for kind, field_name, id_key, plural, _ in self.steps:
+            if kind == _PLAIN:
+                if field_name in result:
+                    attrs[field_name] = result[field_name]
+            elif kind == _ONE_TO_ONE:
+                with contextlib.suppress(MissingValueError):
+                    attrs[field_name] = self.entity_id(field_name, id_key, result)
+            else:
+                with contextlib.suppress(MissingValueError):
+                    attrs[field_name] = self.entity_ids(field_name, id_key, plural, result)
+        return attrs
+
+    def read(self, entity, attrs, ignore, server_config):
+        """Populate ``entity`` from ``attrs``, as :meth:`EntityReadMixin.read` does.
+
+        :raises nailgun.entity_mixins.MissingValueError: If a relationship is
+            missing from ``attrs``.
+        :raises KeyError: If any other field is missing from ``attrs``.
+        """
+        values = {}
+        for kind, field_name, id_key, plural, entity_type in self.steps:
+            if field_name in ignore:
+                continue
+            if kind == _PLAIN:
+                value = attrs[field_name]
+            elif kind == _ONE_TO_ONE:
+                entity_id = self.entity_id(field_name, id_key, attrs)
+                value = (
+                    None
+                    if entity_id is None
+                    else entity_type(server_config=server_config, id=entity_id)
+                )
+            else:
+                value = [
+                    entity_type(server_config=server_config, id=entity_id)
+                    for entity_id in self.entity_ids(field_name, id_key, plural, attrs)
+                ]
+            values[field_name] = value
+        _set_fields(entity, values)
+
+
+def _get_normalizer(entity):
+    """Return a :class:`_Normalizer` for the current fields of ``entity``.
+
+    Normalizers are compiled once, and cached by entity type and fields. The
+    fields are part of the key because some entities add or remove fields per
+    instance, for example depending on the server version.
+    """
+    key = (
+        type(entity),
+        tuple(
+            (field_name, type(field), getattr(field, 'entity', None))
+            for field_name, field in entity._fields.items()
+        ),
+    )
+    normalizer = _NORMALIZERS.get(key)
+    if normalizer is None:
+        normalizer = _NORMALIZERS[key] = _Normalizer(entity._fields)
+    return normalizer
+
+
 # -----------------------------------------------------------------------------
 # Definition of parent Entity class and its dependencies.
 # -----------------------------------------------------------------------------
@@ -403,6 +826,11 @@ class Entity:
         assigned to a field.
     """
 
+    def __init_subclass__(cls, **kwargs):
+        """Make the methods of ``cls`` observable. See :func:`_observe_class`."""
+        super().__init_subclass__(**kwargs)
+        _observable(cls, actions=True)
+
     def __init__(self, server_config=None, **kwargs):
         if server_config is None:
             server_config = _get_server_config()
@@ -427,16 +855,15 @@ class Entity:
         # Iterate through the values passed in and assign them as instance
         # variable to `self`. Make sure to transform entity IDs into entity
         # objects. (This feature is described in the docstring.)
+        values = {}
         for field_name, field_value in kwargs.items():  # e.g. ('admin', True)
             field = self._fields[field_name]  # e.g. A BooleanField object
             if isinstance(field, OneToOneField):
                 if field_value is None:
-                    setattr(self, field_name, field_value)
+                    values[field_name] = field_value
                 else:
-                    setattr(
-                        self,
-                        field_name,
-                        _make_entity_from_id(field.gen_value(), field_value, self._server_config),
+                    values[field_name] = _make_entity_from_id(
+                        field.gen_value(), field_value, self._server_config
                     )
             elif isinstance(field, OneToManyField):
                 # `try:; …; except TypeError:; raise BadValueError(…)` better
@@ -449,13 +876,12 @@ class Entity:
                         'field. An iterable of entities and/or entity IDs '
                         f'should be assigned, but the following was given: {field_value}'
                     )
-                setattr(
-                    self,
-                    field_name,
-                    _make_entities_from_ids(field.gen_value(), field_value, self._server_config),
+                values[field_name] = _make_entities_from_ids(
+                    field.gen_value(), field_value, self._server_config
                 )
             else:
-                setattr(self, field_name, field_value)
+                values[field_name] = field_value
+        _set_fields(self, values)
 
     def path(self, which=None):
         """Return the path to the current entity.
@@ -518,6 +944,54 @@ class Entity:
         """
         return self._fields.copy()
 
+    def __setattr__(self, name, value):
+        """Set an attribute, recording that it changed if it is a field.
+
+        See :meth:`get_changed_fields`.
+        """
+        object.__setattr__(self, name, value)
+        # This is called for every attribute of every entity, so it is kept
+        # cheap. Field names never start with an underscore. Changes are only
+        # recorded once an entity has been read, as every field of an entity
+        # which has not been read counts as changed.
+        if name[:1] != '_':
+            attrs = self.__dict__
+            if name in attrs.get('_fields', ()):
+                changed_fields = attrs.get('_changed_fields')
+                if changed_fields is not None:
+                    changed_fields.add(name)
+
+    @property
+    def response_metadata(self):
+        """What the server said about the response this entity was made from.
+
+        A :data:`nailgun.client.ResponseMetadata`, if
+        :data:`nailgun.entity_mixins.RESPONSE_METADATA` was true when this
+        entity was returned by ``create``, ``read`` or ``update``. Otherwise,
+        ``None``.
+        """
+        return self.__dict__.get('_response_metadata')
+
+    def get_changed_fields(self):
+        """Return the names of the fields assigned to since the entity was read.
+
+        Fields are recorded as they are assigned to, and forgotten when the
+        entity is returned by :meth:`EntityReadMixin.read` (and so by
+        ``create()`` and ``update()``), or when it is updated on the server by
+        :meth:`EntityUpdateMixin.update_json`. For an entity which has not
+        been read, every field given a value is changed.
+
+        Changes made in place, such as appending to a list held by a field, are
+        not seen. Assign the field again to record them.
+
+        :return: A set of field names.
+        """
+        attrs = vars(self)
+        changed_fields = attrs.get('_changed_fields')
+        if changed_fields is None:
+            changed_fields = self._fields
+        return {name for name in changed_fields if name in attrs}
+
     def get_values(self):
         """Return a copy of field values on the current object.
 
@@ -535,6 +1009,8 @@ class Entity:
             attrs.pop('_updatable_fields')
         if '_path_fields' in attrs:
             attrs.pop('_path_fields')
+        attrs.pop('_changed_fields', None)
+        attrs.pop('_response_metadata', None)
         return attrs
 
     def __repr__(self):
@@ -615,7 +1091,12 @@ class Entity:
         return self.to_json_dict() == other.to_json_dict()
 
     def __hash__(self):
-        """Return hash based on entity type and id if available."""
+        """Return hash based on entity type and id if available.
+
+        The hash of an entity without an id does not depend on its fields, so
+        that it does not change when they do. To drop entities with equal
+        fields from a collection, use :func:`nailgun.entity_mixins.distinct`.
+        """
         if getattr(self, 'id', None) is not None:
             return hash((type(self), self.id))
         return hash(type(self))
@@ -671,6 +1152,7 @@ class Entity:
         return entity
 
 
+@_observable
 class EntityDeleteMixin:
     """Provide the ability to delete an entity.
 
@@ -735,6 +1217,7 @@ class EntityDeleteMixin:
         return response.json()
 
 
+@_observable
 class EntityReadMixin:
     """Provide the ability to read an entity.
 
@@ -754,9 +1237,21 @@ class EntityReadMixin:
         created entity and populate its fields with data returned from the
         server.
 
+    Whatever :meth:`read` returns has no changed fields. (See
+    :meth:`nailgun.entity_mixins.Entity.get_changed_fields`.) This holds for
+    overrides of :meth:`read` too, which are wrapped so that values they assign
+    after calling ``super().read()`` are not recorded as changes.
+
     See the individual methods for more detailed information.
     """
 
+    def __init_subclass__(cls, **kwargs):
+        """Wrap any override of :meth:`read`, as described above."""
+        super().__init_subclass__(**kwargs)
+        read = vars(cls).get('read')
+        if read is not None and not hasattr(read, '__forgets_changes__'):
+            cls.read = _forgetting_changes(read)
+
     def read_raw(self, params=None):
         """Get information about the current entity.
 
@@ -785,7 +1280,7 @@ class EntityReadMixin:
         """
         response = self.read_raw(params=params)
         raise_for_status_add_to_exception(response)
-        return response.json()
+        return _decode_response(response)
 
     def read(self, entity=None, attrs=None, ignore=None, params=None):
         """Get information about the current entity.
@@ -844,30 +1339,14 @@ class EntityReadMixin:
         if ignore is None:
             ignore = set()
 
-        for field_name, field in entity.get_fields().items():
-            if field_name in ignore:
-                continue
-            if isinstance(field, OneToOneField):
-                entity_id = _get_entity_id(field_name, attrs)
-                if entity_id is None:
-                    referenced_entity = None
-                else:
-                    referenced_entity = field.entity(
-                        server_config=self._server_config,
-                        id=entity_id,
-                    )
-                setattr(entity, field_name, referenced_entity)
-            elif isinstance(field, OneToManyField):
-                referenced_entities = [
-                    field.entity(server_config=self._server_config, id=entity_id)
-                    for entity_id in _get_entity_ids(field_name, attrs)
-                ]
-                setattr(entity, field_name, referenced_entities)
-            else:
-                setattr(entity, field_name, attrs[field_name])
+        _get_normalizer(entity).read(entity, attrs, ignore, self._server_config)
+        _forget_changes(entity)
+        if RESPONSE_METADATA:
+            entity._response_metadata = _recall_response_metadata(attrs)
         return entity
 
 
+@_observable
 class EntityCreateMixin:
     """Provide the ability to create an entity.
 
@@ -973,7 +1452,7 @@ class EntityCreateMixin:
         response = self.create_raw(create_missing)
         raise_for_status_add_to_exception(response)
 
-        return response.json()
+        return _decode_response(response)
 
     def create(self, create_missing=None):
         """Create an entity.
@@ -1004,6 +1483,7 @@ class EntityCreateMixin:
         return self.read(attrs=self.create_json(create_missing))
 
 
+@_observable
 class EntityUpdateMixin:
     """Provide the ability to update an entity.
 
@@ -1032,16 +1512,22 @@ class EntityUpdateMixin:
     def update_payload(self, fields=None):
         """Create a payload of values that can be sent to the server.
 
-        By default, this method behaves just like :func:`_payload`. However,
-        one can also specify a certain set of fields that should be returned.
-        For more information, see :meth:`update`.
+        By default, this method behaves just like :func:`_payload`. If
+        :data:`nailgun.entity_mixins.UPDATE_CHANGED_FIELDS` is true, only the
+        fields which have changed since the entity was read are included. One
+        can also specify a certain set of fields that should be returned. For
+        more information, see :meth:`update`.
 
         """
         values = self.get_values()
-        _updatable_fields = getattr(self, '_updatable_fields', None) or list(values.keys())
-        values = {field: value for field, value in values.items() if field in _updatable_fields}
+        _updatable_fields = getattr(self, '_updatable_fields', None)
+        if _updatable_fields:
+            values = {field: values[field] for field in _updatable_fields if field in values}
         if fields is not None:
             values = {field: values[field] for field in fields}
+        elif UPDATE_CHANGED_FIELDS:
+            changed_fields = self.get_changed_fields()
+            values = {field: value for field, value in values.items() if field in changed_fields}
         return _payload(self.get_fields(), values)
 
     def update_raw(self, fields=None):
@@ -1077,7 +1563,8 @@ class EntityUpdateMixin:
         """
         response = self.update_raw(fields)
         raise_for_status_add_to_exception(response)
-        return response.json()
+        _forget_changes(self, fields)
+        return _decode_response(response)
 
     def update(self, fields=None):
         """Update the current entity.
@@ -1094,7 +1581,11 @@ class EntityUpdateMixin:
         :param fields: An iterable of field names. Only the fields named in
             this iterable will be updated. No fields are updated if an empty
             iterable is passed in. All fields are updated if ``None`` is passed
-            in.
+            in, unless :data:`nailgun.entity_mixins.UPDATE_CHANGED_FIELDS` is
+            true. Then only the fields changed since the entity was read are
+            updated, as returned by
+            :meth:`nailgun.entity_mixins.Entity.get_changed_fields`. For an
+            entity which has not been read, that is every field with a value.
         :raises: ``KeyError`` if asked to update a field but no value is
             available for that field on the current entity.
 
@@ -1102,6 +1593,7 @@ class EntityUpdateMixin:
         return self.read(attrs=self.update_json(fields))
 
 
+@_observable
 class EntitySearchMixin:
     """Provide the ability to search for entities.
 
@@ -1112,6 +1604,7 @@ class EntitySearchMixin:
         ├── search_json
         │   └── search_raw
         │       └── search_payload
+        │   └── search_filter_query
         ├── search_normalize
         └── search_filter
 
@@ -1123,6 +1616,8 @@ class EntitySearchMixin:
         Make an HTTP GET request to the server, including the payload.
     :meth:`search_json`
         Check the server's response for errors and decode the response.
+    :meth:`search_filter_query`
+        Let the server apply as many of the local filters as it can.
     :meth:`search_normalize`
         Normalize search results so they can be used to create new entities.
     :meth:`search`
@@ -1131,6 +1626,13 @@ class EntitySearchMixin:
     :meth:`search_filter`
         Read all ``entities`` and locally filter them.
 
+    :meth:`scan` calls :meth:`search` repeatedly to fetch every matching entity,
+    a page at a time, without the cost of deep page offsets. :meth:`count` and
+    :meth:`exists` call :meth:`search_json` for a single result, and build no
+    entities at all. :meth:`search_rows` is like :meth:`search`, but returns
+    lightweight, read-only rows instead of entities. :meth:`search_stream` is
+    like :meth:`search`, but reads the response a search result at a time.
+
     See the individual methods for more detailed information.
     """
 
@@ -1190,8 +1692,11 @@ class EntitySearchMixin:
             against what this method produces.
 
         :param fields: See :meth:`search`.
-        :param query: See :meth:`search`.
+        :param query: See :meth:`search`. If its ``search`` parameter is a
+            :class:`nailgun.query.Query`, it is compiled.
         :returns: A dict that can be encoded as JSON and used in a search.
+        :raises nailgun.query.InvalidQueryError: If ``query`` holds a
+            :class:`nailgun.query.Query` which does not fit this entity.
 
         """
         if fields is None:
@@ -1201,18 +1706,22 @@ class EntitySearchMixin:
 
         payload = {}
         fields_dict = self.get_fields()
+        kinds = _get_payload_builder(fields_dict).kinds
         for field in fields:
             value = getattr(self, field)
-            if isinstance(fields_dict[field], OneToOneField):
+            kind = kinds[field]
+            if kind == _ONE_TO_ONE:
                 payload[f'{field}_id'] = value.id
-            elif isinstance(fields_dict[field], OneToManyField):
+            elif kind == _ONE_TO_MANY:
                 payload[f'{field}_ids'] = [entity.id for entity in value]
             else:
                 payload[field] = value
         payload.update(query)
+        if isinstance(payload.get('search'), Query):
+            payload['search'] = payload['search'].compile(fields_dict)
         return payload
 
-    def search_raw(self, fields=None, query=None):
+    def search_raw(self, fields=None, query=None, response_mode=None):
         """Search for entities.
 
         Make an HTTP GET call to ``self.path('base')``. Return the response.
@@ -1224,14 +1733,15 @@ class EntitySearchMixin:
 
         :param fields: See :meth:`search`.
         :param query: See :meth:`search`.
+        :param response_mode: One of :data:`nailgun.client.RESPONSE_MODES`, or
+            ``None``. Pass ``'stream'`` to read the response body in chunks.
         :return: A ``requests.response`` object.
 
         """
-        return client.get(
-            self.path('base'),
-            data=self.search_payload(fields, query),
-            **self._server_config.get_client_kwargs(),
-        )
+        kwargs = self._server_config.get_client_kwargs()
+        if response_mode is not None:
+            kwargs['response_mode'] = response_mode
+        return client.get(self.path('base'), data=self.search_payload(fields, query), **kwargs)
 
     def search_json(self, fields=None, query=None):
         """Search for entities.
@@ -1288,35 +1798,18 @@ class EntitySearchMixin:
             can be used to instantiate entities.
 
         """
-        fields = self.get_fields()
-        normalized = []
-        for result in results:
-            # For each field that we know about, copy the corresponding field
-            # from the server's search result. If any extra attributes are
-            # copied over, Entity.__init__ will raise a NoSuchFieldError.
-            # Examples of problematic results from server:
-            #
-            # * organization_id (denormalized OneToOne. see above)
-            # * organizations, organization_ids (denormalized OneToMany. above)
-            # * updated_at, created_at (these may be handled in the future)
-            # * sp_subnet (Host.sp_subnet is an undocumented field)
-            #
-            attrs = {}
-            for field_name, field in fields.items():
-                if isinstance(field, OneToOneField):
-                    with contextlib.suppress(MissingValueError):
-                        attrs[field_name] = _get_entity_id(field_name, result)
-
-                elif isinstance(field, OneToManyField):
-                    with contextlib.suppress(MissingValueError):
-                        attrs[field_name] = _get_entity_ids(field_name, result)
-
-                else:
-                    with contextlib.suppress(KeyError):
-                        attrs[field_name] = result[field_name]
-
-            normalized.append(attrs)
-        return normalized
+        # For each field that we know about, copy the corresponding field from
+        # the server's search result. If any extra attributes are copied over,
+        # Entity.__init__ will raise a NoSuchFieldError. Examples of
+        # problematic results from server:
+        #
+        # * organization_id (denormalized OneToOne. see above)
+        # * organizations, organization_ids (denormalized OneToMany. above)
+        # * updated_at, created_at (these may be handled in the future)
+        # * sp_subnet (Host.sp_subnet is an undocumented field)
+        #
+        normalize = _get_normalizer(self).search
+        return [normalize(result) for result in results]
 
     def search(self, fields=None, query=None, filters=None, path_fields={}):
         """Search for entities.
@@ -1346,6 +1839,12 @@ class EntitySearchMixin:
 
             LifecycleEnvironment().search(query={'search': 'name="foo"'})
 
+        The ``search`` parameter may also be a :class:`nailgun.query.Query`,
+        which is checked against this entity's fields before it is sent::
+
+            from nailgun.query import SearchField as F
+            LifecycleEnvironment().search(query={'search': F('name') == 'foo'})
+
         The example above is rather pointless: it is easier and more concise to
         use a generated query. But — and this is a **very** important "but" —
         the manual search query is melded in to the generated query. This can
@@ -1365,11 +1864,13 @@ class EntitySearchMixin:
 
             LifecycleEnvironment().search(filters={'name': 'foo'})
 
-        Be warned that filtering locally can be **very** slow. NailGun must
-        ``read()`` every single entity returned by the server before filtering
-        results. This is because the values used in the filtering process may
-        not have been returned by the server in the initial response to the
-        search.
+        Be warned that filtering locally can be slow. NailGun must ``read()``
+        every entity returned by the server before filtering results. This is
+        because the values used in the filtering process may not have been
+        returned by the server in the initial response to the search. To keep
+        the number of reads down, filters are also added to the server-side
+        search query where possible (see :meth:`search_filter_query`), and
+        entities are read concurrently.
 
         The fact that all entities are read when ``filters`` is specified can
         be used to great effect. For example, this search returns a fully
@@ -1397,22 +1898,316 @@ class EntitySearchMixin:
         #   names, misnamed attributes (e.g. BZ 1233245) and weirdly named
         #   fields (e.g. Media.path_).
         #
-        results = self.search_json(fields, query)['results']
+        results = self._search_json(fields, query, filters)['results']
         results = self.search_normalize(results)
-        entities = []
-        for result in results:
-            try:
-                entity = type(self)(server_config=self._server_config, **path_fields, **result)
-            except TypeError:
-                # FIXME Why?
-                # in the event that an entity's init is overwritten
-                # with a positional server_config
-                entity = type(self)(**path_fields, **result)
-            entities.append(entity)
+        entities = [self._search_entity(result, path_fields) for result in results]
         if filters is not None:
             entities = self.search_filter(entities, filters)
         return entities
 
+    def _search_entity(self, result, path_fields):
+        """Build an entity from a normalized search result, as :meth:`search` does."""
+        try:
+            return type(self)(server_config=self._server_config, **path_fields, **result)
+        except TypeError:
+            # FIXME Why?
+            # in the event that an entity's init is overwritten
+            # with a positional server_config
+            return type(self)(**path_fields, **result)
+
+    def search_stream(self, fields=None, query=None, path_fields={}):
+        """Search for entities, building each one as its search result arrives.
+
+        :meth:`search` decodes the whole response before building any
+        entities, so a search returning a large page, such as::
+
+            Package().search(query={'per_page': 5000})
+
+        must hold the whole page in memory at once, first as text, then as
+        decoded JSON, and then as entities. This method streams the response
+        instead. Search results are decoded one at a time by
+        :class:`nailgun.json_stream.ArrayStream`, and each one is normalized by
+        :meth:`search_normalize` and turned in to an entity before the next is
+        read::
+
+            for package in Package().search_stream(query={'per_page': 5000}):
+                print(package.name)
+
+        Only :meth:`search_raw` and :meth:`search_normalize` are used, so
+        entities which override :meth:`search` to alter search results may
+        build different entities here.
+
+        :param fields: See :meth:`search`.
+        :param query: See :meth:`search`.
+        :param path_fields: See :meth:`search`.
+        :returns: A generator of entities, all of type ``type(self)``.
+        :raises: ``requests.exceptions.HTTPError`` if the response has an HTTP
+            4XX or 5XX status code.
+        :raises: ``ValueError`` If the response JSON can not be decoded.
+        """
+        response = self.search_raw(fields, query, response_mode='stream')
+        with contextlib.closing(response):
+            raise_for_status_add_to_exception(response)
+            for item in ArrayStream(response.iter_content(CHUNK_SIZE)):
+                (result,) = self.search_normalize([item])
+                yield self._search_entity(result, path_fields)
+
+    def search_rows(self, fields=None, query=None, columns=None):
+        """Search for entities, and return rows instead of entities.
+
+        Building an entity for each search result is costly when there are many
+        results, as each related entity is built too. This method returns
+        read-only :class:`SearchRow` objects instead. Rows are named tuples,
+        holding only the named ``columns``::
+
+            >>> rows = Package().search_rows(columns=('id', 'name'))
+            >>> rows[0]
+            PackageRow(id=1, name='kernel')
+            >>> rows[0].name
+            'kernel'
+
+        Search results are normalized just as they are for :meth:`search`.
+        Relation fields hold IDs rather than entities: an ID for a
+        :class:`nailgun.entity_fields.OneToOneField`, and a list of IDs for a
+        :class:`nailgun.entity_fields.OneToManyField`. Values missing from a
+        search result are ``None``. Call :meth:`SearchRow.to_entity` to turn a
+        row in to an entity.
+
+        :param fields: See :meth:`search`.
+        :param query: See :meth:`search`.
+        :param columns: An iterable naming the fields each row holds. If
+            ``None``, all of this entity's fields are held.
+        :returns: A list of :class:`SearchRow` objects.
+        :raises nailgun.entity_mixins.NoSuchFieldError: If any of ``columns``
+            is not a field of this entity.
+        """
+        entity_fields = self.get_fields()
+        columns = tuple(entity_fields if columns is None else columns)
+        if not set(columns).issubset(entity_fields):
+            raise NoSuchFieldError(
+                f'Valid columns are {entity_fields.keys()}, but received {columns} instead.'
+            )
+        row_type = SearchRow.make_type(type(self), self._server_config, columns)
+        results = self.search_normalize(self.search_json(fields, query)['results'])
+        relations = [
+            column
+            for column in columns
+            if isinstance(entity_fields[column], OneToOneField | OneToManyField)
+        ]
+        if relations:
+            for result in results:
+                for column in relations:
+                    if column in result:
+                        result[column] = _related_ids_list(result[column])
+        return [row_type._make(map(result.get, columns)) for result in results]
+
+    def scan(self, fields=None, query=None, page_size=1000, workers=1):
+        """Search for every matching entity, a page at a time.
+
+        Paging through a large table with the ``page`` parameter gets slower as
+        the page number grows, because the server must skip every earlier row.
+        This method orders results by ID and asks for each next page with
+        ``id > <last ID seen>`` instead, so every page costs the same::
+
+            for package in Package().scan(query={'search': 'name ~ kernel'}):
+                print(package.id)
+
+        If ``workers`` is greater than one, the lowest and highest matching
+        IDs are fetched, the IDs in between are split in to that many ranges,
+        and the next page of each range is fetched concurrently. Entities are
+        then yielded in order of ID within each range, but not overall.
+
+        Each page is fetched with :meth:`search`, so entities are built just as
+        they are for a search. A range is scanned until a page comes back
+        empty, as the server may cap the number of entities per page below
+        ``page_size``.
+
+        :param fields: See :meth:`search`.
+        :param query: See :meth:`search`. Any ``page``, ``per_page`` and
+            ``order`` parameters are replaced.
+        :param page_size: The number of entities fetched per request.
+        :param workers: The number of ID ranges scanned concurrently.
+        :returns: A generator of entities, all of type ``type(self)``.
+        """
+        query = dict(query or {})
+        for name in ('page', 'per_page', 'order'):
+            query.pop(name, None)
+        search = query.pop('search', None)
+        if isinstance(search, str):
+            search = Raw(search)
+        cursors = (
+            self._scan_ranges(fields, query, search, workers) if workers > 1 else [(None, None)]
+        )
+
+        def fetch(cursor):
+            return self._scan_page(fields, query, search, page_size, cursor)
+
+        from concurrent.futures import ThreadPoolExecutor  # noqa: PLC0415
+
+        with ThreadPoolExecutor(max_workers=max(len(cursors), 1)) as executor:
+            while cursors:
+                pages = (
+                    list(executor.map(fetch, cursors)) if len(cursors) > 1 else [fetch(cursors[0])]
+                )
+                next_cursors = []
+                for (_, upto), page in zip(cursors, pages, strict=True):
+                    yield from page
+                    # The server may return fewer entities per page than asked
+                    # for, so only an empty page ends a range.
+                    if page:
+                        next_cursors.append((page[-1].id, upto))
+                cursors = next_cursors
+
+    def _scan_page(self, fields, query, search, page_size, cursor):
+        """Fetch the first page of entities in an ID range, as :meth:`scan` does.
+
+        :param cursor: An ``(after, upto)`` tuple. Only entities with an ID
+            greater than ``after`` and at most ``upto`` are fetched. Either
+            bound may be ``None``.
+        """
+        after, upto = cursor
+        conditions = [] if search is None else [search]
+        if after is not None:
+            conditions.append(SearchField('id') > after)
+        if upto is not None:
+            conditions.append(SearchField('id') <= upto)
+        page_query = {**query, 'order': 'id ASC', 'per_page': page_size}
+        if conditions:
+            page_query['search'] = And(*conditions)
+        return self.search(fields, page_query)
+
+    def _scan_ranges(self, fields, query, search, workers):
+        """Split the IDs of the entities :meth:`scan` finds in to ranges.
+
+        :returns: A list of up to ``workers`` cursors, as accepted by
+            :meth:`_scan_page`. It is empty if no entities match.
+        """
+        bounds = []
+        for order in ('id ASC', 'id DESC'):
+            bounds_query = {**query, 'order': order, 'per_page': 1}
+            if search is not None:
+                bounds_query['search'] = search
+            results = self.search_json(fields, bounds_query)['results']
+            if not results:
+                return []
+            bounds.append(results[0]['id'])
+        low, high = bounds
+        step = -(-(high - low + 1) // workers)
+        starts = range(low - 1, high, step)
+        # The last range is left open, so that entities created since are found.
+        return [(start, start + step) for start in starts[:-1]] + [(starts[-1], None)]
+
+    def count(self, fields=None, query=None):
+        """Count the entities matching a search.
+
+        Only one result is asked for, and it is discarded. The count comes from
+        the ``subtotal`` the server reports. No entities are built::
+
+            Host(organization=org).count({'organization'})
+
+        :param fields: See :meth:`search`.
+        :param query: See :meth:`search`. Any ``page`` and ``per_page``
+            parameters are replaced.
+        :returns: The number of matching entities.
+        :raises: ``requests.exceptions.HTTPError`` if the response has an HTTP
+            4XX or 5XX status code.
+        """
+        query = {**(query or {}), 'page': 1, 'per_page': 1}
+        response = self.search_json(fields, query)
+        if 'subtotal' in response:
+            return response['subtotal']
+        return response.get('total', len(response['results']))
+
+    def exists(self, fields=None, query=None):
+        """Tell whether any entity matches a search, or whether this entity exists.
+
+        If this entity has an ID and neither ``fields`` nor ``query`` is given,
+        an HTTP HEAD request is made for the entity itself. Should the server
+        not allow HEAD requests, a GET request is made instead. Otherwise, this
+        method is like :meth:`count`.
+
+        :param fields: See :meth:`search`.
+        :param query: See :meth:`search`.
+        :returns: ``True`` or ``False``.
+        :raises: ``requests.exceptions.HTTPError`` if the response has an HTTP
+            4XX or 5XX status code other than 404 (not found).
+        """
+        if fields is None and query is None and getattr(self, 'id', None) is not None:
+            kwargs = self._server_config.get_client_kwargs()
+            response = client.head(self.path('self'), **kwargs)
+            if response.status_code == http_client.METHOD_NOT_ALLOWED:
+                response = client.get(self.path('self'), response_mode='stream', **kwargs)
+                response.close()
+            if response.status_code == http_client.NOT_FOUND:
+                return False
+            raise_for_status_add_to_exception(response)
+            return True
+        return self.count(fields, query) > 0
+
+    def search_filter_query(self, query=None, filters=None):
+        """Add local filters to the ``search`` parameter of a search query.
+
+        Filters on the fields named in ``self._meta['search_fields']`` are
+        turned in to a Foreman scoped search and added to ``query``. Only the
+        fields whose scoped search key is known to mean the same on the server
+        are named there, and only simple values, such as strings, integers and
+        booleans, are compared. For example::
+
+            >>> entity.search_filter_query({'per_page': 50}, {'name': 'foo'})
+            {'per_page': 50, 'search': 'name = "foo"'}
+
+        If ``query`` already has a ``search`` parameter, both searches must
+        match. The server is then left to return fewer results, but filters
+        are still applied locally by :meth:`search_filter`.
+
+        :param query: A dict, as accepted by :meth:`search`.
+        :param filters: A dict, as accepted by :meth:`search_filter`.
+        :returns: A new query, or ``query`` itself if none of the filters can
+            be applied server-side.
+        """
+        if not isinstance(filters, dict) or not isinstance(query, dict | None):
+            return query
+        fields = self.get_fields()
+        search_fields = self._meta.get('search_fields', ())
+        conditions = [
+            SearchField(field_name) == field_value
+            for field_name, field_value in filters.items()
+            if field_name in search_fields
+            and isinstance(fields.get(field_name), _SEARCHABLE_FIELDS)
+            and isinstance(field_value, bool | int | float | str)
+        ]
+        if not conditions:
+            return query
+        query = dict(query or {})
+        search = query.get('search')
+        if isinstance(search, Query):
+            search = search.compile(fields)
+        if search:
+            conditions.insert(0, Raw(search))
+        # The filters are not checked here, as search_filter checks them.
+        query['search'] = And(*conditions).compile()
+        return query
+
+    def _search_json(self, fields, query, filters):
+        """Call :meth:`search_json`, letting the server apply ``filters`` if it can.
+
+        If the server rejects the search built by :meth:`search_filter_query`,
+        perhaps because some field cannot be searched on, the original query
+        is sent instead.
+        """
+        filtered_query = self.search_filter_query(query, filters)
+        if filtered_query is query:
+            return self.search_json(fields, query)
+        try:
+            return self.search_json(fields, filtered_query)
+        except HTTPError as err:
+            if err.response is None or err.response.status_code not in (
+                http_client.BAD_REQUEST,
+                http_client.UNPROCESSABLE_ENTITY,
+            ):
+                raise
+        return self.search_json(fields, query)
+
     @staticmethod
     def search_filter(entities, filters):
         """Read all ``entities`` and locally filter them.
@@ -1425,6 +2220,13 @@ class EntitySearchMixin:
         true are returned. An arbitrary number of field names and values may be
         provided as filters.
 
+        Filters on a :class:`nailgun.entity_fields.OneToOneField` or
+        :class:`nailgun.entity_fields.OneToManyField` compare IDs, and accept
+        entities or IDs as values. Such filters are applied before reading,
+        where the search results already name the related entities, so that
+        entities which cannot match are not read at all. Up to
+        :data:`SEARCH_FILTER_MAX_WORKERS` entities are read at once.
+
         .. NOTE:: This method calls :meth:`EntityReadMixin.read`. As a result,
             this method only works when called on a class that also inherits
             from :class:`EntityReadMixin`.
@@ -1434,9 +2236,6 @@ class EntitySearchMixin:
         :param filters: A dict in the form ``{field_name: field_value, …}``.
         :raises nailgun.entity_mixins.NoSuchFieldError: If any of the fields
             named in ``filters`` do not exist on the entities being filtered.
-        :raises: ``NotImplementedError`` If any of the fields named in
-            ``filters`` are a :class:`nailgun.entity_fields.OneToOneField` or
-            :class:`nailgun.entity_fields.OneToManyField`.
 
         """
         # Check to make sure all arguments are sane.
@@ -1447,21 +2246,305 @@ class EntitySearchMixin:
             raise NoSuchFieldError(
                 f'Valid filters are {fields.keys()}, but received {filters.keys()} instead.'
             )
-        for field_name in filters:
-            if isinstance(fields[field_name], OneToOneField | OneToManyField):
-                raise NotImplementedError(
-                    'Search results cannot (yet?) be locally filtered by '
-                    f'`OneToOneField`s and `OneToManyField`s. '
-                    f'{field_name} is a {type(fields[field_name]).__name__}.'
-                )
-
-        # The arguments are sane. Filter away!
-        filtered = [entity.read() for entity in entities]  # don't alter inputs
+        relations = {
+            field_name: _related_ids(field_value)
+            for field_name, field_value in filters.items()
+            if isinstance(fields[field_name], OneToOneField | OneToManyField)
+        }
+
+        # The arguments are sane. Skip entities which cannot match, then read
+        # the rest and filter away!
+        candidates = [
+            entity
+            for entity in entities
+            if all(
+                not hasattr(entity, field_name)
+                or _related_ids(getattr(entity, field_name)) == related_ids
+                for field_name, related_ids in relations.items()
+            )
+        ]
+        filtered = _read_all(candidates)  # don't alter inputs
         for field_name, field_value in filters.items():
-            filtered = [entity for entity in filtered if getattr(entity, field_name) == field_value]
+            if field_name in relations:
+                filtered = [
+                    entity
+                    for entity in filtered
+                    if _related_ids(getattr(entity, field_name, None)) == relations[field_name]
+                ]
+            else:
+                filtered = [
+                    entity for entity in filtered if getattr(entity, field_name) == field_value
+                ]
         return filtered
 
 
+def _related_ids(value):
+    """Return the IDs named by the value of a relation field, or by a filter on one.
+
+    ``value`` may be an entity, an ID, ``None``, or a list of entities or IDs.
+    A list is turned in to a set, so that the order of its items does not
+    matter.
+    """
+    if isinstance(value, list | tuple | set):
+        return {_related_ids(item) for item in value}
+    return value.id if isinstance(value, Entity) else value
+
+
+def _read_all(entities):
+    """Read each of ``entities``, several at a time, and return a list of the results."""
+    if len(entities) <= 1:
+        return [entity.read() for entity in entities]
+    from concurrent.futures import ThreadPoolExecutor  # noqa: PLC0415
+
+    with ThreadPoolExecutor(max_workers=min(SEARCH_FILTER_MAX_WORKERS, len(entities))) as executor:
+        return list(executor.map(lambda entity: entity.read(), entities))
+
+
+def _related_ids_list(value):
+    """Return the IDs named by the value of a relation field, as a row holds them.
+
+    Like :func:`_related_ids`, but lists of IDs keep their order.
+    """
+    if isinstance(value, list | tuple):
+        return [_related_ids(item) for item in value]
+    return _related_ids(value)
+
+
+class SearchRow:
+    """A read-only search result, as returned by :meth:`EntitySearchMixin.search_rows`.
+
+    Each row type is a named tuple which also inherits from this class, so rows
+    may be checked with ``isinstance(row, SearchRow)``.
+    """
+
+    __slots__ = ()
+
+    #: The type of entity the row was found as.
+    entity_type = None
+
+    #: The :class:`nailgun.config.ServerConfig` the row was found on.
+    server_config = None
+
+    #: The names of the fields the row holds. A field whose name is not a valid
+    #: attribute name, such as ``hidden_value?``, is held by a tuple field named
+    #: after its position, such as ``_3``.
+    columns = ()
+
+    @classmethod
+    def make_type(cls, entity_type, server_config, columns):
+        """Return a row type holding ``columns`` of an ``entity_type``.
+
+        :param entity_type: A subclass of :class:`Entity`.
+        :param server_config: A :class:`nailgun.config.ServerConfig`.
+        :param columns: A tuple of field names.
+        :returns: A subclass of this class and of a named tuple.
+        """
+        name = f'{entity_type.__name__}Row'
+        return type(
+            name,
+            (cls, namedtuple(name, columns, rename=True)),
+            {
+                '__slots__': (),
+                'columns': columns,
+                'entity_type': entity_type,
+                'server_config': server_config,
+            },
+        )
+
+    def to_entity(self):
+        """Return an entity holding the values of this row.
+
+        Columns holding ``None`` are left unset. No request is made, so the
+        entity holds no more than the row does. Call ``read()`` on it to fetch
+        the rest of its values.
+
+        :returns: An instance of :attr:`entity_type`.
+        """
+        values = {
+            name: value for name, value in zip(self.columns, self, strict=True) if value is not None
+        }
+        try:
+            return self.entity_type(server_config=self.server_config, **values)
+        except TypeError:
+            # in the event that an entity's init is overwritten
+            # with a positional server_config
+            return self.entity_type(**values)
+
+
+def _decode_response(response):
+    """Decode the JSON body of ``response``.
+
+    If :data:`RESPONSE_METADATA` is true, what the response says about how the
+    server handled the request is remembered too, until
+    :func:`_recall_response_metadata` is called in this thread.
+    """
+    decoded = response.json()
+    if RESPONSE_METADATA:
+        _responses.last = (decoded, client.response_metadata(response))
+    return decoded
+
+
+def _recall_response_metadata(decoded):
+    """Return the metadata of the response ``decoded`` came from, if remembered.
+
+    See :func:`_decode_response`. Whatever was remembered is forgotten.
+    """
+    last = _responses.__dict__.pop('last', None)
+    if last is None or last[0] is not decoded:
+        return None
+    return last[1]
+
+
+def _forget_changes(entity, fields=None):
+    """Forget that ``fields`` of ``entity`` changed, or all of them if ``None``.
+
+    From then on, fields assigned to are recorded as changed.
+    """
+    if fields is None:
+        entity.__dict__['_changed_fields'] = set()
+    else:
+        entity.__dict__['_changed_fields'] = entity.get_changed_fields().difference(fields)
+
+
+@functools.cache
+def _data_descriptors(entity_type):
+    """Return the names of the attributes of ``entity_type`` set through descriptors.
+
+    Properties with setters, for example, must be assigned to through
+    ``setattr``.
+    """
+    return frozenset(
+        name
+        for cls in entity_type.__mro__
+        for name, value in vars(cls).items()
+        if hasattr(type(value), '__set__')
+    )
+
+
+def _set_fields(entity, values):
+    """Assign ``values`` to the fields of ``entity``, without recording changes.
+
+    :meth:`Entity.__setattr__` is bypassed, as it is slow for the many fields
+    assigned while an entity is made or read.
+
+    :param values: A dict mapping field names to values.
+    """
+    attrs = entity.__dict__
+    descriptors = _data_descriptors(type(entity))
+    for name, value in values.items():
+        if name in descriptors:
+            object.__setattr__(entity, name, value)
+        else:
+            attrs[name] = value
+
+
+def distinct(entities):
+    """Return ``entities`` without those equal to an earlier one, in order.
+
+    Entities are equal if their fields are, as for ``==``. Unlike a ``set``,
+    this tells entities without IDs apart by their fields, in linear time.
+    Entities are compared by their fingerprints, hashable snapshots of
+    :meth:`Entity.to_json_dict` taken as this function runs. Fingerprints are
+    not kept, so fields changed afterwards, even in place, are seen by the
+    next call.
+
+    :param entities: An iterable of entities.
+    :returns: A list of entities.
+    """
+    seen = set()
+    unique = []
+    for entity in entities:
+        key = (type(entity), _freeze(entity.to_json_dict()))
+        if key not in seen:
+            seen.add(key)
+            unique.append(entity)
+    return unique
+
+
+def _forgetting_changes(read):
+    """Wrap a ``read`` method so that the entity it returns has no changed fields."""
+
+    @functools.wraps(read)
+    def wrapper(*args, **kwargs):
+        entity = read(*args, **kwargs)
+        if isinstance(entity, Entity):
+            _forget_changes(entity)
+        return entity
+
+    wrapper.__forgets_changes__ = True
+    return wrapper
+
+
+def save(entities, max_workers=SAVE_MAX_WORKERS):
+    """Update every entity which has changed since it was read, several at a time.
+
+    Each entity with changed fields (see :meth:`Entity.get_changed_fields`) is
+    updated with ``update()``, sending only the changed fields, whatever
+    :data:`UPDATE_CHANGED_FIELDS` says. Entities without changes are left
+    alone, and no request is made for them::
+
+        hosts = Host().search(query={'search': 'name ~ web'})
+        for host in hosts:
+            host.comment = 'web server'
+        hosts = save(hosts)
+
+    :param entities: An iterable of entities which inherit from
+        :class:`EntityUpdateMixin`.
+    :param max_workers: The greatest number of updates made at once.
+    :returns: A list holding, for each of ``entities`` in order, the entity
+        returned by its ``update()``, or the entity itself if it had no
+        changes to fields which can be updated.
+    :raises: ``requests.exceptions.HTTPError`` if any update fails. Other
+        updates may have been made.
+    """
+    entities = list(entities)
+    changed = [index for index, entity in enumerate(entities) if entity.get_changed_fields()]
+    if not changed:
+        return entities
+    from concurrent.futures import ThreadPoolExecutor  # noqa: PLC0415
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(changed))) as executor:
+        updated = executor.map(lambda index: _update_changes(entities[index]), changed)
+        for index, entity in zip(changed, updated, strict=True):
+            entities[index] = entity
+    return entities
+
+
+def _update_changes(entity):
+    """Update the fields of ``entity`` which have changed and can be updated.
+
+    If none of them can be, no request is made, and ``entity`` is returned.
+    """
+    fields = entity.get_changed_fields()
+    updatable_fields = getattr(entity, '_updatable_fields', None)
+    if updatable_fields:
+        fields = fields.intersection(updatable_fields)
+        if not fields:
+            return entity
+    return entity.update(fields)
+
+
+def _freeze(value):
+    """Return a hashable equivalent of ``value``, as decoded from JSON.
+
+    Containers become tuples of their type and their frozen items, so that
+    values are equal when frozen only if they were equal, as a list and a
+    tuple are not. Values which cannot be hashed are replaced by their type and
+    ``repr``.
+    """
+    if isinstance(value, dict):
+        return dict, frozenset((key, _freeze(item)) for key, item in value.items())
+    if isinstance(value, list | tuple):
+        return type(value), tuple(_freeze(item) for item in value)
+    if isinstance(value, set | frozenset):
+        return frozenset, frozenset(_freeze(item) for item in value)
+    try:
+        hash(value)
+    except TypeError:
+        return type(value), repr(value)
+    return value
+
+
 def to_json_serializable(obj):
     """Transform obj into a json serializable object.
 
@@ -0,0 +1,603 @@
+"""An in-memory stand-in for a Satellite server.
+
+:class:`FakeServer` builds its API from the entities in :mod:`nailgun.entities`:
+each entity's ``_meta['api_path']`` becomes a collection, and its ``_fields``
+describe the records kept in that collection. It answers the requests NailGun
+makes without a network, so that multi-step workflows can be run offline, and
+quickly::
+
+    >>> from nailgun.entities import Product
+    >>> server = FakeServer()
+    >>> with server.install() as server_config:
+    ...     product = Product(server_config, name='foo', organization=1).create()
+    ...     product.name = 'bar'
+    ...     product.update()
+    ...     [product.name for product in Product(server_config).search()]
+    ['bar']
+
+Each collection supports:
+
+* ``POST <api_path>``, which creates a record.
+* ``GET <api_path>``, which searches for records, a page at a time. The
+  ``search`` parameter may hold terms like ``name = foo``, ``name ~ fo`` or
+  ``id > 5``, joined by ``and``. Parameters like ``organization_id`` filter
+  records by relationship.
+* ``GET``, ``PUT`` and ``DELETE <api_path>/<id>``, which read, update and
+  delete a record.
+* ``POST`` and ``PUT <api_path>/<id>/<action>``, which start a foreman task
+  that does nothing, like a repository sync.
+
+Tasks can be polled one at a time with ``GET foreman_tasks/api/tasks/<id>``,
+or together with ``POST foreman_tasks/api/tasks/bulk_search``, as
+:mod:`nailgun.orchestration` does.
+
+The server starts out with one record: the smart proxy with ID 1, which has no
+features. Deleting a Katello record starts a task too, as the real server does. Tasks are
+reported as running until they have been polled ``task_polls`` times.
+
+Responses carry an ``X-Request-Id`` header and an ``X-Runtime`` header, the
+seconds spent handling the request, as Satellite's do.
+
+Entities which need a parent, like :class:`nailgun.entities.SyncPlan`, get one
+collection per parent. Entities without an ID, like
+:class:`nailgun.entities.ContentUpload`, are kept by the field which stands in
+for it, such as ``upload_id``. Entities whose payloads or responses do not match their
+fields, such as those that send values under other names, are only partly
+supported: unknown values are ignored.
+
+"""
+
+import contextlib
+from http.client import responses
+import itertools
+import json
+import operator
+import re
+import threading
+import time
+from urllib.parse import parse_qsl, urlsplit
+import uuid
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from nailgun import entities
+from nailgun.config import ServerConfig
+from nailgun.entity_fields import OneToManyField, OneToOneField
+
+#: A stand-in ID for parents of entities, used to find where their IDs appear
+#: in an entity's API path.
+_PARENT_ID = 987654321
+
+#: Matches one term of a search, such as ``name = "foo"``.
+_SEARCH_TERM = re.compile(r'\s*(\w+)\s*(!=|!~|<=|>=|=|~|<|>)\s*("[^"]*"|\'[^\']*\'|\S+)\s*')
+
+
+def _comparable(value, term):
+    """Return ``value`` and ``term`` as numbers if both are, or as they are."""
+    try:
+        return float(value), float(term)
+    except ValueError:
+        return value, term
+
+
+_SEARCH_OPERATORS = {
+    '=': lambda value, term: value == term,
+    '!=': lambda value, term: value != term,
+    '~': lambda value, term: term.lower() in value.lower(),
+    '!~': lambda value, term: term.lower() not in value.lower(),
+    '<': lambda value, term: operator.lt(*_comparable(value, term)),
+    '<=': lambda value, term: operator.le(*_comparable(value, term)),
+    '>': lambda value, term: operator.gt(*_comparable(value, term)),
+    '>=': lambda value, term: operator.ge(*_comparable(value, term)),
+}
+
+
+class FakeServerError(Exception):
+    """Indicates that a request cannot be answered.
+
+    :param status: The HTTP status code to answer with.
+    :param message: Why the request cannot be answered.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _Collection:
+    """The records kept for one API path, and how to store them.
+
+    :param path: The API path, without leading or trailing slashes.
+    :param fields: A dict mapping field names to
+        :class:`nailgun.entity_fields.Field` objects.
+    """
+
+    def __init__(self, path, fields):
+        self.path = path
+        self.fields = fields
+        self.records = {}
+        self.asynchronous_delete = path.startswith('katello/')
+        # Records are found by their ID, or by the field which stands in for
+        # it, like the ``upload_id`` of a content upload.
+        self.key = 'id'
+        if 'id' not in fields:
+            self.key = next(
+                (name for name, field in fields.items() if name.endswith('_id') and field.unique),
+                'id',
+            )
+
+    def record_id(self, record_id):
+        """Return ``record_id``, from an API path, as records are keyed.
+
+        :raises ValueError: If ``record_id`` is not an integer, and records
+            are keyed by integer IDs.
+        """
+        return int(record_id) if self.key == 'id' else record_id
+
+    def store(self, record, payload):
+        """Copy the values in a create or update ``payload`` in to ``record``.
+
+        Values nested in a dict, as in ``{"product": {"name": "foo"}}``, are
+        copied too. ``record`` is changed in place.
+        """
+        for key, value in payload.items():
+            if type(value) is dict and key not in self.fields:
+                self.store(record, value)
+            elif key == self.key:
+                continue
+            elif key in self.fields:
+                record[key] = value
+            elif key.endswith('_id') and isinstance(self.fields.get(key[:-3]), OneToOneField):
+                record[key[:-3]] = None if value is None else {'id': value}
+            elif key.endswith('_ids') and isinstance(self.fields.get(key[:-4]), OneToManyField):
+                record[key[:-4]] = [{'id': entity_id} for entity_id in value or ()]
+
+    def new_record(self, record_id, payload):
+        """Return a record made from a create ``payload``.
+
+        :param record_id: An integer ID. Records which are keyed by another
+            field are given a random hexadecimal string instead.
+        """
+        record = {
+            field_name: [] if isinstance(field, OneToManyField) else None
+            for field_name, field in self.fields.items()
+        }
+        self.store(record, payload)
+        record[self.key] = record_id if self.key == 'id' else uuid.uuid4().hex
+        return record
+
+    def search(self, params):
+        """Return the records matching the ``search`` and other ``params``."""
+        terms = []
+        for key, value in params.items():
+            if key.endswith('_id') and isinstance(self.fields.get(key[:-3]), OneToOneField):
+                terms.append((key, '=', str(value)))
+        search = params.get('search') or ''
+        for part in filter(None, re.split(r'\s+and\s+', search.strip(), flags=re.IGNORECASE)):
+            match = _SEARCH_TERM.fullmatch(part)
+            if match is None:
+                raise FakeServerError(422, f'Unsupported search: {search}')
+            name, operator_, term = match.groups()
+            terms.append((name, operator_, term.strip('"\'')))
+        return [
+            record
+            for record in self.records.values()
+            if all(
+                _SEARCH_OPERATORS[operator_](self.search_value(record, name), term)
+                for name, operator_, term in terms
+            )
+        ]
+
+    def search_value(self, record, name):
+        """Return the value of ``name`` in ``record``, as a string to search by."""
+        if name not in record and name.endswith('_id'):
+            value = (record.get(name[:-3]) or {}).get('id')
+        else:
+            value = record.get(name)
+        if isinstance(value, bool):
+            return str(value).lower()
+        return '' if value is None else str(value)
+
+
+class FakeServer:
+    """An in-memory stand-in for a Satellite server.
+
+    A server is safe to use from several threads at once.
+
+    :param url: The URL the server answers requests for.
+    :param entity_types: An iterable of :class:`nailgun.entity_mixins.Entity`
+        subclasses to serve. All entities in :mod:`nailgun.entities` by
+        default.
+    :param task_polls: How many times each task is polled before it finishes.
+    :param max_per_page: The most search results returned per page, however
+        many are asked for, as a server with a low ``entries_per_page``
+        setting does. Unlimited by default.
+    """
+
+    def __init__(
+        self, url='https://satellite.fake', entity_types=None, task_polls=0, max_per_page=None
+    ):
+        self.url = url.rstrip('/')
+        self.task_polls = task_polls
+        self.max_per_page = max_per_page
+        self.tasks = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._collections = {}
+        self._templates = []
+        if entity_types is None:
+            entity_types = _all_entity_types()
+        for entity_type in entity_types:
+            self._add_template(entity_type)
+        # Match nested paths, like those of sync plans, before their parents.
+        self._templates.sort(key=lambda template: len(template[0].pattern), reverse=True)
+        self.adapter = _FakeAdapter(self)
+        # Like a real server, have a smart proxy built in. Some entities ask it
+        # which features are enabled.
+        with contextlib.suppress(FakeServerError):
+            self.handle(
+                'POST', 'api/v2/smart_proxies', payload={'name': urlsplit(self.url).hostname}
+            )
+            self.records('api/v2/smart_proxies')[1]['features'] = []
+
+    def _add_template(self, entity_type):
+        """Learn the API path and fields of ``entity_type``."""
+        server_config = ServerConfig(self.url)
+        values = {}
+        while True:
+            try:
+                entity = entity_type(server_config, **values)
+                break
+            except TypeError as err:
+                match = re.search(r'value must be provided for the "(\w+)" field', str(err))
+                if match is None or match[1] in values:
+                    return
+                values[match[1]] = _PARENT_ID
+        path = entity._meta.get('api_path', '')
+        if path.startswith(self.url):
+            # The paths of entities with parents start with their parent's URL.
+            path = path[len(self.url) :]
+        path = path.strip('/')
+        if not path:
+            return
+        pattern = re.escape(path).replace(str(_PARENT_ID), r'\d+')
+        for template_pattern, fields in self._templates:
+            if template_pattern.pattern.startswith(f'({pattern})'):
+                fields.update(entity.get_fields())
+                return
+        self._templates.append(
+            (
+                re.compile(rf'({pattern})(?:/([^/]+)(?:/(.+))?)?'),
+                dict(entity.get_fields()),
+            )
+        )
+
+    @property
+    def server_config(self):
+        """Return a :class:`nailgun.config.ServerConfig` for this server."""
+        return ServerConfig(self.url, auth=('admin', 'changeme'), verify=False)
+
+    @contextlib.contextmanager
+    def install(self):
+        """Send requests for :attr:`url` to this server, rather than the network.
+
+        Requests for other URLs are sent as usual. Proxy settings in the
+        environment are not looked up for requests to this server, as that can
+        take longer than answering them. Several servers may be installed at
+        once, from any thread, as long as their URLs differ; each is
+        uninstalled when its context exits, in any order.
+
+        :returns: A context manager which yields :attr:`server_config`.
+        """
+        with _install_lock:
+            if not _installed:
+                _patch_sessions()
+            _installed.append(self)
+        try:
+            yield self.server_config
+        finally:
+            with _install_lock:
+                _installed.remove(self)
+                if not _installed:
+                    _unpatch_sessions()
+
+    def records(self, path):
+        """Return the records kept for ``path``, such as ``'api/v2/hosts'``.
+
+        :returns: A dict mapping IDs to records. Changing it changes what the
+            server holds.
+        """
+        return self._collection(path.strip('/')).records
+
+    def _collection(self, path):
+        """Return the collection for ``path``, making it if need be."""
+        collection = self._collections.get(path)
+        if collection is None:
+            for pattern, fields in self._templates:  # noqa: B007 - used after the loop
+                match = pattern.fullmatch(path)
+                if match is not None and match[2] is None:
+                    break
+            else:
+                raise FakeServerError(404, f'No such collection: {path}')
+            collection = self._collections[path] = _Collection(path, fields)
+        return collection
+
+    def handle(self, method, path, params=None, payload=None):
+        """Answer a request.
+
+        :param method: An HTTP method, such as ``'GET'``.
+        :param path: The path requested, such as ``'/api/v2/hosts/1'``.
+        :param params: A dict of parameters, from the query string or body.
+        :param payload: A dict decoded from the request's JSON body.
+        :returns: A ``(status, body)`` tuple, where ``body`` can be encoded as
+            JSON.
+        """
+        path = path.strip('/')
+        params = params or {}
+        payload = payload or {}
+        try:
+            with self._lock:
+                return self._handle(method, path, params, payload)
+        except FakeServerError as err:
+            return err.status, {'error': {'message': str(err)}}
+
+    def _handle(self, method, path, params, payload):
+        """Implement :meth:`handle`, holding the lock."""
+        if path == 'foreman_tasks/api/tasks/bulk_search' and method == 'POST':
+            return 200, self._bulk_search(payload.get('searches') or [])
+        task = re.fullmatch(r'foreman_tasks/api/tasks/([\w-]+)', path)
+        if task is not None and method == 'GET':
+            return 200, self._poll(task[1])
+        for pattern, _ in self._templates:
+            match = pattern.fullmatch(path)
+            if match is not None:
+                break
+        else:
+            raise FakeServerError(404, f'No route matches {method} {path}')
+        collection_path, record_id, action = match.groups()
+        if record_id is None:
+            target = 'collection'
+        elif action is None:
+            target = 'record'
+        else:
+            target = 'action'
+        handler = getattr(self, f'_{method.lower()}_{target}', None)
+        if handler is None:
+            raise FakeServerError(405, f'{method} {path} is not supported')
+        return handler(self._collection(collection_path), record_id, action, {**payload, **params})
+
+    def _post_collection(self, collection, _record_id, _action, payload):
+        """Create a record."""
+        record = collection.new_record(next(self._ids), payload)
+        collection.records[record[collection.key]] = record
+        return 201, record
+
+    def _get_collection(self, collection, _record_id, _action, params):
+        """Return a page of search results."""
+        return 200, self._search(collection, params)
+
+    def _get_record(self, collection, record_id, _action, _params):
+        """Return a record."""
+        return 200, self._record(collection, record_id)
+
+    def _put_record(self, collection, record_id, _action, payload):
+        """Update a record, and return it."""
+        record = self._record(collection, record_id)
+        collection.store(record, payload)
+        return 200, record
+
+    def _delete_record(self, collection, record_id, _action, _params):
+        """Delete a record, and return it or the task that deletes it."""
+        record = collection.records.pop(self._record(collection, record_id)[collection.key])
+        if collection.asynchronous_delete:
+            return 202, self._start_task(f'delete {collection.path}/{record_id}')
+        return 200, record
+
+    def _post_action(self, collection, record_id, action, _params):
+        """Start a task which acts upon a record."""
+        self._record(collection, record_id)
+        return 202, self._start_task(f'{action} {collection.path}/{record_id}')
+
+    _put_action = _post_action
+
+    def _record(self, collection, record_id):
+        """Return the record with ID ``record_id`` in ``collection``."""
+        try:
+            return collection.records[collection.record_id(record_id)]
+        except (KeyError, ValueError):
+            raise FakeServerError(  # noqa: B904 - the server's message is enough
+                404, f'Resource {collection.path} not found by id {record_id!r}'
+            )
+
+    def _search(self, collection, params):
+        """Return a page of search results, as the server does."""
+        results = collection.search(params)
+        try:
+            page = int(params.get('page', 1))
+            per_page = int(params.get('per_page', 20))
+        except ValueError as err:
+            raise FakeServerError(422, str(err)) from err
+        if self.max_per_page is not None:
+            per_page = min(per_page, self.max_per_page)
+        start = (page - 1) * per_page
+        return {
+            'total': len(collection.records),
+            'subtotal': len(results),
+            'page': page,
+            'per_page': per_page,
+            'search': params.get('search'),
+            'results': results[start : start + per_page],
+        }
+
+    def _start_task(self, label):
+        """Start a task, and return it."""
+        task = {
+            'id': str(uuid.uuid4()),
+            'label': label,
+            'state': 'running',
+            'result': 'pending',
+            'polls': 0,
+        }
+        self.tasks[task['id']] = task
+        return self._task_info(task)
+
+    def _poll(self, task_id):
+        """Return a task, which finishes once it has been polled enough."""
+        try:
+            task = self.tasks[task_id]
+        except KeyError:
+            raise FakeServerError(404, f'No such task: {task_id}')  # noqa: B904
+        if task['polls'] >= self.task_polls:
+            task.update(state='stopped', result='success')
+        task['polls'] += 1
+        return self._task_info(task)
+
+    def _bulk_search(self, searches):
+        """Answer each search for a task by ID, as ``bulk_search`` does.
+
+        Each search which finds a task counts as one poll of it. Searches of
+        other types, or for unknown tasks, find nothing.
+        """
+        answers = []
+        for search in searches:
+            results = []
+            if search.get('type') == 'task' and search.get('task_id') in self.tasks:
+                results.append(self._poll(search['task_id']))
+            answers.append({**search, 'results': results})
+        return answers
+
+    @staticmethod
+    def _task_info(task):
+        """Return what the server says about ``task``."""
+        return {key: task[key] for key in ('id', 'label', 'state', 'result')}
+
+    def __call__(self, environ, start_response):
+        """Answer a request as a WSGI application, so the server can be run over HTTP."""
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        body = environ['wsgi.input'].read(length) if length else b''
+        start = time.perf_counter()
+        status, content = self.handle(
+            environ['REQUEST_METHOD'],
+            environ['PATH_INFO'],
+            dict(parse_qsl(environ.get('QUERY_STRING', ''))),
+            _decode(body, environ.get('CONTENT_TYPE')),
+        )
+        content = json.dumps(content).encode()
+        start_response(
+            f'{status} {responses[status]}',
+            [
+                ('Content-Type', 'application/json'),
+                ('Content-Length', str(len(content))),
+                ('X-Request-Id', str(uuid.uuid4())),
+                ('X-Runtime', f'{time.perf_counter() - start:.6f}'),
+            ],
+        )
+        return [content]
+
+
+#: The servers installed by :meth:`FakeServer.install`, in the order they were
+#: installed. A server installed twice appears twice.
+_installed = []
+_install_lock = threading.Lock()
+#: The methods of ``requests.Session`` replaced while any server is installed.
+#: They are kept afterwards, for threads still calling the replacements.
+_session_methods = {}
+
+
+def _installed_server(url):
+    """Return the installed server which answers requests for ``url``, or ``None``."""
+    for server in reversed(tuple(_installed)):
+        if url == server.url or url.startswith(f'{server.url}/'):
+            return server
+    return None
+
+
+def _get_adapter(session, url):
+    """Return the adapter of the server installed for ``url``, or look one up as usual."""
+    server = _installed_server(url)
+    if server is not None:
+        return server.adapter
+    return _session_methods['get_adapter'](session, url)
+
+
+def _merge_environment_settings(session, url, *settings):
+    """Merge settings for a request, skipping the environment for installed servers."""
+    if _installed_server(url) is not None:
+        proxies, stream, verify, cert = settings
+        return {'proxies': proxies or {}, 'stream': stream, 'verify': verify, 'cert': cert}
+    return _session_methods['merge_environment_settings'](session, url, *settings)
+
+
+def _patch_sessions():
+    """Make ``requests.Session`` send requests to installed servers."""
+    for name, method in (
+        ('get_adapter', _get_adapter),
+        ('merge_environment_settings', _merge_environment_settings),
+    ):
+        _session_methods[name] = getattr(requests.Session, name)
+        setattr(requests.Session, name, method)
+
+
+def _unpatch_sessions():
+    """Undo :func:`_patch_sessions`."""
+    for name, method in _session_methods.items():
+        setattr(requests.Session, name, method)
+
+
+class _FakeAdapter(BaseAdapter):
+    """A transport adapter which sends requests to a :class:`FakeServer`."""
+
+    def __init__(self, server):
+        super().__init__()
+        self.server = server
+
+    def send(self, request, **_kwargs):
+        """Answer ``request`` with the server's response."""
+        url = urlsplit(request.url)
+        start = time.perf_counter()
+        status, content = self.server.handle(
+            request.method,
+            url.path,
+            dict(parse_qsl(url.query)),
+            _decode(request.body, request.headers.get('content-type')),
+        )
+        response = requests.Response()
+        response.status_code = status
+        response.reason = responses[status]
+        response.headers = CaseInsensitiveDict(
+            {
+                'content-type': 'application/json',
+                'x-request-id': str(uuid.uuid4()),
+                'x-runtime': f'{time.perf_counter() - start:.6f}',
+            }
+        )
+        response._content = json.dumps(content).encode()
+        response._content_consumed = True
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        """Release nothing, as nothing is held."""
+
+
+def _decode(body, content_type):
+    """Decode a JSON request body, or return ``None`` if it is not JSON."""
+    if not body or 'json' not in (content_type or ''):
+        return None
+    return json.loads(body)
+
+
+def _all_entity_types():
+    """Return every entity type in :mod:`nailgun.entities`."""
+    types = (getattr(entities, name) for name in dir(entities))
+    return [
+        value
+        for value in types
+        if isinstance(value, type)
+        and issubclass(value, entities.Entity)
+        and value is not entities.Entity
+    ]
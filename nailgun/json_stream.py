@@ -0,0 +1,150 @@
+"""Parse large JSON documents a piece at a time.
+
+Index endpoints such as ``katello/api/v2/packages`` return a JSON object whose
+``results`` member is an array holding one object per entity. With a large
+``per_page``, such a response may be tens of megabytes long. Rather than decode
+the whole response at once, :class:`ArrayStream` reads it in chunks and decodes
+the items of one array one at a time::
+
+    >>> stream = ArrayStream([b'{"total": 2, "results": [{"id": 1},', b' {"id": 2}]}'])
+    >>> list(stream)
+    [{'id': 1}, {'id': 2}]
+    >>> stream.metadata
+    {'total': 2}
+
+Only the unparsed part of the current chunk and the item being decoded are
+held in memory.
+
+"""
+
+import codecs
+import json
+
+#: The number of bytes read from a response at a time.
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+_DECODER = json.JSONDecoder()
+
+
+class ArrayStream:
+    """Iterate over the items of an array held by a streamed JSON object.
+
+    The document must be a JSON object. Iterating over a stream yields the
+    items of the member named ``key``, decoded, as they are read. All other
+    members are decoded whole and saved in :attr:`metadata`.
+
+    A stream may only be iterated over once.
+
+    :param chunks: An iterable of ``bytes`` or ``str`` objects, such as
+        ``response.iter_content(CHUNK_SIZE)``. Bytes are decoded as UTF-8.
+    :param key: The name of the member holding the array.
+    :raises json.JSONDecodeError: While iterating, if the document is not
+        valid JSON or is not an object.
+    """
+
+    def __init__(self, chunks, key='results'):
+        self.key = key
+        #: A dict of the document's members, other than ``key``. Members which
+        #: follow the array are only added once every item has been read.
+        self.metadata = {}
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def __iter__(self):
+        """Yield each item of the array, then read the rest of the document."""
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            name = self._value()
+            if not isinstance(name, str):
+                self._fail('Expecting property name')
+            self._expect(':')
+            if name == self.key and self._peek() == '[':
+                self._pos += 1
+                yield from self._items()
+            else:
+                self.metadata[name] = self._value()
+            if self._delimiter('},') == '}':
+                break
+        if self._peek():
+            self._fail('Extra data')
+
+    def _items(self):
+        """Yield each item of an array whose opening bracket has been read."""
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._delimiter(',]') == ']':
+                return
+
+    def _fill(self):
+        """Read the next chunk in to the buffer, dropping what has been parsed.
+
+        :returns: ``False`` if there is nothing left to read, or ``True``.
+        """
+        if self._eof:
+            return False
+        self._buffer = self._buffer[self._pos :]
+        self._pos = 0
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._eof = True
+            self._buffer += self._decoder.decode(b'', final=True)
+            return True
+        if isinstance(chunk, bytes | bytearray):
+            chunk = self._decoder.decode(chunk)
+        self._buffer += chunk
+        return True
+
+    def _peek(self):
+        """Skip whitespace, and return the next character, or ``''`` at the end."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._fill():
+                return self._buffer[self._pos : self._pos + 1]
+
+    def _expect(self, char):
+        """Read ``char``, which may follow whitespace."""
+        if self._peek() != char:
+            self._fail(f'Expecting {char!r}')
+        self._pos += 1
+
+    def _delimiter(self, chars):
+        """Read one of ``chars``, which may follow whitespace, and return it."""
+        char = self._peek()
+        if not char or char not in chars:
+            self._fail(f'Expecting one of {chars!r}')
+        self._pos += 1
+        return char
+
+    def _value(self):
+        """Decode the next JSON value, reading more chunks until it is whole.
+
+        A value is only known to be whole when something follows it, as
+        ``12`` may be the start of ``123``.
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            if end < len(self._buffer) or not self._fill():
+                self._pos = end
+                return value
+
+    def _fail(self, message):
+        """Raise a :class:`json.JSONDecodeError` at the current position."""
+        raise json.JSONDecodeError(message, self._buffer, self._pos)
@@ -0,0 +1,356 @@
+"""Count the requests NailGun makes, and time them.
+
+A :class:`Metrics` object counts each request sent through
+:mod:`nailgun.client`, and times it and measures its response. Requests are
+grouped by the entity class and method which made them, their HTTP method, and
+their path with IDs replaced by ``{id}``. Task waits are timed too::
+
+    with metrics.collect() as collected:
+        run_job(server_config)
+    print(collected.prometheus())
+    slowest = max(collected.snapshot()['requests'], key=lambda r: r['seconds']['sum'])
+
+While no :class:`Metrics` object is collecting, nothing is counted, and
+requests and entity methods are not slowed down.
+
+"""
+
+import bisect
+import contextlib
+import functools
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+
+from nailgun import client, entity_mixins
+
+#: Upper bounds of the buckets request durations are counted in, in seconds.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+#: Upper bounds of the buckets response sizes are counted in, in bytes.
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+#: Upper bounds of the buckets task waits are counted in, in seconds.
+TASK_WAIT_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+# A path segment which is an ID: a number or a UUID.
+_ID = re.compile(r'^(\d+|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})$', re.I)
+
+
+@functools.lru_cache(maxsize=4096)
+def template_path(url):
+    """Return the path of ``url``, with each ID in it replaced by ``{id}``.
+
+    >>> template_path('https://sat.example.com/katello/api/v2/products/12/sync')
+    '/katello/api/v2/products/{id}/sync'
+    """
+    segments = urlsplit(url).path.split('/')
+    return '/'.join('{id}' if _ID.match(segment) else segment for segment in segments)
+
+
+class Histogram:
+    """Count values in buckets, as a Prometheus histogram does.
+
+    :param buckets: The upper bound of each bucket, in increasing order. Values
+        above the last are only counted in the total.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        """Count ``value`` in its bucket."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        """Return the histogram as a dict, with cumulative bucket counts."""
+        cumulative = []
+        total = 0
+        for bound, count in zip(self.buckets, self.counts, strict=False):
+            total += count
+            cumulative.append((bound, total))
+        return {'count': self.count, 'sum': self.sum, 'buckets': cumulative}
+
+
+class _Endpoint:
+    """What is known about the requests sent to one endpoint."""
+
+    def __init__(self, duration_buckets, size_buckets):
+        self.statuses = {}
+        self.seconds = Histogram(duration_buckets)
+        self.server_seconds = Histogram(duration_buckets)
+        self.bytes = Histogram(size_buckets)
+        self.slowest = None
+
+
+def _response_size(response, kwargs):
+    """Return the size of the body of ``response`` in bytes, or ``None`` if unknown.
+
+    The body of a streamed response is not read, so as not to hold it in memory.
+    """
+    length = response.headers.get('content-length')
+    if length is not None and length.isdigit():
+        return int(length)
+    if kwargs.get('stream'):
+        return None
+    return len(response.content)
+
+
+def _operation_labels(operation):
+    """Return the entity class name and method name of ``operation``, or blanks."""
+    if operation is None:
+        return ('', '')
+    if operation.entity is None:
+        return ('', operation.name)
+    return (type(operation.entity).__name__, operation.name)
+
+
+def _labels(**labels):
+    """Format ``labels`` for the Prometheus text format."""
+    escaped = (
+        (name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels.items()
+    )
+    return ','.join(f'{name}="{value}"' for name, value in escaped)
+
+
+def _format_number(value):
+    """Format ``value`` for the Prometheus text format."""
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _histogram_lines(name, labels, snapshot):
+    """Yield the lines of the Prometheus text format for a histogram sample."""
+    for bound, count in snapshot['buckets']:
+        yield f'{name}_bucket{{{_labels(**labels, le=_format_number(bound))}}} {count}'
+    yield f'{name}_bucket{{{_labels(**labels, le="+Inf")}}} {snapshot["count"]}'
+    yield f'{name}_sum{{{_labels(**labels)}}} {_format_number(snapshot["sum"])}'
+    yield f'{name}_count{{{_labels(**labels)}}} {snapshot["count"]}'
+
+
+class Metrics:
+    """Count and time requests, and time task waits.
+
+    Call :meth:`enable` to start collecting, or use :func:`collect`.
+
+    Requests are grouped by the entity class and entity method which made them,
+    their HTTP method and their templated path (see :func:`template_path`). The
+    entity class and method are empty for requests made outside of the entity
+    methods listed in :func:`nailgun.entity_mixins.add_observer`, and the
+    method is ``'poll_task'`` for task polls. Task waits are grouped by the
+    entity class and method which waited.
+
+    :param duration_buckets: See :data:`DURATION_BUCKETS`.
+    :param size_buckets: See :data:`SIZE_BUCKETS`.
+    :param task_wait_buckets: See :data:`TASK_WAIT_BUCKETS`.
+    """
+
+    def __init__(
+        self,
+        duration_buckets=DURATION_BUCKETS,
+        size_buckets=SIZE_BUCKETS,
+        task_wait_buckets=TASK_WAIT_BUCKETS,
+    ):
+        self.duration_buckets = duration_buckets
+        self.size_buckets = size_buckets
+        self.task_wait_buckets = task_wait_buckets
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._task_waits = {}
+
+    def enable(self):
+        """Start counting requests and task waits."""
+        client.add_interceptor(self.intercept)
+        entity_mixins.add_observer(self.observe)
+
+    def disable(self):
+        """Stop counting requests and task waits. What was counted is kept."""
+        entity_mixins.remove_observer(self.observe)
+        client.remove_interceptor(self.intercept)
+
+    def reset(self):
+        """Forget all that was counted."""
+        with self._lock:
+            self._endpoints = {}
+            self._task_waits = {}
+
+    def intercept(self, method, url, kwargs, send):
+        """Send a request, and count it. See :func:`nailgun.client.add_interceptor`."""
+        key = (*_operation_labels(entity_mixins.current_operation()), method, template_path(url))
+        start = time.perf_counter()
+        try:
+            response = send()
+        except requests.exceptions.RequestException:
+            self._count(key, 'error', time.perf_counter() - start, None, None)
+            raise
+        elapsed = time.perf_counter() - start
+        self._count(
+            key,
+            str(response.status_code),
+            elapsed,
+            _response_size(response, kwargs),
+            client.response_metadata(response),
+        )
+        return response
+
+    def observe(self, operation):
+        """Time task waits. See :func:`nailgun.entity_mixins.add_observer`."""
+        if operation.name != 'poll_task':
+            return contextlib.nullcontext()
+        return self._timing_task_wait(operation)
+
+    @contextlib.contextmanager
+    def _timing_task_wait(self, operation):
+        """Time the task wait ``operation``."""
+        key = (_operation_labels(operation)[0], _operation_labels(operation.parent)[1])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                if key not in self._task_waits:
+                    self._task_waits[key] = Histogram(self.task_wait_buckets)
+                self._task_waits[key].observe(elapsed)
+
+    def _count(self, key, status, elapsed, size, metadata):
+        """Count a request to the endpoint ``key``.
+
+        ``metadata`` is a :data:`nailgun.client.ResponseMetadata`, or ``None``.
+        """
+        with self._lock:
+            endpoint = self._endpoints.get(key)
+            if endpoint is None:
+                endpoint = _Endpoint(self.duration_buckets, self.size_buckets)
+                self._endpoints[key] = endpoint
+            endpoint.statuses[status] = endpoint.statuses.get(status, 0) + 1
+            endpoint.seconds.observe(elapsed)
+            if size is not None:
+                endpoint.bytes.observe(size)
+            server_seconds = request_id = None
+            if metadata is not None:
+                server_seconds, request_id = metadata.server_seconds, metadata.request_id
+            if server_seconds is not None:
+                endpoint.server_seconds.observe(server_seconds)
+            if endpoint.slowest is None or elapsed > endpoint.slowest['seconds']:
+                endpoint.slowest = {
+                    'seconds': elapsed,
+                    'server_seconds': server_seconds,
+                    'request_id': request_id,
+                }
+
+    def snapshot(self):
+        """Return what was counted so far.
+
+        :returns: A dict like this, in which each histogram is a dict as
+            returned by :meth:`Histogram.snapshot`::
+
+                {
+                    'requests': [
+                        {
+                            'entity': 'Product',
+                            'method': 'create',
+                            'verb': 'POST',
+                            'path': '/katello/api/v2/products',
+                            'count': 1,
+                            'statuses': {'201': 1},
+                            'seconds': {...},
+                            'server_seconds': {...},
+                            'bytes': {...},
+                            'slowest': {
+                                'seconds': 0.25,
+                                'server_seconds': 0.2,
+                                'request_id': '6d5c...',
+                            },
+                        },
+                    ],
+                    'task_waits': [
+                        {'entity': 'Product', 'method': 'delete', 'seconds': {...}},
+                    ],
+                }
+
+            ``server_seconds`` counts the time servers said they spent on
+            requests, if they said so. See
+            :func:`nailgun.client.response_metadata`. ``slowest`` is the
+            slowest request, so that it can be found in the server's logs.
+            Requests which raised an error are counted under the status
+            ``'error'``, and have no size.
+        """
+        with self._lock:
+            requests_ = [
+                {
+                    'entity': entity,
+                    'method': method,
+                    'verb': verb,
+                    'path': path,
+                    'count': endpoint.seconds.count,
+                    'statuses': dict(endpoint.statuses),
+                    'seconds': endpoint.seconds.snapshot(),
+                    'server_seconds': endpoint.server_seconds.snapshot(),
+                    'bytes': endpoint.bytes.snapshot(),
+                    'slowest': dict(endpoint.slowest),
+                }
+                for (entity, method, verb, path), endpoint in sorted(self._endpoints.items())
+            ]
+            task_waits = [
+                {'entity': entity, 'method': method, 'seconds': histogram.snapshot()}
+                for (entity, method), histogram in sorted(self._task_waits.items())
+            ]
+        return {'requests': requests_, 'task_waits': task_waits}
+
+    def prometheus(self):
+        """Return what was counted so far, in the Prometheus text format."""
+        snapshot = self.snapshot()
+        lines = [
+            '# HELP nailgun_requests_total Requests sent by NailGun.',
+            '# TYPE nailgun_requests_total counter',
+        ]
+        for request in snapshot['requests']:
+            labels = {key: request[key] for key in ('entity', 'method', 'verb', 'path')}
+            for status, count in request['statuses'].items():
+                lines.append(
+                    f'nailgun_requests_total{{{_labels(**labels, status=status)}}} {count}'
+                )
+        for name, field, help_text in (
+            ('nailgun_request_duration_seconds', 'seconds', 'Time taken by requests.'),
+            (
+                'nailgun_server_duration_seconds',
+                'server_seconds',
+                'Time servers said they spent on requests.',
+            ),
+            ('nailgun_response_size_bytes', 'bytes', 'Size of response bodies.'),
+        ):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for request in snapshot['requests']:
+                labels = {key: request[key] for key in ('entity', 'method', 'verb', 'path')}
+                lines.extend(_histogram_lines(name, labels, request[field]))
+        lines.append('# HELP nailgun_task_wait_seconds Time spent waiting for tasks.')
+        lines.append('# TYPE nailgun_task_wait_seconds histogram')
+        for wait in snapshot['task_waits']:
+            labels = {'entity': wait['entity'], 'method': wait['method']}
+            lines.extend(_histogram_lines('nailgun_task_wait_seconds', labels, wait['seconds']))
+        return '\n'.join(lines) + '\n'
+
+
+@contextlib.contextmanager
+def collect(**kwargs):
+    """Count requests and task waits made within the block.
+
+    :param kwargs: Passed to :class:`Metrics`.
+    :returns: A context manager which yields a :class:`Metrics`.
+    """
+    metrics = Metrics(**kwargs)
+    metrics.enable()
+    try:
+        yield metrics
+    finally:
+        metrics.disable()
@@ -0,0 +1,1123 @@
+"""Tools for running many foreman tasks at once.
+
+Many operations, such as syncing a repository or publishing a content view,
+make the server start a foreman task. The methods in :mod:`nailgun.entities`
+perform one such operation at a time, and wait for each task in turn. The tools
+in this module start many operations with a bounded number of tasks in flight,
+and poll all of their tasks together.
+
+:class:`TaskRunner` is the engine. It runs :class:`TaskJob` objects, each of
+which starts one task, and reports on their progress with :class:`TaskEvent`
+objects. The remaining classes build jobs for common workflows and run them with
+a :class:`TaskRunner`.
+
+"""
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import logging
+import time
+
+from requests.exceptions import RequestException
+
+from nailgun import entities, entity_mixins
+
+logger = logging.getLogger(__name__)
+
+
+class TaskEvent(namedtuple('TaskEvent', ('kind', 'job', 'task'))):
+    """An event reported by :meth:`TaskRunner.run`.
+
+    ``kind`` is one of the constants defined on this class, ``job`` is the
+    :class:`TaskJob` the event is about, and ``task`` is the latest information
+    about the job's task, or ``None`` if there is no such information.
+    """
+
+    __slots__ = ()
+
+    STARTED = 'started'
+    PROGRESS = 'progress'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    RETRYING = 'retrying'
+    SKIPPED = 'skipped'
+
+
+#: A :class:`TaskEvent` reported for one of the entities a job acts upon.
+#:
+#: ``kind`` and ``job`` are as for :class:`TaskEvent`, and ``item`` is an entity
+#: from ``job.items``.
+ItemEvent = namedtuple('ItemEvent', ('kind', 'item', 'job'))
+
+
+def _task_finished(task_info):
+    """Tell whether a task has finished, as :func:`nailgun.entity_mixins._poll_task` does."""
+    return task_info['state'] in ('paused', 'stopped')
+
+
+class TaskWatcher:
+    """Poll several foreman tasks together.
+
+    Rather than polling each task with its own request, as
+    :meth:`nailgun.entities.ForemanTask.poll` does, information about all
+    watched tasks is fetched with one call to
+    :meth:`nailgun.entities.ForemanTask.bulk_search`.
+
+    :param server_config: A :class:`nailgun.config.ServerConfig` object.
+    """
+
+    def __init__(self, server_config):
+        self._server_config = server_config
+        self._task_ids = set()
+
+    def __len__(self):
+        """Return the number of watched tasks."""
+        return len(self._task_ids)
+
+    def add(self, task_id):
+        """Start watching the task with ID ``task_id``."""
+        self._task_ids.add(task_id)
+
+    def discard(self, task_id):
+        """Stop watching the task with ID ``task_id``, if it is watched."""
+        self._task_ids.discard(task_id)
+
+    def poll(self):
+        """Fetch information about every watched task.
+
+        Tasks that have finished are no longer watched afterwards.
+
+        :returns: A dict mapping task IDs to task information. A watched task
+            is missing from this dict if the server did not report on it.
+        :raises: ``requests.exceptions.HTTPError`` If the server responds with
+            an HTTP 4XX or 5XX message.
+        """
+        if not self._task_ids:
+            return {}
+        searches = [
+            {'search_id': task_id, 'type': 'task', 'task_id': task_id}
+            for task_id in sorted(self._task_ids)
+        ]
+        response = entities.ForemanTask(self._server_config).bulk_search(
+            data={'searches': searches}
+        )
+        tasks = {
+            task_info['id']: task_info for search in response for task_info in search['results']
+        }
+        for task_id, task_info in tasks.items():
+            if _task_finished(task_info):
+                self._task_ids.discard(task_id)
+        return tasks
+
+
+class TaskRetryPolicy:
+    """Decide whether a failed job should be run again, and when.
+
+    A job fails for one of these reasons, which are stored in
+    :attr:`TaskJob.result`:
+
+    * Its task finished with a result such as ``'error'`` or ``'warning'``.
+    * The request that should have started its task failed. The reason is
+      ``'start_failed'``.
+    * Its task did not finish in time. The reason is ``'timed_out'``. The task
+      is still running on the server, so retrying it is rarely wise.
+
+    :param max_attempts: The maximum number of times a job is run, including
+        the first time. The default of 1 disables retries.
+    :param delay: Seconds to wait before a job is run for the second time.
+    :param backoff: The delay is multiplied by this value after each retry.
+    :param retry_on: The failure reasons that warrant a retry.
+    """
+
+    def __init__(self, max_attempts=1, delay=0, backoff=2, retry_on=('error', 'start_failed')):
+        self.max_attempts = max_attempts
+        self.delay = delay
+        self.backoff = backoff
+        self.retry_on = retry_on
+
+    def should_retry(self, job):
+        """Tell whether ``job``, which has just failed, should be run again."""
+        return job.attempt < self.max_attempts and job.result in self.retry_on
+
+    def get_delay(self, job):
+        """Return how many seconds to wait before ``job`` is run again."""
+        return self.delay * self.backoff ** (job.attempt - 1)
+
+
+class TaskJob:
+    """A unit of work which starts one foreman task.
+
+    :param start: A callable which takes no arguments, asks the server to do
+        something and returns the server's decoded response. Typically, this is
+        an entity method bound to ``synchronous=False``, such as
+        ``functools.partial(repository.sync, synchronous=False)``. If the
+        response is a dict with an ``'id'``, it is taken to describe a task.
+        Otherwise, the job succeeds as soon as ``start`` returns.
+    :param label: A string describing the job, for humans.
+    :param items: The entities the job acts upon. Callers use these to map
+        job events back to entities.
+    :param depends_on: Jobs which must succeed before this job is started. If
+        any of them fails, this job is skipped.
+    :param run_after: Jobs which must be done, whether or not they succeeded,
+        before this job is started.
+    :param split: An optional callable which returns a list of jobs. If this
+        job fails and may be retried, those jobs are run instead of this one.
+        This is used to retry a failed bulk action one item at a time.
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    SKIPPED = 'skipped'
+    SPLIT = 'split'
+
+    def __init__(self, start, *, label=None, items=(), depends_on=(), split=None, run_after=()):
+        self.start = start
+        self.label = label
+        self.items = list(items)
+        self.depends_on = list(depends_on)
+        self.run_after = list(run_after)
+        self.split = split
+        self.state = self.PENDING
+        #: The number of times the job has been started.
+        self.attempt = 0
+        #: The ID of the job's latest task, if any.
+        self.task_id = None
+        #: The latest information about the job's task, if any.
+        self.task = None
+        #: The task result, or the reason the job failed.
+        self.result = None
+        #: The exception raised when starting the job, if any.
+        self.error = None
+        #: The jobs run instead of this one, if the job was split.
+        self.children = []
+        #: ``time.monotonic()`` when the job was first and last started, and
+        #: when it last finished.
+        self.first_started_at = None
+        self.started_at = None
+        self.ended_at = None
+
+    def __repr__(self):
+        """Return a string representation of the current object."""
+        return (
+            f'{self.__module__}.{type(self).__name__}(label={self.label!r}, state={self.state!r})'
+        )
+
+    @property
+    def succeeded(self):
+        """Tell whether the job, or every job it was split in to, succeeded."""
+        if self.state == self.SPLIT:
+            return all(child.succeeded for child in self.children)
+        return self.state == self.SUCCEEDED
+
+    @property
+    def done(self):
+        """Tell whether the job, or every job it was split in to, is done."""
+        if self.state == self.SPLIT:
+            return all(child.done for child in self.children)
+        return self.state in (self.SUCCEEDED, self.FAILED, self.SKIPPED)
+
+    @property
+    def failed(self):
+        """Tell whether the job is done without having succeeded."""
+        return self.done and not self.succeeded
+
+    @property
+    def duration(self):
+        """Return the seconds between the job first starting and last finishing.
+
+        If the job was split, it last finished when the last of its children
+        did. ``None`` is returned if the job has not both started and finished.
+        """
+        ended_at = [leaf.ended_at for leaf in _leaves(self)]
+        if self.first_started_at is None or not ended_at or None in ended_at:
+            return None
+        return max(ended_at) - self.first_started_at
+
+
+def _leaves(job):
+    """Return the jobs ``job`` was split in to, recursively, or ``[job]``."""
+    if job.state != TaskJob.SPLIT:
+        return [job]
+    return [leaf for child in job.children for leaf in _leaves(child)]
+
+
+class _RunState:
+    """The state of one call to :meth:`TaskRunner.run`."""
+
+    def __init__(self, jobs, watcher):
+        self.queue = list(jobs)
+        self.running = {}  # task ID → job
+        self.not_before = {}  # job → time.monotonic() before which it may not be retried
+        self.watcher = watcher
+
+
+class TaskRunner:
+    """Run :class:`TaskJob` objects with a bounded number of tasks in flight.
+
+    Jobs are started as soon as their dependencies have succeeded, the jobs they
+    run after are done, and there is room for more tasks. Jobs which become ready at the same time are started
+    concurrently. All running tasks are then polled together with a
+    :class:`TaskWatcher`. A job which fails does not stop the other jobs,
+    but jobs depending on it are skipped.
+
+    :param server_config: A :class:`nailgun.config.ServerConfig` object.
+    :param max_in_flight: The maximum number of tasks running at once.
+    :param poll_rate: Seconds between two polls of the running tasks.
+        Defaults to :data:`nailgun.entity_mixins.TASK_POLL_RATE`.
+    :param timeout: Maximum number of seconds to wait for one task. Defaults
+        to :data:`nailgun.entity_mixins.TASK_TIMEOUT`.
+    :param retry_policy: A :class:`TaskRetryPolicy`. By default, failed jobs
+        are not retried.
+    """
+
+    def __init__(
+        self, server_config, max_in_flight=4, poll_rate=None, timeout=None, retry_policy=None
+    ):
+        if max_in_flight < 1:
+            raise ValueError(f'max_in_flight must be at least 1, not {max_in_flight}.')
+        self._server_config = server_config
+        self.max_in_flight = max_in_flight
+        self.poll_rate = poll_rate
+        self.timeout = timeout
+        self.retry_policy = retry_policy or TaskRetryPolicy()
+
+    def run(self, jobs):
+        """Run ``jobs`` and report on their progress.
+
+        This is a generator. Jobs only make progress while events are being
+        consumed.
+
+        :param jobs: An iterable of :class:`TaskJob` objects.
+        :returns: A generator of :class:`TaskEvent` objects.
+        :raises: ``requests.exceptions.HTTPError`` If polling the tasks fails.
+        """
+        poll_rate = entity_mixins.TASK_POLL_RATE if self.poll_rate is None else self.poll_rate
+        state = _RunState(jobs, TaskWatcher(self._server_config))
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            while state.queue or state.running:
+                for job in [job for job in state.queue if any(d.failed for d in job.depends_on)]:
+                    state.queue.remove(job)
+                    job.state = TaskJob.SKIPPED
+                    yield TaskEvent(TaskEvent.SKIPPED, job, None)
+                started = yield from self._start_ready(state, executor)
+                if state.running:
+                    time.sleep(poll_rate)
+                    yield from self._poll(state)
+                    continue
+                waiting = [state.not_before[job] for job in state.queue if job in state.not_before]
+                if waiting:
+                    time.sleep(max(0, min(waiting) - time.monotonic()))
+                elif state.queue and not started:
+                    # Nothing is running and nothing can be started. The
+                    # remaining jobs depend on jobs which were never run.
+                    for job in state.queue:
+                        job.state = TaskJob.SKIPPED
+                        yield TaskEvent(TaskEvent.SKIPPED, job, None)
+                    state.queue.clear()
+
+    def run_all(self, jobs):
+        """Run ``jobs`` to completion.
+
+        :param jobs: An iterable of :class:`TaskJob` objects.
+        :returns: A list of the jobs run. This includes jobs that were run
+            because a job was split.
+        """
+        seen = {}
+        for event in self.run(jobs):
+            seen.setdefault(id(event.job), event.job)
+        return list(seen.values())
+
+    def _start_ready(self, state, executor):
+        """Start the jobs which are ready, and report on them.
+
+        :returns: The number of jobs started.
+        """
+        now = time.monotonic()
+        ready = [
+            job
+            for job in state.queue
+            if all(dep.succeeded for dep in job.depends_on)
+            and all(other.done for other in job.run_after)
+            and state.not_before.get(job, now) <= now
+        ][: self.max_in_flight - len(state.running)]
+        for job in ready:
+            state.queue.remove(job)
+        for job in executor.map(self._start, ready):
+            if job.result == 'start_failed':
+                yield from self._fail(job, state)
+            elif job.task_id is None:
+                job.state = TaskJob.SUCCEEDED
+                yield TaskEvent(TaskEvent.SUCCEEDED, job, job.task)
+            else:
+                state.running[job.task_id] = job
+                state.watcher.add(job.task_id)
+                yield TaskEvent(TaskEvent.STARTED, job, job.task)
+        return len(ready)
+
+    def _poll(self, state):
+        """Poll the running tasks once, and report on them."""
+        timeout = entity_mixins.TASK_TIMEOUT if self.timeout is None else self.timeout
+        tasks = state.watcher.poll()
+        now = time.monotonic()
+        for task_id, job in list(state.running.items()):
+            task_info = tasks.get(task_id)
+            if task_info is not None:
+                progress = (job.task or {}).get('progress')
+                job.task = task_info
+                if _task_finished(task_info):
+                    job.result = task_info.get('result')
+                elif task_info.get('progress') != progress:
+                    yield TaskEvent(TaskEvent.PROGRESS, job, task_info)
+            if job.result is None and now - job.started_at > timeout:
+                job.result = 'timed_out'
+                state.watcher.discard(task_id)
+            if job.result is None:
+                continue
+            del state.running[task_id]
+            job.ended_at = now
+            if job.result == 'success':
+                job.state = TaskJob.SUCCEEDED
+                yield TaskEvent(TaskEvent.SUCCEEDED, job, job.task)
+            else:
+                yield from self._fail(job, state)
+
+    @staticmethod
+    def _start(job):
+        """Start ``job`` and record the outcome on it. Return ``job``."""
+        job.attempt += 1
+        job.state = TaskJob.RUNNING
+        job.task_id = job.task = job.result = job.error = job.ended_at = None
+        job.started_at = time.monotonic()
+        if job.first_started_at is None:
+            job.first_started_at = job.started_at
+        try:
+            response = job.start()
+        except RequestException as err:
+            job.error = err
+            job.result = 'start_failed'
+            job.ended_at = time.monotonic()
+            return job
+        job.task = response
+        if isinstance(response, dict) and 'id' in response:
+            job.task_id = response['id']
+        else:
+            job.result = 'success'
+            job.ended_at = job.started_at
+        return job
+
+    def _fail(self, job, state):
+        """Retry or fail ``job``, which has just failed, and report on it."""
+        if not self.retry_policy.should_retry(job):
+            job.state = TaskJob.FAILED
+            yield TaskEvent(TaskEvent.FAILED, job, job.task)
+            return
+        retry_at = time.monotonic() + self.retry_policy.get_delay(job)
+        logger.warning('Retrying %r, whose attempt %s failed: %s', job, job.attempt, job.result)
+        if job.split is not None:
+            job.state = TaskJob.SPLIT
+            job.children = job.split()
+            for child in job.children:
+                child.attempt = job.attempt
+                child.first_started_at = job.first_started_at
+                state.not_before[child] = retry_at
+            state.queue.extend(job.children)
+        else:
+            job.state = TaskJob.PENDING
+            state.not_before[job] = retry_at
+            state.queue.append(job)
+        yield TaskEvent(TaskEvent.RETRYING, job, job.task)
+
+
+def _item_events(events):
+    """Report each :class:`TaskEvent` in ``events`` once per item of its job."""
+    for event in events:
+        for item in event.job.items:
+            yield ItemEvent(event.kind, item, event.job)
+
+
+class RepositorySyncOrchestrator:
+    """Sync many repositories with a bounded number of sync tasks in flight.
+
+    Here is an example of how to use this class::
+
+        orchestrator = RepositorySyncOrchestrator(
+            server_config,
+            max_in_flight=8,
+            retry_policy=TaskRetryPolicy(max_attempts=3, delay=60),
+        )
+        for event in orchestrator.sync(query={'organization_id': org.id}):
+            print(event.kind, event.item.id, (event.job.task or {}).get('progress'))
+
+    Repositories are synced with :meth:`nailgun.entities.Repository.sync`, one
+    task per repository. However, if ``group_by_product`` is true and every
+    repository of a product is to be synced, the whole product is synced with
+    one task instead, by way of :meth:`nailgun.entities.Product.sync` or
+    :meth:`nailgun.entities.ProductBulkAction.sync`. A failed product sync is
+    retried one repository at a time.
+
+    :param server_config: A :class:`nailgun.config.ServerConfig` object.
+    :param max_in_flight: See :class:`TaskRunner`.
+    :param poll_rate: See :class:`TaskRunner`.
+    :param timeout: See :class:`TaskRunner`.
+    :param retry_policy: See :class:`TaskRunner`.
+    :param group_by_product: Sync whole products with one task, where
+        possible.
+    :param products_per_task: The maximum number of products synced by one
+        task.
+    """
+
+    def __init__(
+        self,
+        server_config,
+        *,
+        max_in_flight=4,
+        poll_rate=None,
+        timeout=None,
+        retry_policy=None,
+        group_by_product=True,
+        products_per_task=10,
+    ):
+        self._server_config = server_config
+        self.group_by_product = group_by_product
+        self.products_per_task = products_per_task
+        self.runner = TaskRunner(server_config, max_in_flight, poll_rate, timeout, retry_policy)
+
+    def jobs(self, repositories):
+        """Return the jobs needed to sync ``repositories``.
+
+        :param repositories: An iterable of
+            :class:`nailgun.entities.Repository` objects. Only repositories
+            whose ``product`` is set can be grouped by product.
+        :returns: A list of :class:`TaskJob` objects.
+        """
+        singles = []
+        by_product = {}
+        for repository in repositories:
+            product = getattr(repository, 'product', None)
+            if self.group_by_product and product is not None:
+                by_product.setdefault(product.id, []).append(repository)
+            else:
+                singles.append(repository)
+        whole_products = []
+        for product_id, product_repositories in by_product.items():
+            if len(product_repositories) > 1 and self._count_repositories(product_id) == len(
+                {repository.id for repository in product_repositories}
+            ):
+                whole_products.append((product_id, product_repositories))
+            else:
+                singles.extend(product_repositories)
+        jobs = self._repository_jobs(singles)
+        for i in range(0, len(whole_products), self.products_per_task):
+            jobs.append(self._products_job(whole_products[i : i + self.products_per_task]))
+        return jobs
+
+    def sync(self, repositories=None, query=None):
+        """Sync repositories and report on each of them.
+
+        :param repositories: An iterable of
+            :class:`nailgun.entities.Repository` objects. If ``None``, the
+            repositories are found by searching with ``query``.
+        :param query: A search query, as accepted by
+            :meth:`nailgun.entities.Repository.search`.
+        :returns: A generator of :class:`ItemEvent` objects, whose items are
+            repositories.
+        """
+        if repositories is None:
+            repositories = entities.Repository(self._server_config).search(query=query)
+        return _item_events(self.runner.run(self.jobs(repositories)))
+
+    def _count_repositories(self, product_id):
+        """Return how many repositories the product with ID ``product_id`` has."""
+        return entities.Repository(self._server_config, product=product_id).count({'product'})
+
+    @staticmethod
+    def _repository_job(repository):
+        """Return a job which syncs ``repository``."""
+        return TaskJob(
+            partial(repository.sync, synchronous=False),
+            label=f'sync repository {repository.id}',
+            items=[repository],
+        )
+
+    def _products_job(self, products):
+        """Return a job which syncs whole products.
+
+        :param products: A list of ``(product_id, repositories)`` tuples.
+        """
+        product_ids = [product_id for product_id, _ in products]
+        if len(product_ids) == 1:
+            product = entities.Product(self._server_config, id=product_ids[0])
+            start = partial(product.sync, synchronous=False)
+        else:
+            bulk_action = entities.ProductBulkAction(self._server_config)
+            start = partial(bulk_action.sync, synchronous=False, data={'ids': product_ids})
+        repositories = [repository for _, repositories in products for repository in repositories]
+        return TaskJob(
+            start,
+            label=f'sync products {product_ids}',
+            items=repositories,
+            split=partial(self._repository_jobs, repositories),
+        )
+
+    def _repository_jobs(self, repositories):
+        """Return a list of jobs, each of which syncs one of ``repositories``."""
+        return [self._repository_job(repository) for repository in repositories]
+
+
+def critical_path(jobs):
+    """Find the chain of dependent jobs which took the longest to run.
+
+    The critical path bounds how long ``jobs`` take to run, however many tasks
+    may be in flight at once. Jobs which never ran count as taking no time.
+
+    :param jobs: An iterable of :class:`TaskJob` objects which have been run.
+    :returns: A ``(seconds, path)`` tuple, where ``path`` is a list of jobs,
+        each of which depends on the previous one.
+    """
+    longest = {}  # id(job) → (seconds, path)
+
+    def visit(job):
+        if id(job) not in longest:
+            seconds, path = max(
+                (visit(dependency) for dependency in job.depends_on),
+                key=lambda chain: chain[0],
+                default=(0, []),
+            )
+            longest[id(job)] = (seconds + (job.duration or 0), [*path, job])
+        return longest[id(job)]
+
+    return max((visit(job) for job in jobs), key=lambda chain: chain[0], default=(0, []))
+
+
+#: The outcome of :meth:`ContentViewPipeline.run`.
+#:
+#: ``jobs`` is a list of the jobs run, ``failed`` lists those of them which
+#: failed or were skipped, ``elapsed`` is the number of seconds the run took and
+#: ``critical_path`` is the result of :func:`critical_path`.
+PipelineReport = namedtuple('PipelineReport', ('jobs', 'failed', 'elapsed', 'critical_path'))
+
+
+class ContentViewPipeline:
+    """Publish content views and promote them along lifecycle paths.
+
+    Here is an example of how to use this class::
+
+        pipeline = ContentViewPipeline(server_config, max_in_flight=6)
+        report = pipeline.run(
+            content_views=[base_os, app, composite],
+            environments=[dev, qa, prod],
+            promote=[composite],
+        )
+        seconds, path = report.critical_path
+        print(f'{len(report.failed)} jobs failed, critical path: {seconds}s via {path}')
+
+    The order in which things must happen is read from the server:
+
+    * A composite content view is published after those of its components
+      which are being published and which track the ``latest`` version.
+    * A content view is promoted to an environment after it is published and
+      after it is promoted to the environment's ``prior`` environment, if that
+      environment is also being promoted to.
+
+    Everything else happens concurrently, with up to ``max_in_flight`` tasks
+    running at once. If a publish or promotion fails, everything that depends
+    on it is skipped, but everything else carries on.
+
+    :param server_config: A :class:`nailgun.config.ServerConfig` object.
+    :param max_in_flight: See :class:`TaskRunner`.
+    :param poll_rate: See :class:`TaskRunner`.
+    :param timeout: See :class:`TaskRunner`.
+    :param retry_policy: See :class:`TaskRunner`.
+    """
+
+    def __init__(
+        self,
+        server_config,
+        *,
+        max_in_flight=4,
+        poll_rate=None,
+        timeout=None,
+        retry_policy=None,
+    ):
+        self._server_config = server_config
+        self.runner = TaskRunner(server_config, max_in_flight, poll_rate, timeout, retry_policy)
+
+    def jobs(self, content_views, environments=(), promote=None):
+        """Return the jobs needed to publish and promote content views.
+
+        :param content_views: An iterable of
+            :class:`nailgun.entities.ContentView` objects to publish. They are
+            read from the server if ``composite`` or ``content_view_component``
+            is unknown.
+        :param environments: An iterable of
+            :class:`nailgun.entities.LifecycleEnvironment` objects to promote
+            to. They are read from the server if ``prior`` is unknown. An
+            environment without a ``prior``, such as "Library", is ignored.
+        :param promote: The content views, out of ``content_views``, which
+            should be promoted. Defaults to all of them.
+        :returns: A list of :class:`TaskJob` objects.
+        """
+        content_views = [self._read_unless(cv, 'composite') for cv in content_views]
+        publishes = {cv.id: self._publish_job(cv) for cv in content_views}
+        for cv in content_views:
+            publishes[cv.id].depends_on = [
+                publishes[component_id]
+                for component_id in self._component_ids(cv)
+                if component_id in publishes
+            ]
+        environments = [
+            environment
+            for environment in (self._read_unless(env, 'prior') for env in environments)
+            if environment.prior is not None
+        ]
+        jobs = list(publishes.values())
+        promote_ids = set(publishes) if promote is None else {cv.id for cv in promote}
+        for cv in content_views:
+            if cv.id in promote_ids:
+                jobs.extend(self._promote_jobs(cv, publishes[cv.id], environments))
+        return jobs
+
+    def run(self, content_views, environments=(), promote=None):
+        """Publish and promote content views, and report on how it went.
+
+        The arguments are as for :meth:`jobs`. To follow progress as it is
+        made, pass the jobs to ``self.runner.run`` instead.
+
+        :returns: A :class:`PipelineReport`.
+        """
+        jobs = self.jobs(content_views, environments, promote)
+        started_at = time.monotonic()
+        ran = self.runner.run_all(jobs)
+        return PipelineReport(
+            jobs=jobs,
+            failed=[job for job in jobs if job.failed],
+            elapsed=time.monotonic() - started_at,
+            critical_path=critical_path(ran),
+        )
+
+    @staticmethod
+    def _read_unless(entity, field_name):
+        """Return ``entity``, read from the server if ``field_name`` is unknown."""
+        return entity if hasattr(entity, field_name) else entity.read()
+
+    @staticmethod
+    def _component_ids(content_view):
+        """Return the IDs of the content views a composite tracks the latest version of."""
+        if not content_view.composite:
+            return []
+        components = getattr(content_view, 'content_view_component', None) or []
+        components = [component.read() for component in components]
+        return [component.content_view.id for component in components if component.latest]
+
+    @staticmethod
+    def _publish_job(content_view):
+        """Return a job which publishes ``content_view``."""
+        return TaskJob(
+            partial(content_view.publish, synchronous=False),
+            label=f'publish content view {content_view.id}',
+            items=[content_view],
+        )
+
+    def _promote_jobs(self, content_view, publish, environments):
+        """Return jobs which promote ``content_view`` to each of ``environments``.
+
+        :param publish: The job which publishes ``content_view``.
+        """
+        promotions = {}
+        for environment in environments:
+            promotions[environment.id] = TaskJob(
+                partial(self._promote, content_view, publish, environment),
+                label=f'promote content view {content_view.id} to environment {environment.id}',
+                items=[content_view, environment],
+            )
+        for environment in environments:
+            # Each promotion depends on the publish, either directly or by way
+            # of the promotion to the prior environment.
+            promotions[environment.id].depends_on = [promotions.get(environment.prior.id, publish)]
+        return list(promotions.values())
+
+    def _promote(self, content_view, publish, environment):
+        """Promote the version of ``content_view`` made by ``publish``.
+
+        The publish task names the version it made. If it does not, the latest
+        version of ``content_view`` is promoted instead.
+        """
+        version_id = ((publish.task or {}).get('input') or {}).get('content_view_version_id')
+        if version_id is None:
+            versions = content_view.read().version
+            version_id = max(version.id for version in versions)
+        version = entities.ContentViewVersion(self._server_config, id=version_id)
+        return version.promote(synchronous=False, data={'environment_ids': [environment.id]})
+
+
+#: The :class:`nailgun.entities.Host` methods which :class:`HostBulkAction` can
+#: run. Each of them accepts a selection of hosts as ``included`` in its
+#: payload.
+HOST_BULK_ACTIONS = (
+    'bulk_applicable_errata',
+    'bulk_destroy',
+    'bulk_installable_errata',
+    'bulk_manage_notifications',
+    'bulk_resolve_traces',
+    'bulk_traces',
+)
+
+#: The outcome of :meth:`HostBulkAction.run`.
+#:
+#: ``jobs`` is a list of the jobs run, one per chunk of hosts. ``results`` is a
+#: list of the results the server returned directly, such as errata or traces,
+#: merged across chunks. ``tasks`` is a list with the final information about
+#: each task the server started. ``failed_host_ids`` is a sorted list of the IDs
+#: of the hosts in chunks which failed, and ``elapsed`` is the number of seconds
+#: the run took.
+HostBulkReport = namedtuple(
+    'HostBulkReport', ('jobs', 'results', 'tasks', 'failed_host_ids', 'elapsed')
+)
+
+
+class HostBulkAction:
+    """Run a host bulk action on many hosts, a chunk of hosts at a time.
+
+    Here is an example of how to use this class::
+
+        action = HostBulkAction(server_config, 'bulk_applicable_errata')
+        report = action.run(
+            search='os = RedHat',
+            data={'organization_id': org.id},
+        )
+        print(len(report.results), 'errata;', len(report.failed_host_ids), 'hosts failed')
+
+    Passing thousands of hosts to a bulk action in one request runs into
+    request size limits and server timeouts. This class splits the hosts into
+    chunks of at most ``chunk_size`` hosts, and runs the action once per chunk,
+    with up to ``max_in_flight`` chunks in flight at once. Chunks are made
+    smaller when there are too few hosts to fill every slot. If the retry policy
+    allows a chunk which failed to be run again, it is run again as two halves.
+
+    The items of the jobs made by this class are host IDs.
+
+    :param server_config: A :class:`nailgun.config.ServerConfig` object.
+    :param action: The name of the :class:`nailgun.entities.Host` method to
+        run. One of :data:`HOST_BULK_ACTIONS`.
+    :param chunk_size: The maximum number of hosts passed to one call of
+        ``action``.
+    :param max_in_flight: See :class:`TaskRunner`.
+    :param poll_rate: See :class:`TaskRunner`.
+    :param timeout: See :class:`TaskRunner`.
+    :param retry_policy: See :class:`TaskRunner`.
+    :param search_page_size: The number of host IDs fetched per request when
+        hosts are selected with a search.
+    :raises: ``ValueError`` If ``action`` or ``chunk_size`` is invalid.
+    """
+
+    def __init__(
+        self,
+        server_config,
+        action,
+        *,
+        chunk_size=500,
+        max_in_flight=4,
+        poll_rate=None,
+        timeout=None,
+        retry_policy=None,
+        search_page_size=1000,
+    ):
+        if action not in HOST_BULK_ACTIONS:
+            raise ValueError(f'action must be one of {HOST_BULK_ACTIONS}, not {action!r}.')
+        if chunk_size < 1:
+            raise ValueError(f'chunk_size must be at least 1, not {chunk_size}.')
+        self._server_config = server_config
+        self.action = action
+        self.chunk_size = chunk_size
+        self.search_page_size = search_page_size
+        self.runner = TaskRunner(server_config, max_in_flight, poll_rate, timeout, retry_policy)
+
+    def host_ids(self, search):
+        """Return the IDs of the hosts matching a search, a page at a time.
+
+        :param search: A search string, such as ``'os = RedHat'``.
+        :returns: A list of host IDs.
+        """
+        host = entities.Host(self._server_config)
+        host_ids = []
+        page = 1
+        while True:
+            response = host.search_json(
+                fields=set(),
+                query={
+                    'search': search,
+                    'thin': True,
+                    'page': page,
+                    'per_page': self.search_page_size,
+                },
+            )
+            host_ids.extend(result['id'] for result in response['results'])
+            if len(response['results']) < self.search_page_size:
+                return host_ids
+            page += 1
+
+    def jobs(self, host_ids=None, search=None, data=None):
+        """Return the jobs needed to run the action on a selection of hosts.
+
+        :param host_ids: An iterable of host IDs.
+        :param search: A search string selecting hosts. Used if ``host_ids``
+            is ``None``.
+        :param data: A dict of other arguments for the action, such as
+            ``organization_id``. The hosts of a chunk are added to it as
+            ``included``.
+        :returns: A list of :class:`TaskJob` objects.
+        """
+        if host_ids is None:
+            host_ids = self.host_ids(search)
+        host_ids = list(dict.fromkeys(host_ids))
+        if not host_ids:
+            return []
+        chunk_size = min(self.chunk_size, -(-len(host_ids) // self.runner.max_in_flight))
+        return [
+            self._chunk_job(host_ids[i : i + chunk_size], data or {})
+            for i in range(0, len(host_ids), chunk_size)
+        ]
+
+    def run(self, host_ids=None, search=None, data=None):
+        """Run the action on a selection of hosts, and merge the outcomes.
+
+        The arguments are as for :meth:`jobs`. To follow progress as it is
+        made, pass the jobs to ``self.runner.run`` instead, and call
+        :meth:`report` afterwards.
+
+        :returns: A :class:`HostBulkReport`.
+        """
+        jobs = self.jobs(host_ids, search, data)
+        started_at = time.monotonic()
+        self.runner.run_all(jobs)
+        return self.report(jobs, time.monotonic() - started_at)
+
+    @staticmethod
+    def report(jobs, elapsed=None):
+        """Merge the outcomes of ``jobs``, which have been run.
+
+        :param jobs: The jobs returned by :meth:`jobs`.
+        :param elapsed: The number of seconds the jobs took to run.
+        :returns: A :class:`HostBulkReport`.
+        """
+        results = []
+        tasks = []
+        failed_host_ids = []
+        for job in (leaf for job in jobs for leaf in _leaves(job)):
+            if not job.succeeded:
+                failed_host_ids.extend(job.items)
+            elif job.task_id is not None:
+                tasks.append(job.task)
+            elif isinstance(job.task, dict) and isinstance(job.task.get('results'), list):
+                results.extend(job.task['results'])
+            elif isinstance(job.task, list):
+                results.extend(job.task)
+            elif job.task is not None:
+                results.append(job.task)
+        return HostBulkReport(jobs, results, tasks, sorted(failed_host_ids), elapsed)
+
+    def _chunk_job(self, host_ids, data):
+        """Return a job which runs the action on the hosts with ``host_ids``."""
+        method = getattr(entities.Host(self._server_config), self.action)
+        data = {**data, 'included': {**data.get('included', {}), 'ids': host_ids}}
+        return TaskJob(
+            partial(method, synchronous=False, data=data),
+            label=f'{self.action} on {len(host_ids)} hosts',
+            items=host_ids,
+            split=partial(self._halve, host_ids, data) if len(host_ids) > 1 else None,
+        )
+
+    def _halve(self, host_ids, data):
+        """Return two jobs, which run the action on each half of ``host_ids``."""
+        half = len(host_ids) // 2
+        return [self._chunk_job(host_ids[:half], data), self._chunk_job(host_ids[half:], data)]
+
+
+def overall_progress(jobs):
+    """Return how far along ``jobs`` are, as a number between 0 and 1.
+
+    Each job counts equally. A job which is done counts as complete, and a
+    running job counts for the progress its task reports.
+
+    :param jobs: An iterable of :class:`TaskJob` objects.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return 1.0
+    total = 0.0
+    for job in jobs:
+        if job.done:
+            total += 1
+        elif job.state == TaskJob.RUNNING and isinstance(job.task, dict):
+            total += job.task.get('progress') or 0
+    return total / len(jobs)
+
+
+#: The outcome of :meth:`CapsuleSyncFanOut.run`.
+#:
+#: ``jobs`` is a list of the jobs run and ``failed`` lists those of them which
+#: failed or were skipped. ``durations`` maps each capsule ID to the number of
+#: seconds between its first sync starting and its last sync finishing, and
+#: ``elapsed`` is the number of seconds the run took. ``content_counts`` maps the
+#: ID of each capsule whose syncs all succeeded to its content counts.
+CapsuleSyncReport = namedtuple(
+    'CapsuleSyncReport', ('jobs', 'failed', 'durations', 'elapsed', 'content_counts')
+)
+
+
+class CapsuleSyncFanOut:
+    """Sync content to many capsules at once.
+
+    Here is an example of how to use this class::
+
+        fan_out = CapsuleSyncFanOut(server_config, max_in_flight=10)
+        report = fan_out.run(capsules, environments=[prod])
+        for capsule_id, seconds in sorted(report.durations.items()):
+            print(capsule_id, seconds, report.content_counts.get(capsule_id))
+
+    Each capsule is synced with :meth:`nailgun.entities.Capsule.content_sync`.
+    If ``environments`` are given, each capsule is synced only for those of
+    them which are attached to it, one environment at a time. Capsules which
+    have none of them attached are left alone. Use :meth:`sync` to follow the
+    syncs as they happen, and :func:`overall_progress` to turn their jobs into a
+    single progress figure.
+
+    :param server_config: A :class:`nailgun.config.ServerConfig` object.
+    :param max_in_flight: See :class:`TaskRunner`. This is also the number of
+        capsules queried at once for lifecycle environments and content
+        counts.
+    :param poll_rate: See :class:`TaskRunner`.
+    :param timeout: See :class:`TaskRunner`.
+    :param retry_policy: See :class:`TaskRunner`.
+    """
+
+    def __init__(
+        self,
+        server_config,
+        *,
+        max_in_flight=4,
+        poll_rate=None,
+        timeout=None,
+        retry_policy=None,
+    ):
+        self._server_config = server_config
+        self.runner = TaskRunner(server_config, max_in_flight, poll_rate, timeout, retry_policy)
+
+    def jobs(self, capsules, environments=None, data=None):
+        """Return the jobs needed to sync ``capsules``.
+
+        :param capsules: An iterable of :class:`nailgun.entities.Capsule`
+            objects.
+        :param environments: An iterable of
+            :class:`nailgun.entities.LifecycleEnvironment` objects, or
+            ``None`` to sync every environment attached to each capsule.
+        :param data: A dict of other arguments for
+            :meth:`nailgun.entities.Capsule.content_sync`, such as
+            ``skip_metadata_check``.
+        :returns: A list of :class:`TaskJob` objects.
+        """
+        capsules = list(capsules)
+        data = data or {}
+        if environments is None:
+            return [self._sync_job(capsule, data) for capsule in capsules]
+        environment_ids = [environment.id for environment in environments]
+        jobs = []
+        for capsule, attached in zip(
+            capsules, self._map(self._environment_ids, capsules), strict=True
+        ):
+            previous = []
+            for environment_id in environment_ids:
+                if environment_id in attached:
+                    job = self._sync_job(
+                        capsule, {**data, 'environment_id': environment_id}, run_after=previous
+                    )
+                    jobs.append(job)
+                    previous = [job]
+        return jobs
+
+    def sync(self, capsules, environments=None, data=None):
+        """Sync capsules and report on each of them.
+
+        The arguments are as for :meth:`jobs`.
+
+        :returns: A generator of :class:`ItemEvent` objects, whose items are
+            capsules.
+        """
+        return _item_events(self.runner.run(self.jobs(capsules, environments, data)))
+
+    def run(self, capsules, environments=None, data=None):
+        """Sync capsules, then fetch the content counts of those that synced.
+
+        The arguments are as for :meth:`jobs`.
+
+        :returns: A :class:`CapsuleSyncReport`.
+        """
+        capsules = list(capsules)
+        jobs = self.jobs(capsules, environments, data)
+        started_at = time.monotonic()
+        self.runner.run_all(jobs)
+        elapsed = time.monotonic() - started_at
+        by_capsule = {}
+        for job in jobs:
+            by_capsule.setdefault(job.items[0].id, []).append(job)
+        durations = {}
+        for capsule_id, capsule_jobs in by_capsule.items():
+            spans = [
+                (job.first_started_at, job.first_started_at + job.duration)
+                for job in capsule_jobs
+                if job.duration is not None
+            ]
+            if spans:
+                durations[capsule_id] = max(end for _, end in spans) - min(s for s, _ in spans)
+        synced = [
+            capsule
+            for capsule in capsules
+            if capsule.id in by_capsule and all(job.succeeded for job in by_capsule[capsule.id])
+        ]
+        return CapsuleSyncReport(
+            jobs=jobs,
+            failed=[job for job in jobs if job.failed],
+            durations=durations,
+            elapsed=elapsed,
+            content_counts=self.content_counts(synced),
+        )
+
+    def content_counts(self, capsules):
+        """Fetch the content counts of several capsules at once.
+
+        :param capsules: An iterable of :class:`nailgun.entities.Capsule`
+            objects.
+        :returns: A dict mapping capsule IDs to the server's responses.
+        :raises: ``requests.exceptions.HTTPError`` If the server responds with
+            an HTTP 4XX or 5XX message.
+        """
+        capsules = list(capsules)
+        counts = self._map(lambda capsule: capsule.content_counts(), capsules)
+        return {capsule.id: count for capsule, count in zip(capsules, counts, strict=True)}
+
+    def _map(self, function, capsules):
+        """Call ``function`` on each of ``capsules`` concurrently, and return a list."""
+        if not capsules:
+            return []
+        with ThreadPoolExecutor(max_workers=self.runner.max_in_flight) as executor:
+            return list(executor.map(function, capsules))
+
+    @staticmethod
+    def _environment_ids(capsule):
+        """Return the IDs of the lifecycle environments attached to ``capsule``."""
+        response = capsule.content_lifecycle_environments()
+        return {environment['id'] for environment in response['results']}
+
+    @staticmethod
+    def _sync_job(capsule, data, run_after=()):
+        """Return a job which syncs ``capsule``."""
+        label = f'sync capsule {capsule.id}'
+        if 'environment_id' in data:
+            label += f' for environment {data["environment_id"]}'
+        start = partial(capsule.content_sync, synchronous=False)
+        if data:
+            start = partial(start, data=data)
+        return TaskJob(start, label=label, items=[capsule], run_after=run_after)
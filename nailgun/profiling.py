@@ -0,0 +1,288 @@
+"""Profile the CPU time NailGun spends in entity methods and requests.
+
+A :class:`Profiler` profiles each call to an entity's ``create``, ``read``,
+``search``, ``update`` and ``delete`` methods, each task wait, and each request
+sent through :mod:`nailgun.client` outside of those. Profiles are kept apart by
+entity class and method, such as ``Host.create`` or ``client.GET``, and written
+to one file each per process::
+
+    with profiling.profile('/tmp/nailgun-profiles'):
+        run_job(server_config)
+
+Profiling can also be switched on without changing any code, by setting the
+``NAILGUN_PROFILE`` environment variable to a directory before NailGun is
+imported. Profiles are then written there when the process exits, and
+``NAILGUN_PROFILE_MODE`` chooses the mode.
+
+Two modes are supported:
+
+``'cprofile'``
+    Profile deterministically with :mod:`cProfile`, and write a file which
+    :mod:`pstats` can read, such as ``nailgun-1234-Host.create.pstats``. Only
+    one operation is profiled at a time: operations which run in other threads
+    meanwhile are not profiled, but are counted in :attr:`Profiler.skipped`.
+``'sample'``
+    Sample the stacks of the threads running operations every ``interval``
+    seconds, and write them in the collapsed stack format read by flame graph
+    tools, such as ``nailgun-1234-Host.create.collapsed``. This costs less,
+    and profiles all threads.
+
+Nested operations, like the ``read`` which a ``create`` does, are profiled as
+part of the outermost operation.
+
+"""
+
+import atexit
+import collections
+import contextlib
+import cProfile
+import logging
+import os
+import sys
+import threading
+import weakref
+
+from nailgun import client, entity_mixins
+
+logger = logging.getLogger(__name__)
+
+#: The modes a :class:`Profiler` can profile in.
+PROFILE_MODES = ('cprofile', 'sample')
+
+#: The file name extension of the profiles written in each mode.
+_EXTENSIONS = {'cprofile': 'pstats', 'sample': 'collapsed'}
+
+# Enabled profilers, so that they can be reset in forked processes.
+_profilers = weakref.WeakSet()
+
+
+def _label(operation):
+    """Return the name of the profile which ``operation`` is profiled in."""
+    if operation.name == 'poll_task':
+        return operation.name
+    return f'{type(operation.entity).__name__}.{operation.name}'
+
+
+def _collapse(frame):
+    """Return the stack of ``frame``, outermost call first, in the collapsed format."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{frame.f_globals.get("__name__", "?")}.{code.co_qualname}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class Profiler:
+    """Profile entity operations and requests, one profile per kind.
+
+    Call :meth:`enable` to start profiling and :meth:`write` to write the
+    profiles, or use :func:`profile`.
+
+    :param directory: Where to write profiles.
+    :param mode: One of :data:`PROFILE_MODES`.
+    :param interval: How often to sample stacks in the ``'sample'`` mode, in
+        seconds.
+    :raises ValueError: If ``mode`` is not supported.
+
+    .. attribute:: skipped
+
+        A :class:`collections.Counter` of the operations and requests which
+        were not profiled in the ``'cprofile'`` mode, by profile name, as
+        another was being profiled meanwhile.
+    """
+
+    def __init__(self, directory, mode='cprofile', interval=0.005):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f'mode must be one of {PROFILE_MODES}, not {mode!r}')
+        self.directory = directory
+        self.mode = mode
+        self.interval = interval
+        self._reset()
+
+    def _reset(self):
+        """Forget all profiles, and stop sampling."""
+        self._lock = threading.Lock()
+        # Only one cProfile profiler may run at a time.
+        self._cprofile_lock = threading.Lock()
+        self._profiles = {}
+        self.skipped = collections.Counter()
+        self._stacks = collections.defaultdict(collections.Counter)
+        self._running = {}
+        self._stopped = threading.Event()
+        self._sampler = None
+
+    def enable(self):
+        """Start profiling."""
+        _profilers.add(self)
+        if self.mode == 'sample':
+            self._start_sampling()
+        client.add_interceptor(self.intercept)
+        entity_mixins.add_observer(self.observe)
+
+    def disable(self):
+        """Stop profiling. The profiles are kept until written."""
+        entity_mixins.remove_observer(self.observe)
+        client.remove_interceptor(self.intercept)
+        self._stop_sampling()
+        _profilers.discard(self)
+
+    def observe(self, operation):
+        """Profile an operation. See :func:`nailgun.entity_mixins.add_observer`."""
+        if operation.parent is not None:
+            return contextlib.nullcontext()
+        return self._profiling(_label(operation))
+
+    def intercept(self, method, url, kwargs, send):
+        """Profile a request. See :func:`nailgun.client.add_interceptor`."""
+        if entity_mixins.current_operation() is not None:
+            return send()
+        with self._profiling(f'client.{method}'):
+            return send()
+
+    @contextlib.contextmanager
+    def _profiling(self, label):
+        """Profile the block in the profile named ``label``."""
+        if self.mode == 'sample':
+            ident = threading.get_ident()
+            self._running[ident] = label
+            try:
+                yield
+            finally:
+                self._running.pop(ident, None)
+            return
+        if not self._cprofile_lock.acquire(blocking=False):
+            with self._lock:
+                self.skipped[label] += 1
+            yield
+            return
+        try:
+            with self._lock:
+                profile = self._profiles.get(label)
+                if profile is None:
+                    profile = self._profiles[label] = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Some other profiler is running, so this one cannot.
+                profile = None
+                with self._lock:
+                    self.skipped[label] += 1
+            try:
+                yield
+            finally:
+                if profile is not None:
+                    profile.disable()
+        finally:
+            self._cprofile_lock.release()
+
+    def _start_sampling(self):
+        """Start a thread which samples the stacks of threads running operations."""
+        self._stopped.clear()
+        self._sampler = threading.Thread(target=self._sample, name='nailgun-profiler', daemon=True)
+        self._sampler.start()
+
+    def _stop_sampling(self):
+        """Stop sampling stacks, if sampling."""
+        if self._sampler is not None:
+            self._stopped.set()
+            self._sampler.join()
+            self._sampler = None
+
+    def _sample(self):
+        """Sample the stacks of threads running operations, until stopped."""
+        while not self._stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for ident, label in list(self._running.items()):
+                frame = frames.get(ident)
+                if frame is not None:
+                    stack = _collapse(frame)
+                    with self._lock:
+                        self._stacks[label][stack] += 1
+
+    def _after_fork(self):
+        """Forget the parent process' profiles, and sample in this process too."""
+        sampling = self._sampler is not None
+        self._reset()
+        if sampling:
+            self._start_sampling()
+
+    def write(self):
+        """Write each profile to a file named after this process and the profile.
+
+        A warning is logged if any operation was skipped. See :attr:`skipped`.
+
+        :returns: The paths of the files written.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        prefix = os.path.join(self.directory, f'nailgun-{os.getpid()}-')
+        extension = _EXTENSIONS[self.mode]
+        paths = []
+        with self._lock:
+            if self.mode == 'cprofile':
+                for label, profile in self._profiles.items():
+                    paths.append(f'{prefix}{label}.{extension}')
+                    profile.dump_stats(paths[-1])
+            else:
+                for label, stacks in self._stacks.items():
+                    paths.append(f'{prefix}{label}.{extension}')
+                    with open(paths[-1], 'w') as handle:
+                        handle.writelines(f'{stack} {count}\n' for stack, count in stacks.items())
+            skipped = sum(self.skipped.values())
+        if skipped:
+            logger.warning(
+                '%s operations were not profiled, as they overlapped others. '
+                'Profile in the sample mode to profile all of them.',
+                skipped,
+            )
+        return paths
+
+
+def _after_fork():
+    """Reset each enabled profiler in a newly forked process."""
+    for profiler in list(_profilers):
+        profiler._after_fork()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+@contextlib.contextmanager
+def profile(directory, mode='cprofile', interval=0.005):
+    """Profile the entity operations and requests made within the block.
+
+    The profiles are written when the block exits. See :class:`Profiler` for
+    the arguments.
+
+    :returns: A context manager which yields a :class:`Profiler`.
+    """
+    profiler = Profiler(directory, mode, interval)
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.write()
+
+
+def enable_from_environment():
+    """Start profiling if the ``NAILGUN_PROFILE`` environment variable is set.
+
+    Profiles are written to the directory it names when the process exits.
+    The mode is read from ``NAILGUN_PROFILE_MODE``, and is ``'cprofile'`` by
+    default. If the mode is not supported, a warning is logged, and nothing is
+    profiled.
+
+    :returns: The :class:`Profiler` started, or ``None``.
+    """
+    directory = os.environ.get('NAILGUN_PROFILE')
+    if not directory:
+        return None
+    try:
+        profiler = Profiler(directory, os.environ.get('NAILGUN_PROFILE_MODE', 'cprofile'))
+    except ValueError as err:
+        logger.warning('Not profiling, as NAILGUN_PROFILE_MODE is bad: %s', err)
+        return None
+    profiler.enable()
+    atexit.register(profiler.write)
+    return profiler
@@ -0,0 +1,358 @@
+"""Build search queries in Foreman's scoped search syntax.
+
+Most search endpoints accept a ``search`` parameter, which is a query in
+`scoped search <https://github.com/wvanbergen/scoped_search>`_ syntax, such as
+``name = "foo" and id > 5``. Writing such strings by hand is error prone, and
+values must be quoted and escaped. The classes in this module build them from
+Python expressions instead::
+
+    >>> from nailgun.query import SearchField as F
+    >>> query = (F('name') == 'foo') & ~F('id').in_([1, 2])
+    >>> str(query)
+    'name = "foo" and not (id ^ (1, 2))'
+
+A :class:`Query` may be passed as the ``search`` parameter of
+:meth:`nailgun.entity_mixins.EntitySearchMixin.search`, in which case it is
+checked against the fields of the entity being searched for::
+
+    >>> Host(server_config).search(query={'search': F('name').like('web')})
+
+:meth:`Query.compile` raises :class:`InvalidQueryError` if a query names a field
+the entity does not have, or compares a field with a value of the wrong kind.
+
+"""
+
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+
+from nailgun.entity_fields import (
+    BooleanField,
+    DateField,
+    DateTimeField,
+    EmailField,
+    FloatField,
+    IntegerField,
+    OneToManyField,
+    OneToOneField,
+    StringField,
+)
+
+# Field kinds, by the values they may be compared with.
+_NUMBER_FIELDS = (FloatField, IntegerField)
+_STRING_FIELDS = (EmailField, StringField)
+_DATE_FIELDS = (DateField, DateTimeField)
+_RELATION_FIELDS = (OneToManyField, OneToOneField)
+
+# Operators, by what they do.
+_RANGE_OPERATORS = ('<', '<=', '>', '>=')
+_LIKE_OPERATORS = ('~', '!~')
+_IN_OPERATORS = ('^', '!^')
+_TEST_OPERATORS = ('set?', 'null?')
+
+# The values each kind of field may be compared with, and how.
+_COMPARISONS = (
+    (BooleanField, (bool,), ('=', '!=')),
+    (_NUMBER_FIELDS, (int, float), ('=', '!=', *_RANGE_OPERATORS, *_IN_OPERATORS)),
+    (_DATE_FIELDS, (date, str), ('=', '!=', *_RANGE_OPERATORS)),
+    (
+        _STRING_FIELDS + _RELATION_FIELDS,
+        (str,),
+        ('=', '!=', *_RANGE_OPERATORS, *_LIKE_OPERATORS, *_IN_OPERATORS),
+    ),
+)
+
+
+class InvalidQueryError(ValueError):
+    """Indicates that a query does not fit the fields of an entity."""
+
+
+class Query(ABC):
+    """A search query, which can be combined with others.
+
+    Queries are combined with ``&`` (and), ``|`` (or) and ``~`` (not). Use
+    :class:`SearchField` to make the simplest queries.
+    """
+
+    def __and__(self, other):
+        """Return a query matching both ``self`` and ``other``."""
+        return And(self, other)
+
+    def __or__(self, other):
+        """Return a query matching either ``self`` or ``other``."""
+        return Or(self, other)
+
+    def __invert__(self):
+        """Return a query matching what ``self`` does not."""
+        return Not(self)
+
+    def __str__(self):
+        """Return the query in scoped search syntax, without checking it."""
+        return self.compile()
+
+    def __repr__(self):
+        """Return a string representation of the current object."""
+        return f'{self.__module__}.{type(self).__name__}({self.compile()!r})'
+
+    @abstractmethod
+    def compile(self, fields=None):
+        """Return the query in scoped search syntax.
+
+        :param fields: A dict mapping field names to
+            :class:`nailgun.entity_fields.Field` objects, as returned by
+            :meth:`nailgun.entity_mixins.Entity.get_fields`. If given, the
+            query is checked against them.
+        :returns: A string.
+        :raises nailgun.query.InvalidQueryError: If the query does not fit
+            ``fields``.
+        """
+
+
+class Raw(Query):
+    """A query written in scoped search syntax by hand. It is not checked.
+
+    :param text: The query.
+    """
+
+    def __init__(self, text):
+        self.text = text
+
+    def compile(self, fields=None):
+        """Return the query as given."""
+        return self.text
+
+
+class Condition(Query):
+    """A query comparing one field with a value.
+
+    Rather than making conditions directly, use the methods and operators of
+    :class:`SearchField`.
+
+    :param field_name: The name of a field.
+    :param operator: A scoped search operator, such as ``'='`` or ``'^'``.
+    :param value: The value to compare with. For the ``'^'`` and ``'!^'``
+        operators, this is a list of values. For the ``'set?'`` and ``'null?'``
+        operators, it is ignored.
+    """
+
+    def __init__(self, field_name, operator, value=None):
+        self.field_name = field_name
+        self.operator = operator
+        self.value = value
+
+    def compile(self, fields=None):
+        """Return the condition in scoped search syntax.
+
+        Values which are entities are replaced by their IDs. Comparing a
+        :class:`nailgun.entity_fields.OneToOneField` or
+        :class:`nailgun.entity_fields.OneToManyField` with IDs compares the
+        ``<field>_id`` search field.
+
+        :raises nailgun.query.InvalidQueryError: If a value is ``None``, even
+            if the condition is not checked. Use :meth:`SearchField.is_null`
+            instead.
+        """
+        field_name = self.field_name
+        values = self.value if self.operator in _IN_OPERATORS else [self.value]
+        values = [_get_id(value) for value in values]
+        if self.operator not in _TEST_OPERATORS and None in values:
+            raise InvalidQueryError(
+                f'Cannot compare {field_name!r} with None. Use is_null() or is_set() instead.'
+            )
+        if fields is not None:
+            field_name = _check(self, fields, values)
+        if self.operator in _TEST_OPERATORS:
+            return f'{self.operator} {field_name}'
+        if self.operator in _IN_OPERATORS:
+            return f'{field_name} {self.operator} ({", ".join(_format(v) for v in values)})'
+        return f'{field_name} {self.operator} {_format(values[0])}'
+
+
+class And(Query):
+    """A query matching all of several queries."""
+
+    def __init__(self, *queries):
+        self.queries = queries
+
+    def compile(self, fields=None):
+        """Return the query in scoped search syntax."""
+        return ' and '.join(_group(query, fields, Or) for query in self.queries)
+
+
+class Or(Query):
+    """A query matching any of several queries."""
+
+    def __init__(self, *queries):
+        self.queries = queries
+
+    def compile(self, fields=None):
+        """Return the query in scoped search syntax."""
+        return ' or '.join(_group(query, fields, And) for query in self.queries)
+
+
+class Not(Query):
+    """A query matching what another query does not."""
+
+    def __init__(self, query):
+        self.query = query
+
+    def compile(self, fields=None):
+        """Return the query in scoped search syntax."""
+        return f'not ({_compile(self.query, fields)})'
+
+
+class SearchField:
+    """Make :class:`Condition` objects about one field.
+
+    Comparison operators make conditions, as do the methods below::
+
+        >>> F = SearchField
+        >>> str(F('id') >= 5)
+        'id >= 5'
+        >>> str(F('name') != 'foo')
+        'name != "foo"'
+
+    :param name: The name of the field. When a query is checked against an
+        entity, this must be one of the entity's fields, or ``<field>_id``
+        for one of its :class:`nailgun.entity_fields.OneToOneField` or
+        :class:`nailgun.entity_fields.OneToManyField` fields.
+    """
+
+    # Comparisons make conditions, so instances cannot be hashed.
+    __hash__ = None
+
+    def __init__(self, name):
+        self.name = name
+
+    def __eq__(self, value):
+        """Match where the field equals ``value``, or has no value if it is ``None``."""
+        if value is None:
+            return self.is_null()
+        return Condition(self.name, '=', value)
+
+    def __ne__(self, value):
+        """Match where the field does not equal ``value``, or has one if it is ``None``."""
+        if value is None:
+            return self.is_set()
+        return Condition(self.name, '!=', value)
+
+    def __lt__(self, value):
+        """Match where the field is less than ``value``."""
+        return Condition(self.name, '<', value)
+
+    def __le__(self, value):
+        """Match where the field is at most ``value``."""
+        return Condition(self.name, '<=', value)
+
+    def __gt__(self, value):
+        """Match where the field is greater than ``value``."""
+        return Condition(self.name, '>', value)
+
+    def __ge__(self, value):
+        """Match where the field is at least ``value``."""
+        return Condition(self.name, '>=', value)
+
+    def in_(self, values):
+        """Match where the field equals one of ``values``."""
+        return Condition(self.name, '^', list(values))
+
+    def not_in(self, values):
+        """Match where the field equals none of ``values``."""
+        return Condition(self.name, '!^', list(values))
+
+    def like(self, value):
+        """Match where the field contains ``value``. ``*`` is a wildcard."""
+        return Condition(self.name, '~', value)
+
+    def not_like(self, value):
+        """Match where the field does not contain ``value``."""
+        return Condition(self.name, '!~', value)
+
+    def between(self, low, high):
+        """Match where the field is at least ``low`` and at most ``high``."""
+        return And(self >= low, self <= high)
+
+    def is_set(self):
+        """Match where the field has a value."""
+        return Condition(self.name, 'set?')
+
+    def is_null(self):
+        """Match where the field has no value."""
+        return Condition(self.name, 'null?')
+
+
+def _compile(query, fields):
+    """Compile ``query``, which may also be a string of scoped search syntax."""
+    return query if isinstance(query, str) else query.compile(fields)
+
+
+def _group(query, fields, other):
+    """Compile ``query``, in parentheses if it is a ``other`` or a string."""
+    text = _compile(query, fields)
+    return f'({text})' if isinstance(query, other | str | Raw) else text
+
+
+def _get_id(value):
+    """Return the ID of ``value`` if it is an entity, or ``value`` otherwise."""
+    if isinstance(value, bool | int | float | str | date) or value is None:
+        return value
+    return getattr(value, 'id', value)
+
+
+def _format(value):
+    """Return ``value`` in scoped search syntax."""
+    if isinstance(value, bool):
+        return str(value).lower()
+    if isinstance(value, int | float):
+        return str(value)
+    if isinstance(value, datetime):
+        value = value.strftime('%Y-%m-%d %H:%M:%S')
+    elif isinstance(value, date):
+        value = value.strftime('%Y-%m-%d')
+    escaped = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def _resolve_field(condition, fields, values):
+    """Find the field ``condition`` is about.
+
+    :returns: A ``(field_name, field)`` tuple, where ``field_name`` is the name
+        to search on. ``field`` is ``None`` if there is no such field.
+    """
+    field_name = condition.field_name
+    field = fields.get(field_name)
+    if field is None and field_name.endswith('_id'):
+        if isinstance(fields.get(field_name[: -len('_id')]), _RELATION_FIELDS):
+            return field_name, IntegerField()
+    elif isinstance(field, _RELATION_FIELDS) and condition.operator not in _TEST_OPERATORS:
+        if all(isinstance(value, int) for value in values):
+            return f'{field_name}_id', IntegerField()
+    return field_name, field
+
+
+def _check(condition, fields, values):
+    """Check ``condition``, with its ``values``, against ``fields``.
+
+    :returns: The name of the field to search on.
+    :raises nailgun.query.InvalidQueryError: If the condition does not fit.
+    """
+    field_name, field = _resolve_field(condition, fields, values)
+    if field is None:
+        raise InvalidQueryError(
+            f'Cannot search on {field_name!r}. Valid fields are {sorted(fields)}.'
+        )
+    if condition.operator in _TEST_OPERATORS:
+        return field_name
+    comparison = next(
+        (comparison for comparison in _COMPARISONS if isinstance(field, comparison[0])), None
+    )
+    if comparison is None:
+        raise InvalidQueryError(f'Cannot search on {field_name!r}, a {type(field).__name__}.')
+    _, value_kinds, operators = comparison
+    if condition.operator not in operators:
+        raise InvalidQueryError(f'Cannot use {condition.operator!r} on {field_name!r}.')
+    for value in values:
+        if not isinstance(value, value_kinds) or (
+            isinstance(value, bool) and bool not in value_kinds
+        ):
+            raise InvalidQueryError(f'Cannot compare {field_name!r} with {value!r}.')
+    return field_name
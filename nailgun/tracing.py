@@ -0,0 +1,132 @@
+"""Trace entity operations, the requests they send and the tasks they wait for.
+
+A :class:`Tracing` object starts a span for each call to an entity's
+``create``, ``read``, ``search``, ``update`` and ``delete`` methods, for each
+task wait, and for each request sent through :mod:`nailgun.client`. Spans
+started while another is current are its children, so that the requests and
+task waits an operation causes are shown as part of it::
+
+    with tracing.trace():
+        Host(server_config, ...).create(create_missing=True)
+
+Spans are started with an `OpenTelemetry`_ tracer. By default the tracer is
+got from ``opentelemetry.trace``, which must be configured for the spans to be
+exported. Any object with a compatible ``start_as_current_span`` method may be
+given instead. If no tracer is given and OpenTelemetry is not installed,
+nothing is traced, and nothing is slowed down.
+
+.. _OpenTelemetry: https://opentelemetry.io/docs/languages/python/
+
+"""
+
+import contextlib
+from http import HTTPStatus
+
+from nailgun import client, entity_mixins
+from nailgun.metrics import template_path
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+
+def _operation_attributes(operation):
+    """Return the span attributes of an entity operation or task wait."""
+    attributes = {'nailgun.operation': operation.name}
+    if operation.entity is not None:
+        attributes['nailgun.entity'] = type(operation.entity).__name__
+        entity_id = getattr(operation.entity, 'id', None)
+        if entity_id is not None:
+            attributes['nailgun.entity.id'] = entity_id
+    if operation.task_id is not None:
+        attributes['nailgun.task.id'] = operation.task_id
+    return attributes
+
+
+class Tracing:
+    """Start a span for each entity operation, task wait and request.
+
+    Call :meth:`enable` to start tracing, or use :func:`trace`.
+
+    Operation spans are named after the entity class and method, such as
+    ``Host.create``, and task wait spans ``poll_task``. Both have the
+    attributes ``nailgun.operation``, ``nailgun.entity`` and, if known,
+    ``nailgun.entity.id`` and ``nailgun.task.id``. Request spans are named
+    after the HTTP method and templated path (see
+    :func:`nailgun.metrics.template_path`), and have the usual OpenTelemetry
+    HTTP client attributes. They also have the attributes
+    ``nailgun.request.id`` and ``nailgun.server.duration``, if the server sent
+    a request ID and said how long it spent on the request. See
+    :func:`nailgun.client.response_metadata`.
+
+    :param tracer: An OpenTelemetry tracer, or ``None`` to get one from
+        ``opentelemetry.trace``, if installed.
+    """
+
+    def __init__(self, tracer=None):
+        if tracer is None and otel_trace is not None:
+            tracer = otel_trace.get_tracer(__name__)
+        self.tracer = tracer
+
+    def enable(self):
+        """Start tracing. Do nothing if there is no tracer."""
+        if self.tracer is None:
+            return
+        client.add_interceptor(self.intercept)
+        entity_mixins.add_observer(self.observe)
+
+    def disable(self):
+        """Stop tracing."""
+        if self.tracer is None:
+            return
+        entity_mixins.remove_observer(self.observe)
+        client.remove_interceptor(self.intercept)
+
+    def observe(self, operation):
+        """Start a span for an operation. See :func:`nailgun.entity_mixins.add_observer`."""
+        if operation.name == 'poll_task':
+            name = operation.name
+        else:
+            name = f'{type(operation.entity).__name__}.{operation.name}'
+        return self._start_span(name, _operation_attributes(operation), outgoing=False)
+
+    def intercept(self, method, url, kwargs, send):
+        """Send a request in a span. See :func:`nailgun.client.add_interceptor`."""
+        path = template_path(url)
+        attributes = {'http.request.method': method, 'url.full': url, 'url.template': path}
+        with self._start_span(f'{method} {path}', attributes, outgoing=True) as span:
+            response = send()
+            span.set_attribute('http.response.status_code', response.status_code)
+            metadata = client.response_metadata(response)
+            if metadata.request_id is not None:
+                span.set_attribute('nailgun.request.id', metadata.request_id)
+            if metadata.server_seconds is not None:
+                span.set_attribute('nailgun.server.duration', metadata.server_seconds)
+            if response.status_code >= HTTPStatus.BAD_REQUEST:
+                span.set_attribute('error.type', str(response.status_code))
+                if otel_trace is not None:
+                    span.set_status(otel_trace.StatusCode.ERROR)
+            return response
+
+    def _start_span(self, name, attributes, outgoing):
+        """Start a span as the current one, of the client kind if ``outgoing``."""
+        if otel_trace is None:
+            return self.tracer.start_as_current_span(name, attributes=attributes)
+        kind = otel_trace.SpanKind.CLIENT if outgoing else otel_trace.SpanKind.INTERNAL
+        return self.tracer.start_as_current_span(name, kind=kind, attributes=attributes)
+
+
+@contextlib.contextmanager
+def trace(tracer=None):
+    """Trace the entity operations, task waits and requests made within the block.
+
+    :param tracer: See :class:`Tracing`.
+    :returns: A context manager which yields a :class:`Tracing`.
+    """
+    tracing = Tracing(tracer)
+    tracing.enable()
+    try:
+        yield tracing
+    finally:
+        tracing.disable()
@@ -44,7 +44,8 @@ setup(
         'Programming Language :: Python :: 3.13',
         'Programming Language :: Python :: 3.14',
     ],
-    packages=find_packages(exclude=['docs', 'tests']),
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*', 'docs', 'tests']),
     install_requires=REQUIREMENTS,
+    extras_require={'tracing': ['opentelemetry-api']},
     python_requires='>=3.12',
 )
@@ -0,0 +1,26 @@
+"""Helpers shared by the unit tests."""
+
+from unittest import TestCase, mock
+
+from nailgun import entities, entity_mixins
+from nailgun.fake_server import FakeServer
+
+
+class FakeServerCase(TestCase):
+    """A test case which sends requests to a :class:`nailgun.fake_server.FakeServer`.
+
+    Each test gets a fresh server, installed for the length of the test, as
+    ``self.server``, and a server configuration for it as ``self.cfg``. Tasks
+    are polled without waiting.
+    """
+
+    #: The entity types the server serves.
+    entity_types = (entities.Organization, entities.Product, entities.SmartProxy)
+    #: How many times each task is polled before it finishes.
+    task_polls = 1
+
+    def setUp(self):
+        """Make a server, and send requests to it."""
+        self.server = FakeServer(entity_types=self.entity_types, task_polls=self.task_polls)
+        self.cfg = self.enterContext(self.server.install())
+        self.enterContext(mock.patch.object(entity_mixins, 'TASK_POLL_RATE', 0))
@@ -0,0 +1,129 @@
+"""Tests for :mod:`nailgun.budget`."""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from nailgun import client, entities
+from nailgun.budget import BudgetExceededError, RequestBudget
+from tests.helpers import FakeServerCase
+
+# Due to the length of the with statements, nested is preferred over combined
+# ruff: noqa: SIM117
+
+
+class RequestBudgetTestCase(FakeServerCase):
+    """Tests for :class:`nailgun.budget.RequestBudget`."""
+
+    task_polls = 3
+
+    def setUp(self):
+        """Make a server holding several products."""
+        super().setUp()
+        org = entities.Organization(self.cfg, name='org').create()
+        self.products = [
+            entities.Product(self.cfg, name=f'product-{i}', organization=org).create()
+            for i in range(12)
+        ]
+
+    def read_each(self):
+        """Read each product, one request at a time."""
+        return [entities.Product(self.cfg, id=product.id).read() for product in self.products]
+
+    def test_counts(self):
+        """Count requests by HTTP method and templated path."""
+        with RequestBudget() as budget:
+            entities.Product(self.cfg).search()
+            self.products[0].read()
+            self.products[1].read()
+        self.assertEqual(
+            dict(budget.counts),
+            {('GET', '/katello/api/v2/products'): 1, ('GET', '/katello/api/v2/products/{id}'): 2},
+        )
+        self.assertEqual(budget.total, 3)
+        self.assertEqual(budget.reads(), {'/katello/api/v2/products': 2})
+        self.assertEqual(client._interceptors, ())
+
+    def test_n_plus_one(self):
+        """Warn of many reads from one collection, and ignore task polls."""
+        with self.assertLogs('nailgun.budget', 'WARNING') as logs:
+            with RequestBudget() as budget:
+                self.read_each()
+                self.products[0].delete()
+        self.assertEqual(budget.n_plus_one(), {'/katello/api/v2/products': 12})
+        self.assertEqual(budget.counts['GET', '/foreman_tasks/api/tasks/{id}'], 4)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('12 reads from /katello/api/v2/products', logs.output[0])
+        self.assertIn('Likely N+1', budget.report())
+
+    def test_exceeded(self):
+        """Fail when a limit is exceeded."""
+        for kwargs, message in (
+            ({'max_requests': 11}, '12 requests, more than 11'),
+            ({'max_per_endpoint': 10}, '12 GET /katello/api/v2/products/{id} requests'),
+            ({'max_reads': 5}, '12 reads from /katello/api/v2/products, more than 5'),
+        ):
+            with self.subTest(kwargs):
+                with self.assertRaises(BudgetExceededError) as context:
+                    with RequestBudget(**kwargs):
+                        self.read_each()
+                self.assertIn(message, str(context.exception))
+        with RequestBudget(max_requests=12, max_per_endpoint=12, max_reads=12):
+            self.read_each()
+
+    def test_decorator(self):
+        """Count each call of a decorated function afresh."""
+        budget = RequestBudget(max_requests=1)
+        read = budget(self.products[0].read)
+        read()
+        read()
+        self.assertEqual(budget.total, 1)
+        with self.assertRaises(BudgetExceededError):
+            budget(self.read_each)()
+
+    def test_reentry(self):
+        """Count and check the requests of the outermost block, when entered again within it."""
+        budget = RequestBudget(max_requests=2)
+
+        @budget
+        def read(products):
+            if len(products) > 1:
+                read(products[1:])
+            products[0].read()
+
+        read(self.products[:2])
+        self.assertEqual(budget.total, 2)
+        self.assertEqual(client._interceptors, ())
+        with self.assertRaises(BudgetExceededError):
+            read(self.products[:3])
+        self.assertEqual(client._interceptors, ())
+
+    def test_threads(self):
+        """Count and check the requests of concurrent calls of a decorated function apart."""
+        budget = RequestBudget(max_requests=3)
+        # Both calls are within the block while the other, and the main
+        # thread, which is not, send their requests.
+        barrier = threading.Barrier(3)
+
+        @budget
+        def read(products):
+            barrier.wait()
+            for product in products:
+                product.read()
+            barrier.wait()
+            return budget.total
+
+        with ThreadPoolExecutor(2) as executor:
+            totals = executor.map(read, (self.products[:1], self.products[1:4]))
+            barrier.wait()
+            self.read_each()
+            barrier.wait()
+            self.assertEqual(list(totals), [1, 3])
+        self.assertEqual(budget.total, 0)
+        self.assertEqual(client._interceptors, ())
+
+    def test_error(self):
+        """Let an error raised in the block through, rather than check the budget."""
+        with self.assertRaises(ValueError):
+            with RequestBudget(max_requests=0):
+                self.read_each()
+                raise ValueError
@@ -0,0 +1,180 @@
+"""Tests for :mod:`nailgun.cassette`."""
+
+import gzip
+import io
+import json
+import os
+import tempfile
+from unittest import TestCase, mock
+
+import requests
+
+from nailgun import cassette, client, entities, entity_mixins
+from nailgun.cassette import CassetteError
+from nailgun.fake_server import FakeServer
+
+# Due to the length of the with statements, nested is preferred over combined
+# ruff: noqa: SIM117
+
+
+class CassetteTestCase(TestCase):
+    """Tests for :func:`nailgun.cassette.record` and :func:`nailgun.cassette.replay`."""
+
+    def setUp(self):
+        """Make a server to record requests to, and a place for cassettes."""
+        self.server = FakeServer(
+            entity_types=(entities.Organization, entities.Product, entities.SmartProxy),
+            task_polls=1,
+        )
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cassette.jsonl')
+        patcher = mock.patch.object(entity_mixins, 'TASK_POLL_RATE', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_job(self, server_config):
+        """Make several requests, including task polls, and return their results."""
+        org = entities.Organization(server_config, name='org').create()
+        product = entities.Product(server_config, name='foo', organization=org).create()
+        return [
+            product.read().name,
+            [product.name for product in entities.Product(server_config).search()],
+            product.sync()['result'],
+        ]
+
+    def record(self, path):
+        """Run the job against the server, and record it in a cassette at ``path``."""
+        with self.server.install() as server_config, cassette.record(path):
+            return self.run_job(server_config)
+
+    def test_replay(self):
+        """Replay a job with the same results, though the server is not installed."""
+        for path in (self.path, f'{self.path}.gz'):
+            with self.subTest(path):
+                recorded = self.record(path)
+                with cassette.replay(path):
+                    self.assertEqual(self.run_job(self.server.server_config), recorded)
+
+    def test_format(self):
+        """Write a header, then one line of JSON per request."""
+        self.record(f'{self.path}.gz')
+        with gzip.open(f'{self.path}.gz', 'rt') as handle:
+            lines = [json.loads(line) for line in handle]
+        self.assertEqual(lines[0], {'nailgun_cassette': cassette.FORMAT_VERSION})
+        methods = [(line['method'], line['url'].split('/')[-1]) for line in lines[1:]]
+        task_id = lines[-1]['url'].split('/')[-1]
+        self.assertEqual(
+            methods,
+            [
+                ('POST', 'organizations'),
+                ('GET', '2'),
+                ('POST', 'products'),
+                ('GET', '3'),
+                ('GET', 'products'),
+                ('POST', 'sync'),
+                ('GET', task_id),
+                ('GET', task_id),
+            ],
+        )
+
+    def test_order(self):
+        """Hand out responses to requests made in another order than recorded."""
+        self.record(self.path)
+        server_config = self.server.server_config
+        with cassette.replay(self.path):
+            products = entities.Product(server_config).search()
+            with self.assertRaises(CassetteError):
+                entities.Product(server_config).search()
+        self.assertEqual([product.name for product in products], ['foo'])
+        with cassette.replay(self.path, window=1):
+            with self.assertRaises(CassetteError):
+                entities.Product(server_config).search()
+
+    def test_match_body(self):
+        """Only hand out a response to a request with the same body, if asked to."""
+        self.record(self.path)
+        server_config = self.server.server_config
+        with cassette.replay(self.path, match_body=True):
+            with self.assertRaises(CassetteError):
+                entities.Organization(server_config, name='other').create()
+        with cassette.replay(self.path):
+            org = entities.Organization(server_config, name='other').create()
+        self.assertEqual(org.name, 'org')
+
+    def test_latency(self):
+        """Wait before handing out each response, if asked to."""
+        self.record(self.path)
+        server_config = self.server.server_config
+        for latency in ('recorded', 2):
+            with self.subTest(latency):
+                with cassette.replay(self.path, latency=latency):
+                    with mock.patch('time.sleep') as sleep:
+                        entities.Organization(server_config, name='org').create()
+                delays = [call[0][0] for call in sleep.call_args_list]
+                self.assertEqual(len(delays), 2)
+                if latency == 'recorded':
+                    self.assertTrue(all(0 < delay < 1 for delay in delays), delays)
+                else:
+                    self.assertEqual(delays, [latency, latency])
+
+    def test_errors(self):
+        """Record errors raised by requests, and raise them again on replay."""
+        url = 'https://satellite.example.com/api/v2/hosts'
+        with cassette.record(self.path):
+            with mock.patch.object(requests, 'get', side_effect=requests.ConnectionError('no')):
+                with self.assertRaises(requests.ConnectionError):
+                    client.get(url)
+        with cassette.replay(self.path):
+            with self.assertRaises(requests.ConnectionError):
+                client.get(url)
+
+    def test_binary(self):
+        """Record binary request and response bodies."""
+        url = 'https://satellite.example.com/pub/file'
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'\xff\x00'
+        with cassette.record(self.path):
+            with mock.patch.object(requests, 'put', return_value=response):
+                client.put(url, b'\xfe', headers={'content-type': 'application/octet-stream'})
+        with cassette.replay(self.path, match_body=True):
+            response = client.put(
+                url, b'\xfe', headers={'content-type': 'application/octet-stream'}
+            )
+        self.assertEqual(response.content, b'\xff\x00')
+
+    def test_streamed(self):
+        """Write streamed response bodies to blob files, rather than the cassette."""
+        url = 'https://satellite.example.com/pub/file'
+        body = os.urandom(3 * cassette._BLOB_CHUNK_SIZE // 2)
+        response = requests.Response()
+        response.status_code = 200
+        response.raw = io.BytesIO(body)
+        with cassette.record(self.path):
+            with mock.patch.object(requests, 'get', return_value=response):
+                recorded = client.get(url, response_mode='stream')
+            self.assertEqual(b''.join(recorded.iter_content(1024)), body)
+        with open(self.path) as handle:
+            interaction = json.loads(handle.readlines()[1])
+        self.assertNotIn('content', interaction)
+        blob = os.path.join(f'{self.path}.blobs', interaction['blob'])
+        with open(blob, 'rb') as handle:
+            self.assertEqual(handle.read(), body)
+        with cassette.replay(self.path):
+            replayed = client.get(url, response_mode='stream')
+        self.assertEqual(replayed.content, body)
+
+    def test_not_a_cassette(self):
+        """Refuse to replay a file which is not a cassette."""
+        with open(self.path, 'w') as handle:
+            handle.write('{}\n')
+        with self.assertRaisesRegex(CassetteError, r'not a NailGun cassette \(versions 1, 2'):
+            cassette.Player(self.path)
+
+    def test_interceptors(self):
+        """Stop intercepting requests when the block exits."""
+        self.record(self.path)
+        with cassette.replay(self.path):
+            self.assertEqual(len(client._interceptors), 1)
+        self.assertEqual(client._interceptors, ())
@@ -1,12 +1,15 @@
 """Unit tests for :mod:`nailgun.client`."""
 
+import datetime
 import inspect
+import io
 from unittest import TestCase, mock
 
 from fauxfactory import gen_alpha
 import requests
 
 from nailgun import client
+from nailgun.config import RequestRetryPolicy
 
 
 class ContentTypeIsJsonTestCase(TestCase):
@@ -60,6 +63,35 @@ class SetContentTypeTestCase(TestCase):
         self.assertEqual(kwargs, {'files': None})
 
 
+class PopResponseModeTestCase(TestCase):
+    """Tests for function ``_pop_response_mode``."""
+
+    def test_no_value(self):
+        """Assert that ``None`` is returned and ``kwargs`` is untouched."""
+        kwargs = {'verify': False}
+        self.assertIsNone(client._pop_response_mode(kwargs))
+        self.assertEqual(kwargs, {'verify': False})
+
+    def test_raw_modes(self):
+        """Assert that the mode is popped from ``kwargs`` and returned."""
+        for mode in ('decode', 'bytes', 'memoryview'):
+            with self.subTest(mode):
+                kwargs = {'response_mode': mode}
+                self.assertEqual(client._pop_response_mode(kwargs), mode)
+                self.assertEqual(kwargs, {})
+
+    def test_stream(self):
+        """Assert that requests is asked not to download the body."""
+        kwargs = {'response_mode': 'stream'}
+        self.assertEqual(client._pop_response_mode(kwargs), 'stream')
+        self.assertEqual(kwargs, {'stream': True})
+
+    def test_invalid(self):
+        """Assert that an unknown mode is rejected."""
+        with self.assertRaises(ValueError):
+            client._pop_response_mode({'response_mode': 'foo'})
+
+
 class ClientTestCase(TestCase):
     """Tests for functions in :mod:`nailgun.client`."""
 
@@ -123,6 +155,25 @@ class ClientTestCase(TestCase):
                 'foo', self.bogus_url, headers={'content-type': 'application/json'}
             )
 
+    def test_response_mode(self):
+        """Check that the response mode is recorded on the response.
+
+        Assert that the mode is not passed to requests, and that a streamed
+        body is not read in order to log it.
+
+        """
+        for meth in ('delete', 'get', 'head', 'patch', 'post', 'put'):
+            with self.subTest(meth), mock.patch.object(requests, meth) as requests_meth:
+                response = mock.Mock(spec=requests.Response, status_code=200, ok=True)
+                type(response).text = mock.PropertyMock(side_effect=AssertionError)
+                requests_meth.return_value = response
+                self.assertIs(
+                    getattr(client, meth)(self.bogus_url, response_mode='stream'), response
+                )
+                self.assertEqual(response.response_mode, 'stream')
+                self.assertNotIn('response_mode', requests_meth.call_args[1])
+                self.assertTrue(requests_meth.call_args[1]['stream'])
+
     def test_identical_args(self):
         """Check that the wrapper functions have the correct signatures.
 
@@ -142,3 +193,202 @@ class ClientTestCase(TestCase):
                 _strip_annotations(inspect.signature(getattr(client, meth))),
                 _strip_annotations(inspect.signature(getattr(requests, meth))),
             )
+
+
+class InterceptorTestCase(TestCase):
+    """Tests for :func:`nailgun.client.add_interceptor` and its kin."""
+
+    def test_interceptors(self):
+        """Send requests through each interceptor in turn, and then to requests."""
+        calls = []
+
+        def interceptor(name):
+            def intercept(method, url, kwargs, send):
+                calls.append((name, method, url, kwargs['params']))
+                kwargs['headers'][name] = 'yes'
+                return send()
+
+            return intercept
+
+        outer, inner = interceptor('outer'), interceptor('inner')
+        client.add_interceptor(outer)
+        self.addCleanup(client.remove_interceptor, outer)
+        client.add_interceptor(inner)
+        with mock.patch.object(requests, 'get') as requests_get:
+            self.assertIs(client.get('url', {'page': 1}), requests_get.return_value)
+        client.remove_interceptor(inner)
+        self.assertEqual(
+            calls, [('outer', 'GET', 'url', {'page': 1}), ('inner', 'GET', 'url', {'page': 1})]
+        )
+        requests_get.assert_called_once_with(
+            'url',
+            {'page': 1},
+            headers={'content-type': 'application/json', 'outer': 'yes', 'inner': 'yes'},
+        )
+        with self.assertRaises(ValueError):
+            client.remove_interceptor(inner)
+
+    def test_short_circuit(self):
+        """Let an interceptor answer a request without sending it."""
+        response = mock.Mock(status_code=200)
+        intercept = mock.Mock(return_value=response)
+        client.add_interceptor(intercept)
+        self.addCleanup(client.remove_interceptor, intercept)
+        with mock.patch.object(requests, 'request') as requests_request:
+            self.assertIs(client.request('post', 'url', data={'a': 1}), response)
+        requests_request.assert_not_called()
+        method, url, kwargs, _ = intercept.call_args[0]
+        self.assertEqual((method, url, kwargs['data']), ('POST', 'url', '{"a": 1}'))
+
+
+class ResponseMetadataTestCase(TestCase):
+    """Tests for :func:`nailgun.client.response_metadata`."""
+
+    def response(self, **headers):
+        """Return a response with ``headers``, received after a quarter second."""
+        response = requests.Response()
+        response.headers.update(headers)
+        response.elapsed = datetime.timedelta(seconds=0.25)
+        return response
+
+    def test_runtime(self):
+        """Read the request ID and the server's runtime."""
+        metadata = client.response_metadata(
+            self.response(**{'X-Request-Id': 'abc', 'X-Runtime': '0.125'})
+        )
+        self.assertEqual(metadata, client.ResponseMetadata('abc', 0.25, 0.125, {}))
+
+    def test_server_timing(self):
+        """Read each duration in the Server-Timing header, in seconds."""
+        metadata = client.response_metadata(
+            self.response(**{'Server-Timing': 'db;dur=20, total;desc="All";dur=100, miss'})
+        )
+        self.assertEqual(metadata.server_timing, {'db': 0.02, 'total': 0.1})
+        self.assertEqual(metadata.server_seconds, 0.1)
+        self.assertIsNone(metadata.request_id)
+
+    def test_missing(self):
+        """Tolerate missing and malformed headers."""
+        metadata = client.response_metadata(
+            self.response(**{'X-Runtime': 'slow', 'Server-Timing': 'db;dur=x'})
+        )
+        self.assertEqual(metadata, client.ResponseMetadata(None, 0.25, None, {}))
+
+
+class RetryTestCase(TestCase):
+    """Tests for retrying requests with a ``retry_policy``."""
+
+    def setUp(self):
+        """Wait for no time between attempts."""
+        self.policy = RequestRetryPolicy(max_attempts=3, delay=1, jitter=False)
+        patcher = mock.patch('time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def response(self, status_code, **headers):
+        """Return a response with ``status_code`` and ``headers``."""
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers.update(headers)
+        response.raw = io.BytesIO(b'')
+        return response
+
+    def test_retry_server_error(self):
+        """Retry a GET which failed with a 503, backing off."""
+        responses = [self.response(503), self.response(502), self.response(200)]
+        with mock.patch.object(requests, 'get', side_effect=responses) as requests_get:
+            response = client.get('url', retry_policy=self.policy)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(requests_get.call_count, 3)
+        self.assertNotIn('retry_policy', requests_get.call_args[1])
+        self.assertEqual(self.sleep.call_args_list, [mock.call(1), mock.call(2)])
+
+    def test_give_up(self):
+        """Return the last response once ``max_attempts`` requests were sent."""
+        responses = [self.response(503) for _ in range(3)]
+        with mock.patch.object(requests, 'delete', side_effect=responses) as requests_delete:
+            response = client.delete('url', retry_policy=self.policy)
+        self.assertIs(response, responses[-1])
+        self.assertEqual(requests_delete.call_count, 3)
+
+    def test_retry_after(self):
+        """Wait as long as the server asks, but not too long."""
+        responses = [self.response(429, **{'Retry-After': '7'}), self.response(200)]
+        with mock.patch.object(requests, 'get', side_effect=responses):
+            client.get('url', retry_policy=self.policy)
+        self.sleep.assert_called_once_with(7.0)
+
+        self.sleep.reset_mock()
+        response = self.response(503, **{'Retry-After': '3600'})
+        with mock.patch.object(requests, 'get', return_value=response) as requests_get:
+            self.assertIs(client.get('url', retry_policy=self.policy), response)
+        requests_get.assert_called_once()
+        self.sleep.assert_not_called()
+
+    def test_connection_error(self):
+        """Retry a GET whose connection failed, and raise the last error."""
+        error = requests.ConnectionError('refused')
+        with (
+            mock.patch.object(requests, 'get', side_effect=error) as requests_get,
+            self.assertRaises(requests.ConnectionError),
+        ):
+            client.get('url', retry_policy=self.policy)
+        self.assertEqual(requests_get.call_count, 3)
+
+    def test_post(self):
+        """Only retry a POST if it is marked idempotent."""
+        with mock.patch.object(requests, 'post', return_value=self.response(503)) as requests_post:
+            client.post('url', {'a': 1}, retry_policy=self.policy)
+        requests_post.assert_called_once()
+
+        responses = [self.response(503), self.response(200)]
+        with mock.patch.object(requests, 'post', side_effect=responses) as requests_post:
+            client.post('url', {'a': 1}, retry_policy=self.policy, idempotent=True)
+        self.assertEqual(requests_post.call_count, 2)
+        self.assertNotIn('idempotent', requests_post.call_args[1])
+
+    def test_stream(self):
+        """Send a request whose body is a stream once, and raise its error."""
+        error = requests.ConnectionError('reset')
+        for kwargs in (
+            {'data': io.BytesIO(b'content')},
+            {'data': iter([b'con', b'tent'])},
+            {'files': {'content': io.BytesIO(b'content')}},
+        ):
+            with self.subTest(kwargs):
+                with (
+                    mock.patch.object(requests, 'put', side_effect=error) as requests_put,
+                    self.assertRaises(requests.ConnectionError),
+                ):
+                    client.put(
+                        'url',
+                        headers={'content-type': 'application/octet-stream'},
+                        retry_policy=self.policy,
+                        **kwargs,
+                    )
+                requests_put.assert_called_once()
+
+    def test_default_retry_policy(self):
+        """Retry with ``default_retry_policy`` unless a ``retry_policy`` is passed."""
+        never = RequestRetryPolicy(max_attempts=1)
+        for kwargs, call_count in (
+            ({'default_retry_policy': self.policy}, 2),
+            ({'default_retry_policy': self.policy, 'retry_policy': never}, 1),
+            ({'default_retry_policy': never, 'retry_policy': self.policy}, 2),
+        ):
+            with self.subTest(kwargs):
+                responses = [self.response(503), self.response(200)]
+                with mock.patch.object(requests, 'get', side_effect=responses) as requests_get:
+                    client.get('url', **kwargs)
+                self.assertEqual(requests_get.call_count, call_count)
+                self.assertNotIn('default_retry_policy', requests_get.call_args[1])
+
+    def test_interceptors(self):
+        """Send each attempt through the interceptors."""
+        intercept = mock.Mock(side_effect=lambda method, url, kwargs, send: send())
+        client.add_interceptor(intercept)
+        self.addCleanup(client.remove_interceptor, intercept)
+        responses = [self.response(500), self.response(200)]
+        with mock.patch.object(requests, 'get', side_effect=responses):
+            client.get('url', retry_policy=self.policy)
+        self.assertEqual(intercept.call_count, 2)
@@ -11,6 +11,7 @@ from packaging.version import InvalidVersion, parse
 from nailgun.config import (
     BaseServerConfig,
     ConfigFileError,
+    RequestRetryPolicy,
     ServerConfig,
     _get_config_file_path,
 )
@@ -316,3 +317,53 @@ def _get_written_json(mock_obj):
     """Return the JSON that has been written to a mock `open` object."""
     # json.dump() calls write() for each individual JSON token.
     return json.loads(''.join(tuple(call_obj)[1][0] for call_obj in mock_obj().write.mock_calls))
+
+
+class RequestRetryPolicyTestCase(TestCase):
+    """Tests for :class:`nailgun.config.RequestRetryPolicy`."""
+
+    def test_should_retry(self):
+        """Retry failed idempotent requests, up to ``max_attempts`` times."""
+        policy = RequestRetryPolicy(max_attempts=3)
+        self.assertTrue(policy.should_retry('GET', 1, 503))
+        self.assertTrue(policy.should_retry('PUT', 2))
+        self.assertFalse(policy.should_retry('GET', 3, 503))
+        self.assertFalse(policy.should_retry('GET', 1, 404))
+        self.assertFalse(policy.should_retry('POST', 1, 503))
+        self.assertTrue(policy.should_retry('POST', 1, 503, idempotent=True))
+        self.assertFalse(policy.should_retry('GET', 1, 503, idempotent=False))
+
+    def test_get_delay(self):
+        """Back off exponentially, up to ``max_delay``, with jitter if asked."""
+        policy = RequestRetryPolicy(delay=1, backoff=3, max_delay=5, jitter=False)
+        self.assertEqual([policy.get_delay(attempt) for attempt in (1, 2, 3)], [1, 3, 5])
+        policy.jitter = True
+        for _ in range(20):
+            self.assertTrue(0 <= policy.get_delay(3) <= policy.max_delay)
+
+    def test_retry_after(self):
+        """Wait at least as long as ``Retry-After`` asks, unless too long."""
+        policy = RequestRetryPolicy(delay=1, jitter=False, max_retry_after=60)
+        self.assertEqual(policy.get_delay(1, '10'), 10)
+        self.assertEqual(policy.get_delay(1, '0'), 1)
+        self.assertEqual(policy.get_delay(1, 'Wed, 21 Oct 2015 07:28:00 GMT'), 1)
+        self.assertEqual(policy.get_delay(1, 'soon'), 1)
+        self.assertIsNone(policy.get_delay(1, '61'))
+
+    def test_server_config(self):
+        """Pass a policy to the client, and save and read it as a dict."""
+        policy = RequestRetryPolicy(max_attempts=5, jitter=False)
+        server_config = ServerConfig('https://example.org', retry_policy=policy.to_dict())
+        self.assertEqual(server_config.retry_policy.to_dict(), policy.to_dict())
+        self.assertEqual(
+            server_config.get_client_kwargs(), {'default_retry_policy': server_config.retry_policy}
+        )
+
+        open_ = mock_open(read_data=json.dumps(CONFIGS))
+        with patch.object(builtins, 'open', open_):
+            server_config.save('retrying', FILE_PATH)
+        configs = _get_written_json(open_)
+        open_ = mock_open(read_data=json.dumps(configs))
+        with patch.object(builtins, 'open', open_):
+            server_config = ServerConfig.get('retrying', FILE_PATH)
+        self.assertEqual(server_config.retry_policy.to_dict(), policy.to_dict())
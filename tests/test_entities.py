@@ -5,6 +5,8 @@ from http.client import ACCEPTED, NO_CONTENT
 import inspect
 import json
 import os
+import subprocess
+import sys
 from unittest import TestCase, mock
 
 from fauxfactory import gen_alpha, gen_integer, gen_string
@@ -19,6 +21,9 @@ from nailgun.entity_mixins import (
 )
 
 _BUILTIN_OPEN = 'builtins.open'
+# The standard library modules which nailgun imports only when it uses them,
+# and which its dependencies do not import either.
+_DEFERRED_MODULES = ('concurrent.futures', 'inspect')
 # For inspection comparison, a tuple matching the expected func arg spec
 # https://docs.python.org/3/library/inspect.html#inspect.getfullargspec
 EXPECTED_ARGSPEC = (['self', 'synchronous', 'timeout'], None, 'kwargs', (True, None), [], None, {})
@@ -2358,6 +2363,35 @@ class ForemanTaskTestCase(TestCase):
                 self.assertEqual(post.call_count, 1)
                 self.assertEqual(post.mock_calls[2][1][0].ACCEPTED, 202)
 
+    def test_bulk_search(self):
+        """Call :meth:`nailgun.entities.ForemanTask.bulk_search` as an idempotent request."""
+        data = {'searches': [{'type': 'task', 'task_id': self.foreman_task.id}]}
+        for kwargs, idempotent in (({}, True), ({'idempotent': False}, False)):
+            with self.subTest(kwargs):
+                with mock.patch.object(entities, '_handle_response'):
+                    with mock.patch.object(client, 'post') as post:
+                        self.foreman_task.bulk_search(data=data, **kwargs)
+                self.assertEqual(post.call_count, 1)
+                self.assertEqual(post.call_args[1]['data'], data)
+                self.assertIs(post.call_args[1]['idempotent'], idempotent)
+
+    def test_client_kwargs(self):
+        """Let a ``retry_policy`` passed to a method win over that of the server configuration.
+
+        Other arguments of the server configuration win over those passed.
+        """
+        server_policy = config.RequestRetryPolicy(max_attempts=2)
+        call_policy = config.RequestRetryPolicy(max_attempts=5)
+        foreman_task = entities.ForemanTask(
+            config.ServerConfig('http://example.com', verify=False, retry_policy=server_policy)
+        )
+        with mock.patch.object(entities, '_handle_response'):
+            with mock.patch.object(client, 'post') as post:
+                foreman_task.bulk_resume(retry_policy=call_policy, verify=True)
+        self.assertIs(post.call_args[1]['retry_policy'], call_policy)
+        self.assertIs(post.call_args[1]['default_retry_policy'], server_policy)
+        self.assertIs(post.call_args[1]['verify'], False)
+
 
 class ContentUploadTestCase(TestCase):
     """Tests for :class:`nailgun.entities.ContentUpload`."""
@@ -2729,6 +2763,36 @@ class ActivationKeyTestCase(TestCase):
         self.assertIsNone(ak.environment)
 
 
+class OrganizationTestCase(TestCase):
+    """Tests for :class:`nailgun.entities.Organization`."""
+
+    def test_rh_cloud_download_report(self):
+        """Stream the report to a file, unless another response mode is requested."""
+        org = entities.Organization(config.ServerConfig('http://example.com'), id=1)
+        for kwargs, mode, chunks in (
+            ({}, 'stream', [b're', b'port']),
+            ({'response_mode': 'bytes'}, 'bytes', [b'report']),
+        ):
+            with self.subTest(kwargs):
+                response = mock.Mock(status_code=200, content=b'report')
+                response.headers = {'content-type': 'application/x-xz'}
+                response.iter_content.return_value = iter([b're', b'port'])
+
+                def get(url, response=response, **kwargs):
+                    response.response_mode = kwargs['response_mode']
+                    return response
+
+                mock_open = mock.mock_open()
+                with mock.patch.object(client, 'get', side_effect=get) as client_get:
+                    with mock.patch(_BUILTIN_OPEN, mock_open, create=True):
+                        org.rh_cloud_download_report('report.tar.xz', **kwargs)
+                self.assertEqual(client_get.call_args[1]['response_mode'], mode)
+                mock_open.assert_called_once_with('report.tar.xz', 'wb')
+                self.assertEqual(
+                    mock_open.return_value.write.call_args_list, [mock.call(c) for c in chunks]
+                )
+
+
 class ReportTemplateTestCase(TestCase):
     """Tests for :class:`nailgun.entities.ReportTemplate`."""
 
@@ -3819,6 +3883,76 @@ class HandleResponseTestCase(TestCase):
                 entities._handle_response(response, 'foo', True),
             )
 
+    def test_bytes_mode(self):
+        """Check that binary content is returned undecoded in ``'bytes'`` mode."""
+        response = mock.Mock()
+        response.headers = {'content-type': 'application/octet-stream'}
+        response.content = b'\xff\x00binary'
+        response.response_mode = 'bytes'
+        self.assertIs(entities._handle_response(response, 'foo'), response.content)
+
+    def test_memoryview_mode(self):
+        """Check that binary content is wrapped in ``'memoryview'`` mode."""
+        response = mock.Mock()
+        response.headers = {'content-type': 'application/x-tar'}
+        response.content = b'\xff\x00binary'
+        response.response_mode = 'memoryview'
+        content = entities._handle_response(response, 'foo')
+        self.assertIsInstance(content, memoryview)
+        self.assertIs(content.obj, response.content)
+
+    def test_raw_mode_text(self):
+        """Check that textual content is decoded in the raw modes."""
+        response = mock.Mock()
+        response.content = 'žluťoučký'.encode('iso-8859-2')
+        response.headers = {'content-type': 'text/plain; charset=iso-8859-2'}
+        for mode in ('bytes', 'memoryview'):
+            with self.subTest(mode):
+                response.response_mode = mode
+                self.assertEqual(entities._handle_response(response, 'foo'), 'žluťoučký')
+
+    def test_stream_mode(self):
+        """Check that an iterator over the content is returned in ``'stream'`` mode."""
+        response = mock.Mock()
+        response.headers = {'content-type': 'application/gzip'}
+        response.response_mode = 'stream'
+        self.assertEqual(
+            entities._handle_response(response, 'foo'),
+            response.iter_content.return_value,
+        )
+        response.iter_content.assert_called_once_with(
+            chunk_size=entities.STREAM_CHUNK_SIZE, decode_unicode=False
+        )
+
+    def test_default_mode(self):
+        """Check that an entity method's mode is used unless one is requested for the call."""
+        response = mock.Mock()
+        response.headers = {'content-type': 'application/octet-stream'}
+        response.content = b'\xff\x00binary'
+        response.response_mode = None
+        self.assertIs(
+            entities._handle_response(response, 'foo', response_mode='bytes'), response.content
+        )
+        response.response_mode = 'stream'
+        self.assertEqual(
+            entities._handle_response(response, 'foo', response_mode='bytes'),
+            response.iter_content.return_value,
+        )
+
+    def test_get_text_encoding(self):
+        """Check which content types are treated as text."""
+        for content_type, encoding in (
+            ('text/html', 'utf-8'),
+            ('text/plain; charset="latin-1"', 'latin-1'),
+            ('application/xml', 'utf-8'),
+            ('application/x-yaml; charset=ascii', 'ascii'),
+            ('application/octet-stream', None),
+            ('application/x-pem-file', None),
+            ('', None),
+        ):
+            with self.subTest(content_type):
+                self.assertEqual(entities._get_text_encoding(content_type), encoding)
+
 
 class VersionTestCase(TestCase):
     """Tests for entities that vary based on the server's software version."""
@@ -4165,3 +4299,51 @@ class NotificationRecipientsTestCase(TestCase):
         cfg = config.ServerConfig(url='https://foo.bar', verify=False, auth=('foo', 'bar'))
         notifications = entities.NotificationRecipients(cfg, **notifications_kwargs)
         self.assertDictEqual(notifications_kwargs, json.loads(notifications.to_json()))
+
+
+class LazyImportTestCase(TestCase):
+    """Tests for the lazy import of entities defined by plugin submodules."""
+
+    @staticmethod
+    def _run(code):
+        """Run ``code`` in a fresh interpreter, and return its output."""
+        return subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, check=True, text=True
+        ).stdout
+
+    def test_import(self):
+        """Import neither plugin submodules nor ``_DEFERRED_MODULES`` with ``nailgun.entities``."""
+        code = (
+            'import sys\n'
+            'import nailgun.entities\n'
+            'print(*sorted(name for name in sys.modules if name.startswith("nailgun.entities.")))\n'
+            f'print(*sorted(name for name in {_DEFERRED_MODULES!r} if name in sys.modules))\n'
+        )
+        self.assertEqual(self._run(code).splitlines(), ['', ''])
+
+    def test_import_on_access(self):
+        """Import a plugin submodule only when one of its entities is used."""
+        code = (
+            'import sys\n'
+            'from nailgun import entities\n'
+            'print(*sorted(name for name in sys.modules if name.startswith("nailgun.entities.")))\n'
+            'entities.DiscoveredHost\n'
+            'print(*sorted(name for name in sys.modules if name.startswith("nailgun.entities.")))\n'
+        )
+        self.assertEqual(self._run(code).splitlines(), ['', 'nailgun.entities.discovery'])
+
+    def test_getattr(self):
+        """Return the entity defined by the submodule, or raise ``AttributeError``."""
+        entity = entities.DiscoveredHost
+        self.assertIs(entity, sys.modules['nailgun.entities.discovery'].DiscoveredHost)
+        self.assertIs(entity, entities.DiscoveredHost)
+        with self.assertRaises(AttributeError):
+            getattr(entities, 'NoSuchEntity')  # noqa: B009
+
+    def test_dir(self):
+        """List the names of entities defined by each plugin submodule."""
+        names = dir(entities)
+        for name in entities._PLUGIN_ENTITIES:
+            with self.subTest(name):
+                self.assertIn(name, names)
+                self.assertTrue(issubclass(getattr(entities, name), entities.Entity))
@@ -1,19 +1,24 @@
 """Tests for :mod:`nailgun.entity_mixins`."""
 
+import contextlib
 import http.client as http_client
+import json
 from unittest import TestCase, mock
 
 from fauxfactory import gen_integer
+import requests
 from requests.exceptions import HTTPError, JSONDecodeError
 
 from nailgun import client, config, entity_mixins
 from nailgun.entity_fields import (
+    BooleanField,
     IntegerField,
     ListField,
     OneToManyField,
     OneToOneField,
     StringField,
 )
+from nailgun.query import Condition
 
 # The size of this module is a direct reflection of the size of module
 # `nailgun.entity_mixins`. It would be good to split that module up, then split
@@ -128,6 +133,17 @@ class EntityWithSearch2(EntityWithSearch):
         super().__init__(server_config=server_config, **kwargs)
 
 
+class EntityWithSearchAndRead(EntityWithSearch2, entity_mixins.EntityReadMixin):
+    """An entity with simple and foreign key fields, which can be read."""
+
+    def __init__(self, server_config=None, **kwargs):
+        super().__init__(server_config=server_config, **kwargs)
+        self._fields.update(
+            {'enabled': BooleanField(), 'name': StringField(), 'number': IntegerField()}
+        )
+        self._meta['search_fields'] = ('enabled', 'name', 'number', 'one')
+
+
 # 2. Tests for private methods. ------------------------------------------ {{{1
 
 
@@ -199,6 +215,83 @@ class MakeEntitiesFromIdsTestCase(TestCase):
             self.assertIsInstance(entity, SampleEntity)
 
 
+class NormalizerTestCase(TestCase):
+    """Tests for :class:`nailgun.entity_mixins._Normalizer`."""
+
+    def test_relations(self):
+        """Find IDs just as ``_get_entity_id`` and ``_get_entity_ids`` do."""
+        normalizer = entity_mixins._Normalizer(EntityWithSearch2().get_fields())
+        for attrs in (
+            {'one': None, 'many': []},
+            {'one': {'id': 1, 'name': 'a'}, 'many': [{'id': 2}, {'id': 3}]},
+            {'one': {'name': 'a'}, 'one_id': 4, 'manies': [{'id': 5}]},
+            {'one_id': None, 'many_ids': [6], 'many': [{'id': 7}]},
+        ):
+            with self.subTest(attrs):
+                self.assertEqual(
+                    normalizer.search(attrs),
+                    {
+                        'one': entity_mixins._get_entity_id('one', attrs),
+                        'many': entity_mixins._get_entity_ids('many', attrs),
+                        **({'id': attrs['id']} if 'id' in attrs else {}),
+                    },
+                )
+        with self.assertRaises(entity_mixins.MissingValueError):
+            normalizer.entity_id('one', 'one_id', {'one': {'name': 'a'}})
+        self.assertEqual(normalizer.search({'id': 1, 'other': 2}), {'id': 1})
+
+    def test_environment(self):
+        """Treat a missing ``environment`` as ``_get_entity_id`` does."""
+        normalizer = entity_mixins._Normalizer(
+            {'environment': OneToOneField(SampleEntity), 'id': IntegerField()}
+        )
+        attrs = {'id': 1}
+        self.assertEqual(normalizer.search(attrs), {'environment': [], 'id': 1})
+        self.assertEqual(attrs['environment'], [])
+
+    def test_cache(self):
+        """Compile one normalizer per entity type and set of fields."""
+        cfg = config.ServerConfig('example.com')
+        normalizer = entity_mixins._get_normalizer(EntityWithSearch2(cfg))
+        self.assertIs(entity_mixins._get_normalizer(EntityWithSearch2(cfg, id=1)), normalizer)
+        self.assertIsNot(entity_mixins._get_normalizer(EntityWithSearchAndRead(cfg)), normalizer)
+        self.assertIsNot(entity_mixins._get_normalizer(EntityWithSearch(cfg)), normalizer)
+
+
+class PayloadBuilderTestCase(TestCase):
+    """Tests for :class:`nailgun.entity_mixins._PayloadBuilder`."""
+
+    def test_build(self):
+        """Convert relations and lists of entities, and leave other values alone."""
+        cfg = config.ServerConfig('example.com')
+        nested = SampleEntityTwo(cfg, one_to_many=[SampleEntity(cfg, id=2)])
+        entity = SampleEntityThree(cfg, one_to_one=SampleEntityTwo(cfg, id=1), list=[nested, 3])
+        self.assertEqual(
+            entity_mixins._payload(entity.get_fields(), entity.get_values()),
+            {'one_to_one_id': 1, 'list': [{'one_to_many_ids': [2]}, 3]},
+        )
+        self.assertEqual(
+            entity_mixins._payload(entity.get_fields(), {'one_to_one': None, 'list': None}),
+            {'one_to_one_id': None, 'list': None},
+        )
+
+    def test_cache(self):
+        """Compile one builder per set of field names and types."""
+        fields = SampleEntityThree().get_fields()
+        builder = entity_mixins._get_payload_builder(fields)
+        self.assertIs(entity_mixins._get_payload_builder(SampleEntityThree().get_fields()), builder)
+        self.assertEqual(
+            builder.kinds,
+            {
+                'id': entity_mixins._PLAIN,
+                'list': entity_mixins._LIST,
+                'one_to_one': entity_mixins._ONE_TO_ONE,
+            },
+        )
+        fields['list'] = StringField()
+        self.assertIsNot(entity_mixins._get_payload_builder(fields), builder)
+
+
 class PollTaskTestCase(TestCase):
     """Tests for :func:`nailgun.entity_mixins._poll_task`."""
 
@@ -418,6 +511,52 @@ class EntityTestCase(TestCase):
         mary_clone.list = [alice_clone]
         self.assertEqual(mary, mary_clone)
 
+    def test_eq_in_place(self):
+        """Compare entities as they are, even after a field is changed in place."""
+        mary = SampleEntityThree(self.cfg, list=['a'])
+        mary_clone = SampleEntityThree(self.cfg, list=['a'])
+        self.assertEqual(mary, mary_clone)
+        mary.list.append('b')
+        self.assertNotEqual(mary, mary_clone)
+        self.assertNotEqual(
+            SampleEntityThree(self.cfg, list={'a': 1}), SampleEntityThree(self.cfg, list={('a', 1)})
+        )
+
+    def test_hash(self):
+        """Hash entities by ID, or by type alone if they have no ID."""
+        alice = SampleEntity(self.cfg, name='Alice')
+        self.assertEqual(hash(alice), hash(SampleEntity(self.cfg, name='Alice')))
+        self.assertEqual(hash(alice), hash(SampleEntity(self.cfg, name='Bob')))
+        self.assertEqual(
+            len({alice, SampleEntity(self.cfg, name='Alice'), SampleEntity(self.cfg)}), 2
+        )
+        self.assertEqual(hash(SampleEntity(self.cfg, id=1)), hash(SampleEntity(self.cfg, id=1)))
+
+        # An entity is still found after its fields change.
+        entities = {alice}
+        alice.name = 'Alice2'
+        self.assertIn(alice, entities)
+
+    def test_distinct(self):
+        """Drop entities equal to an earlier one, keeping the order."""
+        alice = SampleEntity(self.cfg, name='Alice')
+        bob = SampleEntity(self.cfg, name='Bob')
+        self.assertEqual(
+            entity_mixins.distinct([alice, bob, SampleEntity(self.cfg, name='Alice'), alice]),
+            [alice, bob],
+        )
+        self.assertEqual(entity_mixins.distinct([]), [])
+
+        # Fields are compared as they are on each call, and exactly.
+        mary = SampleEntityThree(self.cfg, list=['a'])
+        mary_clone = SampleEntityThree(self.cfg, list=['a'])
+        self.assertEqual(entity_mixins.distinct([mary, mary_clone]), [mary])
+        mary.list.append('b')
+        self.assertEqual(entity_mixins.distinct([mary, mary_clone]), [mary, mary_clone])
+        mary_dict = SampleEntityThree(self.cfg, list={'a': 1})
+        mary_set = SampleEntityThree(self.cfg, list={('a', 1)})
+        self.assertEqual(entity_mixins.distinct([mary_dict, mary_set]), [mary_dict, mary_set])
+
     def test_compare_to_null(self):
         """Assert entity comparison to None."""
         alice = SampleEntity(self.cfg, id=1, name='Alice', unique='a')
@@ -460,6 +599,20 @@ class EntityTestCase(TestCase):
             'Only id is ignored, so it should return False because "unique" is different',
         )
 
+    def test_compare_extra_keys(self):
+        """Ignore keys which are not fields, as an override of ``to_json_dict`` may add."""
+
+        class ExtraKeyEntity(SampleEntity):
+            """An entity whose ``to_json_dict`` adds a key."""
+
+            def to_json_dict(self, filter_fcn=None):
+                """Add a key which is not a field."""
+                return {**super().to_json_dict(filter_fcn), 'extra': 'value'}
+
+        alice = ExtraKeyEntity(self.cfg, id=1, name='Alice', unique='a')
+        self.assertTrue(alice.compare(ExtraKeyEntity(self.cfg, id=2, name='Alice', unique='b')))
+        self.assertFalse(alice.compare(ExtraKeyEntity(self.cfg, id=1, name='Bob', unique='a')))
+
     def test_repr_v1(self):
         """Test method ``nailgun.entity_mixins.Entity.__repr__``.
 
@@ -954,6 +1107,89 @@ class EntityUpdateMixinTestCase(TestCase):
             update_json.return_value,
         )
 
+    def test_changed_fields(self):
+        """Update only the fields changed since an entity was read."""
+
+        class EntityWithUpdateRead(EntityWithUpdate, entity_mixins.EntityReadMixin):
+            """An entity that can be updated and read, with an override of read."""
+
+            def __init__(self, server_config=None, **kwargs):
+                self._fields = {'one': IntegerField(), 'two': IntegerField()}
+                super().__init__(server_config=server_config, **kwargs)
+
+            def read(self, entity=None, attrs=None, ignore=None, params=None):
+                """Assign a field after reading."""
+                entity = super().read(entity, attrs, ignore, params)
+                entity.two = 2
+                return entity
+
+        cfg = config.ServerConfig('example.com')
+        entity = EntityWithUpdateRead(cfg, id=1, one=1)
+        self.assertEqual(entity.get_changed_fields(), {'id', 'one'})
+        self.assertEqual(entity.update_payload(), {'id': 1, 'one': 1})
+
+        entity = entity.read(attrs={'id': 1, 'one': 1, 'two': 0})
+        self.assertEqual(entity.get_changed_fields(), set())
+        self.assertNotIn('_changed_fields', entity.get_values())
+        entity.one = 3
+        self.assertEqual(entity.get_changed_fields(), {'one'})
+        # By default, every field is still sent.
+        self.assertEqual(entity.update_payload(), {'id': 1, 'one': 3, 'two': 2})
+        del entity.two
+        with mock.patch.object(entity_mixins, 'UPDATE_CHANGED_FIELDS', True):
+            self.assertEqual(entity.update_payload(), {'one': 3})
+            self.assertEqual(entity.update_payload(['id', 'one']), {'id': 1, 'one': 3})
+
+            with mock.patch.object(client, 'put') as put:
+                put.return_value.json.return_value = {'id': 1, 'one': 3, 'two': 0}
+                updated = entity.update()
+        self.assertEqual(put.call_args[0][1], {'one': 3})
+        self.assertEqual(entity.get_changed_fields(), set())
+        self.assertEqual((updated.one, updated.get_changed_fields()), (3, set()))
+
+    def test_changed_fields_not_tracked_while_made(self):
+        """Do not run ``__setattr__`` for the fields given when an entity is made or read."""
+        cfg = config.ServerConfig('example.com')
+        attrs = {'id': 1, 'one_id': 2, 'many_ids': [3], 'enabled': True, 'name': 'a', 'number': 4}
+        with mock.patch.object(
+            entity_mixins.Entity, '__setattr__', autospec=True, side_effect=object.__setattr__
+        ) as setattr_:
+            entity = EntityWithSearchAndRead(cfg, id=1, one=2, many=[3])
+            entity = entity.read(attrs=attrs)
+        self.assertFalse(
+            {call.args[1] for call in setattr_.call_args_list} & set(entity.get_fields())
+        )
+        self.assertEqual((entity.one.id, entity.name), (2, 'a'))
+        self.assertEqual(entity.get_changed_fields(), set())
+
+    def test_save(self):
+        """Update only the entities which have changed."""
+        cfg = config.ServerConfig('example.com')
+        entities = [EntityWithUpdate(cfg, id=i) for i in range(4)]
+        for entity in entities[1::2]:
+            entity_mixins._forget_changes(entity)
+        with mock.patch.object(EntityWithUpdate, 'update', autospec=True) as update:
+            update.side_effect = lambda entity, fields: entity.id * 10
+            saved = entity_mixins.save(iter(entities), max_workers=2)
+        self.assertEqual(saved, [0, entities[1], 20, entities[3]])
+        self.assertEqual(update.call_count, 2)
+        self.assertEqual(update.call_args_list[0].args[1], {'id'})
+        with mock.patch.object(EntityWithUpdate, 'update') as update:
+            self.assertEqual(entity_mixins.save(entities[1::2]), entities[1::2])
+        update.assert_not_called()
+
+    def test_save_not_updatable(self):
+        """Send no request for an entity whose changed fields cannot be updated."""
+        cfg = config.ServerConfig('example.com')
+        entities = [EntityWithUpdate(cfg, id=i) for i in range(2)]
+        for entity in entities:
+            entity._updatable_fields = ['name']
+            entity_mixins._forget_changes(entity)
+        entities[0].id = 5
+        with mock.patch.object(client, 'put') as put, mock.patch.object(client, 'get') as get:
+            self.assertEqual(entity_mixins.save(entities), entities)
+        self.assertEqual((put.call_count, get.call_count), (0, 0))
+
 
 class EntityDeleteMixinTestCase(TestCase):
     """Tests for :class:`nailgun.entity_mixins.EntityDeleteMixin`."""
@@ -1136,6 +1372,11 @@ class EntitySearchMixinTestCase(TestCase):
         self.assertEqual(len(get.call_args[0]), 1)  # path='…'
         self.assertEqual(get.call_args[0][0], self.entity.path())
         self.assertEqual(get.call_args[1]['data'], s_payload.return_value)
+        self.assertNotIn('response_mode', get.call_args[1])
+        with mock.patch.object(self.entity, 'search_payload'):
+            with mock.patch.object(client, 'get') as get:
+                self.entity.search_raw(response_mode='stream')
+        self.assertEqual(get.call_args[1]['response_mode'], 'stream')
 
     def test_search_json(self):
         """Call :meth:`nailgun.entity_mixins.EntitySearchMixin.search_json`."""
@@ -1148,35 +1389,43 @@ class EntitySearchMixinTestCase(TestCase):
         self.assertEqual(response.raise_for_status.call_count, 1)
         self.assertEqual(response.json.call_count, 1)
 
+    def test_search_stream(self):
+        """Build entities from a streamed response, one search result at a time."""
+        entity = EntityWithSearch2(self.cfg)
+        response = mock.Mock()
+        response.iter_content.return_value = iter(
+            [b'{"total": 2, "results": [{"id": 1, "one_id": 3},', b' {"id": 2, "many_ids": [4]}]}']
+        )
+        with mock.patch.object(entity, 'search_raw', return_value=response) as search_raw:
+            entities = entity.search_stream({'one'}, {'per_page': 2})
+            first = next(entities)
+            self.assertEqual((first.id, first.one.id), (1, 3))
+            response.close.assert_not_called()
+            (second,) = entities
+        search_raw.assert_called_once_with({'one'}, {'per_page': 2}, response_mode='stream')
+        self.assertEqual([item.id for item in second.many], [4])
+        response.raise_for_status.assert_called_once_with()
+        response.close.assert_called_once_with()
+
     def test_search_normalize_v1(self):
         """Call ``search_normalize``.
 
         Pretend the server returns values for all fields, and an extra value.
 
         """
-        with mock.patch.object(entity_mixins, '_get_entity_ids') as get_ids:
-            with mock.patch.object(entity_mixins, '_get_entity_id') as get_id:
-                attrs_list = EntityWithSearch2(self.cfg).search_normalize(
-                    [
-                        {
-                            'extra': 'foo',  # simulate extra value returned by server
-                            'id': 'bar',
-                            'many_ids': [gen_integer()],
-                            'one_id': gen_integer(),
-                        }
-                    ]
-                )
-        self.assertEqual(get_ids.call_count, 1)
-        self.assertEqual(get_id.call_count, 1)
-        self.assertEqual(len(attrs_list), 1)
-        self.assertEqual(
-            attrs_list[0],
-            {
-                'id': 'bar',
-                'many': get_ids.return_value,
-                'one': get_id.return_value,
-            },
+        one_id, many_ids = gen_integer(), [gen_integer()]
+        attrs_list = EntityWithSearch2(self.cfg).search_normalize(
+            [
+                {
+                    'extra': 'foo',  # simulate extra value returned by server
+                    'id': 'bar',
+                    'many_ids': many_ids,
+                    'one_id': one_id,
+                }
+            ]
         )
+        self.assertEqual(len(attrs_list), 1)
+        self.assertEqual(attrs_list[0], {'id': 'bar', 'many': many_ids, 'one': one_id})
 
     def test_search_normalize_v2(self):
         """Call ``search_normalize``.
@@ -1241,6 +1490,156 @@ class EntitySearchMixinTestCase(TestCase):
         self.assertEqual(s_filter.call_args[0][0][0].id, 'foo')  # from mock ↑
         self.assertEqual(s_filter.call_args[0][1], 'filters')
 
+    def fake_search(self, ids):
+        """Return a fake ``search`` method, which finds entities with ``ids``.
+
+        It honours ``per_page`` and the ``id`` conditions added by ``scan``.
+        """
+
+        def search(fields=None, query=None):
+            self.assertEqual(query['order'], 'id ASC')
+            found = list(ids)
+            search = query.get('search')
+            for condition in getattr(search, 'queries', ()):
+                if isinstance(condition, Condition) and condition.field_name == 'id':
+                    if condition.operator == '>':
+                        found = [i for i in found if i > condition.value]
+                    else:
+                        found = [i for i in found if i <= condition.value]
+            return [EntityWithSearch(self.cfg, id=i) for i in found[: query['per_page']]]
+
+        return search
+
+    def test_scan(self):
+        """Fetch each next page with ``id > <last ID seen>``."""
+        search = mock.Mock(side_effect=self.fake_search(range(1, 8)))
+        with mock.patch.object(self.entity, 'search', search):
+            entities = list(
+                self.entity.scan(
+                    query={'search': 'name ~ a', 'page': 4, 'per_page': 2}, page_size=3
+                )
+            )
+        self.assertEqual([entity.id for entity in entities], list(range(1, 8)))
+        self.assertEqual(search.call_count, 4)
+        self.assertEqual(
+            [str(call.args[1].get('search')) for call in search.call_args_list],
+            [
+                '(name ~ a)',
+                '(name ~ a) and id > 3',
+                '(name ~ a) and id > 6',
+                '(name ~ a) and id > 7',
+            ],
+        )
+        self.assertNotIn('page', search.call_args.args[1])
+
+    def test_scan_workers(self):
+        """Scan ID ranges concurrently."""
+        ids = range(1, 11)
+        search = mock.Mock(side_effect=self.fake_search(ids))
+        bounds = [{'results': [{'id': 1}]}, {'results': [{'id': 10}]}]
+        with mock.patch.object(self.entity, 'search', search):
+            with mock.patch.object(self.entity, 'search_json', side_effect=bounds) as search_json:
+                entities = list(self.entity.scan(set(), page_size=2, workers=3))
+        self.assertEqual(sorted(entity.id for entity in entities), list(ids))
+        self.assertEqual(
+            [call.args[1]['order'] for call in search_json.call_args_list],
+            ['id ASC', 'id DESC'],
+        )
+        self.assertEqual(
+            {str(call.args[1]['search']) for call in search.call_args_list[:3]},
+            {'id > 0 and id <= 4', 'id > 4 and id <= 8', 'id > 8'},
+        )
+
+    def test_scan_workers_empty(self):
+        """Find nothing if nothing matches."""
+        with mock.patch.object(self.entity, 'search_json', return_value={'results': []}):
+            with mock.patch.object(self.entity, 'search') as search:
+                self.assertEqual(list(self.entity.scan(workers=2)), [])
+        search.assert_not_called()
+
+    def test_count(self):
+        """Count search results from the subtotal, asking for one result only."""
+        for response, expected in (
+            ({'results': [{'id': 1}], 'subtotal': 12, 'total': 40}, 12),
+            ({'results': [{'id': 1}], 'total': 40}, 40),
+            ({'results': []}, 0),
+        ):
+            with self.subTest(response):
+                with mock.patch.object(
+                    self.entity, 'search_json', return_value=response
+                ) as search_json:
+                    self.assertEqual(self.entity.count(set(), {'page': 3, 'search': 'x'}), expected)
+                search_json.assert_called_once_with(
+                    set(), {'page': 1, 'per_page': 1, 'search': 'x'}
+                )
+
+    def test_exists(self):
+        """Tell whether any entity matches a search."""
+        for count in (0, 3):
+            with self.subTest(count):
+                with mock.patch.object(self.entity, 'count', return_value=count) as count_:
+                    self.assertEqual(self.entity.exists(query={'search': 'x'}), count > 0)
+                count_.assert_called_once_with(None, {'search': 'x'})
+
+    def test_exists_id(self):
+        """Check whether an entity with an ID exists with a HEAD request."""
+        entity = EntityWithSearch(self.cfg, id=5)
+        for status_code, expected in ((http_client.OK, True), (http_client.NOT_FOUND, False)):
+            with self.subTest(status_code):
+                with mock.patch.object(client, 'head') as head:
+                    head.return_value.status_code = status_code
+                    self.assertIs(entity.exists(), expected)
+                head.assert_called_once_with(entity.path('self'), **self.cfg.get_client_kwargs())
+        with mock.patch.object(client, 'head') as head:
+            head.return_value.status_code = http_client.METHOD_NOT_ALLOWED
+            with mock.patch.object(client, 'get') as get:
+                get.return_value.status_code = http_client.OK
+                self.assertTrue(entity.exists())
+        get.assert_called_once_with(
+            entity.path('self'), response_mode='stream', **self.cfg.get_client_kwargs()
+        )
+        get.return_value.close.assert_called_once_with()
+        with mock.patch.object(client, 'head') as head:
+            head.return_value.status_code = http_client.INTERNAL_SERVER_ERROR
+            head.return_value.raise_for_status.side_effect = HTTPError
+            with self.assertRaises(HTTPError):
+                entity.exists()
+
+    def test_search_rows(self):
+        """Search for rows holding some fields, and turn one in to an entity."""
+        entity = EntityWithSearchAndRead(self.cfg)
+        results = [
+            {'id': 1, 'name': 'a', 'enabled': False, 'one_id': 3, 'many_ids': [5, 4]},
+            {'id': 2, 'one': {'id': 6, 'name': 'b'}, 'many': [{'id': 7}]},
+        ]
+        with mock.patch.object(
+            entity, 'search_json', return_value={'results': results}
+        ) as search_json:
+            rows = entity.search_rows({'name'}, {'per_page': 2}, ('id', 'name', 'one', 'many'))
+        search_json.assert_called_once_with({'name'}, {'per_page': 2})
+        self.assertEqual(rows, [(1, 'a', 3, [5, 4]), (2, None, 6, [7])])
+        self.assertIsInstance(rows[0], entity_mixins.SearchRow)
+        self.assertEqual((rows[0].name, rows[0].one, rows[0].many), ('a', 3, [5, 4]))
+        with self.assertRaises(AttributeError):
+            rows[0].name = 'b'
+        row_entity = rows[1].to_entity()
+        self.assertIsInstance(row_entity, EntityWithSearchAndRead)
+        self.assertEqual(row_entity._server_config, self.cfg)
+        self.assertEqual((row_entity.id, row_entity.one.id), (2, 6))
+        self.assertFalse(hasattr(row_entity, 'name'))
+
+    def test_search_rows_columns(self):
+        """Hold every field by default, and reject unknown columns."""
+        entity = EntityWithSearchAndRead(self.cfg)
+        with mock.patch.object(
+            entity, 'search_json', return_value={'results': [{'id': 1, 'one_id': 3}]}
+        ):
+            (row,) = entity.search_rows()
+            with self.assertRaises(entity_mixins.NoSuchFieldError):
+                entity.search_rows(columns=('id', 'no such field'))
+        self.assertEqual(set(row.columns), set(entity.get_fields()))
+        self.assertEqual((row.id, row.one, row.name), (1, 3, None))
+
     def test_search_filter_v1(self):
         """Test :meth:`nailgun.entity_mixins.EntitySearchMixin.search_filter`.
 
@@ -1255,15 +1654,98 @@ class EntitySearchMixinTestCase(TestCase):
     def test_search_filter_v2(self):
         """Test :meth:`nailgun.entity_mixins.EntitySearchMixin.search_filter`.
 
-        Try to filter on a foreign key field.
+        Filter on foreign key fields. Compare IDs, and do not read entities
+        which the search results show cannot match.
 
         """
-        for filter_ in ({'one': 'foo'}, {'many': 'bar'}):
-            with self.subTest(filter_), self.assertRaises(NotImplementedError):
-                entity_mixins.EntitySearchMixin.search_filter(
-                    [EntityWithSearch2(self.cfg)],
-                    filter_,
+        entities = [
+            EntityWithSearchAndRead(self.cfg, id=1, one=1, many=[1, 2]),
+            EntityWithSearchAndRead(self.cfg, id=2, one=2),
+            EntityWithSearchAndRead(self.cfg, id=3),
+        ]
+        with mock.patch.object(
+            EntityWithSearchAndRead,
+            'read',
+            autospec=True,
+            side_effect=lambda entity: EntityWithSearchAndRead(
+                self.cfg, id=entity.id, one=1, many=[2, 1]
+            ),
+        ) as read:
+            results = entity_mixins.EntitySearchMixin.search_filter(
+                entities,
+                {'one': SampleEntity(self.cfg, id=1), 'many': [2, 1]},
+            )
+        self.assertEqual(read.call_count, 2)
+        self.assertEqual([result.id for result in results], [1, 3])
+
+    def test_search_filter_query(self):
+        """Test :meth:`nailgun.entity_mixins.EntitySearchMixin.search_filter_query`."""
+        entity = EntityWithSearchAndRead(self.cfg)
+        self.assertEqual(
+            entity.search_filter_query(
+                None, {'name': 'a "b"', 'number': 2, 'enabled': True, 'one': 1}
+            ),
+            {'search': 'name = "a \\"b\\"" and number = 2 and enabled = true'},
+        )
+        query = {'search': 'name ~ a', 'per_page': 5}
+        self.assertEqual(
+            entity.search_filter_query(query, {'number': 2}),
+            {'search': '(name ~ a) and number = 2', 'per_page': 5},
+        )
+        self.assertEqual(query, {'search': 'name ~ a', 'per_page': 5})
+        for filters in ({'one': 1}, {'number': None}, None):
+            with self.subTest(filters):
+                self.assertIs(entity.search_filter_query(query, filters), query)
+
+    def test_search_filter_query_allow_list(self):
+        """Only add filters on the fields an entity says can be searched."""
+        entity = EntityWithSearchAndRead(self.cfg)
+        entity._meta['search_fields'] = ('name',)
+        query = {'per_page': 5}
+        self.assertEqual(
+            entity.search_filter_query(query, {'name': 'a', 'number': 2}),
+            {'search': 'name = "a"', 'per_page': 5},
+        )
+        self.assertIs(entity.search_filter_query(query, {'number': 2}), query)
+        del entity._meta['search_fields']
+        self.assertIs(entity.search_filter_query(query, {'name': 'a'}), query)
+
+    def test_search_server_side_filters_refiltered(self):
+        """Filter locally what the server returns for a pushed down filter."""
+        entity = EntityWithSearchAndRead(self.cfg)
+        results = {'results': [{'id': 1}, {'id': 2}]}
+
+        def read(entity):
+            read_entity = EntityWithSearchAndRead(self.cfg, id=entity.id)
+            read_entity.name = 'a' if entity.id == 1 else 'b'
+            return read_entity
+
+        with (
+            mock.patch.object(entity, 'search_json', return_value=results) as search_json,
+            mock.patch.object(EntityWithSearchAndRead, 'read', autospec=True, side_effect=read),
+        ):
+            found = entity.search(filters={'name': 'a'})
+        search_json.assert_called_once_with(None, {'search': 'name = "a"'})
+        self.assertEqual([result.id for result in found], [1])
+
+    def test_search_server_side_filters(self):
+        """Let the server filter search results, unless it cannot."""
+        entity = EntityWithSearchAndRead(self.cfg)
+        for status_code in (http_client.BAD_REQUEST, http_client.UNPROCESSABLE_ENTITY):
+            error = HTTPError(response=mock.Mock(status_code=status_code))
+            with self.subTest(status_code):
+                with mock.patch.object(
+                    entity, 'search_json', side_effect=[error, {'results': []}]
+                ) as search_json:
+                    self.assertEqual(entity.search(filters={'number': 2}), [])
+                self.assertEqual(
+                    search_json.call_args_list,
+                    [mock.call(None, {'search': 'number = 2'}), mock.call(None, None)],
                 )
+        error = HTTPError(response=mock.Mock(status_code=http_client.INTERNAL_SERVER_ERROR))
+        with mock.patch.object(entity, 'search_json', side_effect=error):
+            with self.assertRaises(HTTPError):
+                entity.search(filters={'number': 2})
 
     def test_search_filter_v3(self):
         """Test :meth:`nailgun.entity_mixins.EntitySearchMixin.search_filter`.
@@ -1295,3 +1777,122 @@ class EntitySearchMixinTestCase(TestCase):
             )
         self.assertEqual(read.call_count, 1)
         self.assertEqual(results, [read.return_value])
+
+
+class ObserverTestCase(TestCase):
+    """Tests for :func:`nailgun.entity_mixins.add_observer`."""
+
+    def setUp(self):
+        """Add an observer which records each operation as it starts and ends."""
+        self.cfg = config.ServerConfig('http://example.com')
+        self.events = []
+
+        @contextlib.contextmanager
+        def observer(operation):
+            parent = operation.parent and operation.parent.name
+            self.events.append(('start', operation.name, operation.task_id, parent))
+            try:
+                yield
+            except ValueError:
+                self.events.append(('error', operation.name))
+                raise
+            self.events.append(('end', operation.name))
+
+        self.observer = observer
+        entity_mixins.add_observer(observer)
+        self.addCleanup(entity_mixins.remove_observer, observer)
+
+    def test_nested(self):
+        """Tell observers about operations, and the operations they are part of."""
+
+        class Entity(EntityWithCreate, entity_mixins.EntityReadMixin):
+            """An entity which reads itself once created, as many do."""
+
+            def create(self, create_missing=None):
+                """Create the entity, then read it."""
+                return self.read()
+
+            def read(self, entity=None, attrs=None, ignore=None, params=None):
+                """Read the entity, and wait for a task."""
+                entity_mixins._poll_task(1, self._server_config)
+                return super().read(entity, attrs, ignore, params)
+
+        with mock.patch.object(client, 'get') as get:
+            get.return_value.json.return_value = {'id': 1, 'state': 'stopped', 'result': 'success'}
+            Entity(self.cfg, id=1).create()
+        self.assertEqual(
+            self.events,
+            [
+                ('start', 'create', None, None),
+                ('start', 'read', None, 'create'),
+                ('start', 'poll_task', 1, 'read'),
+                ('end', 'poll_task'),
+                ('end', 'read'),
+                ('end', 'create'),
+            ],
+        )
+        self.assertIsNone(entity_mixins.current_operation())
+
+    def test_error(self):
+        """Pass on exceptions raised by operations to observers."""
+        with mock.patch.object(EntityWithRead, 'read_json', side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                EntityWithRead(self.cfg, id=1).read()
+        self.assertEqual(self.events, [('start', 'read', None, None), ('error', 'read')])
+        self.assertIsNone(entity_mixins.current_operation())
+
+    def test_remove(self):
+        """Stop tracking operations once no observer is added."""
+        entity_mixins.remove_observer(self.observer)
+        self.addCleanup(entity_mixins.add_observer, self.observer)
+        with mock.patch.object(EntityWithRead, 'read_json', return_value={'id': 1}):
+            EntityWithRead(self.cfg, id=1).read()
+        self.assertEqual(self.events, [])
+        with self.assertRaises(ValueError):
+            entity_mixins.remove_observer(self.observer)
+
+
+class ResponseMetadataTestCase(TestCase):
+    """Tests for :data:`nailgun.entity_mixins.RESPONSE_METADATA`."""
+
+    def setUp(self):
+        """Keep response metadata, and answer requests with a canned response."""
+        self.cfg = config.ServerConfig('http://example.com')
+        patcher = mock.patch.object(entity_mixins, 'RESPONSE_METADATA', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def response(self, request_id, body):
+        """Return a response to a request with ID ``request_id``."""
+        response = requests.Response()
+        response.status_code = 200
+        response.headers.update({'X-Request-Id': request_id, 'X-Runtime': '0.5'})
+        response._content = json.dumps(body).encode()
+        return response
+
+    def test_entities(self):
+        """Keep the metadata of the response each entity was made from."""
+
+        class Entity(EntityWithCreate, entity_mixins.EntityReadMixin):
+            """An entity which can be created and read."""
+
+        with mock.patch.object(client, 'post', return_value=self.response('post', {'id': 1})):
+            entity = Entity(self.cfg).create()
+        self.assertEqual(entity.response_metadata.request_id, 'post')
+        self.assertEqual(entity.response_metadata.server_seconds, 0.5)
+        self.assertNotIn('_response_metadata', entity.get_values())
+        with mock.patch.object(client, 'get', return_value=self.response('get', {'id': 1})):
+            self.assertEqual(entity.read().response_metadata.request_id, 'get')
+        self.assertIsNone(entity.read(attrs={'id': 1}).response_metadata)
+        with mock.patch.object(entity_mixins, 'RESPONSE_METADATA', False):
+            with mock.patch.object(client, 'get', return_value=self.response('get', {'id': 1})):
+                self.assertIsNone(entity.read().response_metadata)
+
+    def test_task(self):
+        """Return task results with the metadata of the last poll."""
+        task = {'id': 'a', 'state': 'stopped', 'result': 'success'}
+        with mock.patch.object(client, 'get', return_value=self.response('poll', task)):
+            result = entity_mixins._poll_task('a', self.cfg)
+        self.assertIsInstance(result, entity_mixins.TaskResult)
+        self.assertEqual(result, task)
+        self.assertEqual(result.response_metadata.request_id, 'poll')
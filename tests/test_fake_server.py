@@ -0,0 +1,210 @@
+"""Tests for :mod:`nailgun.fake_server`."""
+
+from concurrent.futures import ThreadPoolExecutor
+import io
+import json
+import tempfile
+import threading
+from unittest import mock
+from wsgiref.util import setup_testing_defaults
+
+import requests
+from requests.exceptions import HTTPError
+
+from nailgun import entities
+from nailgun.fake_server import FakeServer
+from tests.helpers import FakeServerCase
+
+
+class FakeServerTestCase(FakeServerCase):
+    """Tests for :class:`nailgun.fake_server.FakeServer`."""
+
+    entity_types = (
+        entities.ContentUpload,
+        entities.Organization,
+        entities.Product,
+        entities.Repository,
+        entities.SmartProxy,
+        entities.SyncPlan,
+    )
+    task_polls = 2
+
+    def setUp(self):
+        """Make a server, and an organization on it."""
+        super().setUp()
+        self.org = entities.Organization(self.cfg, name='org').create()
+
+    def test_crud(self):
+        """Create, read, update and delete an entity."""
+        product = entities.Product(self.cfg, name='foo', organization=self.org).create()
+        self.assertEqual(product.name, 'foo')
+        self.assertEqual(product.organization.id, self.org.id)
+        product.name = 'bar'
+        product.update()
+        self.assertEqual(product.read().name, 'bar')
+        product.delete()
+        with self.assertRaises(HTTPError) as context:
+            product.read()
+        self.assertEqual(context.exception.response.status_code, 404)
+
+    def test_delete(self):
+        """Delete Katello entities with a task, and others without."""
+        product = entities.Product(self.cfg, name='foo', organization=self.org).create()
+        self.assertEqual(product.delete(synchronous=False)['state'], 'running')
+        self.assertEqual(self.server.records('katello/api/v2/products'), {})
+        smart_proxy = entities.SmartProxy(self.cfg, id=1)
+        self.assertEqual(smart_proxy.delete()['name'], 'satellite.fake')
+
+    def test_search(self):
+        """Search by terms and relationships, a page at a time."""
+        other_org = entities.Organization(self.cfg, name='other').create()
+        for i in range(25):
+            entities.Product(self.cfg, name=f'product-{i}', organization=self.org).create()
+        entities.Product(self.cfg, name='product-x', organization=other_org).create()
+        product = entities.Product(self.cfg)
+        for query, names in (
+            ({'per_page': 10, 'page': 3}, [f'product-{i}' for i in range(20, 25)] + ['product-x']),
+            ({'search': 'name = product-1'}, ['product-1']),
+            (
+                {'search': 'name ~ "product-2" and name != product-2', 'per_page': 2},
+                ['product-20', 'product-21'],
+            ),
+            ({'search': f'organization_id = {other_org.id}'}, ['product-x']),
+        ):
+            with self.subTest(query):
+                results = product.search(query=query)
+                self.assertEqual([result.name for result in results], names)
+        self.assertEqual(len(product.search(query={'per_page': 100})), 26)
+        results = product.search_json(query={'organization_id': other_org.id})
+        self.assertEqual((results['total'], results['subtotal']), (26, 1))
+        with self.assertRaises(HTTPError) as context:
+            product.search(query={'search': 'name in (a, b)'})
+        self.assertEqual(context.exception.response.status_code, 422)
+
+    def test_scan_capped_pages(self):
+        """Scan every entity when the server returns fewer per page than asked for."""
+        for i in range(7):
+            entities.Product(self.cfg, name=f'product-{i}', organization=self.org).create()
+        self.server.max_per_page = 3
+        product = entities.Product(self.cfg)
+        self.assertEqual(len(product.search(query={'per_page': 10})), 3)
+        self.assertEqual(product.search_json(query={'per_page': 10})['per_page'], 3)
+        names = [result.name for result in product.scan(page_size=10)]
+        self.assertEqual(names, [f'product-{i}' for i in range(7)])
+
+    def test_nested(self):
+        """Keep the entities of each parent apart."""
+        other_org = entities.Organization(self.cfg, name='other').create()
+        for org in (self.org, other_org):
+            entities.SyncPlan(
+                self.cfg, organization=org, name='daily', interval='daily', sync_date='2024-01-01'
+            ).create()
+        for org in (self.org, other_org):
+            with self.subTest(org.id):
+                plans = entities.SyncPlan(self.cfg, organization=org).search()
+                self.assertEqual(len(plans), 1)
+
+    def test_tasks(self):
+        """Report tasks as running until they have been polled enough."""
+        product = entities.Product(self.cfg, name='foo', organization=self.org).create()
+        task = product.sync(synchronous=False)
+        self.assertEqual(task['state'], 'running')
+        poll = entities.ForemanTask(self.cfg, id=task['id']).read_json
+        self.assertEqual([poll()['state'] for _ in range(3)], ['running', 'running', 'stopped'])
+        self.assertEqual(product.sync()['result'], 'success')
+
+    def test_content_upload(self):
+        """Keep content uploads by their upload ID."""
+        product = entities.Product(self.cfg, name='foo', organization=self.org).create()
+        repository = entities.Repository(self.cfg, name='foo', product=product).create()
+        content_upload = entities.ContentUpload(self.cfg, repository=repository)
+        with tempfile.NamedTemporaryFile() as handle:
+            handle.write(b'content')
+            handle.flush()
+            self.assertEqual(content_upload.upload(handle.name, 'file')['result'], 'success')
+        self.assertEqual(
+            self.server.records(f'katello/api/v2/repositories/{repository.id}/content_uploads'),
+            {},
+        )
+
+    def test_not_found(self):
+        """Answer requests for unknown paths, records and tasks with a 404."""
+        for path in (
+            'api/v2/no_such_entities',
+            'katello/api/v2/products/1000',
+            'katello/api/v2/products/foo',
+            'foreman_tasks/api/tasks/1000',
+        ):
+            with self.subTest(path):
+                status, content = self.server.handle('GET', path)
+                self.assertEqual(status, 404)
+                self.assertIn('message', content['error'])
+        self.assertEqual(self.server.handle('PATCH', 'katello/api/v2/products')[0], 405)
+
+    def test_install(self):
+        """Send requests for other URLs as usual, and restore requests afterwards."""
+        session = requests.Session()
+        self.assertIsNot(session.get_adapter('https://example.com'), self.server.adapter)
+        with self.server.install():
+            self.assertIs(session.get_adapter(f'{self.server.url}/api'), self.server.adapter)
+        self.assertIs(session.get_adapter(f'{self.server.url}/api'), self.server.adapter)
+        self.doCleanups()
+        self.assertIsNot(session.get_adapter(f'{self.server.url}/api'), self.server.adapter)
+
+    def test_install_several(self):
+        """Send requests to each of several servers installed at once, from several threads."""
+        servers = [
+            FakeServer(f'https://satellite{i}.fake', entity_types=self.entity_types)
+            for i in range(2)
+        ]
+        # A server whose URL starts with another's does not take its requests.
+        servers.append(FakeServer(f'{self.server.url}2', entity_types=self.entity_types))
+        barrier = threading.Barrier(len(servers))
+
+        def create(server):
+            with server.install() as cfg:
+                barrier.wait()
+                for _ in range(5):
+                    entities.Organization(cfg, name=server.url).create()
+                barrier.wait()
+
+        with ThreadPoolExecutor(len(servers)) as executor:
+            list(executor.map(create, servers))
+        for server in servers:
+            with self.subTest(server.url):
+                names = [
+                    record['name']
+                    for record in server.records('katello/api/organizations').values()
+                ]
+                self.assertEqual(names, [server.url] * 5)
+        self.assertEqual(len(self.server.records('katello/api/organizations')), 1)
+
+        # Servers are uninstalled in any order.
+        session = requests.Session()
+        first, second = servers[:2]
+        first_context, second_context = first.install(), second.install()
+        first_context.__enter__()
+        second_context.__enter__()
+        first_context.__exit__(None, None, None)
+        self.assertIsNot(session.get_adapter(f'{first.url}/api'), first.adapter)
+        self.assertIs(session.get_adapter(f'{second.url}/api'), second.adapter)
+        second_context.__exit__(None, None, None)
+        self.assertIsNot(session.get_adapter(f'{second.url}/api'), second.adapter)
+        self.assertIs(session.get_adapter(f'{self.server.url}/api'), self.server.adapter)
+
+    def test_wsgi(self):
+        """Answer requests made through WSGI."""
+        body = json.dumps({'product': {'name': 'foo', 'organization_id': self.org.id}}).encode()
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': '/katello/api/v2/products',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body),
+        }
+        setup_testing_defaults(environ)
+        start_response = mock.Mock()
+        content = json.loads(b''.join(self.server(environ, start_response)))
+        self.assertEqual(start_response.call_args[0][0], '201 Created')
+        self.assertEqual(content['name'], 'foo')
+        self.assertEqual(content['organization'], {'id': self.org.id})
@@ -0,0 +1,65 @@
+"""Tests for :mod:`nailgun.json_stream`."""
+
+import json
+from unittest import TestCase
+
+from nailgun.json_stream import ArrayStream
+
+
+def _chunks(text, size):
+    """Split ``text`` in to UTF-8 encoded chunks of ``size`` bytes."""
+    raw = text.encode()
+    return (raw[i : i + size] for i in range(0, len(raw), size))
+
+
+class ArrayStreamTestCase(TestCase):
+    """Tests for :class:`nailgun.json_stream.ArrayStream`."""
+
+    def test_chunks(self):
+        """Yield the same items and metadata however the document is split."""
+        document = {
+            'total': 30,
+            'search': None,
+            'results': [
+                {'id': i, 'name': 'é "x" \\' * i, 'values': [i, 2.5, None, True]} for i in range(30)
+            ],
+            'page': 1,
+            'per_page': 12345,
+        }
+        metadata = {name: value for name, value in document.items() if name != 'results'}
+        text = json.dumps(document, ensure_ascii=False, indent=1)
+        for size in (1, 2, 3, 7, 100, len(text) * 2):
+            with self.subTest(size):
+                stream = ArrayStream(_chunks(text, size))
+                self.assertEqual(list(stream), document['results'])
+                self.assertEqual(stream.metadata, metadata)
+
+    def test_lazy(self):
+        """Read no more chunks than are needed for the next item."""
+        read = []
+
+        def chunks():
+            for chunk in ('{"results": [{"id": 1}, ', '{"id": 2}', ']}'):
+                read.append(chunk)
+                yield chunk
+
+        items = iter(ArrayStream(chunks()))
+        self.assertEqual(next(items), {'id': 1})
+        self.assertEqual(len(read), 1)
+        self.assertEqual(list(items), [{'id': 2}])
+
+    def test_empty(self):
+        """Handle empty objects and arrays, and a different key."""
+        for text, key, expected in (
+            ('{}', 'results', []),
+            (' { "results" : [ ] } ', 'results', []),
+            ('{"results": [1], "rows": [2, 3]}', 'rows', [2, 3]),
+        ):
+            with self.subTest(text):
+                self.assertEqual(list(ArrayStream([text], key)), expected)
+
+    def test_invalid(self):
+        """Raise an error for documents which are not JSON objects."""
+        for text in ('', '[1]', '{"results": [1,}', '{"a": 1', '{"a": 1} x', '{1: 2}', '{"a" 1}'):
+            with self.subTest(text), self.assertRaises(json.JSONDecodeError):
+                list(ArrayStream(_chunks(text, 2)))
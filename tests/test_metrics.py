@@ -0,0 +1,159 @@
+"""Tests for :mod:`nailgun.metrics`."""
+
+from unittest import mock
+
+import requests
+
+from nailgun import client, entities, entity_mixins, metrics
+from tests.helpers import FakeServerCase
+
+# Due to the length of the with statements, nested is preferred over combined
+# ruff: noqa: SIM117
+
+
+class MetricsTestCase(FakeServerCase):
+    """Tests for :class:`nailgun.metrics.Metrics`."""
+
+    entity_types = (
+        entities.Organization,
+        entities.Product,
+        entities.Repository,
+        entities.SmartProxy,
+    )
+
+    def run_job(self):
+        """Create a product, search for it, and delete it."""
+        org = entities.Organization(self.cfg, name='org').create()
+        product = entities.Product(self.cfg, name='foo', organization=org).create()
+        entities.Product(self.cfg).search()
+        product.delete()
+
+    def test_requests(self):
+        """Count requests by entity class, method, HTTP method and templated path."""
+        with metrics.collect() as collected:
+            self.run_job()
+        counts = {
+            (r['entity'], r['method'], r['verb'], r['path']): (r['count'], r['statuses'])
+            for r in collected.snapshot()['requests']
+        }
+        self.assertEqual(
+            counts,
+            {
+                ('Organization', 'create', 'POST', '/katello/api/organizations'): (
+                    1,
+                    {'201': 1},
+                ),
+                ('Organization', 'read', 'GET', '/katello/api/organizations/{id}'): (
+                    1,
+                    {'200': 1},
+                ),
+                ('Product', 'create', 'POST', '/katello/api/v2/products'): (1, {'201': 1}),
+                ('Product', 'search', 'GET', '/katello/api/v2/products'): (1, {'200': 1}),
+                ('Product', 'delete', 'DELETE', '/katello/api/v2/products/{id}'): (
+                    1,
+                    {'202': 1},
+                ),
+                ('Product', 'poll_task', 'GET', '/foreman_tasks/api/tasks/{id}'): (
+                    2,
+                    {'200': 2},
+                ),
+            },
+        )
+        for request in collected.snapshot()['requests']:
+            with self.subTest(request['path']):
+                self.assertEqual(request['seconds']['count'], request['count'])
+                self.assertEqual(request['bytes']['count'], request['count'])
+                self.assertGreater(request['bytes']['sum'], 0)
+
+    def test_server_time(self):
+        """Count the time the server said it spent, and find the slowest request."""
+        with metrics.collect() as collected:
+            for _ in range(3):
+                entities.SmartProxy(self.cfg, id=1).read()
+        (request,) = collected.snapshot()['requests']
+        self.assertEqual(request['server_seconds']['count'], 3)
+        slowest = request['slowest']
+        self.assertEqual(len(slowest['request_id']), 36)
+        self.assertLessEqual(slowest['server_seconds'], slowest['seconds'])
+        self.assertIn('nailgun_server_duration_seconds_count{', collected.prometheus())
+
+    def test_task_waits(self):
+        """Time task waits by the entity class and method which waited."""
+        with metrics.collect(task_wait_buckets=(0, 60)) as collected:
+            self.run_job()
+        waits = collected.snapshot()['task_waits']
+        self.assertEqual([(w['entity'], w['method']) for w in waits], [('Product', 'delete')])
+        self.assertEqual(waits[0]['seconds']['count'], 1)
+        self.assertEqual(waits[0]['seconds']['buckets'], [(0, 0), (60, 1)])
+
+    def test_actions(self):
+        """Count requests made by action methods, and their task waits, by entity and method."""
+        org = entities.Organization(self.cfg, name='org').create()
+        product = entities.Product(self.cfg, name='foo', organization=org).create()
+        repository = entities.Repository(self.cfg, name='foo', product=product).create()
+        with metrics.collect() as collected:
+            repository.sync()
+        snapshot = collected.snapshot()
+        self.assertEqual(
+            {(r['entity'], r['method'], r['verb'], r['path']) for r in snapshot['requests']},
+            {
+                ('Repository', 'sync', 'POST', '/katello/api/v2/repositories/{id}/sync'),
+                ('Repository', 'poll_task', 'GET', '/foreman_tasks/api/tasks/{id}'),
+            },
+        )
+        self.assertEqual(
+            [(w['entity'], w['method']) for w in snapshot['task_waits']],
+            [('Repository', 'sync')],
+        )
+
+    def test_errors(self):
+        """Count requests which raise an error."""
+        url = 'https://satellite.example.com/api/v2/hosts/1'
+        with metrics.collect() as collected:
+            with mock.patch.object(requests, 'get', side_effect=requests.ConnectionError):
+                with self.assertRaises(requests.ConnectionError):
+                    client.get(url)
+        (request,) = collected.snapshot()['requests']
+        self.assertEqual(
+            (request['entity'], request['method'], request['path'], request['statuses']),
+            ('', '', '/api/v2/hosts/{id}', {'error': 1}),
+        )
+        self.assertEqual(request['bytes']['count'], 0)
+
+    def test_prometheus(self):
+        """Render what was counted in the Prometheus text format."""
+        with metrics.collect(duration_buckets=(60,)) as collected:
+            entities.SmartProxy(self.cfg, id=1).read()
+        text = collected.prometheus()
+        labels = 'entity="SmartProxy",method="read",verb="GET",path="/api/v2/smart_proxies/{id}"'
+        self.assertIn(f'nailgun_requests_total{{{labels},status="200"}} 1\n', text)
+        self.assertIn(f'nailgun_request_duration_seconds_bucket{{{labels},le="60"}} 1\n', text)
+        self.assertIn(f'nailgun_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1\n', text)
+        self.assertIn(f'nailgun_request_duration_seconds_count{{{labels}}} 1\n', text)
+        self.assertIn('# TYPE nailgun_task_wait_seconds histogram\n', text)
+
+    def test_disable(self):
+        """Count nothing once disabled, and forget what was counted when reset."""
+        collected = metrics.Metrics()
+        collected.enable()
+        entities.SmartProxy(self.cfg, id=1).read()
+        collected.disable()
+        self.assertEqual((client._interceptors, entity_mixins._observers), ((), ()))
+        entities.SmartProxy(self.cfg, id=1).read()
+        self.assertEqual(len(collected.snapshot()['requests']), 1)
+        collected.reset()
+        self.assertEqual(collected.snapshot(), {'requests': [], 'task_waits': []})
+
+    def test_template_path(self):
+        """Replace numeric IDs and UUIDs in paths."""
+        for url, path in (
+            ('https://sat/api/v2/hosts', '/api/v2/hosts'),
+            ('https://sat/api/v2/hosts/10/power?x=1', '/api/v2/hosts/{id}/power'),
+            (
+                'https://sat/foreman_tasks/api/tasks/0f6ab1e4-4bb0-4c7e-8bfb-3b2e8e0c0a3a',
+                '/foreman_tasks/api/tasks/{id}',
+            ),
+            ('https://sat/api/v2/settings/foo', '/api/v2/settings/foo'),
+        ):
+            with self.subTest(url):
+                self.assertEqual(metrics.template_path(url), path)
@@ -0,0 +1,668 @@
+"""Tests for :mod:`nailgun.orchestration`."""
+
+from itertools import count, pairwise
+from unittest import TestCase, mock
+
+from requests.exceptions import HTTPError
+
+from nailgun import config, entities, orchestration
+from nailgun.orchestration import (
+    CapsuleSyncFanOut,
+    ContentViewPipeline,
+    HostBulkAction,
+    RepositorySyncOrchestrator,
+    TaskEvent,
+    TaskJob,
+    TaskRetryPolicy,
+    TaskRunner,
+    TaskWatcher,
+    critical_path,
+    overall_progress,
+)
+from tests.helpers import FakeServerCase
+
+# Due to the length of the with statements, nested is preferred over combined
+# ruff: noqa: SIM117
+
+
+class FakeTasks:
+    """Start fake foreman tasks and answer bulk searches about them.
+
+    Each task runs for ``polls`` bulk searches and then stops with the next
+    result from ``results``, or with ``'success'`` once ``results`` runs out.
+    """
+
+    def __init__(self, polls=1, results=()):
+        self.polls = polls
+        self.results = list(results)
+        self.tasks = {}
+        self.ids = count(1)
+        self.max_running = 0
+        self.bulk_searches = 0
+
+    def start(self, *args, **kwargs):
+        """Start a task and return it as the server would."""
+        task_id = f'task-{next(self.ids)}'
+        self.tasks[task_id] = {'id': task_id, 'state': 'running', 'result': 'pending', 'polls': 0}
+        running = [task for task in self.tasks.values() if task['state'] == 'running']
+        self.max_running = max(self.max_running, len(running))
+        return {'id': task_id, 'state': 'planned'}
+
+    def bulk_search(self, synchronous=True, timeout=None, **kwargs):
+        """Implement :meth:`nailgun.entities.ForemanTask.bulk_search`."""
+        self.bulk_searches += 1
+        response = []
+        for search in kwargs['data']['searches']:
+            task = self.tasks[search['task_id']]
+            task['polls'] += 1
+            task['progress'] = min(task['polls'] / self.polls, 1)
+            if task['state'] == 'running' and task['polls'] >= self.polls:
+                task['state'] = 'stopped'
+                task['result'] = self.results.pop(0) if self.results else 'success'
+            response.append({'search_params': search, 'results': [dict(task)]})
+        return response
+
+
+class TaskWatcherTestCase(TestCase):
+    """Tests for :class:`nailgun.orchestration.TaskWatcher`."""
+
+    def test_poll(self):
+        """Poll several tasks with one request, and forget finished tasks."""
+        fake = FakeTasks(polls=2)
+        watcher = TaskWatcher(config.ServerConfig('http://example.com'))
+        self.assertEqual(watcher.poll(), {})
+        for _ in range(2):
+            watcher.add(fake.start()['id'])
+        with mock.patch.object(entities.ForemanTask, 'bulk_search', fake.bulk_search):
+            self.assertEqual(
+                {task['state'] for task in watcher.poll().values()},
+                {'running'},
+            )
+            self.assertEqual(len(watcher), 2)
+            self.assertEqual(
+                {task['state'] for task in watcher.poll().values()},
+                {'stopped'},
+            )
+        self.assertEqual(len(watcher), 0)
+        self.assertEqual(fake.bulk_searches, 2)
+
+
+class TaskRunnerTestCase(TestCase):
+    """Tests for :class:`nailgun.orchestration.TaskRunner`."""
+
+    def setUp(self):
+        """Set ``self.cfg``."""
+        self.cfg = config.ServerConfig('http://example.com')
+
+    def run_jobs(self, fake, jobs, **kwargs):
+        """Run ``jobs`` against ``fake`` and return the events."""
+        kwargs.setdefault('poll_rate', 0)
+        runner = TaskRunner(self.cfg, **kwargs)
+        with mock.patch.object(entities.ForemanTask, 'bulk_search', fake.bulk_search):
+            return list(runner.run(jobs))
+
+    def test_max_in_flight(self):
+        """Never run more tasks at once than allowed."""
+        fake = FakeTasks(polls=2)
+        jobs = [TaskJob(fake.start, label=i) for i in range(5)]
+        events = self.run_jobs(fake, jobs, max_in_flight=2)
+        self.assertEqual(fake.max_running, 2)
+        self.assertTrue(all(job.succeeded for job in jobs))
+        self.assertEqual(
+            [event.kind for event in events].count(TaskEvent.SUCCEEDED),
+            5,
+        )
+        self.assertIn(TaskEvent.PROGRESS, [event.kind for event in events])
+
+    def test_no_task(self):
+        """Succeed immediately if no task is started."""
+        job = TaskJob(lambda: None)
+        events = self.run_jobs(FakeTasks(), [job])
+        self.assertEqual(events, [TaskEvent(TaskEvent.SUCCEEDED, job, None)])
+
+    def test_failure(self):
+        """Keep going past a failed job, but skip its dependents."""
+        fake = FakeTasks(results=['error'])
+        failing = TaskJob(fake.start)
+        dependent = TaskJob(fake.start, depends_on=[failing])
+        other = TaskJob(fake.start)
+        self.run_jobs(fake, [failing, dependent, other], max_in_flight=1)
+        self.assertEqual(failing.state, TaskJob.FAILED)
+        self.assertEqual(failing.result, 'error')
+        self.assertEqual(dependent.state, TaskJob.SKIPPED)
+        self.assertEqual(other.state, TaskJob.SUCCEEDED)
+
+    def test_dependencies(self):
+        """Start a job only once its dependencies have succeeded."""
+        fake = FakeTasks(polls=2)
+        first = TaskJob(fake.start)
+        second = TaskJob(fake.start, depends_on=[first])
+        events = self.run_jobs(fake, [second, first])
+        self.assertEqual(
+            [(event.kind, event.job) for event in events if event.kind != TaskEvent.PROGRESS],
+            [
+                (TaskEvent.STARTED, first),
+                (TaskEvent.SUCCEEDED, first),
+                (TaskEvent.STARTED, second),
+                (TaskEvent.SUCCEEDED, second),
+            ],
+        )
+
+    def test_run_after(self):
+        """Start a job once the jobs it runs after are done, even if they failed."""
+        fake = FakeTasks(results=['error'])
+        first = TaskJob(fake.start)
+        second = TaskJob(fake.start, run_after=[first])
+        events = self.run_jobs(fake, [second, first])
+        self.assertEqual(
+            [(event.kind, event.job) for event in events],
+            [
+                (TaskEvent.STARTED, first),
+                (TaskEvent.FAILED, first),
+                (TaskEvent.STARTED, second),
+                (TaskEvent.SUCCEEDED, second),
+            ],
+        )
+
+    def test_missing_dependency(self):
+        """Skip jobs which depend on a job that is never run."""
+        job = TaskJob(FakeTasks().start, depends_on=[TaskJob(None)])
+        self.assertEqual(
+            self.run_jobs(FakeTasks(), [job]),
+            [TaskEvent(TaskEvent.SKIPPED, job, None)],
+        )
+
+    def test_retry(self):
+        """Retry a failed job under the retry policy."""
+        fake = FakeTasks(results=['error', 'error'])
+        job = TaskJob(fake.start)
+        events = self.run_jobs(
+            fake, [job], retry_policy=TaskRetryPolicy(max_attempts=3, delay=0.01)
+        )
+        self.assertEqual(
+            [event.kind for event in events].count(TaskEvent.RETRYING),
+            2,
+        )
+        self.assertEqual(job.attempt, 3)
+        self.assertTrue(job.succeeded)
+
+    def test_retry_start_failed(self):
+        """Retry a job whose task could not be started."""
+        fake = FakeTasks()
+        job = TaskJob(mock.Mock(side_effect=[HTTPError('503'), {'id': 'task-1'}]))
+        fake.start()  # So that "task-1" exists.
+        self.run_jobs(fake, [job], retry_policy=TaskRetryPolicy(max_attempts=2))
+        self.assertTrue(job.succeeded)
+        self.assertEqual(job.attempt, 2)
+
+    def test_split(self):
+        """Retry a failed job as the jobs returned by its ``split`` callable."""
+        fake = FakeTasks(results=['error'])
+        children = [TaskJob(fake.start), TaskJob(fake.start)]
+        job = TaskJob(fake.start, split=lambda: children)
+        dependent = TaskJob(fake.start, depends_on=[job])
+        runner = TaskRunner(self.cfg, poll_rate=0, retry_policy=TaskRetryPolicy(max_attempts=2))
+        with mock.patch.object(entities.ForemanTask, 'bulk_search', fake.bulk_search):
+            ran = runner.run_all([job, dependent])
+        self.assertEqual(job.state, TaskJob.SPLIT)
+        self.assertTrue(job.succeeded)
+        self.assertEqual(dependent.state, TaskJob.SUCCEEDED)
+        self.assertEqual({child.attempt for child in children}, {2})
+        self.assertEqual(len(ran), 4)
+
+    def test_timeout(self):
+        """Fail a job whose task takes too long."""
+        fake = FakeTasks(polls=1000)
+        job = TaskJob(fake.start)
+        with mock.patch.object(orchestration.time, 'monotonic', side_effect=count(0, 10)):
+            self.run_jobs(fake, [job], timeout=15)
+        self.assertEqual(job.state, TaskJob.FAILED)
+        self.assertEqual(job.result, 'timed_out')
+
+
+class CriticalPathTestCase(TestCase):
+    """Tests for :func:`nailgun.orchestration.critical_path`."""
+
+    @staticmethod
+    def make_job(started_at, ended_at, depends_on=()):
+        """Return a job which ran between ``started_at`` and ``ended_at``."""
+        job = TaskJob(None, depends_on=depends_on)
+        job.state = TaskJob.SUCCEEDED
+        job.first_started_at = job.started_at = started_at
+        job.ended_at = ended_at
+        return job
+
+    def test_critical_path(self):
+        """Follow the dependencies which took the longest."""
+        short = self.make_job(0, 1)
+        long = self.make_job(0, 5)
+        last = self.make_job(5, 7, depends_on=[short, long])
+        other = self.make_job(0, 6)
+        self.assertEqual(critical_path([short, long, last, other]), (7, [long, last]))
+        self.assertEqual(critical_path([]), (0, []))
+
+    def test_split(self):
+        """A split job lasts until its last child finishes."""
+        job = self.make_job(0, 1)
+        job.state = TaskJob.SPLIT
+        job.children = [self.make_job(2, 3), self.make_job(2, 4)]
+        self.assertEqual(job.duration, 4)
+        job.children.append(TaskJob(None))
+        self.assertIsNone(job.duration)
+
+
+class RepositorySyncOrchestratorTestCase(TestCase):
+    """Tests for :class:`nailgun.orchestration.RepositorySyncOrchestrator`."""
+
+    def setUp(self):
+        """Create repositories in two products.
+
+        Product 1 has two repositories, both of which are selected. Product 2
+        has three repositories, two of which are selected.
+        """
+        self.cfg = config.ServerConfig('http://example.com')
+        self.repositories = [
+            entities.Repository(self.cfg, id=i, product=product)
+            for i, product in ((1, 1), (2, 1), (3, 2), (4, 2))
+        ]
+        self.counts = {1: 2, 2: 3}
+
+    def count_repositories(self, product_id):
+        """Return the number of repositories in a product."""
+        return self.counts[product_id]
+
+    def test_jobs(self):
+        """Sync a product with one task only if all its repositories are synced."""
+        orchestrator = RepositorySyncOrchestrator(self.cfg)
+        with mock.patch.object(orchestrator, '_count_repositories', self.count_repositories):
+            with mock.patch.object(entities.Product, 'sync') as sync:
+                jobs = orchestrator.jobs(self.repositories)
+                jobs[-1].start()
+        self.assertEqual(
+            [[repository.id for repository in job.items] for job in jobs],
+            [[3], [4], [1, 2]],
+        )
+        sync.assert_called_once_with(synchronous=False)
+        self.assertEqual(
+            [[repository.id for repository in job.items] for job in jobs[-1].split()],
+            [[1], [2]],
+        )
+
+    def test_jobs_bulk(self):
+        """Sync several whole products with one bulk task."""
+        self.counts[2] = 2
+        orchestrator = RepositorySyncOrchestrator(self.cfg)
+        with mock.patch.object(orchestrator, '_count_repositories', self.count_repositories):
+            with mock.patch.object(entities.ProductBulkAction, 'sync') as sync:
+                jobs = orchestrator.jobs(self.repositories)
+                jobs[0].start()
+        self.assertEqual(len(jobs), 1)
+        sync.assert_called_once_with(synchronous=False, data={'ids': [1, 2]})
+
+    def test_jobs_ungrouped(self):
+        """Sync each repository with its own task if asked to."""
+        orchestrator = RepositorySyncOrchestrator(self.cfg, group_by_product=False)
+        with mock.patch.object(entities.Repository, 'sync') as sync:
+            jobs = orchestrator.jobs(self.repositories)
+            jobs[0].start()
+        self.assertEqual(len(jobs), 4)
+        sync.assert_called_once_with(synchronous=False)
+
+    def test_sync(self):
+        """Report events for each repository."""
+        fake = FakeTasks()
+        orchestrator = RepositorySyncOrchestrator(self.cfg, poll_rate=0)
+        with mock.patch.object(orchestrator, '_count_repositories', self.count_repositories):
+            with mock.patch.object(entities.ForemanTask, 'bulk_search', fake.bulk_search):
+                with mock.patch.object(entities.Repository, 'sync', fake.start):
+                    with mock.patch.object(entities.Product, 'sync', fake.start):
+                        events = list(orchestrator.sync(self.repositories))
+        self.assertEqual(
+            sorted(event.item.id for event in events if event.kind == TaskEvent.SUCCEEDED),
+            [1, 2, 3, 4],
+        )
+        self.assertEqual(len(fake.tasks), 3)
+
+    def test_sync_query(self):
+        """Search for the repositories to sync."""
+        orchestrator = RepositorySyncOrchestrator(self.cfg)
+        with mock.patch.object(entities.Repository, 'search', return_value=[]) as search:
+            self.assertEqual(list(orchestrator.sync(query={'organization_id': 1})), [])
+        search.assert_called_once_with(query={'organization_id': 1})
+
+
+class FakeServerSyncTestCase(FakeServerCase):
+    """Sync repositories on a :class:`nailgun.fake_server.FakeServer`."""
+
+    entity_types = (
+        entities.Organization,
+        entities.Product,
+        entities.Repository,
+        entities.SmartProxy,
+    )
+    task_polls = 2
+
+    def test_sync(self):
+        """Sync a whole product with one task and a lone repository with another."""
+        org = entities.Organization(self.cfg, name='org').create()
+        products = [entities.Product(self.cfg, organization=org).create() for _ in range(2)]
+        repositories = [
+            entities.Repository(self.cfg, product=product).create()
+            for product in (products[0], products[0], products[1], products[1])
+        ]
+        orchestrator = RepositorySyncOrchestrator(self.cfg, max_in_flight=2, poll_rate=0)
+        events = list(orchestrator.sync(repositories[:3]))
+        self.assertEqual(
+            sorted(event.item.id for event in events if event.kind == TaskEvent.SUCCEEDED),
+            sorted(repository.id for repository in repositories[:3]),
+        )
+        self.assertEqual(len(self.server.tasks), 2)
+        self.assertTrue(all(task['result'] == 'success' for task in self.server.tasks.values()))
+
+
+class OverallProgressTestCase(TestCase):
+    """Tests for :func:`nailgun.orchestration.overall_progress`."""
+
+    def test_overall_progress(self):
+        """Average the progress of every job."""
+        done, running, pending = TaskJob(None), TaskJob(None), TaskJob(None)
+        done.state = TaskJob.FAILED
+        running.state = TaskJob.RUNNING
+        running.task = {'progress': 0.5}
+        self.assertEqual(overall_progress([done, running, pending]), 0.5)
+        self.assertEqual(overall_progress([]), 1)
+
+
+class ContentViewPipelineTestCase(TestCase):
+    """Tests for :class:`nailgun.orchestration.ContentViewPipeline`.
+
+    Content views 1 and 2 are components of composite content view 3, which
+    tracks the latest version of 1 only. Lifecycle environment 2 follows
+    "Library", and environment 3 follows environment 2.
+    """
+
+    def setUp(self):
+        """Create content views and lifecycle environments."""
+        self.cfg = config.ServerConfig('http://example.com')
+        self.content_views = [
+            entities.ContentView(self.cfg, id=1, composite=False),
+            entities.ContentView(self.cfg, id=2, composite=False),
+            entities.ContentView(
+                self.cfg,
+                id=3,
+                composite=True,
+                content_view_component=[
+                    entities.ContentViewComponent(self.cfg, composite_content_view=3, id=i)
+                    for i in (1, 2)
+                ],
+            ),
+        ]
+        self.components = [
+            entities.ContentViewComponent(
+                self.cfg, composite_content_view=3, id=1, content_view=1, latest=True
+            ),
+            entities.ContentViewComponent(
+                self.cfg, composite_content_view=3, id=2, content_view=2, latest=False
+            ),
+        ]
+        self.environments = [
+            entities.LifecycleEnvironment(self.cfg, id=1, prior=None),
+            entities.LifecycleEnvironment(self.cfg, id=2, prior=1),
+            entities.LifecycleEnvironment(self.cfg, id=3, prior=2),
+        ]
+
+    def get_jobs(self, pipeline, **kwargs):
+        """Return the jobs ``pipeline`` makes for the content views and environments."""
+        with mock.patch.object(entities.ContentViewComponent, 'read', side_effect=self.components):
+            return pipeline.jobs(self.content_views, self.environments, **kwargs)
+
+    def test_jobs(self):
+        """Publish components before composites, and promote along the path."""
+        jobs = {job.label: job for job in self.get_jobs(ContentViewPipeline(self.cfg))}
+        self.assertEqual(
+            {label: [dep.label for dep in job.depends_on] for label, job in jobs.items()},
+            {
+                'publish content view 1': [],
+                'publish content view 2': [],
+                'publish content view 3': ['publish content view 1'],
+                'promote content view 1 to environment 2': ['publish content view 1'],
+                'promote content view 1 to environment 3': [
+                    'promote content view 1 to environment 2'
+                ],
+                'promote content view 2 to environment 2': ['publish content view 2'],
+                'promote content view 2 to environment 3': [
+                    'promote content view 2 to environment 2'
+                ],
+                'promote content view 3 to environment 2': ['publish content view 3'],
+                'promote content view 3 to environment 3': [
+                    'promote content view 3 to environment 2'
+                ],
+            },
+        )
+
+    def test_jobs_read(self):
+        """Read entities whose relations are unknown."""
+        self.content_views[0] = entities.ContentView(self.cfg, id=1)
+        self.environments = [entities.LifecycleEnvironment(self.cfg, id=2)]
+        with mock.patch.object(
+            entities.ContentView, 'read', return_value=entities.ContentView(self.cfg, id=1)
+        ) as read_cv:
+            read_cv.return_value.composite = False
+            with mock.patch.object(
+                entities.LifecycleEnvironment,
+                'read',
+                return_value=entities.LifecycleEnvironment(self.cfg, id=2, prior=1),
+            ) as read_env:
+                jobs = self.get_jobs(ContentViewPipeline(self.cfg), promote=[])
+        read_cv.assert_called_once_with()
+        read_env.assert_called_once_with()
+        self.assertEqual(len(jobs), 3)
+
+    def test_run(self):
+        """Promote the latest version, and carry on past failures."""
+        fake = FakeTasks(results=['error'])
+        pipeline = ContentViewPipeline(self.cfg, poll_rate=0, max_in_flight=1)
+        published = entities.ContentView(self.cfg, id=2, version=[5, 7])
+        with mock.patch.object(entities.ForemanTask, 'bulk_search', fake.bulk_search):
+            with mock.patch.object(entities.ContentView, 'publish', fake.start):
+                with mock.patch.object(entities.ContentView, 'read', return_value=published):
+                    with mock.patch.object(
+                        entities.ContentViewVersion,
+                        'promote',
+                        autospec=True,
+                        side_effect=fake.start,
+                    ) as promote:
+                        with mock.patch.object(
+                            entities.ContentViewComponent, 'read', side_effect=self.components
+                        ):
+                            report = pipeline.run(
+                                self.content_views,
+                                self.environments,
+                                promote=self.content_views[1:],
+                            )
+        self.assertEqual(
+            [job.label for job in report.failed],
+            [
+                'publish content view 1',
+                'publish content view 3',
+                'promote content view 3 to environment 2',
+                'promote content view 3 to environment 3',
+            ],
+        )
+        self.assertEqual(promote.call_count, 2)
+        (version,) = {call.args[0].id for call in promote.call_args_list}
+        self.assertEqual(version, 7)
+        promote.assert_called_with(mock.ANY, synchronous=False, data={'environment_ids': [3]})
+        # Which chain took longest depends on timing, so only its shape is
+        # checked. See CriticalPathTestCase.
+        seconds, path = report.critical_path
+        self.assertTrue(path)
+        for job, next_job in pairwise(path):
+            self.assertIn(job, next_job.depends_on)
+        self.assertGreaterEqual(report.elapsed, seconds)
+
+    def test_promote_published_version(self):
+        """Promote the version named by the publish task."""
+        pipeline = ContentViewPipeline(self.cfg)
+        publish = TaskJob(None)
+        publish.task = {'input': {'content_view_version_id': 4}}
+        with mock.patch.object(entities.ContentViewVersion, 'promote', autospec=True) as promote:
+            pipeline._promote(self.content_views[0], publish, self.environments[1])
+        self.assertEqual(promote.call_args.args[0].id, 4)
+
+
+class HostBulkActionTestCase(TestCase):
+    """Tests for :class:`nailgun.orchestration.HostBulkAction`."""
+
+    def setUp(self):
+        """Set ``self.cfg``."""
+        self.cfg = config.ServerConfig('http://example.com')
+
+    def test_invalid(self):
+        """Reject unknown actions and empty chunks."""
+        with self.assertRaises(ValueError):
+            HostBulkAction(self.cfg, 'update')
+        with self.assertRaises(ValueError):
+            HostBulkAction(self.cfg, 'bulk_destroy', chunk_size=0)
+
+    def test_jobs(self):
+        """Split the hosts in to chunks, each with its own payload."""
+        action = HostBulkAction(self.cfg, 'bulk_destroy', chunk_size=3, max_in_flight=2)
+        with mock.patch.object(entities.Host, 'bulk_destroy') as bulk_destroy:
+            jobs = action.jobs([*range(1, 11), 1], data={'organization_id': 5})
+            jobs[-1].start()
+        self.assertEqual([job.items for job in jobs], [[1, 2, 3], [4, 5, 6], [7, 8, 9], [10]])
+        bulk_destroy.assert_called_once_with(
+            synchronous=False, data={'organization_id': 5, 'included': {'ids': [10]}}
+        )
+        self.assertEqual(action.jobs([]), [])
+
+    def test_jobs_small(self):
+        """Make chunks smaller so that every slot is used."""
+        action = HostBulkAction(self.cfg, 'bulk_traces', max_in_flight=4)
+        self.assertEqual(
+            [len(job.items) for job in action.jobs(range(10))],
+            [3, 3, 3, 1],
+        )
+
+    def test_host_ids(self):
+        """Fetch the IDs of the hosts matching a search, a page at a time."""
+        action = HostBulkAction(self.cfg, 'bulk_traces', search_page_size=2)
+        pages = [{'results': [{'id': 1}, {'id': 2}]}, {'results': [{'id': 3}]}]
+        with mock.patch.object(entities.Host, 'search_json', side_effect=pages) as search_json:
+            jobs = action.jobs(search='os = RedHat')
+        self.assertEqual([host_id for job in jobs for host_id in job.items], [1, 2, 3])
+        search_json.assert_called_with(
+            fields=set(),
+            query={'search': 'os = RedHat', 'thin': True, 'page': 2, 'per_page': 2},
+        )
+
+    def test_run(self):
+        """Merge the results of every chunk, and report the hosts which failed."""
+        failing_host_ids = {3}
+
+        def bulk_traces(synchronous=True, timeout=None, **kwargs):
+            host_ids = kwargs['data']['included']['ids']
+            if failing_host_ids.intersection(host_ids):
+                raise HTTPError('500')
+            return {'results': [{'host_id': host_id} for host_id in host_ids]}
+
+        action = HostBulkAction(self.cfg, 'bulk_traces', chunk_size=2, poll_rate=0)
+        with mock.patch.object(entities.Host, 'bulk_traces', side_effect=bulk_traces):
+            report = action.run(range(1, 6))
+        self.assertEqual(
+            sorted(result['host_id'] for result in report.results),
+            [1, 2, 5],
+        )
+        self.assertEqual(report.failed_host_ids, [3, 4])
+        self.assertEqual(report.tasks, [])
+
+    def test_run_tasks(self):
+        """Track the tasks started for each chunk, and halve chunks which fail."""
+        fake = FakeTasks(results=['error'])
+        action = HostBulkAction(
+            self.cfg,
+            'bulk_destroy',
+            max_in_flight=1,
+            poll_rate=0,
+            retry_policy=TaskRetryPolicy(max_attempts=2),
+        )
+        with mock.patch.object(entities.ForemanTask, 'bulk_search', fake.bulk_search):
+            with mock.patch.object(entities.Host, 'bulk_destroy', side_effect=fake.start):
+                report = action.run([1, 2, 3])
+        self.assertEqual(report.failed_host_ids, [])
+        self.assertEqual(len(report.tasks), 2)
+        self.assertEqual(
+            [child.items for child in report.jobs[0].children],
+            [[1], [2, 3]],
+        )
+
+
+class CapsuleSyncFanOutTestCase(TestCase):
+    """Tests for :class:`nailgun.orchestration.CapsuleSyncFanOut`.
+
+    Lifecycle environments 1 and 2 are attached to capsule 1, environment 2 is
+    attached to capsule 2, and none are attached to capsule 3.
+    """
+
+    def setUp(self):
+        """Create capsules and lifecycle environments."""
+        self.cfg = config.ServerConfig('http://example.com')
+        self.capsules = [entities.Capsule(self.cfg, id=i) for i in (1, 2, 3)]
+        self.environments = [entities.LifecycleEnvironment(self.cfg, id=i) for i in (1, 2)]
+        self.attached = {1: [1, 2], 2: [2], 3: []}
+
+    def content_lifecycle_environments(self, capsule, synchronous=True, timeout=None, **kwargs):
+        """Implement :meth:`nailgun.entities.Capsule.content_lifecycle_environments`."""
+        return {'results': [{'id': i} for i in self.attached[capsule.id]]}
+
+    def test_jobs(self):
+        """Sync each capsule once if no environments are given."""
+        fan_out = CapsuleSyncFanOut(self.cfg)
+        with mock.patch.object(entities.Capsule, 'content_sync') as content_sync:
+            jobs = fan_out.jobs(self.capsules, data={'skip_metadata_check': True})
+            jobs[0].start()
+        self.assertEqual([job.items for job in jobs], [[capsule] for capsule in self.capsules])
+        content_sync.assert_called_once_with(synchronous=False, data={'skip_metadata_check': True})
+
+    def test_jobs_environments(self):
+        """Sync each capsule for the given environments attached to it, in turn."""
+        fan_out = CapsuleSyncFanOut(self.cfg)
+        with mock.patch.object(
+            entities.Capsule,
+            'content_lifecycle_environments',
+            autospec=True,
+            side_effect=self.content_lifecycle_environments,
+        ):
+            with mock.patch.object(entities.Capsule, 'content_sync') as content_sync:
+                jobs = fan_out.jobs(self.capsules, self.environments)
+                jobs[1].start()
+        self.assertEqual(
+            [job.label for job in jobs],
+            [
+                'sync capsule 1 for environment 1',
+                'sync capsule 1 for environment 2',
+                'sync capsule 2 for environment 2',
+            ],
+        )
+        self.assertEqual(jobs[1].run_after, [jobs[0]])
+        self.assertEqual(jobs[2].run_after, [])
+        content_sync.assert_called_once_with(synchronous=False, data={'environment_id': 2})
+
+    def test_run(self):
+        """Report timings, and fetch content counts for capsules that synced."""
+        fake = FakeTasks(polls=2, results=['success', 'error'])
+        fan_out = CapsuleSyncFanOut(self.cfg, poll_rate=0, max_in_flight=1)
+        with mock.patch.object(entities.ForemanTask, 'bulk_search', fake.bulk_search):
+            with mock.patch.object(entities.Capsule, 'content_sync', side_effect=fake.start):
+                with mock.patch.object(
+                    entities.Capsule,
+                    'content_counts',
+                    autospec=True,
+                    side_effect=lambda capsule: {'capsule': capsule.id},
+                ) as content_counts:
+                    report = fan_out.run(self.capsules)
+        self.assertEqual([job.items[0].id for job in report.failed], [2])
+        self.assertEqual(sorted(report.durations), [1, 2, 3])
+        self.assertEqual(report.content_counts, {1: {'capsule': 1}, 3: {'capsule': 3}})
+        self.assertEqual(content_counts.call_count, 2)
@@ -0,0 +1,124 @@
+"""Tests for :mod:`nailgun.profiling`."""
+
+import os
+import pstats
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+
+from nailgun import client, entities, entity_mixins, profiling
+from tests.helpers import FakeServerCase
+
+# Due to the length of the with statements, nested is preferred over combined
+# ruff: noqa: SIM117
+
+
+class ProfilerTestCase(FakeServerCase):
+    """Tests for :class:`nailgun.profiling.Profiler`."""
+
+    task_polls = 0
+
+    def setUp(self):
+        """Make a server to send requests to, and a place for profiles."""
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def run_job(self):
+        """Create an organization, and send a request outside of any operation."""
+        entities.Organization(self.cfg, name='org').create()
+        client.get(f'{self.cfg.url}/api/v2/smart_proxies/1')
+
+    def profiles(self):
+        """Return the labels of the profiles written, and their paths."""
+        prefix = f'nailgun-{os.getpid()}-'
+        return {
+            name[len(prefix) :].rsplit('.', 1)[0]: os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+        }
+
+    def test_cprofile(self):
+        """Write a pstats file per entity class and method, or client call."""
+        with profiling.profile(self.directory):
+            self.run_job()
+        profiles = self.profiles()
+        self.assertEqual(set(profiles), {'Organization.create', 'client.GET'})
+        stats = pstats.Stats(profiles['Organization.create'])
+        functions = {function for _, _, function in stats.stats}
+        self.assertIn('create_payload', functions)
+        self.assertIn('read_json', functions)
+        self.assertEqual((client._interceptors, entity_mixins._observers), ((), ()))
+
+    def test_cprofile_skipped(self):
+        """Count the operations not profiled as they overlap another, and warn of them."""
+        with self.assertLogs('nailgun.profiling', 'WARNING') as logs:
+            with profiling.profile(self.directory) as profiler:
+                # Stand in for an operation being profiled in another thread.
+                with profiler._cprofile_lock:
+                    entities.SmartProxy(self.cfg, id=1).read()
+                entities.SmartProxy(self.cfg, id=1).read()
+        self.assertEqual(profiler.skipped, {'SmartProxy.read': 1})
+        self.assertIn('1 operations were not profiled', logs.output[0])
+        self.assertEqual(set(self.profiles()), {'SmartProxy.read'})
+
+    def test_sample(self):
+        """Write a collapsed stack file per entity class and method."""
+        proxy = entities.SmartProxy(self.cfg, id=1)
+        attrs = proxy.read_json()
+
+        def read_json(**_kwargs):
+            time.sleep(0.05)
+            return attrs
+
+        with mock.patch.object(entities.SmartProxy, 'read_json', side_effect=read_json):
+            with profiling.profile(self.directory, 'sample', interval=0.001):
+                proxy.read()
+        profiles = self.profiles()
+        self.assertEqual(set(profiles), {'SmartProxy.read'})
+        with open(profiles['SmartProxy.read']) as handle:
+            lines = handle.read().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertGreater(int(count), 0)
+            self.assertIn('nailgun.entity_mixins.EntityReadMixin.read;', stack)
+
+    def test_bad_mode(self):
+        """Refuse to profile in an unknown mode."""
+        with self.assertRaises(ValueError):
+            profiling.Profiler(self.directory, 'perf')
+
+    def test_environment(self):
+        """Profile a process in which the environment variable is set."""
+        script = (
+            'import os; from unittest import mock; from nailgun import client; '
+            'mock.patch("requests.get").start(); client.get("https://example.com/api"); '
+            'print(os.getpid())'
+        )
+        environment = dict(os.environ, NAILGUN_PROFILE=self.directory)
+        process = subprocess.run(
+            [sys.executable, '-c', script],
+            env=environment,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(
+            os.listdir(self.directory), [f'nailgun-{process.stdout.strip()}-client.GET.pstats']
+        )
+
+    def test_environment_bad_mode(self):
+        """Warn of an unknown mode in the environment, rather than fail to import NailGun."""
+        environment = dict(os.environ, NAILGUN_PROFILE=self.directory, NAILGUN_PROFILE_MODE='bogus')
+        process = subprocess.run(
+            [sys.executable, '-c', 'import nailgun'],
+            env=environment,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        self.assertIn('Not profiling', process.stderr)
+        self.assertEqual(os.listdir(self.directory), [])
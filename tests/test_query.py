@@ -0,0 +1,129 @@
+"""Tests for :mod:`nailgun.query`."""
+
+from datetime import date, datetime
+from unittest import TestCase, mock
+
+from nailgun import config, entities
+from nailgun.entity_fields import (
+    BooleanField,
+    DateTimeField,
+    DictField,
+    IntegerField,
+    OneToManyField,
+    OneToOneField,
+    StringField,
+)
+from nailgun.query import InvalidQueryError, Not, Query, Raw, SearchField as F
+
+# Comparisons with search fields build queries, so their operands are not magic
+# ruff: noqa: PLR2004
+
+
+class QueryTestCase(TestCase):
+    """Tests for compiling queries."""
+
+    def setUp(self):
+        """Set ``self.fields``."""
+        self.fields = {
+            'created_at': DateTimeField(),
+            'enabled': BooleanField(),
+            'facts': DictField(),
+            'id': IntegerField(),
+            'location': OneToManyField(entities.Location),
+            'name': StringField(),
+            'organization': OneToOneField(entities.Organization),
+        }
+
+    def test_conditions(self):
+        """Compile each kind of condition."""
+        cfg = config.ServerConfig('http://example.com')
+        for query, expected in (
+            (F('name') == 'foo', 'name = "foo"'),
+            (F('name') != 'a "b" \\c', 'name != "a \\"b\\" \\\\c"'),
+            (F('id') < 5, 'id < 5'),
+            (F('id') <= 5, 'id <= 5'),
+            (F('id') > 5, 'id > 5'),
+            (F('id') >= 5, 'id >= 5'),
+            (F('id').in_([1, 2]), 'id ^ (1, 2)'),
+            (F('name').not_in(['a', 'b']), 'name !^ ("a", "b")'),
+            (F('name').like('web*'), 'name ~ "web*"'),
+            (F('name').not_like('web'), 'name !~ "web"'),
+            (F('id').between(1, 9), 'id >= 1 and id <= 9'),
+            (F('name').is_set(), 'set? name'),
+            (F('name').is_null(), 'null? name'),
+            (F('name') == None, 'null? name'),  # noqa: E711
+            (F('name') != None, 'set? name'),  # noqa: E711
+            (F('enabled') == False, 'enabled = false'),  # noqa: E712
+            (F('created_at') > date(2020, 1, 2), 'created_at > "2020-01-02"'),
+            (
+                F('created_at') < datetime(2020, 1, 2, 3, 4, 5),
+                'created_at < "2020-01-02 03:04:05"',
+            ),
+            (F('organization') == entities.Organization(cfg, id=3), 'organization_id = 3'),
+            (F('organization') == 'Default', 'organization = "Default"'),
+            (F('location_id').in_([1, 2]), 'location_id ^ (1, 2)'),
+        ):
+            with self.subTest(expected):
+                self.assertEqual(query.compile(self.fields), expected)
+
+    def test_operators(self):
+        """Combine queries with and, or and not."""
+        name = F('name') == 'foo'
+        self.assertEqual(
+            str((name | (F('id') > 1)) & ~name & Raw('os = RedHat')),
+            '(name = "foo" or id > 1) and not (name = "foo") and (os = RedHat)',
+        )
+        self.assertEqual(
+            str((name & (F('id') > 1)) | Not(name | name)),
+            '(name = "foo" and id > 1) or not (name = "foo" or name = "foo")',
+        )
+
+    def test_unchecked(self):
+        """Do not check queries compiled without fields."""
+        self.assertEqual(str(F('os') == 'RedHat'), 'os = "RedHat"')
+        self.assertEqual(str(F('os') == None), 'null? os')  # noqa: E711
+        self.assertEqual(repr(F('id') == 1), "nailgun.query.Condition('id = 1')")
+
+    def test_none(self):
+        """Reject comparisons with ``None`` other than equality, checked or not."""
+        for query in (F('id') > None, F('id').in_([1, None]), F('name').like(None)):
+            for fields in (None, self.fields):
+                with self.subTest((str(query.value), fields)), self.assertRaises(InvalidQueryError):
+                    query.compile(fields)
+
+    def test_abstract(self):
+        """Only let queries which can be compiled be made."""
+        with self.assertRaises(TypeError):
+            Query()
+
+    def test_invalid(self):
+        """Reject queries which do not fit the fields."""
+        for query in (
+            F('os') == 'RedHat',
+            F('name_id') == 1,
+            F('facts') == 'a',
+            F('id') == '1',
+            F('id') == True,  # noqa: E712
+            F('id').like('1'),
+            F('enabled') > True,
+            F('enabled') == 1,
+            F('created_at').like('2020'),
+            F('name').in_(['a', 1]),
+            ~(F('os') == 'RedHat'),
+        ):
+            with self.subTest(str(query)), self.assertRaises(InvalidQueryError):
+                query.compile(self.fields)
+
+    def test_search(self):
+        """Compile a query passed to a search, checking it against the entity."""
+        host = entities.Host(config.ServerConfig('http://example.com'))
+        payload = host.search_payload(set(), {'search': F('name').like('web'), 'per_page': 5})
+        self.assertEqual(payload, {'search': 'name ~ "web"', 'per_page': 5})
+        with self.assertRaises(InvalidQueryError):
+            host.search_payload(set(), {'search': F('no such field') == 1})
+        with mock.patch.object(host, 'search_json', return_value={'results': []}) as search_json:
+            host.search(set(), {'search': F('name') == 'web'}, filters={'name': 'web'})
+        self.assertEqual(
+            search_json.call_args[0][1],
+            {'search': '(name = "web") and name = "web"'},
+        )
@@ -0,0 +1,169 @@
+"""Tests for :mod:`nailgun.tracing`."""
+
+import contextlib
+from unittest import mock
+
+from requests.exceptions import HTTPError
+
+from nailgun import client, entities, entity_mixins, tracing
+from tests.helpers import FakeServerCase
+
+
+class FakeSpan:
+    """A span, which knows its children."""
+
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = dict(attributes)
+        self.children = []
+
+    def set_attribute(self, key, value):
+        """Set an attribute."""
+        self.attributes[key] = value
+
+    def tree(self):
+        """Return the names of this span and its descendants, as nested tuples."""
+        return (self.name, [child.tree() for child in self.children])
+
+
+class FakeTracer:
+    """A tracer, which keeps the spans it starts."""
+
+    def __init__(self):
+        self.spans = []
+        self._current = []
+
+    @contextlib.contextmanager
+    def start_as_current_span(self, name, attributes=None):
+        """Start a span as a child of the current one."""
+        span = FakeSpan(name, attributes or {})
+        (self._current[-1].children if self._current else self.spans).append(span)
+        self._current.append(span)
+        try:
+            yield span
+        finally:
+            self._current.pop()
+
+
+@mock.patch.object(tracing, 'otel_trace', None)
+class TracingTestCase(FakeServerCase):
+    """Tests for :class:`nailgun.tracing.Tracing`."""
+
+    entity_types = (
+        entities.ContentView,
+        entities.Organization,
+        entities.Product,
+        entities.SmartProxy,
+    )
+
+    def setUp(self):
+        """Make a server to send requests to, and a tracer."""
+        super().setUp()
+        self.tracer = FakeTracer()
+
+    def test_tree(self):
+        """Start spans for operations, and for the requests and task waits within them."""
+        with tracing.trace(self.tracer):
+            org = entities.Organization(self.cfg, name='org').create()
+            entities.Product(self.cfg, name='foo', organization=org).create().delete()
+        self.assertEqual(
+            [span.tree() for span in self.tracer.spans],
+            [
+                (
+                    'Organization.create',
+                    [
+                        ('POST /katello/api/organizations', []),
+                        ('Organization.read', [('GET /katello/api/organizations/{id}', [])]),
+                    ],
+                ),
+                (
+                    'Product.create',
+                    [('POST /katello/api/v2/products', []), ('Product.read', [])],
+                ),
+                (
+                    'Product.delete',
+                    [
+                        ('DELETE /katello/api/v2/products/{id}', []),
+                        (
+                            'poll_task',
+                            [
+                                ('GET /foreman_tasks/api/tasks/{id}', []),
+                                ('GET /foreman_tasks/api/tasks/{id}', []),
+                            ],
+                        ),
+                    ],
+                ),
+            ],
+        )
+        delete = self.tracer.spans[2]
+        self.assertEqual(
+            delete.attributes,
+            {'nailgun.operation': 'delete', 'nailgun.entity': 'Product', 'nailgun.entity.id': 3},
+        )
+        poll = delete.children[1]
+        self.assertEqual(poll.attributes['nailgun.entity'], 'Product')
+        self.assertIn('nailgun.task.id', poll.attributes)
+        request = poll.children[0]
+        self.assertEqual(
+            {key: request.attributes[key] for key in ('http.request.method', 'url.template')},
+            {'http.request.method': 'GET', 'url.template': '/foreman_tasks/api/tasks/{id}'},
+        )
+        self.assertEqual(request.attributes['http.response.status_code'], 200)
+        self.assertEqual(len(request.attributes['nailgun.request.id']), 36)
+        self.assertGreaterEqual(request.attributes['nailgun.server.duration'], 0)
+
+    def test_action(self):
+        """Start a span for an action method, parenting its requests and task wait."""
+        org = entities.Organization(self.cfg, name='org').create()
+        content_view = entities.ContentView(self.cfg, name='foo', organization=org).create()
+        with tracing.trace(self.tracer):
+            content_view.publish()
+        self.assertEqual(
+            [span.tree() for span in self.tracer.spans],
+            [
+                (
+                    'ContentView.publish',
+                    [
+                        ('POST /katello/api/v2/content_views/{id}/publish', []),
+                        (
+                            'poll_task',
+                            [
+                                ('GET /foreman_tasks/api/tasks/{id}', []),
+                                ('GET /foreman_tasks/api/tasks/{id}', []),
+                            ],
+                        ),
+                    ],
+                ),
+            ],
+        )
+        (publish,) = self.tracer.spans
+        self.assertEqual(
+            publish.attributes,
+            {
+                'nailgun.operation': 'publish',
+                'nailgun.entity': 'ContentView',
+                'nailgun.entity.id': content_view.id,
+            },
+        )
+        poll = publish.children[1]
+        self.assertEqual(poll.attributes['nailgun.entity'], 'ContentView')
+        self.assertIn('nailgun.task.id', poll.attributes)
+
+    def test_error(self):
+        """Mark requests which receive an error response."""
+        with tracing.trace(self.tracer), self.assertRaises(HTTPError):
+            entities.Product(self.cfg, id=1000).read()
+        (read,) = self.tracer.spans
+        (request,) = read.children
+        self.assertEqual(request.attributes['error.type'], '404')
+
+    def test_no_tracer(self):
+        """Do nothing when there is no tracer."""
+        with tracing.trace() as traced:
+            self.assertIsNone(traced.tracer)
+            self.assertEqual((client._interceptors, entity_mixins._observers), ((), ()))
+            entities.SmartProxy(self.cfg, id=1).read()
+        with tracing.trace(self.tracer):
+            entities.SmartProxy(self.cfg, id=1).read()
+        self.assertEqual((client._interceptors, entity_mixins._observers), ((), ()))
+        self.assertEqual(len(self.tracer.spans), 1)